@@ -10,11 +10,15 @@ def main():
         # "export_by_location_intersects",
         # "join_by_location_intersects",
         # "clip",
+        # "fill_gpkg_rtree",
+        # "fill_gpkg_rtree_unsorted",
         # "intersection",
         "intersection_complexpoly_agri",
         # "intersection_complexpoly_complexpoly",
         # "intersection_gridsize",
         # "symmetric_difference_complexpolys_agri",
+        # "to_file",
+        # "to_file_arrow",
         # "union",
     ]
     # Run all bechmark functions
@@ -4,13 +4,14 @@
 import inspect
 import logging
 import multiprocessing
+import sqlite3
 from datetime import datetime
 from pathlib import Path
 
 import geofileops as gfo
 from benchmark.benchmarker import RunResult
 from benchmark.benchmarks import testdata
-from geofileops.util import _geoops_gpd, _geoops_sql
+from geofileops.util import _geoops_gpd, _geoops_sql, _sqlite_util
 
 logger = logging.getLogger(__name__)
 nb_parallel = min(multiprocessing.cpu_count(), 12)
@@ -286,6 +287,67 @@ def export_by_location_intersects_complexpoly(tmp_dir: Path) -> RunResult:
     return result
 
 
+def fill_gpkg_rtree(tmp_dir: Path) -> RunResult:
+    return _fill_gpkg_rtree(tmp_dir, hilbert=True)
+
+
+def fill_gpkg_rtree_unsorted(tmp_dir: Path) -> RunResult:
+    return _fill_gpkg_rtree(tmp_dir, hilbert=False)
+
+
+def _fill_gpkg_rtree(tmp_dir: Path, hilbert: bool) -> RunResult:
+    # Init
+    input_path, input_descr = testdata.TestFile.AGRIPRC_2018.get_file(tmp_dir)
+    operation = "fill_gpkg_rtree" if hilbert else "fill_gpkg_rtree_unsorted"
+    test_path = tmp_dir / f"{input_path.stem}_{operation}.gpkg"
+    gfo.copy(input_path, test_path)
+    gfo.remove_spatial_index(test_path)
+    layer = gfo.get_only_layer(test_path)
+    geometrycolumn = gfo.get_layerinfo(test_path, layer).geometrycolumn
+    rtree = f"rtree_{layer}_{geometrycolumn}"
+
+    # Go!
+    conn = sqlite3.connect(test_path)
+    try:
+        _sqlite_util.load_spatialite(conn)
+        conn.execute("SELECT EnableGpkgMode();")
+        conn.execute(f"SELECT gpkgAddSpatialIndex('{layer}', '{geometrycolumn}');")
+        start_time = datetime.now()
+        if hilbert:
+            _sqlite_util.fill_gpkg_rtree(conn, layer, geometrycolumn)
+        else:
+            # Fill the rtree in a single INSERT ... SELECT, in the order of the fids
+            conn.execute(
+                f"""
+                INSERT INTO "{rtree}"
+                  SELECT fid
+                        ,ST_MinX("{geometrycolumn}")
+                        ,ST_MaxX("{geometrycolumn}")
+                        ,ST_MinY("{geometrycolumn}")
+                        ,ST_MaxY("{geometrycolumn}")
+                    FROM "{layer}"
+                   WHERE "{geometrycolumn}" IS NOT NULL
+                     AND ST_IsEmpty("{geometrycolumn}") = 0
+                """
+            )
+        conn.commit()
+        secs_taken = (datetime.now() - start_time).total_seconds()
+    finally:
+        conn.close()
+
+    result = RunResult(
+        package=_get_package(),
+        package_version=_get_version(),
+        operation=operation,
+        secs_taken=secs_taken,
+        operation_descr=f"{operation} of {input_descr}",
+    )
+
+    # Cleanup and return
+    test_path.unlink()
+    return result
+
+
 def intersection(tmp_dir: Path) -> RunResult:
     # Init
     function_name = inspect.currentframe().f_code.co_name  # type: ignore[union-attr]
@@ -587,6 +649,40 @@ def symmetric_difference_complexpolys_agri(tmp_dir: Path) -> RunResult:
     return result
 
 
+def to_file(tmp_dir: Path) -> RunResult:
+    return _to_file(tmp_dir, use_arrow=False)
+
+
+def to_file_arrow(tmp_dir: Path) -> RunResult:
+    return _to_file(tmp_dir, use_arrow=True)
+
+
+def _to_file(tmp_dir: Path, use_arrow: bool) -> RunResult:
+    # Init
+    input_path, input_descr = testdata.TestFile.AGRIPRC_2018.get_file(tmp_dir)
+    input_gdf = gfo.read_file(input_path)
+    operation = "to_file_arrow" if use_arrow else "to_file"
+
+    # Go!
+    output_path = tmp_dir / f"{input_path.stem}_{operation}.gpkg"
+    with gfo.TempEnv({"GFO_IO_USE_ARROW": use_arrow}):
+        start_time = datetime.now()
+        gfo.to_file(input_gdf, output_path)
+        secs_taken = (datetime.now() - start_time).total_seconds()
+    result = RunResult(
+        package=_get_package(),
+        package_version=_get_version(),
+        operation=operation,
+        secs_taken=secs_taken,
+        operation_descr=f"{operation} of {input_descr}",
+        run_details={"use_arrow": use_arrow},
+    )
+
+    # Cleanup and return
+    output_path.unlink()
+    return result
+
+
 def union(tmp_dir: Path) -> RunResult:
     # Init
     function_name = inspect.currentframe().f_code.co_name  # type: ignore[union-attr]
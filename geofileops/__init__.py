@@ -18,6 +18,8 @@ from geofileops.geoops import *  # noqa: F403
 from geofileops.helpers.layerstyles import *  # noqa: F403
 from geofileops.util._general_util import TempEnv  # noqa: F401
 from geofileops.util._geofileinfo import get_driver  # noqa: F401
+from geofileops.util._processing_util import worker_pool  # noqa: F401
+from geofileops.util._queue_executor import DirectoryQueueExecutor  # noqa: F401
 
 
 def _get_version():
@@ -69,6 +69,8 @@ GDAL_GTE_38 = version.parse(gdal.__version__) >= version.parse("3.8")
 GEOPANDAS_GTE_10 = version.parse(gpd.__version__) >= version.parse("1.0")
 PANDAS_GTE_22 = version.parse(pd.__version__) >= version.parse("2.2")
 PYOGRIO_GTE_07 = version.parse(pyogrio.__version__) >= version.parse("0.7")
+PYOGRIO_GTE_08 = version.parse(pyogrio.__version__) >= version.parse("0.8")
+PYOGRIO_GTE_012 = version.parse(pyogrio.__version__) >= version.parse("0.12")
 SHAPELY_GTE_20 = version.parse(shapely.__version__) >= version.parse("2")
 SPATIALITE_GTE_51 = version.parse(sqlite3_spatialite_version) >= version.parse("5.1")
 
@@ -1,15 +1,17 @@
 """Module with helper functions for geo files."""
 
+import copy as copy_module
 import enum
 import filecmp
 import logging
+import math
 import pprint
 import shutil
 import string
 import tempfile
-import time
 import warnings
-from collections.abc import Iterable
+from collections.abc import Iterable, Iterator
+from contextlib import ExitStack, contextmanager
 from datetime import date, datetime
 from pathlib import Path
 from typing import (
@@ -25,17 +27,19 @@ import numpy as np
 import pandas as pd
 import pyogrio
 import pyproj
+import shapely
 from geopandas.io import file as gpd_io_file
 from osgeo import gdal
 from pandas.api.types import is_integer_dtype
 from pygeoops import GeometryType, PrimitiveType  # noqa: F401
 
-from geofileops._compat import PYOGRIO_GTE_07
+from geofileops._compat import PYOGRIO_GTE_012, PYOGRIO_GTE_07, PYOGRIO_GTE_08
 from geofileops.helpers._configoptions_helper import ConfigOptions
 from geofileops.util import (
     _geofileinfo,
     _geoseries_util,
     _io_util,
+    _metadata_cache,
     _ogr_sql_util,
     _ogr_util,
 )
@@ -118,6 +122,15 @@ def listlayers(
     if path.suffix.lower() == ".shp":
         return [path.stem]
 
+    layers = _metadata_cache.get(
+        path,
+        key=("listlayers", only_spatial_layers),
+        compute=lambda: _listlayers(path, only_spatial_layers),
+    )
+    return list(layers)
+
+
+def _listlayers(path: Path, only_spatial_layers: bool) -> list[str]:
     datasource = None
     layers = []
     try:
@@ -304,6 +317,20 @@ def get_layerinfo(
     if layer is None:
         layer = get_only_layer(path)
 
+    layerinfo = _metadata_cache.get(
+        path,
+        key=("layerinfo", layer, raise_on_nogeom),
+        compute=lambda: _get_layerinfo(path, layer, raise_on_nogeom),
+    )
+
+    # Return a copy, so changes by the caller don't end up in the cache
+    layerinfo = copy_module.copy(layerinfo)
+    layerinfo.columns = dict(layerinfo.columns)
+    layerinfo.errors = list(layerinfo.errors)
+    return layerinfo
+
+
+def _get_layerinfo(path: Path, layer: str, raise_on_nogeom: bool) -> LayerInfo:
     datasource = None
     try:
         datasource = gdal.OpenEx(
@@ -420,6 +447,12 @@ def get_only_layer(path: Union[str, "os.PathLike[Any]"]) -> str:
     Returns:
         str: the layer name
     """
+    return _metadata_cache.get(
+        path, key=("only_layer",), compute=lambda: _get_only_layer(path)
+    )
+
+
+def _get_only_layer(path: Union[str, "os.PathLike[Any]"]) -> str:
     datasource = None
     try:
         datasource_layer = None
@@ -493,6 +526,7 @@ def execute_sql(
         raise
     finally:
         datasource = None
+        _metadata_cache.invalidate(path)
 
 
 def create_spatial_index(
@@ -567,6 +601,7 @@ def create_spatial_index(
         raise
     finally:
         datasource = None
+        _metadata_cache.invalidate(path)
 
     if not has_spatial_index(path, layer):
         raise RuntimeError(f"create_spatial_index failed on {path}, layer: {layer}")
@@ -670,6 +705,7 @@ def remove_spatial_index(
         raise
     finally:
         datasource = None
+        _metadata_cache.invalidate(path)
 
 
 def rename_layer(
@@ -714,6 +750,7 @@ def rename_layer(
         raise
     finally:
         datasource = None
+        _metadata_cache.invalidate(path)
 
 
 def rename_column(
@@ -791,6 +828,7 @@ def rename_column(
         raise
     finally:
         datasource = None
+        _metadata_cache.invalidate(path)
 
 
 class DataType(enum.Enum):
@@ -894,6 +932,7 @@ def add_column(
         raise
     finally:
         datasource = None
+        _metadata_cache.invalidate(path)
 
 
 def drop_column(
@@ -930,6 +969,7 @@ def drop_column(
         raise
     finally:
         datasource = None
+        _metadata_cache.invalidate(path)
 
 
 def update_column(
@@ -980,6 +1020,7 @@ def update_column(
         raise
     finally:
         datasource = None
+        _metadata_cache.invalidate(path)
 
 
 def read_file(
@@ -1123,6 +1164,203 @@ def read_file_nogeom(
     return result_gdf
 
 
+def read_file_chunks(
+    path: Union[str, "os.PathLike[Any]"],
+    chunksize: int = 100_000,
+    layer: Optional[str] = None,
+    columns: Optional[Iterable[str]] = None,
+    bbox=None,
+    where: Optional[str] = None,
+    ignore_geometry: bool = False,
+    fid_as_index: bool = False,
+) -> Iterator[Union[pd.DataFrame, gpd.GeoDataFrame]]:
+    """Reads a file in chunks of GeoDataFrames.
+
+    This makes it possible to process files that are too large to fit in memory: only
+    one chunk is in memory at a time.
+
+    If pyogrio >= 0.8 and pyarrow are available, the features are streamed in Arrow
+    batches while the file stays open. Otherwise, each chunk is read separately using
+    the ``rows`` parameter of :func:`read_file`, which is slower for most file formats.
+
+    Args:
+        path (file path): path to the file to read from
+        chunksize (int, optional): the maximum number of rows per chunk.
+            Defaults to 100000.
+        layer (str, optional): The layer to read. If None and there is only one layer in
+            the file it is read, otherwise an error is thrown. Defaults to None.
+        columns (Iterable[str], optional): The (non-geometry) columns to read will
+            be returned in the order specified. If None, all standard columns are read.
+            In addition to standard columns, it is also possible to specify "fid", a
+            unique index available in all input files. Defaults to None.
+        bbox (Tuple, optional): return only geometries intersecting this bbox.
+            Defaults to None, then all rows are read.
+        where (str, optional): where clause to filter features in layer by attribute
+            values. Check :func:`read_file` for more details. Defaults to None.
+        ignore_geometry (bool, optional): True not to read/return the geometry.
+            Defaults to False.
+        fid_as_index (bool, optional): If True, will use the FIDs of the features that
+            were read as the index of the GeoDataFrame. Defaults to False.
+
+    Raises:
+        ValueError: an invalid parameter value was passed.
+
+    Yields:
+        Union[pd.DataFrame, gpd.GeoDataFrame]: the chunks read. If ``fid_as_index`` is
+            False, the index is continuous over the chunks.
+
+    Examples:
+        .. code-block:: python
+
+            import geofileops as gfo
+
+            for chunk_gdf in gfo.read_file_chunks("parcels.gpkg", chunksize=50_000):
+                print(chunk_gdf.area.sum())
+
+    """
+    if chunksize <= 0:
+        raise ValueError(f"chunksize should be > 0, not {chunksize}")
+    path = Path(path)
+    if path.exists() is False:
+        raise ValueError(f"file doesn't exist: {path}")
+    if layer is None:
+        layer = get_only_layer(path)
+    if isinstance(columns, str):
+        columns = [columns]
+    fid_as_column = columns is not None and "fid" in [col.lower() for col in columns]
+
+    if ConfigOptions.io_engine == "pyogrio" and _arrow_available():
+        chunks = _read_file_chunks_arrow(
+            path=path,
+            chunksize=chunksize,
+            layer=layer,
+            columns=columns,
+            bbox=bbox,
+            where=where,
+            ignore_geometry=ignore_geometry,
+            fid_as_index=fid_as_index or fid_as_column,
+        )
+    else:
+        chunks = _read_file_chunks_rows(
+            path=path,
+            chunksize=chunksize,
+            layer=layer,
+            columns=columns,
+            bbox=bbox,
+            where=where,
+            ignore_geometry=ignore_geometry,
+            fid_as_index=fid_as_index or fid_as_column,
+        )
+
+    nb_rows_read = 0
+    for chunk_df in chunks:
+        if fid_as_column:
+            chunk_df["fid"] = chunk_df.index
+        if not fid_as_index:
+            chunk_df.index = pd.RangeIndex(nb_rows_read, nb_rows_read + len(chunk_df))
+        nb_rows_read += len(chunk_df)
+        yield chunk_df
+
+
+def _read_file_chunks_arrow(
+    path: Path,
+    chunksize: int,
+    layer: str,
+    columns: Optional[list[str]],
+    bbox,
+    where: Optional[str],
+    ignore_geometry: bool,
+    fid_as_index: bool,
+) -> Iterator[Union[pd.DataFrame, gpd.GeoDataFrame]]:
+    """Reads a file in chunks by streaming Arrow batches from one open dataset."""
+    from pyogrio.raw import open_arrow
+
+    columns_prepared = _prepare_columns(path, layer, columns)
+    columns_list = None if columns_prepared is None else list(columns_prepared)
+    kwargs = {}
+    if PYOGRIO_GTE_012:
+        # Read datetimes as string and parse them like pyogrio.read_dataframe does, so
+        # time zones are treated the same way as in read_file.
+        kwargs["datetime_as_string"] = True
+    with open_arrow(
+        path,
+        layer=layer,
+        columns=columns_list,
+        bbox=bbox,
+        where=where,
+        read_geometry=not ignore_geometry,
+        return_fids=fid_as_index,
+        batch_size=chunksize,
+        use_pyarrow=True,
+        **kwargs,
+    ) as (meta, reader):
+        geometry_name = meta["geometry_name"] or "wkb_geometry"
+        datetime_columns = [
+            column
+            for column, dtype in zip(meta["fields"], meta["dtypes"])
+            if dtype.startswith("datetime") and dtype != "datetime64[D]"
+        ]
+        for batch in reader:
+            if batch.num_rows == 0:
+                continue
+            chunk_df = batch.to_pandas(date_as_object=False)
+            for column in datetime_columns:
+                if column in chunk_df.columns and pd.api.types.is_string_dtype(
+                    chunk_df[column].dtype
+                ):
+                    try:
+                        chunk_df[column] = pd.to_datetime(
+                            chunk_df[column], format="ISO8601"
+                        )
+                    except ValueError:
+                        # E.g. mixed time zones: keep the strings
+                        pass
+            if fid_as_index:
+                chunk_df = chunk_df.set_index(meta["fid_column"])
+                chunk_df.index.name = "fid"
+            if not ignore_geometry and geometry_name in chunk_df.columns:
+                geometry = gpd.GeoSeries.from_wkb(
+                    chunk_df.pop(geometry_name).to_numpy(),
+                    index=chunk_df.index,
+                    crs=meta["crs"],
+                )
+                chunk_df = gpd.GeoDataFrame(chunk_df, geometry=geometry)
+            yield _reorder_columns(chunk_df, columns_prepared)
+
+
+def _read_file_chunks_rows(
+    path: Path,
+    chunksize: int,
+    layer: str,
+    columns: Optional[list[str]],
+    bbox,
+    where: Optional[str],
+    ignore_geometry: bool,
+    fid_as_index: bool,
+) -> Iterator[Union[pd.DataFrame, gpd.GeoDataFrame]]:
+    """Reads a file in chunks by reading slices of rows."""
+    # Remark: if "fid" is in columns, it is read as index via fid_as_index instead.
+    if columns is not None:
+        columns = [col for col in columns if col.lower() != "fid"]
+    start = 0
+    while True:
+        chunk_df = _read_file_base(
+            path=path,
+            layer=layer,
+            columns=columns,
+            bbox=bbox,
+            rows=slice(start, start + chunksize),
+            where=where,
+            ignore_geometry=ignore_geometry,
+            fid_as_index=fid_as_index,
+        )
+        if len(chunk_df) > 0:
+            yield chunk_df
+        if len(chunk_df) < chunksize:
+            return
+        start += chunksize
+
+
 def _read_file_base(
     path: Union[str, "os.PathLike[Any]"],
     layer: Optional[str] = None,
@@ -1316,14 +1554,23 @@ def _read_file_base_pyogrio(
         raise ValueError(f"file doesn't exist: {path}")
 
     # Convert rows slice object to pyogrio parameters
+    # Remark: when reading via Arrow, the rows are sliced in the Arrow stream.
     if rows is not None:
         skip_features = rows.start
         max_features = rows.stop - rows.start
     else:
         skip_features = 0
         max_features = None
-    # Arrow doesn't support filtering rows like this
-    # use_arrow = True if rows is None else False
+    use_arrow = kwargs.pop("use_arrow", None)
+    if use_arrow is None:
+        use_arrow = _use_arrow()
+    if use_arrow:
+        # Convert date columns to datetime64 while converting from Arrow to pandas,
+        # instead of checking all object columns for dates afterwards.
+        kwargs["arrow_to_pandas_kwargs"] = {
+            "date_as_object": False,
+            **kwargs.get("arrow_to_pandas_kwargs", {}),
+        }
 
     # If no sql_stmt specified
     columns_prepared = None
@@ -1332,16 +1579,7 @@ def _read_file_base_pyogrio(
         if layer is None:
             layer = get_only_layer(path)
 
-        # Checking if column names should be read is case sensitive in pyogrio, so
-        # make sure the column names specified have the same casing.
-        if columns is not None:
-            layerinfo = get_layerinfo(path, layer=layer, raise_on_nogeom=False)
-            columns_upper_lookup = {column.upper(): column for column in columns}
-            columns_prepared = {
-                column: columns_upper_lookup[column.upper()]
-                for column in layerinfo.columns
-                if column.upper() in columns_upper_lookup
-            }
+        columns_prepared = _prepare_columns(path, layer, columns)
     else:
         # Fill out placeholders, keep columns_prepared None because column filtering
         # should happen in sql_stmt.
@@ -1365,20 +1603,15 @@ def _read_file_base_pyogrio(
         sql_dialect=sql_dialect,
         read_geometry=not ignore_geometry,
         fid_as_index=fid_as_index,
+        use_arrow=use_arrow,
         **kwargs,
     )
 
-    # Reorder columns + change casing so they are the same as columns parameter
-    if columns_prepared is not None and len(columns_prepared) > 0:
-        columns_to_keep = list(columns_prepared)
-        if layerinfo.geometrycolumn is not None and not ignore_geometry:
-            columns_to_keep += ["geometry"]
-        result_gdf = result_gdf[columns_to_keep]
-        result_gdf = result_gdf.rename(columns=columns_prepared)
+    result_gdf = _reorder_columns(result_gdf, columns_prepared)
 
     # Cast columns that are of object type, but contain datetime.date or datetime.date
     # to proper datetime64 columns.
-    if len(result_gdf) > 0:
+    if not use_arrow and len(result_gdf) > 0:
         for column in result_gdf.select_dtypes(include=["object"]):
             if isinstance(result_gdf[column].iloc[0], (date, datetime)):
                 result_gdf[column] = pd.to_datetime(result_gdf[column])
@@ -1387,6 +1620,104 @@ def _read_file_base_pyogrio(
     return result_gdf
 
 
+def _prepare_columns(
+    path: Path, layer: str, columns: Optional[Iterable[str]]
+) -> Optional[dict[str, str]]:
+    """Map the columns in the file to the casing specified in columns.
+
+    Checking if column names should be read is case sensitive in pyogrio, so the column
+    names to read should have the same casing as in the file.
+
+    Returns:
+        Optional[dict[str, str]]: None if columns is None, otherwise a dict with the
+            column names in the file as keys and the names as specified in columns as
+            values.
+    """
+    if columns is None:
+        return None
+
+    layerinfo = get_layerinfo(path, layer=layer, raise_on_nogeom=False)
+    columns_upper_lookup = {column.upper(): column for column in columns}
+    return {
+        column: columns_upper_lookup[column.upper()]
+        for column in layerinfo.columns
+        if column.upper() in columns_upper_lookup
+    }
+
+
+def _reorder_columns(
+    df: Union[pd.DataFrame, gpd.GeoDataFrame],
+    columns_prepared: Optional[dict[str, str]],
+) -> Union[pd.DataFrame, gpd.GeoDataFrame]:
+    """Reorder columns + change casing so they are the same as columns parameter."""
+    if columns_prepared is None or len(columns_prepared) == 0:
+        return df
+
+    columns_to_keep = list(columns_prepared)
+    if isinstance(df, gpd.GeoDataFrame) and "geometry" in df.columns:
+        columns_to_keep += ["geometry"]
+    df = df[columns_to_keep]
+    return df.rename(columns=columns_prepared)
+
+
+def _arrow_available() -> bool:
+    """Check if pyogrio and pyarrow are available to read and write via Arrow."""
+    if not PYOGRIO_GTE_08:
+        return False
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+
+    return True
+
+
+def _use_arrow() -> bool:
+    """Determine if Arrow should be used to read and write files with pyogrio.
+
+    Raises:
+        RuntimeError: if Arrow should be used, but the dependencies are not available.
+
+    Returns:
+        bool: True if Arrow should be used.
+    """
+    if not ConfigOptions.io_use_arrow:
+        return False
+
+    if not PYOGRIO_GTE_08:
+        raise RuntimeError("GFO_IO_USE_ARROW=TRUE requires pyogrio >= 0.8")
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError as ex:
+        raise RuntimeError(
+            "GFO_IO_USE_ARROW=TRUE requires pyarrow to be installed"
+        ) from ex
+
+    return True
+
+
+def _use_arrow_write() -> bool:
+    """Determine if Arrow should be used to write files with pyogrio.
+
+    Writing via Arrow uses ``pyogrio.write_arrow``, which requires GDAL >= 3.8. For
+    older GDAL versions, the default write path is used instead.
+
+    Returns:
+        bool: True if Arrow should be used.
+    """
+    if not _use_arrow():
+        return False
+
+    if pyogrio.__gdal_version__ < (3, 8, 0):
+        logger.debug(
+            "GFO_IO_USE_ARROW=TRUE, but writing via Arrow requires GDAL >= 3.8: "
+            "use the default write path"
+        )
+        return False
+
+    return True
+
+
 def _fill_out_sql_placeholders(
     path: Path, layer: Optional[str], sql_stmt: str, columns: Optional[Iterable[str]]
 ) -> str:
@@ -1566,34 +1897,37 @@ def to_file(
             engine = "fiona"
 
     # Write file with the correct engine
-    if engine == "pyogrio":
-        return _to_file_pyogrio(
-            gdf=gdf,
-            path=path,
-            layer=layer,
-            force_output_geometrytype=force_output_geometrytype,
-            force_multitype=force_multitype,
-            append=append,
-            append_timeout_s=append_timeout_s,
-            index=index,
-            create_spatial_index=create_spatial_index,
-            **kwargs,
-        )
-    elif engine == "fiona":
-        return _to_file_fiona(
-            gdf=gdf,
-            path=path,
-            layer=layer,
-            force_output_geometrytype=force_output_geometrytype,
-            force_multitype=force_multitype,
-            append=append,
-            append_timeout_s=append_timeout_s,
-            index=index,
-            create_spatial_index=create_spatial_index,
-            **kwargs,
-        )
-    else:
-        raise ValueError(f"Unsupported engine: {engine}")
+    try:
+        if engine == "pyogrio":
+            return _to_file_pyogrio(
+                gdf=gdf,
+                path=path,
+                layer=layer,
+                force_output_geometrytype=force_output_geometrytype,
+                force_multitype=force_multitype,
+                append=append,
+                append_timeout_s=append_timeout_s,
+                index=index,
+                create_spatial_index=create_spatial_index,
+                **kwargs,
+            )
+        elif engine == "fiona":
+            return _to_file_fiona(
+                gdf=gdf,
+                path=path,
+                layer=layer,
+                force_output_geometrytype=force_output_geometrytype,
+                force_multitype=force_multitype,
+                append=append,
+                append_timeout_s=append_timeout_s,
+                index=index,
+                create_spatial_index=create_spatial_index,
+                **kwargs,
+            )
+        else:
+            raise ValueError(f"Unsupported engine: {engine}")
+    finally:
+        _metadata_cache.invalidate(path)
 
 
 def _to_file_fiona(
@@ -1718,48 +2052,21 @@ def _to_file_fiona(
             **kwargs,
         )
     else:
-        path_info = _geofileinfo.get_geofileinfo(path)
-
         # Files don't typically support having multiple processes writing
-        # simultanously to them, so use lock file to synchronize access.
-        lockfile = Path(f"{path!s}.lock")
-        start_time = datetime.now()
-        ready = False
-        while not ready:
-            if _io_util.create_file_atomic(lockfile) is True:
-                try:
-                    write_to_file(
-                        gdf=gdf,
-                        path=path,
-                        layer=layer,
-                        index=index,
-                        force_output_geometrytype=force_output_geometrytype,
-                        force_multitype=force_multitype,
-                        append=True,
-                        schema=schema,
-                        create_spatial_index=create_spatial_index,
-                        **kwargs,
-                    )
-                except Exception as ex:
-                    # If sqlite output file locked, also retry
-                    if path_info.is_spatialite_based and str(ex) not in [
-                        "database is locked",
-                        "attempt to write a readonly database",
-                    ]:
-                        raise ex
-                finally:
-                    ready = True
-                    lockfile.unlink()
-            else:
-                time_waiting = (datetime.now() - start_time).total_seconds()
-                if time_waiting > append_timeout_s:
-                    raise RuntimeError(
-                        f"to_file timeout of {append_timeout_s} reached, stop append "
-                        f"to {path}!"
-                    )
-
-            # Sleep for a second before trying again
-            time.sleep(1)
+        # simultanously to them, so use a lock file to synchronize access.
+        with _lock_for_append(path, append_timeout_s, operation="to_file"):
+            write_to_file(
+                gdf=gdf,
+                path=path,
+                layer=layer,
+                index=index,
+                force_output_geometrytype=force_output_geometrytype,
+                force_multitype=force_multitype,
+                append=True,
+                schema=schema,
+                create_spatial_index=create_spatial_index,
+                **kwargs,
+            )
 
 
 def _to_file_pyogrio(
@@ -1775,6 +2082,46 @@ def _to_file_pyogrio(
     **kwargs,
 ):
     """Writes a pandas dataframe to file using pyogrio."""
+    if append:
+        # Files don't typically support having multiple processes writing
+        # simultanously to them, so use a lock file to synchronize access.
+        with _lock_for_append(path, append_timeout_s, operation="to_file"):
+            return _to_file_pyogrio_nolock(
+                gdf=gdf,
+                path=path,
+                layer=layer,
+                force_output_geometrytype=force_output_geometrytype,
+                force_multitype=force_multitype,
+                append=append,
+                index=index,
+                create_spatial_index=create_spatial_index,
+                **kwargs,
+            )
+
+    return _to_file_pyogrio_nolock(
+        gdf=gdf,
+        path=path,
+        layer=layer,
+        force_output_geometrytype=force_output_geometrytype,
+        force_multitype=force_multitype,
+        append=append,
+        index=index,
+        create_spatial_index=create_spatial_index,
+        **kwargs,
+    )
+
+
+def _to_file_pyogrio_nolock(
+    gdf: gpd.GeoDataFrame,
+    path: Path,
+    layer: str,
+    force_output_geometrytype: Union[GeometryType, str, None] = None,
+    force_multitype: bool = False,
+    append: bool = False,
+    index: Optional[bool] = None,
+    create_spatial_index: Optional[bool] = None,
+    **kwargs,
+):
     # Check upfront if append is going to work to give nice error
     if append is True and path.exists():
         kwargs["append"] = True
@@ -1806,6 +2153,8 @@ def _to_file_pyogrio(
         kwargs["promote_to_multi"] = True
     if not path_info.is_singlelayer:
         kwargs["layer"] = layer
+    if "use_arrow" not in kwargs and _use_arrow_write():
+        kwargs["use_arrow"] = True
 
     # Temp fix for bug in pyogrio 0.7.2 (https://github.com/geopandas/pyogrio/pull/324)
     # Logic based on geopandas.to_file
@@ -1826,6 +2175,110 @@ def _to_file_pyogrio(
         gdf.to_file(str(path), **kwargs)
 
 
+class BatchWriter:
+    """Writer that combines many small appends to a file into fewer, larger ones.
+
+    Appending many small GeoDataFrames to a file one by one is slow: for each of them
+    the file needs to be locked, opened and a transaction needs to be committed. The
+    GeoDataFrames written to a BatchWriter are buffered and appended together with
+    :meth:`~to_file` once ``batch_size`` rows are buffered, when :meth:`flush` is
+    called or when the writer is closed.
+
+    Args:
+        path (PathLike): the file to append to. If it doesn't exist yet, it is created.
+        layer (str, optional): the layer to append to. Defaults to None.
+        batch_size (int, optional): the number of rows to buffer before appending
+            them to the file. Defaults to 10000.
+        append_timeout_s (int, optional): the maximum time to wait till the file is
+            not being written to by another process anymore. Defaults to 600.
+        **kwargs: other parameters to pass to :meth:`~to_file`, e.g.
+            ``force_output_geometrytype``.
+
+    Examples:
+        .. code-block:: python
+
+            import geofileops as gfo
+
+            with gfo.BatchWriter(path, batch_size=50_000) as writer:
+                for gdf in results:
+                    writer.write(gdf)
+
+    """
+
+    def __init__(
+        self,
+        path: Union[str, "os.PathLike[Any]"],
+        layer: Optional[str] = None,
+        batch_size: int = 10_000,
+        append_timeout_s: int = 600,
+        **kwargs,
+    ):
+        """Constructor of BatchWriter.
+
+        Args:
+            path (PathLike): the file to append to.
+            layer (str, optional): the layer to append to. Defaults to None.
+            batch_size (int, optional): the number of rows to buffer before appending
+                them to the file. Defaults to 10000.
+            append_timeout_s (int, optional): the maximum time to wait till the file
+                is not being written to by another process anymore. Defaults to 600.
+            **kwargs: other parameters to pass to :meth:`~to_file`.
+        """
+        if batch_size <= 0:
+            raise ValueError(f"batch_size should be > 0, not {batch_size}")
+
+        self.path = Path(path)
+        self.layer = layer
+        self.batch_size = batch_size
+        self.append_timeout_s = append_timeout_s
+        self.kwargs = kwargs
+        self._buffer: list[Union[pd.DataFrame, gpd.GeoDataFrame]] = []
+        self._nb_rows_buffered = 0
+
+    def write(self, gdf: Union[pd.DataFrame, gpd.GeoDataFrame]):
+        """Add the rows of the dataframe to the rows to be appended to the file.
+
+        Args:
+            gdf (Union[pd.DataFrame, gpd.GeoDataFrame]): the rows to append.
+        """
+        self._buffer.append(gdf)
+        self._nb_rows_buffered += len(gdf)
+        if self._nb_rows_buffered >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Append the rows buffered to the file."""
+        if len(self._buffer) == 0:
+            return
+
+        if len(self._buffer) == 1:
+            gdf = self._buffer[0]
+        else:
+            gdf = pd.concat(self._buffer)
+        to_file(
+            gdf,
+            self.path,
+            layer=self.layer,
+            append=True,
+            append_timeout_s=self.append_timeout_s,
+            **self.kwargs,
+        )
+        self._buffer = []
+        self._nb_rows_buffered = 0
+
+    def close(self):
+        """Append the rows still buffered to the file."""
+        self.flush()
+
+    def __enter__(self):
+        """Enter the context of the writer."""
+        return self
+
+    def __exit__(self, type, value, traceback):
+        """Append the rows still buffered to the file."""
+        self.close()
+
+
 def get_crs(
     path: Union[str, "os.PathLike[Any]"],
     layer: Optional[str] = None,
@@ -2030,6 +2483,8 @@ def copy(src: Union[str, "os.PathLike[Any]"], dst: Union[str, "os.PathLike[Any]"
             if srcfile.exists():
                 shutil.copy(str(srcfile), dstfile)
 
+    _metadata_cache.invalidate(dst / src.name if dst.is_dir() else dst)
+
 
 def move(src: Union[str, "os.PathLike[Any]"], dst: Union[str, "os.PathLike[Any]"]):
     """Moves the geofile from src to dst.
@@ -2063,6 +2518,9 @@ def move(src: Union[str, "os.PathLike[Any]"], dst: Union[str, "os.PathLike[Any]"
             if srcfile.exists():
                 shutil.move(str(srcfile), dstfile)
 
+    _metadata_cache.invalidate(src)
+    _metadata_cache.invalidate(dst / src.name if dst.is_dir() else dst)
+
 
 def remove(path: Union[str, "os.PathLike[Any]"], missing_ok: bool = False):
     """Removes the geofile.
@@ -2091,6 +2549,8 @@ def remove(path: Union[str, "os.PathLike[Any]"], missing_ok: bool = False):
         curr_path = path.parent / f"{path.stem}{suffix}"
         curr_path.unlink(missing_ok=True)
 
+    _metadata_cache.invalidate(path)
+
 
 def append_to(
     src: Union[str, "os.PathLike[Any]"],
@@ -2218,57 +2678,41 @@ def append_to(
         force_output_geometrytype = GeometryType(force_output_geometrytype)
 
     # Files don't typically support having multiple processes writing
-    # simultanously to them, so use lock file to synchronize access.
-    lockfile = Path(f"{dst!s}.lock")
-
-    # If the destination file doesn't exist yet, but the lockfile does,
-    # try removing the lockfile as it might be a ghost lockfile.
-    if not dst.exists() and lockfile.exists():
-        try:
-            lockfile.unlink()
-        except Exception:
-            _ = None
+    # simultanously to them, so use a lock file to synchronize access.
+    with _lock_for_append(dst, append_timeout_s, operation="append_to"):
+        _append_to_nolock(
+            src=src,
+            dst=dst,
+            src_layer=src_layer,
+            dst_layer=dst_layer,
+            src_crs=src_crs,
+            dst_crs=dst_crs,
+            columns=columns,
+            where=where,
+            sql_stmt=sql_stmt,
+            sql_dialect=sql_dialect,
+            reproject=reproject,
+            explodecollections=explodecollections,
+            force_output_geometrytype=force_output_geometrytype,
+            create_spatial_index=create_spatial_index,
+            transaction_size=transaction_size,
+            preserve_fid=preserve_fid,
+            dst_dimensions=dst_dimensions,
+            options=options,
+        )
 
-    # Creating lockfile and append
-    start_time = datetime.now()
-    ready = False
-    while not ready:
-        if _io_util.create_file_atomic(lockfile) is True:
-            try:
-                # append
-                _append_to_nolock(
-                    src=src,
-                    dst=dst,
-                    src_layer=src_layer,
-                    dst_layer=dst_layer,
-                    src_crs=src_crs,
-                    dst_crs=dst_crs,
-                    columns=columns,
-                    where=where,
-                    sql_stmt=sql_stmt,
-                    sql_dialect=sql_dialect,
-                    reproject=reproject,
-                    explodecollections=explodecollections,
-                    force_output_geometrytype=force_output_geometrytype,
-                    create_spatial_index=create_spatial_index,
-                    transaction_size=transaction_size,
-                    preserve_fid=preserve_fid,
-                    dst_dimensions=dst_dimensions,
-                    options=options,
-                )
-            finally:
-                ready = True
-                lockfile.unlink()
-        else:
-            time_waiting = (datetime.now() - start_time).total_seconds()
-            if time_waiting > append_timeout_s:
-                raise RuntimeError(
-                    f"append_to timeout of {append_timeout_s} reached, so stop write "
-                    f"to {dst}!"
-                )
 
-        # Sleep for a second before trying again
-        time.sleep(1)
+@contextmanager
+def _lock_for_append(path: Path, timeout_s: float, operation: str) -> Iterator[None]:
+    """Lock the file for the append operation specified till the context exits."""
+    with ExitStack() as stack:
+        try:
+            stack.enter_context(_io_util.lock_file(path, timeout_s=timeout_s))
+        except TimeoutError as ex:
+            raise RuntimeError(
+                f"{operation} timeout of {timeout_s} reached, stop append to {path}!"
+            ) from ex
+        yield
 
 
 def _append_to_nolock(
@@ -2564,6 +3008,183 @@ def copy_layer(
     )
 
 
+def spatial_sort(
+    src: Union[str, "os.PathLike[Any]"],
+    dst: Union[str, "os.PathLike[Any]"],
+    src_layer: Optional[str] = None,
+    dst_layer: Optional[str] = None,
+    method: Literal["hilbert"] = "hilbert",
+    max_rows_in_memory: int = 1_000_000,
+    create_spatial_index: Optional[bool] = None,
+    force: bool = False,
+):
+    """Copy a layer to a new file with the rows sorted so nearby rows are stored close.
+
+    The rows are sorted on the distance of the centers of their bounding boxes along a
+    hilbert curve. Rows that are close to each other are then also stored close to each
+    other in the file, so spatial queries on the result need to read less data.
+
+    The sort is done out of core, so layers that are larger than the memory available
+    can be sorted as well:
+        1. the bounding boxes of the rows are read in chunks to determine their
+           distance along the hilbert curve.
+        2. the rows are distributed over temp files, each containing a range of
+           distances with at most about ``max_rows_in_memory`` rows.
+        3. the temp files are read one by one, sorted and appended to ``dst``.
+
+    Only the distances of all rows and at most about ``max_rows_in_memory`` rows are
+    in memory at the same time. The fids of the rows are not preserved.
+
+    Args:
+        src (PathLike): the file to sort.
+        dst (PathLike): the file to write the sorted rows to.
+        src_layer (str, optional): the layer to sort. If None and there is only one
+            layer in the src file, that layer is taken. Defaults to None.
+        dst_layer (str, optional): the destination layer. If None, the file stem is
+            taken as layer name. Defaults to None.
+        method (str, optional): the method to use to sort the rows. Only "hilbert" is
+            supported. Defaults to "hilbert".
+        max_rows_in_memory (int, optional): the maximum number of rows to keep in
+            memory while sorting. Defaults to 1000000.
+        create_spatial_index (bool, optional): True to create a spatial index on the
+            destination layer. If None, the default behaviour by gdal for that file
+            type is respected. Defaults to None.
+        force (bool, optional): overwrite the existing dst file. Defaults to False.
+
+    Raises:
+        ValueError: an invalid parameter value was passed.
+    """
+    src = Path(src)
+    dst = Path(dst)
+    if method != "hilbert":
+        raise ValueError(f"unsupported method: {method}, should be 'hilbert'")
+    if max_rows_in_memory <= 0:
+        raise ValueError(f"max_rows_in_memory should be > 0, not {max_rows_in_memory}")
+    if not src.exists():
+        raise ValueError(f"src file doesn't exist: {src}")
+    if dst.exists():
+        if force:
+            remove(dst)
+        else:
+            logger.info(f"Output file exists already, so stop: {dst}")
+            return
+
+    if src_layer is None:
+        src_layer = get_only_layer(src)
+    layerinfo = get_layerinfo(src, src_layer)
+    chunksize = max(max_rows_in_memory // 10, 1)
+
+    def get_centers(gdf: gpd.GeoDataFrame) -> tuple[np.ndarray, np.ndarray]:
+        bounds = shapely.bounds(gdf.geometry.array)
+        return (bounds[:, 0] + bounds[:, 2]) / 2, (bounds[:, 1] + bounds[:, 3]) / 2
+
+    def write_sorted(gdf: gpd.GeoDataFrame, total_bounds: tuple):
+        distances = _geoseries_util.hilbert_distance(
+            *get_centers(gdf), total_bounds=total_bounds
+        )
+        to_file(
+            gdf.iloc[np.argsort(distances, kind="stable")],
+            dst,
+            layer=dst_layer,
+            force_output_geometrytype=layerinfo.geometrytype,
+            append=True,
+            index=False,
+            create_spatial_index=create_spatial_index,
+        )
+
+    # Determine the distances of all rows along the hilbert curve
+    centers = [
+        get_centers(chunk)
+        for chunk in read_file_chunks(
+            src, chunksize=chunksize, layer=src_layer, columns=[]
+        )
+    ]
+    if len(centers) == 0:
+        # The layer is empty
+        to_file(
+            read_file(src, layer=src_layer),
+            dst,
+            layer=dst_layer,
+            force_output_geometrytype=layerinfo.geometrytype,
+            index=False,
+            create_spatial_index=create_spatial_index,
+        )
+        return
+    x = np.concatenate([center[0] for center in centers])
+    y = np.concatenate([center[1] for center in centers])
+    del centers
+    # The same bounds need to be used when the distances are calculated again later on
+    total_bounds: tuple = (0.0, 0.0, 1.0, 1.0)
+    if not np.all(np.isnan(x)):
+        total_bounds = (np.nanmin(x), np.nanmin(y), np.nanmax(x), np.nanmax(y))
+    distances = _geoseries_util.hilbert_distance(x, y, total_bounds=total_bounds)
+    del x, y
+
+    # If all rows fit in memory, no temp files are needed
+    if len(distances) <= max_rows_in_memory:
+        gdf = read_file(src, layer=src_layer)
+        gdf = gdf.iloc[np.argsort(distances, kind="stable")]
+        to_file(
+            gdf,
+            dst,
+            layer=dst_layer,
+            force_output_geometrytype=layerinfo.geometrytype,
+            index=False,
+            create_spatial_index=create_spatial_index,
+        )
+        return
+
+    # Distribute the rows over temp files with consecutive ranges of distances
+    nb_buckets = math.ceil(len(distances) / max_rows_in_memory)
+    distances_sorted = np.sort(distances)
+    boundaries = distances_sorted[
+        np.arange(1, nb_buckets) * len(distances) // nb_buckets
+    ]
+    del distances_sorted
+    buckets = np.searchsorted(boundaries, distances, side="right")
+    del distances
+
+    tempdir = _io_util.create_tempdir("geofileops/spatial_sort")
+    try:
+        bucket_paths = [tempdir / f"bucket_{i:06d}.gpkg" for i in range(nb_buckets)]
+        buffers: dict[int, list[gpd.GeoDataFrame]] = {}
+        nb_rows_buffered = dict.fromkeys(range(nb_buckets), 0)
+
+        def flush(bucket: int):
+            to_file(
+                pd.concat(buffers.pop(bucket)),
+                bucket_paths[bucket],
+                force_output_geometrytype=layerinfo.geometrytype,
+                append=True,
+                index=False,
+                create_spatial_index=False,
+            )
+            nb_rows_buffered[bucket] = 0
+
+        offset = 0
+        for chunk in read_file_chunks(src, chunksize=chunksize, layer=src_layer):
+            chunk_buckets = buckets[offset : offset + len(chunk)]
+            offset += len(chunk)
+            for bucket in np.unique(chunk_buckets):
+                bucket_rows = chunk[chunk_buckets == bucket]
+                buffers.setdefault(bucket, []).append(bucket_rows)
+                nb_rows_buffered[bucket] += len(bucket_rows)
+
+            # Write the largest buffers till the rows buffered fit in memory again
+            while sum(nb_rows_buffered.values()) > max_rows_in_memory:
+                flush(max(nb_rows_buffered, key=nb_rows_buffered.__getitem__))
+        for bucket in list(buffers):
+            flush(bucket)
+
+        # Sort the rows in the temp files one by one and append them to dst
+        for bucket_path in bucket_paths:
+            if bucket_path.exists():
+                write_sorted(read_file(bucket_path), total_bounds)
+    finally:
+        if ConfigOptions.remove_temp_files:
+            shutil.rmtree(tempdir, ignore_errors=True)
+
+
 def _launder_column_names(columns: Iterable) -> list[tuple[str, str]]:
     """Launders the column names passed to comply with shapefile restrictions.
 
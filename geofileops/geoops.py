@@ -8,6 +8,7 @@ from datetime import datetime
 from pathlib import Path
 from typing import TYPE_CHECKING, Any, Callable, Literal, Optional, Union
 
+import cloudpickle
 from pygeoops import GeometryType
 
 from geofileops import fileops
@@ -493,6 +494,7 @@ def apply(
         nb_parallel=nb_parallel,
         batchsize=batchsize,
         force=force,
+        sort_output=ConfigOptions.output_sorted,
     )
 
 
@@ -595,6 +597,7 @@ def apply_vectorized(
         nb_parallel=nb_parallel,
         batchsize=batchsize,
         force=force,
+        sort_output=ConfigOptions.output_sorted,
     )
 
 
@@ -791,6 +794,7 @@ def buffer(
             nb_parallel=nb_parallel,
             batchsize=batchsize,
             force=force,
+            sort_output=ConfigOptions.output_sorted,
         )
     else:
         # If special buffer options, use geopandas version
@@ -813,6 +817,7 @@ def buffer(
             nb_parallel=nb_parallel,
             batchsize=batchsize,
             force=force,
+            sort_output=ConfigOptions.output_sorted,
         )
 
 
@@ -935,6 +940,7 @@ def convexhull(
         nb_parallel=nb_parallel,
         batchsize=batchsize,
         force=force,
+        sort_output=ConfigOptions.output_sorted,
     )
 
 
@@ -993,6 +999,7 @@ def delete_duplicate_geometries(
         keep_empty_geoms=keep_empty_geoms,
         where_post=where_post,
         force=force,
+        sort_output=ConfigOptions.output_sorted,
     )
 
 
@@ -1310,6 +1317,7 @@ def isvalid(
         nb_parallel=nb_parallel,
         batchsize=batchsize,
         force=force,
+        sort_output=ConfigOptions.output_sorted,
     )
 
 
@@ -1421,6 +1429,7 @@ def makevalid(
             nb_parallel=nb_parallel,
             batchsize=batchsize,
             force=force,
+            sort_output=ConfigOptions.output_sorted,
         )
     else:
         _geoops_gpd.makevalid(
@@ -1437,6 +1446,7 @@ def makevalid(
             nb_parallel=nb_parallel,
             batchsize=batchsize,
             force=force,
+            sort_output=ConfigOptions.output_sorted,
         )
 
     # If asked and output is spatialite based, check if all data can be read
@@ -1664,6 +1674,7 @@ def select(
         nb_parallel=nb_parallel,
         batchsize=batchsize,
         force=force,
+        sort_output=ConfigOptions.output_sorted,
     )
 
 
@@ -1760,6 +1771,7 @@ def simplify(
             nb_parallel=nb_parallel,
             batchsize=batchsize,
             force=force,
+            sort_output=ConfigOptions.output_sorted,
         )
     else:
         return _geoops_gpd.simplify(
@@ -1778,6 +1790,303 @@ def simplify(
             nb_parallel=nb_parallel,
             batchsize=batchsize,
             force=force,
+            sort_output=ConfigOptions.output_sorted,
+        )
+
+
+def pipeline(
+    input_path: Union[str, "os.PathLike[Any]"],
+    input_layer: Optional[str] = None,
+    columns: Optional[list[str]] = None,
+) -> "Pipeline":
+    """Start a pipeline of operations to apply in one go on the input file.
+
+    Consecutive single layer operations are applied one after the other on the same
+    batch of rows in the same worker, without writing the intermediate results to
+    file. Compared to running the operations one by one, this avoids reading and
+    writing the full layer for every intermediate step.
+
+    The pipeline is only executed when :meth:`Pipeline.to` is called.
+
+    Examples:
+        .. code-block:: python
+
+            gfo.pipeline(input_path).buffer(distance=2).makevalid().simplify(
+                tolerance=1
+            ).to(output_path)
+
+    Args:
+        input_path (PathLike): the input file.
+        input_layer (str, optional): input layer name. If None, ``input_path`` should
+            contain only one layer. Defaults to None.
+        columns (List[str], optional): list of columns to retain. If None, all standard
+            columns are retained. In addition to standard columns, it is also possible
+            to specify "fid", a unique index available in all input files. Note that the
+            "fid" will be aliased eg. to "fid_1". Defaults to None.
+
+    Returns:
+        Pipeline: the pipeline, without any steps yet.
+    """
+    return Pipeline(input_path=input_path, input_layer=input_layer, columns=columns)
+
+
+class Pipeline:
+    """A sequence of single layer operations to apply in one go on an input file.
+
+    Use :func:`pipeline` to create one. Every method to add a step returns a new
+    pipeline, so pipelines can be chained and reused.
+    """
+
+    def __init__(
+        self,
+        input_path: Union[str, "os.PathLike[Any]"],
+        input_layer: Optional[str] = None,
+        columns: Optional[list[str]] = None,
+        steps: Optional[list[tuple[_geoops_gpd.GeoOperation, dict]]] = None,
+    ):
+        """Constructor of Pipeline.
+
+        Args:
+            input_path (PathLike): the input file.
+            input_layer (str, optional): input layer name. Defaults to None.
+            columns (List[str], optional): list of columns to retain. Defaults to None.
+            steps (list[tuple[GeoOperation, dict]], optional): the steps of the
+                pipeline. Defaults to None.
+        """
+        self.input_path = Path(input_path)
+        self.input_layer = input_layer
+        self.columns = columns
+        self.steps = [] if steps is None else steps
+
+    def __repr__(self) -> str:
+        """Overrides the representation property of Pipeline."""
+        step_names = [
+            step_params.get("operation_name", step_operation.value)
+            for step_operation, step_params in self.steps
+        ]
+        return f"Pipeline({self.input_path}: {' -> '.join(step_names)})"
+
+    def _add_step(
+        self, operation: _geoops_gpd.GeoOperation, operation_params: dict
+    ) -> "Pipeline":
+        return Pipeline(
+            input_path=self.input_path,
+            input_layer=self.input_layer,
+            columns=self.columns,
+            steps=[*self.steps, (operation, operation_params)],
+        )
+
+    def apply(
+        self, func: Callable[[Any], Any], only_geom_input: bool = True
+    ) -> "Pipeline":
+        """Add a step to apply a python function on the geometry column.
+
+        Args:
+            func (Callable): lambda function to apply to the geometry column. See
+                :func:`apply` for more info.
+            only_geom_input (bool, optional): If True, only the geometry column is
+                available. If False, the entire row is input. Defaults to True.
+
+        Returns:
+            Pipeline: a new pipeline with the step added.
+        """
+        operation_params = {
+            "operation_name": "apply",
+            "only_geom_input": only_geom_input,
+            "pickled_func": cloudpickle.dumps(func),
+        }
+        return self._add_step(_geoops_gpd.GeoOperation.APPLY, operation_params)
+
+    def apply_vectorized(self, func: Callable[[Any], Any]) -> "Pipeline":
+        """Add a step to apply a vectorized python function on the geometry column.
+
+        Args:
+            func (Callable): vectorized function to apply to the geometry column. See
+                :func:`apply_vectorized` for more info.
+
+        Returns:
+            Pipeline: a new pipeline with the step added.
+        """
+        operation_params = {
+            "operation_name": "apply_vectorized",
+            "pickled_func": cloudpickle.dumps(func),
+        }
+        return self._add_step(
+            _geoops_gpd.GeoOperation.APPLY_VECTORIZED, operation_params
+        )
+
+    def buffer(
+        self,
+        distance: float,
+        quadrantsegments: int = 5,
+        endcap_style: BufferEndCapStyle = BufferEndCapStyle.ROUND,
+        join_style: BufferJoinStyle = BufferJoinStyle.ROUND,
+        mitre_limit: float = 5.0,
+        single_sided: bool = False,
+    ) -> "Pipeline":
+        """Add a buffer step.
+
+        See :func:`buffer` for more info about the parameters.
+
+        Returns:
+            Pipeline: a new pipeline with the step added.
+        """
+        operation_params = {
+            "operation_name": "buffer",
+            "distance": distance,
+            "quadrantsegments": quadrantsegments,
+            "endcap_style": endcap_style,
+            "join_style": join_style,
+            "mitre_limit": mitre_limit,
+            "single_sided": single_sided,
+        }
+        return self._add_step(_geoops_gpd.GeoOperation.BUFFER, operation_params)
+
+    def convexhull(self) -> "Pipeline":
+        """Add a convexhull step.
+
+        Returns:
+            Pipeline: a new pipeline with the step added.
+        """
+        return self._add_step(_geoops_gpd.GeoOperation.CONVEXHULL, {})
+
+    def makevalid(self) -> "Pipeline":
+        """Add a step to make the geometries valid.
+
+        The geometries are made valid the same way as :func:`makevalid` does when it
+        uses GeoPandas: the parts of geometries that collapse to a lower dimension,
+        e.g. a polygon that becomes a line, are only kept if the
+        ``force_output_geometrytype`` passed to :meth:`to` is another type than the
+        one of the input of the step.
+
+        Returns:
+            Pipeline: a new pipeline with the step added.
+        """
+        # Remark: the function to apply is only determined in to(), as it depends on
+        # force_output_geometrytype.
+        operation_params = {"operation_name": "makevalid", "only_geom_input": True}
+        return self._add_step(_geoops_gpd.GeoOperation.APPLY, operation_params)
+
+    def simplify(
+        self,
+        tolerance: float,
+        algorithm: SimplifyAlgorithm = SimplifyAlgorithm.RAMER_DOUGLAS_PEUCKER,
+        lookahead: int = 8,
+    ) -> "Pipeline":
+        """Add a simplify step.
+
+        See :func:`simplify` for more info about the parameters.
+
+        Returns:
+            Pipeline: a new pipeline with the step added.
+        """
+        if isinstance(algorithm, str):
+            algorithm = SimplifyAlgorithm(algorithm)
+        operation_params = {
+            "operation_name": "simplify",
+            "tolerance": tolerance,
+            "algorithm": algorithm,
+            "step": lookahead,
+        }
+        return self._add_step(_geoops_gpd.GeoOperation.SIMPLIFY, operation_params)
+
+    def to(
+        self,
+        output_path: Union[str, "os.PathLike[Any]"],
+        output_layer: Optional[str] = None,
+        explodecollections: bool = False,
+        force_output_geometrytype: Union[GeometryType, str, None] = None,
+        gridsize: float = 0.0,
+        keep_empty_geoms: bool = False,
+        where_post: Optional[str] = None,
+        nb_parallel: int = -1,
+        batchsize: int = -1,
+        force: bool = False,
+    ):
+        """Run the pipeline and write the result to the output file.
+
+        Args:
+            output_path (PathLike): the file to write the result to.
+            output_layer (str, optional): output layer name. If None, the
+                ``output_path`` stem is used. Defaults to None.
+            explodecollections (bool, optional): True to output only simple
+                geometries. Defaults to False.
+            force_output_geometrytype (GeometryType, optional): The output geometry
+                type to force. If None and the last step that changes the geometry
+                type is a buffer, the output will be (multi)polygons. Otherwise the
+                geometry type of the input is retained. It also determines if
+                :meth:`makevalid` steps keep collapsed parts. Defaults to None.
+            gridsize (float, optional): the size of the grid the coordinates of the
+                ouput will be rounded to. Eg. 0.001 to keep 3 decimals. Value 0.0
+                doesn't change the precision. Defaults to 0.0.
+            keep_empty_geoms (bool, optional): True to keep rows with empty/null
+                geometries in the output. Defaults to False.
+            where_post (str, optional): SQL filter to apply after all other
+                processing, including e.g. ``explodecollections``. It should be in
+                sqlite syntax. Defaults to None.
+            nb_parallel (int, optional): the number of parallel processes to use.
+                Defaults to -1: use all available CPUs.
+            batchsize (int, optional): indicative number of rows to process per
+                batch. A smaller batch size, possibly in combination with a
+                smaller ``nb_parallel``, will reduce the memory usage.
+                Defaults to -1: (try to) determine optimal size automatically.
+            force (bool, optional): overwrite existing output file(s).
+                Defaults to False.
+        """
+        logger = logging.getLogger("geofileops.pipeline")
+        logger.info(f"Start, on {self.input_path}: {self!r}")
+
+        # Determine the function to apply for the makevalid steps, based on the
+        # geometry type of the input of the step, as makevalid does.
+        steps = []
+        geometrytype = None
+        for step_operation, step_params in self.steps:
+            if step_operation is _geoops_gpd.GeoOperation.BUFFER:
+                geometrytype = GeometryType.MULTIPOLYGON
+            elif step_params.get("operation_name") == "makevalid":
+                if geometrytype is None:
+                    geometrytype = fileops.get_layerinfo(
+                        self.input_path, self.input_layer
+                    ).geometrytype
+                keep_collapsed = _geoops_gpd._makevalid_keep_collapsed(
+                    geometrytype, force_output_geometrytype
+                )
+                func = _geoops_gpd._makevalid_func(keep_collapsed)
+                step_params = {
+                    **step_params,
+                    "pickled_func": cloudpickle.dumps(func),
+                }
+            steps.append((step_operation, step_params))
+
+        if force_output_geometrytype is None:
+            # Only a buffer results in a known geometry type. Makevalid and simplify
+            # don't change it, so look back past those.
+            for step_operation, step_params in reversed(self.steps):
+                if step_params.get("operation_name") in ("makevalid", "simplify"):
+                    continue
+                if step_operation is _geoops_gpd.GeoOperation.BUFFER:
+                    if explodecollections:
+                        force_output_geometrytype = GeometryType.POLYGON
+                    else:
+                        force_output_geometrytype = GeometryType.MULTIPOLYGON
+                break
+
+        return _geoops_gpd.pipeline(
+            input_path=self.input_path,
+            output_path=Path(output_path),
+            steps=steps,
+            input_layer=self.input_layer,
+            output_layer=output_layer,
+            columns=self.columns,
+            explodecollections=explodecollections,
+            force_output_geometrytype=force_output_geometrytype,
+            gridsize=gridsize,
+            keep_empty_geoms=keep_empty_geoms,
+            where_post=where_post,
+            nb_parallel=nb_parallel,
+            batchsize=batchsize,
+            force=force,
+            sort_output=ConfigOptions.output_sorted,
         )
 
 
@@ -1866,6 +2175,30 @@ def clip(
     """  # noqa: E501
     logger = logging.getLogger("geofileops.clip")
     logger.info(f"Start on {input_path} with {clip_path} to {output_path}")
+
+    # If the clip layer is small, load it in memory once and share it with the workers
+    # instead of querying it from disk for every batch.
+    broadcast_max_rows = ConfigOptions.broadcast_max_rows
+    if broadcast_max_rows > 0:
+        clip_layerinfo = fileops.get_layerinfo(clip_path, clip_layer)
+        if clip_layerinfo.featurecount <= broadcast_max_rows:
+            return _geoops_gpd.clip(
+                input_path=Path(input_path),
+                clip_path=Path(clip_path),
+                output_path=Path(output_path),
+                input_layer=input_layer,
+                input_columns=input_columns,
+                clip_layer=clip_layer,
+                output_layer=output_layer,
+                explodecollections=explodecollections,
+                gridsize=gridsize,
+                where_post=where_post,
+                nb_parallel=nb_parallel,
+                batchsize=batchsize,
+                force=force,
+                sort_output=ConfigOptions.output_sorted,
+            )
+
     return _geoops_sql.clip(
         input_path=Path(input_path),
         clip_path=Path(clip_path),
@@ -1880,6 +2213,7 @@ def clip(
         nb_parallel=nb_parallel,
         batchsize=batchsize,
         force=force,
+        sort_output=ConfigOptions.output_sorted,
     )
 
 
@@ -1992,6 +2326,7 @@ def difference(
         batchsize=batchsize,
         subdivide_coords=subdivide_coords,
         force=force,
+        sort_output=ConfigOptions.output_sorted,
     )
 
 
@@ -2149,6 +2484,7 @@ def export_by_location(
         batchsize=batchsize,
         subdivide_coords=subdivide_coords,
         force=force,
+        sort_output=ConfigOptions.output_sorted,
     )
 
 
@@ -2229,6 +2565,7 @@ def export_by_distance(
         nb_parallel=nb_parallel,
         batchsize=batchsize,
         force=force,
+        sort_output=ConfigOptions.output_sorted,
     )
 
 
@@ -2349,6 +2686,7 @@ def identity(
         batchsize=batchsize,
         subdivide_coords=subdivide_coords,
         force=force,
+        sort_output=ConfigOptions.output_sorted,
     )
 
 
@@ -2399,6 +2737,7 @@ def split(
         batchsize=batchsize,
         subdivide_coords=subdivide_coords,
         force=force,
+        sort_output=ConfigOptions.output_sorted,
     )
 
 
@@ -2563,6 +2902,7 @@ def intersection(
         batchsize=batchsize,
         subdivide_coords=subdivide_coords,
         force=force,
+        sort_output=ConfigOptions.output_sorted,
     )
 
 
@@ -2693,6 +3033,7 @@ def join_by_location(
         nb_parallel=nb_parallel,
         batchsize=batchsize,
         force=force,
+        sort_output=ConfigOptions.output_sorted,
     )
 
 
@@ -2795,6 +3136,7 @@ def join_nearest(
         nb_parallel=nb_parallel,
         batchsize=batchsize,
         force=force,
+        sort_output=ConfigOptions.output_sorted,
     )
 
 
@@ -3025,6 +3367,7 @@ def select_two_layers(
         nb_parallel=nb_parallel,
         batchsize=batchsize,
         force=force,
+        sort_output=ConfigOptions.output_sorted,
     )
 
 
@@ -3153,6 +3496,7 @@ def symmetric_difference(
         batchsize=batchsize,
         subdivide_coords=subdivide_coords,
         force=force,
+        sort_output=ConfigOptions.output_sorted,
     )
 
 
@@ -3285,4 +3629,5 @@ def union(
         batchsize=batchsize,
         subdivide_coords=subdivide_coords,
         force=force,
+        sort_output=ConfigOptions.output_sorted,
     )
@@ -1,4 +1,5 @@
 import os
+from typing import Union
 
 
 class classproperty(property):
@@ -12,6 +13,78 @@ class ConfigOptions:
     They are read from environement variables.
     """
 
+    @classproperty
+    def batch_order(cls) -> str:
+        """The order in which rows of the input layer are assigned to batches.
+
+        Supported values (case insensitive):
+            - "rowid": rows are assigned to batches in ranges of their rowid.
+            - "hilbert": rows are assigned to batches along a hilbert curve based on
+              the center of their bounding box. This way each batch covers a
+              spatially compact region, which can reduce I/O significantly for
+              two-layer operations on large files where the rowids are not
+              spatially ordered.
+
+        Returns:
+            str: the batch order to use. Defaults to "rowid".
+        """
+        return get_enum("GFO_BATCH_ORDER", ["rowid", "hilbert"], default="rowid")
+
+    @classproperty
+    def batch_weight(cls) -> str:
+        """The weight of the rows used to divide them in batches of similar size.
+
+        Supported values (case insensitive):
+            - "rows": each row has the same weight, so all batches get about the same
+              number of rows.
+            - "geomsize": rows weigh according to the size of their geometry, so all
+              batches get about the same number of coordinates to process. This
+              avoids that a few batches with e.g. very complex polygons take a lot
+              longer than the other ones, at the cost of an extra pass over the input
+              data to determine the batches.
+
+        Returns:
+            str: the weight to use. Defaults to "rows".
+        """
+        return get_enum("GFO_BATCH_WEIGHT", ["rows", "geomsize"], default="rows")
+
+    @classproperty
+    def broadcast_max_rows(cls) -> int:
+        """The maximum number of rows of a layer to broadcast it to the workers.
+
+        For two-layer operations that support it, currently ``clip``, if the second
+        layer has at most this number of rows, it is loaded in memory once and shared
+        with the workers. The batches are then processed in memory instead of querying
+        the second layer from disk for each batch. Where possible, the workers are
+        forked so they share it copy-on-write. This is not possible for the workers of
+        a shared pool or if other threads are running, e.g. in ``run_dag``: then each
+        worker loads it once.
+
+        Returns:
+            int: the maximum number of rows. Defaults to 0: never broadcast.
+        """
+        return get_int("GFO_BROADCAST_MAX_ROWS", default=0)
+
+    @classproperty
+    def calibrate(cls) -> str:
+        """How the parallelization parameters are calibrated.
+
+        Supported values (case insensitive):
+            - "none": the default heuristics are used.
+            - "sample": the memory usage and the processing time per row are measured
+              on a small random sample of the input data, and the batch sizes are
+              determined based on those measurements.
+            - "persist": like "sample", but the calibration is saved in the temp dir
+              and reused for later runs on the same, unchanged input file.
+
+        Calibration is only applied when no explicit batchsize is specified.
+
+        Returns:
+            str: the calibration mode to use. Defaults to "none".
+        """
+        supported_values = ["none", "sample", "persist"]
+        return get_enum("GFO_CALIBRATE", supported_values, default="none")
+
     @classproperty
     def on_data_error(cls) -> str:
         """The preferred action when a data error occurs.
@@ -26,26 +99,71 @@ class ConfigOptions:
         Returns:
             str: the preferred action when a data error occurs. Defaults to "raise".
         """
-        value = os.environ.get("GFO_ON_DATA_ERROR")
-
-        if value is None:
-            return "raise"
-
-        value_cleaned = value.strip().lower()
-        supported_values = ["raise", "warn"]
-        if value_cleaned not in supported_values:
-            raise ValueError(
-                f"invalid value for configoption <GFO_ON_DATA_ERROR>: {value}, should "
-                f"be one of {supported_values}"
-            )
-
-        return value_cleaned
+        return get_enum("GFO_ON_DATA_ERROR", ["raise", "warn"], default="raise")
 
     @classproperty
     def io_engine(cls):
         """The IO engine to use."""
         return os.environ.get("GFO_IO_ENGINE", default="pyogrio").strip().lower()
 
+    @classproperty
+    def io_use_arrow(cls) -> bool:
+        """Should Arrow be used to read and write files with pyogrio.
+
+        Reading and writing via Arrow avoids conversions per row in python, which is
+        faster and uses less memory, certainly for layers with many columns. Requires
+        pyogrio >= 0.8 and pyarrow.
+
+        Returns:
+            bool: True to use Arrow. Defaults to False.
+        """
+        return get_bool("GFO_IO_USE_ARROW", default=False)
+
+    @classproperty
+    def memory_ceiling(cls) -> float:
+        """The percentage of the system memory that may be used while processing.
+
+        If starting a new batch would make the memory used on the system exceed this
+        ceiling, no new batches are started till enough memory is available again.
+
+        Returns:
+            float: the percentage of the total memory. Defaults to 90.
+        """
+        return get_percentage("GFO_MEMORY_CEILING", default=90.0)
+
+    @classproperty
+    def output_sorted(cls) -> bool:
+        """Should the rows of output files be sorted spatially.
+
+        If True, the rows of the output files of the operations calculated in batches
+        are sorted along a hilbert curve, see :func:`~geofileops.spatial_sort`. This
+        way rows that are close to each other are also stored close to each other in
+        the file, which makes later spatial queries on the file faster. Only the final
+        output is sorted, and not if the operation preserves the fids of the input,
+        as sorting renumbers them.
+
+        Returns:
+            bool: True to sort the output files. Defaults to False.
+        """
+        return get_bool("GFO_OUTPUT_SORTED", default=False)
+
+    @classproperty
+    def partial_format(cls) -> str:
+        """The file format to use for the temp files with partial results.
+
+        The GeoDataFrame based operations write the result of each batch to a temp
+        file, which is merged into the output file afterwards. Supported values (case
+        insensitive):
+            - "gpkg": write the partial results as GeoPackage.
+            - "parquet": write the partial results as GeoParquet, which is faster as
+              they are written with pyarrow instead of GDAL. Requires pyarrow and GDAL
+              with the Parquet driver to merge them into the output file.
+
+        Returns:
+            str: the file format for the temp files. Defaults to "gpkg".
+        """
+        return get_enum("GFO_PARTIAL_FORMAT", ["gpkg", "parquet"], default="gpkg")
+
     @classproperty
     def remove_temp_files(cls) -> bool:
         """Should temporary files be removed or not.
@@ -55,6 +173,108 @@ class ConfigOptions:
         """
         return get_bool("GFO_REMOVE_TEMP_FILES", default=True)
 
+    @classproperty
+    def resume(cls) -> bool:
+        """Should interrupted operations be resumed.
+
+        If True, the temp dir of an operation isn't removed when it fails and the
+        batches that were completed are kept track of. When the same operation is run
+        again, the batches that were completed already are not calculated again.
+
+        Returns:
+            bool: True to resume operations. Defaults to False.
+        """
+        return get_bool("GFO_RESUME", default=False)
+
+    @classproperty
+    def sqlite_profile(cls) -> dict[str, Union[int, str]]:
+        """The settings to use for the sqlite databases in sqlite based operations.
+
+        The settings are specified as a comma separated list of key=value pairs, e.g.
+        "cache_size_mb=512,threads=4". The settings that are not specified get their
+        default value. Supported keys (case insensitive):
+            - "page_size": the page size in bytes of new output files. Should be a
+              power of 2 between 512 and 65536. Defaults to the sqlite default.
+            - "cache_size_mb": the page cache per database per worker in MB. Defaults
+              to a part of the available memory divided by the number of parallel
+              workers.
+            - "mmap_size_mb": the maximum size of the file in MB that is memory
+              mapped. Defaults to 30000.
+            - "threads": the number of auxiliary threads sqlite may use for sorting,
+              e.g. to create indexes. Defaults to 0.
+            - "temp_store": where temporary tables and indexes are stored: "default",
+              "file" or "memory". Defaults to "memory".
+            - "soft_heap_limit_mb": the soft limit in MB of the heap memory sqlite
+              uses per worker. Defaults to 1024.
+
+        Returns:
+            dict[str, Union[int, str]]: the settings specified. Defaults to {}.
+        """
+        value = os.environ.get("GFO_SQLITE_PROFILE")
+
+        if value is None or value.strip() == "":
+            return {}
+
+        int_keys = [
+            "page_size",
+            "cache_size_mb",
+            "mmap_size_mb",
+            "threads",
+            "soft_heap_limit_mb",
+        ]
+        supported_keys = [*int_keys, "temp_store"]
+        temp_store_values = ["default", "file", "memory"]
+        settings: dict[str, Union[int, str]] = {}
+        for setting in value.split(","):
+            key, sep, setting_value = setting.partition("=")
+            key = key.strip().lower()
+            setting_value = setting_value.strip().lower()
+            if sep == "" or key not in supported_keys:
+                raise ValueError(
+                    f"invalid value for configoption <GFO_SQLITE_PROFILE>: {value}, "
+                    f"should be key=value pairs with keys in {supported_keys}"
+                )
+            if key == "temp_store":
+                if setting_value not in temp_store_values:
+                    raise ValueError(
+                        "invalid value for configoption <GFO_SQLITE_PROFILE>: "
+                        f"{value}, temp_store should be one of {temp_store_values}"
+                    )
+                settings[key] = setting_value
+                continue
+
+            try:
+                int_value = int(setting_value)
+            except ValueError:
+                int_value = -1
+            if int_value < 0:
+                raise ValueError(
+                    f"invalid value for configoption <GFO_SQLITE_PROFILE>: {value}, "
+                    f"{key} should be an integer >= 0"
+                )
+            if key == "page_size" and (
+                not 512 <= int_value <= 65536 or int_value & (int_value - 1) != 0
+            ):
+                raise ValueError(
+                    f"invalid value for configoption <GFO_SQLITE_PROFILE>: {value}, "
+                    "page_size should be a power of 2 between 512 and 65536"
+                )
+            settings[key] = int_value
+
+        return settings
+
+    @classproperty
+    def split_stragglers(cls) -> bool:
+        """Should batches that take a lot longer than the others be split.
+
+        If a batch is running a lot longer than the other batches and there are idle
+        workers, the batch is split in sub-batches that are calculated in parallel.
+
+        Returns:
+            bool: True to split stragglers. Defaults to True.
+        """
+        return get_bool("GFO_SPLIT_STRAGGLERS", default=True)
+
 
 def get_bool(key: str, default: bool) -> bool:
     """Get the value for the environment variable ``key`` as a bool.
@@ -91,3 +311,99 @@ def get_bool(key: str, default: bool) -> bool:
             f"invalid value for bool configoption <{key}>: {value}, should be one of "
             "1, 0, YES, NO, TRUE, FALSE"
         )
+
+
+def get_enum(key: str, supported_values: list[str], default: str) -> str:
+    """Get the value for the environment variable ``key`` as one of a list of values.
+
+    The value is case insensitive and leading and trailing spaces are ignored.
+
+    Args:
+        key (str): the environement variable to read.
+        supported_values (list[str]): the supported values, in lower case.
+        default (str): the value to return if the environement variable does not exist
+            or if it is "".
+
+    Raises:
+        ValueError: if an invalid value is present in the environment variable.
+
+    Returns:
+        str: the value, in lower case.
+    """
+    value = os.environ.get(key, default="")
+    value_cleaned = value.strip().lower()
+    if value_cleaned == "":
+        return default
+
+    if value_cleaned not in supported_values:
+        raise ValueError(
+            f"invalid value for configoption <{key}>: {value}, should be one of "
+            f"{supported_values}"
+        )
+
+    return value_cleaned
+
+
+def get_int(key: str, default: int, min_value: int = 0) -> int:
+    """Get the value for the environment variable ``key`` as an integer.
+
+    Args:
+        key (str): the environement variable to read.
+        default (int): the value to return if the environement variable does not exist
+            or if it is "".
+        min_value (int, optional): the minimum value that is valid. Defaults to 0.
+
+    Raises:
+        ValueError: if an invalid value is present in the environment variable.
+
+    Returns:
+        int: the value.
+    """
+    value = os.environ.get(key, default="")
+    if value.strip() == "":
+        return default
+
+    try:
+        value_cleaned = int(value.strip())
+    except ValueError:
+        value_cleaned = None
+    if value_cleaned is None or value_cleaned < min_value:
+        raise ValueError(
+            f"invalid value for configoption <{key}>: {value}, should be an integer "
+            f">= {min_value}"
+        )
+
+    return value_cleaned
+
+
+def get_percentage(key: str, default: float) -> float:
+    """Get the value for the environment variable ``key`` as a percentage.
+
+    The value can optionally be followed by a "%".
+
+    Args:
+        key (str): the environement variable to read.
+        default (float): the value to return if the environement variable does not
+            exist or if it is "".
+
+    Raises:
+        ValueError: if an invalid value is present in the environment variable.
+
+    Returns:
+        float: the percentage, > 0 and <= 100.
+    """
+    value = os.environ.get(key, default="")
+    if value.strip() == "":
+        return default
+
+    try:
+        value_cleaned = float(value.strip().rstrip("%"))
+    except ValueError:
+        value_cleaned = None
+    if value_cleaned is None or not 0 < value_cleaned <= 100:
+        raise ValueError(
+            f"invalid value for configoption <{key}>: {value}, should be a percentage "
+            "> 0 and <= 100"
+        )
+
+    return value_cleaned
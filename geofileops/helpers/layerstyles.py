@@ -8,6 +8,7 @@ import pandas as pd
 from osgeo import gdal, ogr
 
 from geofileops import fileops
+from geofileops.util import _metadata_cache
 
 gdal.UseExceptions()
 ogr.UseExceptions()
@@ -113,6 +114,7 @@ def add_layerstyle(
         raise Exception(f"Error {ex} executing {sql}") from ex
     finally:
         conn.close()
+        _metadata_cache.invalidate(path)
 
 
 def remove_layerstyle(path: Path, id: int):
@@ -137,6 +139,7 @@ def remove_layerstyle(path: Path, id: int):
 
     finally:
         datasource = None
+        _metadata_cache.invalidate(path)
 
 
 def _has_layerstyles_table(path: Path) -> bool:
@@ -220,4 +223,5 @@ def _init_layerstyles(path: Path, exist_ok: bool = False):
         layer.CreateField(field_region)
     finally:
         datasource = None
+        _metadata_cache.invalidate(path)
         layer = None
@@ -77,6 +77,7 @@ class GeofileType(enum.Enum):
     GPKG = enum.auto()
     SQLite = enum.auto()
     FlatGeobuf = enum.auto()
+    Parquet = enum.auto()
 
     @classmethod
     def _missing_(cls, value):
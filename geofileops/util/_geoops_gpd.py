@@ -2,14 +2,16 @@
 
 import copy
 import enum
+import functools
+import hashlib
 import json
 import logging
 import logging.config
 import math
-import multiprocessing
 import pickle
 import re
 import shutil
+import tempfile
 import time
 import warnings
 from collections.abc import Iterable
@@ -38,8 +40,10 @@ from geofileops.util import (
     _geoops_sql,
     _geoseries_util,
     _io_util,
+    _merge_util,
     _ogr_util,
     _processing_util,
+    _sqlite_util,
 )
 from geofileops.util._geofileinfo import GeofileInfo
 from geofileops.util._geometry_util import (
@@ -90,7 +94,8 @@ class ParallelizationConfig:
             bytes_usable (Optional[int], optional): the memory available for processing.
                 Defaults to None, then the free memory is automatically determined.
             cpu_count (int, optional): the number of CPU's available. Defaults to -1,
-                then the cpu_count is determined automatically.
+                then the number of workers of the shared pool is used if one is
+                active, otherwise the cpu_count is determined automatically.
         """
         self.bytes_basefootprint = bytes_basefootprint
         self.bytes_per_row = bytes_per_row
@@ -103,10 +108,15 @@ class ParallelizationConfig:
         self.bytes_usable = (
             bytes_usable
             if bytes_usable is not None
-            else int(psutil.virtual_memory().available * 0.9)
+            else int(_processing_util.memory_info().available * 0.9)
         )
         # If not specified, determine yourself
-        self.cpu_count = cpu_count if cpu_count > 0 else multiprocessing.cpu_count()
+        if cpu_count <= 0:
+            cpu_count = (
+                _processing_util.shared_pool_max_workers()
+                or _processing_util.cpu_count()
+            )
+        self.cpu_count = cpu_count
 
     @property
     def bytes_min_per_process(self):
@@ -164,13 +174,21 @@ def _determine_nb_batches(
     if logger.isEnabledFor(logging.DEBUG):
         mem_usable = _general_util.formatbytes(config_local.bytes_usable)
         logger.debug(f"memory_usable: {mem_usable}, with:")
-        mem_available = _general_util.formatbytes(psutil.virtual_memory().available)
+        mem_available = _general_util.formatbytes(
+            _processing_util.memory_info().available
+        )
         logger.debug(f"  -> mem.available: {mem_available}")
         swap_free = _general_util.formatbytes(psutil.swap_memory().free)
         logger.debug(f"  -> swap.free: {swap_free}")
 
     # If not enough memory for the amount of parallellism asked, reduce
-    if (nb_parallel * config_local.bytes_min_per_process) > config_local.bytes_usable:
+    # Remark: the memory can only be checked if the workers run on this machine.
+    shared_pool = _processing_util._shared_pool
+    workers_local = shared_pool is None or _processing_util.is_local_pool(shared_pool)
+    if (
+        workers_local
+        and nb_parallel * config_local.bytes_min_per_process > config_local.bytes_usable
+    ):
         nb_parallel = int(
             config_local.bytes_usable / config_local.bytes_min_per_process
         )
@@ -232,6 +250,145 @@ def _determine_nb_batches(
     return (nb_parallel, nb_batches)
 
 
+# The processing time aimed for per batch when calibrating, in seconds
+BATCH_SECONDS_MIN = 1
+BATCH_SECONDS_MAX = 60
+
+
+def _calibrate_parallelization_config(
+    input_path: Path,
+    input_layer: str,
+    apply_func: Callable[[gpd.GeoDataFrame], Any],
+    columns: Optional[list[str]] = None,
+    parallelization_config: Optional[ParallelizationConfig] = None,
+    cache_key: Optional[str] = None,
+    sample_size: int = 500,
+    nb_sample_slices: int = 5,
+) -> ParallelizationConfig:
+    """Calibrate the parallelization parameters on a sample of the input data.
+
+    A small random sample of the input layer is read and ``apply_func`` is applied on
+    it to measure the memory needed and the processing time per row. Based on this:
+        - bytes_per_row: the memory needed for the input and the result of a row,
+          times 2 for temporary copies while processing and writing.
+        - min_rows_per_batch: the rows that can be processed in about
+          ``BATCH_SECONDS_MIN`` seconds, so the overhead per batch is negligible.
+        - max_rows_per_batch: the rows that can be processed in about
+          ``BATCH_SECONDS_MAX`` seconds, so the work can be spread evenly over the
+          workers.
+
+    If ConfigOptions.calibrate is "persist", the calibration is saved in the temp dir
+    and reused as long as the input file and the ``cache_key`` don't change.
+
+    Args:
+        input_path (Path): the input file.
+        input_layer (str): the input layer.
+        apply_func (Callable[[gpd.GeoDataFrame], Any]): the function that applies the
+            operation on a GeoDataFrame and returns the result.
+        columns (Optional[list[str]], optional): the columns to read. Defaults to None.
+        parallelization_config (ParallelizationConfig, optional): the config to start
+            from. Defaults to None.
+        cache_key (Optional[str], optional): key that identifies the operation and
+            its parameters to save the calibration for. Defaults to None.
+        sample_size (int, optional): the number of rows to sample. Defaults to 500.
+        nb_sample_slices (int, optional): the number of random slices the sample is
+            read in. Defaults to 5.
+
+    Returns:
+        ParallelizationConfig: the calibrated config.
+    """
+    if parallelization_config is None:
+        config = ParallelizationConfig()
+    else:
+        config = copy.deepcopy(parallelization_config)
+
+    # Check if a calibration was saved already
+    cache_path = None
+    if ConfigOptions.calibrate == "persist":
+        stat = input_path.stat()
+        key = (
+            f"{input_path.resolve()}|{input_layer}|{stat.st_size}_{stat.st_mtime_ns}|"
+            f"{columns}|{cache_key}"
+        )
+        key_hash = hashlib.sha256(key.encode()).hexdigest()[:16]
+        cache_dir = Path(tempfile.gettempdir()) / "geofileops" / "calibration"
+        cache_path = cache_dir / f"{key_hash}.json"
+        if cache_path.exists():
+            with open(cache_path) as file:
+                calibration = json.load(file)
+            for name, value in calibration.items():
+                setattr(config, name, value)
+            logger.debug(f"calibration reused from {cache_path}: {calibration}")
+            return config
+
+    # Read a random sample of the input in slices
+    nb_rows_total = gfo.get_layerinfo(input_path, input_layer).featurecount
+    slice_size = max(math.ceil(sample_size / nb_sample_slices), 1)
+    if nb_rows_total <= sample_size:
+        slices = [slice(0, nb_rows_total)]
+    else:
+        rng = np.random.default_rng(seed=0)
+        starts = rng.choice(nb_rows_total - slice_size, nb_sample_slices, replace=False)
+        slices = [slice(int(start), int(start) + slice_size) for start in starts]
+    sample_gdfs = [
+        gfo.read_file(input_path, layer=input_layer, columns=columns, rows=rows)
+        for rows in slices
+    ]
+    sample_gdf = pd.concat(sample_gdfs, ignore_index=True)
+    nb_rows_sample = len(sample_gdf)
+    if nb_rows_sample == 0:
+        return config
+    assert isinstance(sample_gdf, gpd.GeoDataFrame)
+    input_bytes = _estimate_gdf_bytes(sample_gdf)
+
+    # Measure the processing time and the memory of the result
+    start = time.perf_counter()
+    result_gdf = apply_func(sample_gdf)
+    seconds_per_row = max(time.perf_counter() - start, 1e-9) / nb_rows_sample
+    result_bytes = 0
+    if isinstance(result_gdf, gpd.GeoDataFrame):
+        result_bytes = _estimate_gdf_bytes(result_gdf)
+
+    calibration = {
+        "bytes_per_row": math.ceil(2 * (input_bytes + result_bytes) / nb_rows_sample),
+        "min_rows_per_batch": min(
+            max(math.ceil(BATCH_SECONDS_MIN / seconds_per_row), 100), 100_000
+        ),
+    }
+    calibration["max_rows_per_batch"] = min(
+        max(
+            math.ceil(BATCH_SECONDS_MAX / seconds_per_row),
+            calibration["min_rows_per_batch"],
+        ),
+        1_000_000,
+    )
+    logger.info(
+        f"calibrated on {nb_rows_sample} rows ({seconds_per_row * 1000:.3f} ms/row): "
+        f"{calibration}"
+    )
+    for name, value in calibration.items():
+        setattr(config, name, value)
+
+    if cache_path is not None:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(cache_path, "w") as file:
+            json.dump(calibration, file)
+
+    return config
+
+
+def _estimate_gdf_bytes(gdf: gpd.GeoDataFrame) -> int:
+    # The memory of the geometries is mainly in GEOS, so not included in memory_usage.
+    # GEOS stores 3 doubles per coordinate + there is some overhead per geometry.
+    attributes_bytes = pd.DataFrame(gdf.drop(columns=gdf.geometry.name)).memory_usage(
+        deep=True
+    )
+    geoms = np.asarray(gdf.geometry.array)
+    nb_coords = shapely.get_num_coordinates(geoms).sum()
+    nb_parts = shapely.get_num_geometries(geoms).sum()
+    return int(attributes_bytes.sum() + nb_coords * 24 + (len(gdf) + nb_parts) * 100)
+
+
 class ProcessingParams:
     def __init__(
         self,
@@ -239,11 +396,15 @@ class ProcessingParams:
         nb_parallel: int,
         batches: list[str],
         batchsize: int,
+        batch_ranges: Optional[list[tuple[int, Optional[int]]]] = None,
+        fid_column: Optional[str] = None,
     ):
         self.nb_rows_to_process = nb_rows_to_process
         self.nb_parallel = nb_parallel
         self.batches = batches
         self.batchsize = batchsize
+        self.batch_ranges = batch_ranges
+        self.fid_column = fid_column
 
     def to_json(self, path: Path):
         prepared = _general_util.prepare_for_serialize(vars(self))
@@ -270,74 +431,90 @@ def _prepare_processing_params(
 
     # Prepare batches to process
     batches: list[str] = []
+    batch_ranges: Optional[list[tuple[int, Optional[int]]]] = None
     if nb_batches == 1:
         # If only one batch, no filtering is needed
         batches.append("")
     else:
-        # Determine the min_fid and max_fid
-        # Remark: SELECT MIN(fid), MAX(fid) FROM ... is a lot slower than UNION ALL!
-        sql_stmt = f"""
-            SELECT MIN({fid_column}) minmax_fid FROM "{input_info.name}"
-            UNION ALL
-            SELECT MAX({fid_column}) minmax_fid FROM "{input_info.name}"
-        """
-        batch_info_df = gfo.read_file(path=input_path, sql_stmt=sql_stmt)
-        min_fid = pd.to_numeric(batch_info_df["minmax_fid"][0]).item()
-        max_fid = pd.to_numeric(batch_info_df["minmax_fid"][1]).item()
-
-        # Determine the exact batches to use
-        if ((max_fid - min_fid) / input_info.featurecount) < 1.1:
-            # If the fid's are quite consecutive, use an imperfect, but
-            # fast distribution in batches
-            batch_info_list = []
-            nb_rows_per_batch = round(input_info.featurecount / nb_batches)
-            offset = 0
-            offset_per_batch = round((max_fid - min_fid) / nb_batches)
-            for batch_id in range(nb_batches):
-                start_fid = offset
-                if batch_id < (nb_batches - 1):
-                    # End fid for this batch is the next start_fid - 1
-                    end_fid = offset + offset_per_batch - 1
-                else:
-                    # For the last batch, take the max_fid so no fid's are
-                    # 'lost' due to rounding errors
-                    end_fid = max_fid
-                batch_info_list.append(
-                    (batch_id, nb_rows_per_batch, start_fid, end_fid)
-                )
-                offset += offset_per_batch
-            batch_info_df = pd.DataFrame(
-                batch_info_list, columns=["batch_id", "nb_rows", "start_fid", "end_fid"]
-            )
+        if ConfigOptions.batch_weight == "geomsize":
+            # Determine the fid ranges so each batch has about the same total size of
+            # geometries.
+            # Remark: the SQLITE dialect is used, so rowid is the fid in this case.
+            batch_info_df = _sqlite_util.get_batch_ranges_geomsize(
+                input_path,
+                layer=input_info.name,
+                geometrycolumn=input_info.geometrycolumn,
+                nb_batches=nb_batches,
+            ).rename(columns={"start_id": "start_fid", "end_id": "end_fid"})
+            nb_batches = len(batch_info_df)
         else:
-            # The fids are not consecutive, so determine the optimal fid
-            # ranges for each batch so each batch has same number of elements
-            # Remark: - this might take some seconds for larger datasets!
-            #         - (batch_id - 1) AS id to make the id zero-based
+            # Determine the min_fid and max_fid
+            # Remark: SELECT MIN(fid), MAX(fid) FROM ... is a lot slower than UNION ALL!
             sql_stmt = f"""
-                SELECT (batch_id_1 - 1) AS batch_id
-                      ,COUNT(*) AS nb_rows
-                      ,MIN({fid_column}) AS start_fid
-                      ,MAX({fid_column}) AS end_fid
-                  FROM
-                    ( SELECT {fid_column}
-                            ,NTILE({nb_batches}) OVER (ORDER BY {fid_column}) batch_id_1
-                        FROM "{input_info.name}"
-                    )
-                 GROUP BY batch_id_1;
+                SELECT MIN({fid_column}) minmax_fid FROM "{input_info.name}"
+                UNION ALL
+                SELECT MAX({fid_column}) minmax_fid FROM "{input_info.name}"
             """
             batch_info_df = gfo.read_file(path=input_path, sql_stmt=sql_stmt)
+            min_fid = pd.to_numeric(batch_info_df["minmax_fid"][0]).item()
+            max_fid = pd.to_numeric(batch_info_df["minmax_fid"][1]).item()
+
+            # Determine the exact batches to use
+            if ((max_fid - min_fid) / input_info.featurecount) < 1.1:
+                # If the fid's are quite consecutive, use an imperfect, but
+                # fast distribution in batches
+                batch_info_list = []
+                nb_rows_per_batch = round(input_info.featurecount / nb_batches)
+                offset = 0
+                offset_per_batch = round((max_fid - min_fid) / nb_batches)
+                for batch_id in range(nb_batches):
+                    start_fid = offset
+                    if batch_id < (nb_batches - 1):
+                        # End fid for this batch is the next start_fid - 1
+                        end_fid = offset + offset_per_batch - 1
+                    else:
+                        # For the last batch, take the max_fid so no fid's are
+                        # 'lost' due to rounding errors
+                        end_fid = max_fid
+                    batch_info_list.append(
+                        (batch_id, nb_rows_per_batch, start_fid, end_fid)
+                    )
+                    offset += offset_per_batch
+                batch_info_df = pd.DataFrame(
+                    batch_info_list,
+                    columns=["batch_id", "nb_rows", "start_fid", "end_fid"],
+                )
+            else:
+                # The fids are not consecutive, so determine the optimal fid
+                # ranges for each batch so each batch has same number of elements
+                # Remark: - this might take some seconds for larger datasets!
+                #         - (batch_id - 1) AS id to make the id zero-based
+                sql_stmt = f"""
+                    SELECT (batch_id_1 - 1) AS batch_id
+                          ,COUNT(*) AS nb_rows
+                          ,MIN({fid_column}) AS start_fid
+                          ,MAX({fid_column}) AS end_fid
+                      FROM
+                        ( SELECT {fid_column}
+                                ,NTILE({nb_batches}) OVER (ORDER BY {fid_column})
+                                   AS batch_id_1
+                            FROM "{input_info.name}"
+                        )
+                     GROUP BY batch_id_1;
+                """
+                batch_info_df = gfo.read_file(path=input_path, sql_stmt=sql_stmt)
 
         # Now loop over all batch ranges to build up the necessary filters
+        # Remark: the ranges are kept as well so batches can be split later on
+        batch_ranges = []
         for batch_info in batch_info_df.itertuples():
             # The batch filter
+            start_fid = int(batch_info.start_fid)
+            end_fid = None
             if batch_info.batch_id < nb_batches - 1:
-                batches.append(
-                    f"({fid_column} >= {batch_info.start_fid} "
-                    f"AND {fid_column} <= {batch_info.end_fid}) "
-                )
-            else:
-                batches.append(f"{fid_column} >= {batch_info.start_fid} ")
+                end_fid = int(batch_info.end_fid)
+            batches.append(_range_batch_filter(fid_column, start_fid, end_fid))
+            batch_ranges.append((start_fid, end_fid))
 
     # No use starting more processes than the number of batches...
     nb_parallel = min(len(batches), nb_parallel)
@@ -347,6 +524,8 @@ def _prepare_processing_params(
         nb_parallel=nb_parallel,
         batches=batches,
         batchsize=int(input_info.featurecount / len(batches)),
+        batch_ranges=batch_ranges,
+        fid_column=fid_column,
     )
 
     if tmp_dir is not None:
@@ -354,12 +533,31 @@ def _prepare_processing_params(
     return returnvalue
 
 
+def _range_batch_filter(fid_column: str, start_fid: int, end_fid: Optional[int]) -> str:
+    """Create a batch filter for the rows with fid between start_fid and end_fid.
+
+    Args:
+        fid_column (str): the fid column to filter on.
+        start_fid (int): the minimum fid, inclusive.
+        end_fid (Optional[int]): the maximum fid, inclusive. If None, there is no
+            maximum.
+
+    Returns:
+        str: the batch filter.
+    """
+    if end_fid is None:
+        return f"{fid_column} >= {start_fid} "
+    return f"({fid_column} >= {start_fid} AND {fid_column} <= {end_fid}) "
+
+
 class GeoOperation(enum.Enum):
     SIMPLIFY = "simplify"
     BUFFER = "buffer"
+    CLIP = "clip"
     CONVEXHULL = "convexhull"
     APPLY = "apply"
     APPLY_VECTORIZED = "apply_vectorized"
+    PIPELINE = "pipeline"
 
 
 def apply(
@@ -380,6 +578,7 @@ def apply(
     batchsize: int = -1,
     force: bool = False,
     parallelization_config: Optional[ParallelizationConfig] = None,
+    sort_output: bool = False,
 ):
     # Init
     operation_params = {
@@ -407,6 +606,7 @@ def apply(
         batchsize=batchsize,
         force=force,
         parallelization_config=parallelization_config,
+        sort_output=sort_output,
     )
 
 
@@ -427,6 +627,7 @@ def apply_vectorized(
     batchsize: int = -1,
     force: bool = False,
     parallelization_config: Optional[ParallelizationConfig] = None,
+    sort_output: bool = False,
 ):
     # Init
     operation_params = {"pickled_func": cloudpickle.dumps(func)}
@@ -451,6 +652,7 @@ def apply_vectorized(
         batchsize=batchsize,
         force=force,
         parallelization_config=parallelization_config,
+        sort_output=sort_output,
     )
 
 
@@ -474,6 +676,7 @@ def buffer(
     batchsize: int = -1,
     force: bool = False,
     operation_prefix: str = "",
+    sort_output: bool = False,
 ):
     # Init
     operation_params = {
@@ -509,6 +712,72 @@ def buffer(
         nb_parallel=nb_parallel,
         batchsize=batchsize,
         force=force,
+        sort_output=sort_output,
+    )
+
+
+def clip(
+    input_path: Path,
+    clip_path: Path,
+    output_path: Path,
+    input_layer: Optional[str] = None,
+    input_columns: Optional[list[str]] = None,
+    clip_layer: Optional[str] = None,
+    output_layer: Optional[str] = None,
+    explodecollections: bool = False,
+    gridsize: float = 0.0,
+    where_post: Optional[str] = None,
+    nb_parallel: int = -1,
+    batchsize: int = -1,
+    force: bool = False,
+    sort_output: bool = False,
+):
+    """Clip the input layer with a small clip layer that is loaded in memory.
+
+    The clip layer is loaded once in an STRtree that is shared with the workers, so
+    the batches can be processed fully in memory instead of querying the clip layer
+    from disk for every batch. Where possible, the workers are forked so they inherit
+    the STRtree copy-on-write. Otherwise, each worker loads it once: this is the case
+    for the workers of a shared pool (:func:`worker_pool`) and if other threads are
+    running, e.g. in :func:`run_dag`, as forking is not safe then.
+
+    The result is the same as for :func:`_geoops_sql.clip`.
+    """
+    # Init
+    input_layer_info = gfo.get_layerinfo(input_path, input_layer)
+
+    # If explodecollections is False and the input type is not point, force the output
+    # type to multi, because clip can cause eg. polygons to be split to multipolygons.
+    force_output_geometrytype = input_layer_info.geometrytype
+    if not explodecollections and force_output_geometrytype is not GeometryType.POINT:
+        force_output_geometrytype = force_output_geometrytype.to_multitype
+
+    operation_params = {
+        "clip_path": str(clip_path),
+        "clip_layer": clip_layer,
+        # The modification time makes sure an updated clip layer is reloaded
+        "clip_mtime_ns": clip_path.stat().st_mtime_ns,
+        "primitivetype": input_layer_info.geometrytype.to_primitivetype.value,
+    }
+
+    # Go!
+    return _apply_geooperation_to_layer(
+        input_path=input_path,
+        output_path=output_path,
+        operation=GeoOperation.CLIP,
+        operation_params=operation_params,
+        input_layer=input_layer,
+        output_layer=output_layer,
+        columns=input_columns,
+        explodecollections=explodecollections,
+        force_output_geometrytype=force_output_geometrytype,
+        gridsize=gridsize,
+        keep_empty_geoms=False,
+        where_post=where_post,
+        nb_parallel=nb_parallel,
+        batchsize=batchsize,
+        force=force,
+        sort_output=sort_output,
     )
 
 
@@ -525,6 +794,7 @@ def convexhull(
     nb_parallel: int = -1,
     batchsize: int = -1,
     force: bool = False,
+    sort_output: bool = False,
 ):
     # Init
     operation_params: dict[str, Any] = {}
@@ -546,6 +816,7 @@ def convexhull(
         nb_parallel=nb_parallel,
         batchsize=batchsize,
         force=force,
+        sort_output=sort_output,
     )
 
 
@@ -564,26 +835,22 @@ def makevalid(
     nb_parallel: int = -1,
     batchsize: int = -1,
     force: bool = False,
+    sort_output: bool = False,
 ):
     # Determine if collapsed parts need to be kept after makevalid or not
-    keep_collapsed = True
-    if force_output_geometrytype is None:
-        keep_collapsed = False
-    else:
+    keep_collapsed = False
+    if force_output_geometrytype is not None:
         if isinstance(force_output_geometrytype, GeometryType):
             force_output_geometrytype = force_output_geometrytype.name
-        info = fileops.get_layerinfo(input_path)
-        if force_output_geometrytype.startswith(
-            info.geometrytypename
-        ) or info.geometrytypename.startswith(force_output_geometrytype):
-            keep_collapsed = False
+        info = fileops.get_layerinfo(input_path, input_layer)
+        keep_collapsed = _makevalid_keep_collapsed(
+            info.geometrytype, force_output_geometrytype
+        )
 
     apply(
         input_path=Path(input_path),
         output_path=Path(output_path),
-        func=lambda geom: pygeoops.make_valid(
-            geom, keep_collapsed=keep_collapsed, only_if_invalid=True
-        ),
+        func=_makevalid_func(keep_collapsed),
         operation_name="makevalid",
         input_layer=input_layer,
         output_layer=output_layer,
@@ -596,6 +863,35 @@ def makevalid(
         nb_parallel=nb_parallel,
         batchsize=batchsize,
         force=force,
+        sort_output=sort_output,
+    )
+
+
+def _makevalid_keep_collapsed(
+    input_geometrytype: GeometryType,
+    force_output_geometrytype: Union[GeometryType, str, None],
+) -> bool:
+    """Determine if the parts that collapse when making geometries valid are kept.
+
+    They are only kept if the output geometry type is forced to another type than the
+    one of the input.
+    """
+    if force_output_geometrytype is None:
+        return False
+    if isinstance(force_output_geometrytype, GeometryType):
+        force_output_geometrytype = force_output_geometrytype.name
+    input_name = input_geometrytype.name
+    if force_output_geometrytype.startswith(input_name) or input_name.startswith(
+        force_output_geometrytype
+    ):
+        return False
+    return True
+
+
+def _makevalid_func(keep_collapsed: bool) -> Callable[[Any], Any]:
+    """Get the function :func:`makevalid` applies on the geometries."""
+    return lambda geom: pygeoops.make_valid(
+        geom, keep_collapsed=keep_collapsed, only_if_invalid=True
     )
 
 
@@ -615,6 +911,7 @@ def simplify(
     nb_parallel: int = -1,
     batchsize: int = -1,
     force: bool = False,
+    sort_output: bool = False,
 ):
     # Init
     operation_params = {
@@ -640,6 +937,83 @@ def simplify(
         nb_parallel=nb_parallel,
         batchsize=batchsize,
         force=force,
+        sort_output=sort_output,
+    )
+
+
+def pipeline(
+    input_path: Path,
+    output_path: Path,
+    steps: list[tuple[GeoOperation, dict]],
+    input_layer: Optional[str] = None,
+    output_layer: Optional[str] = None,
+    columns: Optional[list[str]] = None,
+    explodecollections: bool = False,
+    force_output_geometrytype: Union[GeometryType, str, None] = None,
+    gridsize: float = 0.0,
+    keep_empty_geoms: bool = False,
+    where_post: Optional[str] = None,
+    nb_parallel: int = -1,
+    batchsize: int = -1,
+    force: bool = False,
+    sort_output: bool = False,
+):
+    """Apply a sequence of operations in one go on each batch of the input layer.
+
+    All steps are applied one after the other on the same GeoDataFrame in the worker,
+    so no intermediate files are written.
+
+    Args:
+        input_path (Path): the input file.
+        output_path (Path): the file to write the result to.
+        steps (list[tuple[GeoOperation, dict]]): the operations to apply, with their
+            operation parameters, in the order they need to be applied.
+        input_layer (str, optional): input layer name. Defaults to None.
+        output_layer (str, optional): output layer name. Defaults to None.
+        columns (List[str], optional): list of columns to retain. Defaults to None.
+        explodecollections (bool, optional): True to output only simple geometries.
+            Defaults to False.
+        force_output_geometrytype (Union[GeometryType, str, None], optional): the
+            geometry type to force the output to. Defaults to None.
+        gridsize (float, optional): the size of the grid the coordinates of the ouput
+            will be rounded to. Defaults to 0.0.
+        keep_empty_geoms (bool, optional): True to keep rows with empty/null geometries
+            in the output. Defaults to False.
+        where_post (str, optional): SQL filter to apply after all other processing.
+            Defaults to None.
+        nb_parallel (int, optional): the number of parallel processes to use.
+            Defaults to -1: use all available CPUs.
+        batchsize (int, optional): indicative number of rows to process per batch.
+            Defaults to -1: (try to) determine optimal size automatically.
+        force (bool, optional): overwrite existing output file(s). Defaults to False.
+    """
+    if len(steps) == 0:
+        raise ValueError("pipeline: at least one step should be specified")
+    for step_operation, _ in steps:
+        if step_operation is GeoOperation.PIPELINE:
+            raise ValueError("pipeline: a step cannot be a pipeline itself")
+
+    # Init
+    operation_params = {"operation_name": "pipeline", "steps": steps}
+
+    # Go!
+    return _apply_geooperation_to_layer(
+        input_path=input_path,
+        output_path=output_path,
+        operation=GeoOperation.PIPELINE,
+        operation_params=operation_params,
+        input_layer=input_layer,
+        output_layer=output_layer,
+        columns=columns,
+        explodecollections=explodecollections,
+        force_output_geometrytype=force_output_geometrytype,
+        gridsize=gridsize,
+        keep_empty_geoms=keep_empty_geoms,
+        where_post=where_post,
+        nb_parallel=nb_parallel,
+        batchsize=batchsize,
+        force=force,
+        sort_output=sort_output,
     )
 
 
@@ -660,6 +1034,7 @@ def _apply_geooperation_to_layer(
     batchsize: int,  # = -1
     force: bool,  # = False
     parallelization_config: Optional[ParallelizationConfig] = None,
+    sort_output: bool = False,
 ):
     """Applies a geo operation on a layer.
 
@@ -685,6 +1060,11 @@ def _apply_geooperation_to_layer(
         - single_sided: only one side of the line is buffered,
             if distance is negative, the left side, if distance is positive,
             the right hand side. Only relevant for line geometries.
+      - CLIP: clip with the geometries of a small layer loaded in memory. Operation
+        parameters:
+          - clip_path, clip_layer: the layer to clip with.
+          - clip_mtime_ns: modification time of clip_path, to reload it if changed.
+          - primitivetype: the primitive type of the geometries to keep.
       - CONVEXHULL: appy a convex hull.
       - SIMPLIFY: simplify the geometry. Operation parameters:
           - algorithm: vector_util.SimplifyAlgorithm
@@ -724,6 +1104,8 @@ def _apply_geooperation_to_layer(
             Defaults to -1: (try to) determine optimal size automatically.
         force (bool, optional): [description]. Defaults to False.
         parallelization_config (ParallelizationConfig, optional): Defaults to None.
+        sort_output (bool, optional): True to sort the rows of the output spatially.
+            Not applicable if the fids are preserved. Defaults to False.
 
     Technical remarks:
         - Retaining None geometry values in the output files is hard, because when
@@ -776,12 +1158,32 @@ def _apply_geooperation_to_layer(
             # Always set geometrycolumn to "geom", because where_post parameter for shp
             # doesn't seem to work... so create temp partial files always as gpkg.
             where_post = where_post.format(geometrycolumn="geom")
+    partial_suffix = _merge_util.partial_suffix(
+        preserve_fid=preserve_fid, where=where_post
+    )
 
     # Prepare tmp files
-    tmp_dir = _io_util.create_tempdir(f"geofileops/{operation.value}")
+    tmp_dir = _io_util.create_tempdir(
+        f"geofileops/{operation.value}",
+        resume_key=_io_util.get_resume_key(input_path, output_path),
+    )
     logger.debug(f"Start calculation to temp files in {tmp_dir}")
 
+    keep_tmp_dir = False
     try:
+        # If asked, calibrate the parallelization parameters on a sample of the input
+        if ConfigOptions.calibrate != "none" and batchsize <= 0:
+            parallelization_config = _calibrate_parallelization_config(
+                input_path=input_path,
+                input_layer=input_layer,
+                apply_func=lambda gdf: _apply_operation(
+                    gdf, operation, operation_params
+                ),
+                columns=columns,
+                parallelization_config=parallelization_config,
+                cache_key=f"{operation.value}|{operation_params}",
+            )
+
         # Calculate the best number of parallel processes and batches for
         # the available resources
         processing_params = _prepare_processing_params(
@@ -794,6 +1196,28 @@ def _apply_geooperation_to_layer(
         )
         assert processing_params.batches is not None
 
+        # If resuming is enabled, keep track of the batches completed
+        manifest = None
+        if ConfigOptions.resume:
+            manifest = _processing_util.ResumeManifest(
+                tmp_dir / "resume_manifest.json",
+                fingerprint={
+                    "operation": operation.value,
+                    "operation_params": operation_params,
+                    "batches": processing_params.batches,
+                    "inputs": _io_util.get_resume_key(input_path),
+                    "input_layer": input_layer,
+                    "columns": columns,
+                    "explodecollections": explodecollections,
+                    "gridsize": gridsize,
+                    "keep_empty_geoms": keep_empty_geoms,
+                    "preserve_fid": preserve_fid,
+                    "partial_suffix": partial_suffix,
+                },
+            )
+            # Merged files can be incomplete, so they are merged again
+            shutil.rmtree(tmp_dir / "merged", ignore_errors=True)
+
         logger.info(
             f"Start processing ({processing_params.nb_parallel} "
             f"parallel workers, batch size: {processing_params.batchsize})"
@@ -802,34 +1226,51 @@ def _apply_geooperation_to_layer(
         calculate_in_threads = (
             True if processing_params.nb_rows_to_process <= 100 else False
         )
+        # The clip layer is loaded once here, so threads or forked workers share it
+        # instead of each worker loading it. Forking isn't possible for a shared pool
+        # and isn't safe if other threads are running: then each worker loads it.
+        mp_context = None
+        if operation is GeoOperation.CLIP:
+            fork = not calculate_in_threads and _processing_util.can_fork()
+            if calculate_in_threads or fork:
+                _get_clip_tree(
+                    operation_params["clip_path"],
+                    operation_params["clip_layer"],
+                    operation_params["clip_mtime_ns"],
+                )
+            if fork:
+                mp_context = "fork"
         with _processing_util.PooledExecutorFactory(
             threadpool=calculate_in_threads,
             max_workers=processing_params.nb_parallel,
             initializer=_processing_util.initialize_worker(),
+            mp_context=mp_context,
         ) as calculate_pool:
             # Prepare output filename
             tmp_output_path = tmp_dir / output_path.name
+            gfo.remove(tmp_output_path, missing_ok=True)
 
             batches: dict[int, dict] = {}
-            future_to_batch_id = {}
 
-            for batch_id, batch_filter in enumerate(processing_params.batches):
+            def submit_batch(batch_id: int, batch_filter: str) -> futures.Future:
                 batches[batch_id] = {}
                 batches[batch_id]["layer"] = output_layer
 
                 # Output each batch to a seperate temporary file, otherwise there
                 # are timeout issues when processing large files
                 output_tmp_partial_path = (
-                    tmp_dir / f"{output_path.stem}_{batch_id}.gpkg"
+                    tmp_dir / f"{output_path.stem}_{batch_id}{partial_suffix}"
                 )
                 batches[batch_id]["tmp_partial_output_path"] = output_tmp_partial_path
                 batches[batch_id]["filter"] = batch_filter
+                # Remark: when resuming, an incomplete partial file can exist
+                gfo.remove(output_tmp_partial_path, missing_ok=True)
 
                 # Remark: this temp file doesn't need spatial index
                 # Remark: because force_output_geometrytype for GeoDataFrame
                 # operations is (a lot) more limited than gdal-based, the gdal version
                 # is used later on when the results are merged to the result file.
-                future = calculate_pool.submit(
+                return calculate_pool.submit(
                     _apply_geooperation,
                     input_path=input_path,
                     output_path=output_tmp_partial_path,
@@ -845,32 +1286,96 @@ def _apply_geooperation_to_layer(
                     preserve_fid=preserve_fid,
                     force=force,
                 )
-                future_to_batch_id[future] = batch_id
+
+            def split_batch(batch_id: int, nb_parts: int) -> dict:
+                # Only batches on a range of fids can be split
+                batch_ranges = processing_params.batch_ranges
+                fid_column = processing_params.fid_column
+                if batch_ranges is None or fid_column is None:
+                    return {}
+                if batch_id >= len(batch_ranges):
+                    return {}
+
+                start_fid, end_fid = batch_ranges[batch_id]
+                if end_fid is None:
+                    # The last batch has no end_fid, so determine it
+                    sql_stmt = f'SELECT MAX({fid_column}) max_fid FROM "{input_layer}"'
+                    max_df = gfo.read_file(input_path, sql_stmt=sql_stmt)
+                    end_fid = pd.to_numeric(max_df["max_fid"][0]).item()
+
+                future_to_sub_id = {}
+                ranges = _processing_util.split_range(start_fid, end_fid, nb_parts)
+                for sub_start_fid, sub_end_fid in ranges:
+                    sub_id = max(batches) + 1
+                    batch_filter = _range_batch_filter(
+                        fid_column, sub_start_fid, sub_end_fid
+                    )
+                    future_to_sub_id[submit_batch(sub_id, batch_filter)] = sub_id
+
+                return future_to_sub_id
+
+            def stop_batch(batch_id: int):
+                path = batches[batch_id]["tmp_partial_output_path"]
+                _processing_util.request_stop(path)
+
+            to_submit = []
+            partials_to_merge = []
+            for batch_id, batch_filter in enumerate(processing_params.batches):
+                if manifest is not None and manifest.is_completed(batch_id):
+                    path = tmp_dir / f"{output_path.stem}_{batch_id}{partial_suffix}"
+                    if path.exists() and path.stat().st_size > 0:
+                        partials_to_merge.append(path)
+                    continue
+                to_submit.append(
+                    (batch_id, functools.partial(submit_batch, batch_id, batch_filter))
+                )
 
             # Loop till all parallel processes are ready, but process each one
-            # that is ready already
+            # that is ready already. Batches are only submitted when there is enough
+            # memory available. Batches that take a lot longer than the others
+            # are split in sub-batches if there are idle workers. When resuming, the
+            # completed batches are kept track of, so batches aren't split then.
             # Remark: calculating can be done in parallel, but only one process
             # can write to the same output file at the time...
             start_time = datetime.now()
-            nb_done = 0
             nb_batches = len(processing_params.batches)
+            nb_todo = len(to_submit)
+            if nb_todo < nb_batches:
+                logger.info(f"resume: {nb_batches - nb_todo} batches were completed")
+            split_stragglers = ConfigOptions.split_stragglers and manifest is None
+            batches_completed = _processing_util.AsCompletedSplitStragglers(
+                pool=calculate_pool,
+                future_to_batch_id={},
+                split_batch=split_batch if split_stragglers else None,
+                stop_batch=stop_batch,
+                nb_workers=processing_params.nb_parallel,
+                to_submit=to_submit,
+                memory_monitor=_processing_util.MemoryMonitor(
+                    pool=calculate_pool,
+                    max_concurrency=processing_params.nb_parallel,
+                ),
+            )
+            merger = _merge_util.PartialsMerger(
+                tmp_dir=tmp_dir, preserve_fid=preserve_fid
+            )
             _general_util.report_progress(
                 start_time,
-                nb_done,
-                nb_todo=nb_batches,
+                batches_completed.nb_done,
+                nb_todo=nb_todo,
                 operation=operation.value,
                 nb_parallel=processing_params.nb_parallel,
             )
-            for future in futures.as_completed(future_to_batch_id):
+            for future, batch_id in batches_completed:
                 try:
                     message = future.result()
                     logger.debug(message)
 
                     # If the calculate gave results, copy to output
-                    batch_id = future_to_batch_id[future]
                     tmp_partial_output_path = batches[batch_id][
                         "tmp_partial_output_path"
                     ]
+                    if manifest is not None:
+                        manifest.set_completed(batch_id, [tmp_partial_output_path])
                     if (
                         tmp_partial_output_path.exists()
                         and tmp_partial_output_path.stat().st_size > 0
@@ -878,9 +1383,15 @@ def _apply_geooperation_to_layer(
                         # Remark: because force_output_geometrytype for GeoDataFrame
                         # operations is (a lot) more limited than gdal-based, use the
                         # gdal version via _append_to_nolock.
-                        if (
-                            nb_batches == 1
-                            and force_output_geometrytype is None
+                        if manifest is not None:
+                            # The partial files are only merged once all batches are
+                            # ready, otherwise they can't be reused when resuming.
+                            partials_to_merge.append(tmp_partial_output_path)
+                        elif nb_batches > 1 or batches_completed.nb_split > 0:
+                            # Merge the partial files in parallel while calculating
+                            merger.add(tmp_partial_output_path)
+                        elif (
+                            force_output_geometrytype is None
                             and tmp_partial_output_path.suffix == tmp_output_path.suffix
                             and where_post is None
                         ):
@@ -898,32 +1409,49 @@ def _apply_geooperation_to_layer(
                             gfo.remove(tmp_partial_output_path)
 
                 except Exception as ex:
-                    batch_id = future_to_batch_id[future]
                     message = f"Error {ex} executing {batches[batch_id]}"
                     logger.exception(message)
                     raise RuntimeError(message) from ex
 
                 # Log the progress and prediction speed
-                nb_done += 1
                 _general_util.report_progress(
                     start_time,
-                    nb_done,
-                    nb_todo=nb_batches,
+                    batches_completed.nb_done,
+                    nb_todo=nb_todo,
                     operation=operation.value,
                     nb_parallel=processing_params.nb_parallel,
                 )
 
+            # Append the files remaining after the parallel merges to the output
+            for partial_path in partials_to_merge:
+                merger.add(partial_path)
+            merger.finalize(
+                tmp_output_path,
+                explodecollections=explodecollections,
+                force_output_geometrytype=force_output_geometrytype,
+                where=where_post,
+            )
+
+            # The pool isn't needed anymore, so stop discarded stragglers
+            batches_completed.terminate_discarded()
+
         # Round up and clean up
         # Now create spatial index and move to output location
         if tmp_output_path.exists():
+            if sort_output and not preserve_fid:
+                tmp_output_path = _merge_util.sort_output(tmp_output_path, output_layer)
             if GeofileInfo(tmp_output_path).default_spatial_index:
                 gfo.create_spatial_index(path=tmp_output_path, layer=output_layer)
             gfo.move(tmp_output_path, output_path)
         else:
             logger.debug("Result was empty")
 
+    except Exception:
+        # Keep the completed batches so the operation can be resumed
+        keep_tmp_dir = ConfigOptions.resume
+        raise
     finally:
-        if ConfigOptions.remove_temp_files:
+        if ConfigOptions.remove_temp_files and not keep_tmp_dir:
             shutil.rmtree(tmp_dir, ignore_errors=True)
 
     logger.info(f"Ready, took {datetime.now()-start_time_global}")
@@ -964,37 +1492,13 @@ def _apply_geooperation(
         fid_as_index=preserve_fid,
     )
 
+    # The batch can be asked to stop, e.g. if it is split in sub-batches
+    _processing_util.raise_if_stopped(output_path)
+
     # Run operation if data read
     if len(data_gdf) > 0:
-        if operation is GeoOperation.BUFFER:
-            data_gdf.geometry = data_gdf.geometry.buffer(
-                distance=operation_params["distance"],
-                resolution=operation_params["quadrantsegments"],
-                cap_style=operation_params["endcap_style"].value,
-                join_style=operation_params["join_style"].value,
-                mitre_limit=operation_params["mitre_limit"],
-                single_sided=operation_params["single_sided"],
-            )
-        elif operation is GeoOperation.CONVEXHULL:
-            data_gdf.geometry = data_gdf.geometry.convex_hull
-        elif operation is GeoOperation.SIMPLIFY:
-            data_gdf.geometry = pygeoops.simplify(
-                data_gdf.geometry,
-                algorithm=operation_params["algorithm"].value,
-                tolerance=operation_params["tolerance"],
-                lookahead=operation_params["step"],
-            )
-        elif operation is GeoOperation.APPLY:
-            func = pickle.loads(operation_params["pickled_func"])
-            if operation_params["only_geom_input"] is True:
-                data_gdf.geometry = data_gdf.geometry.apply(func)
-            else:
-                data_gdf.geometry = data_gdf.apply(func, axis=1)
-        elif operation is GeoOperation.APPLY_VECTORIZED:
-            func = pickle.loads(operation_params["pickled_func"])
-            data_gdf.geometry = func(data_gdf.geometry)
-        else:
-            raise ValueError(f"operation not supported: {operation}")
+        data_gdf = _apply_operation(data_gdf, operation, operation_params)
+    _processing_util.raise_if_stopped(output_path)
 
     # If there is an fid column in the dataset, rename it, because the fid column is a
     # "special case" in gdal that should not be written.
@@ -1037,20 +1541,112 @@ def _apply_geooperation(
 
     # Use force_multitype if explodecollections=False to avoid warnings/issues when some
     # batches contain singletype and some contain multitype geometries
-    gfo.to_file(
-        gdf=data_gdf,
+    _merge_util.write_partial(
+        data_gdf,
         path=output_path,
         layer=output_layer,
         index=False,
         force_output_geometrytype=force_output_geometrytype,
         force_multitype=not explodecollections,
-        create_spatial_index=False,
     )
 
     message = f"Took {datetime.now()-start_time} for {len(data_gdf)} rows ({where})"
     return message
 
 
+def _apply_operation(
+    data_gdf: gpd.GeoDataFrame, operation: GeoOperation, operation_params: dict
+) -> gpd.GeoDataFrame:
+    if operation is GeoOperation.BUFFER:
+        data_gdf.geometry = data_gdf.geometry.buffer(
+            distance=operation_params["distance"],
+            resolution=operation_params["quadrantsegments"],
+            cap_style=operation_params["endcap_style"].value,
+            join_style=operation_params["join_style"].value,
+            mitre_limit=operation_params["mitre_limit"],
+            single_sided=operation_params["single_sided"],
+        )
+    elif operation is GeoOperation.CLIP:
+        clip_tree = _get_clip_tree(
+            operation_params["clip_path"],
+            operation_params["clip_layer"],
+            operation_params["clip_mtime_ns"],
+        )
+        data_gdf = _clip(data_gdf, clip_tree, operation_params["primitivetype"])
+    elif operation is GeoOperation.CONVEXHULL:
+        data_gdf.geometry = data_gdf.geometry.convex_hull
+    elif operation is GeoOperation.SIMPLIFY:
+        data_gdf.geometry = pygeoops.simplify(
+            data_gdf.geometry,
+            algorithm=operation_params["algorithm"].value,
+            tolerance=operation_params["tolerance"],
+            lookahead=operation_params["step"],
+        )
+    elif operation is GeoOperation.APPLY:
+        func = pickle.loads(operation_params["pickled_func"])
+        if operation_params["only_geom_input"] is True:
+            data_gdf.geometry = data_gdf.geometry.apply(func)
+        else:
+            data_gdf.geometry = data_gdf.apply(func, axis=1)
+    elif operation is GeoOperation.APPLY_VECTORIZED:
+        func = pickle.loads(operation_params["pickled_func"])
+        data_gdf.geometry = func(data_gdf.geometry)
+    elif operation is GeoOperation.PIPELINE:
+        # Apply all steps on the same GeoDataFrame, without intermediate files
+        for step_operation, step_params in operation_params["steps"]:
+            if len(data_gdf) == 0:
+                break
+            data_gdf = _apply_operation(data_gdf, step_operation, step_params)
+    else:
+        raise ValueError(f"operation not supported: {operation}")
+
+    return data_gdf
+
+
+@functools.lru_cache(maxsize=4)
+def _get_clip_tree(
+    clip_path: str, clip_layer: Optional[str], clip_mtime_ns: int
+) -> shapely.STRtree:
+    # Remark: clip_mtime_ns is only used as part of the cache key
+    clip_gdf = gfo.read_file(clip_path, layer=clip_layer, columns=[])
+    clip_geoms = clip_gdf.geometry.array.to_numpy()
+    clip_geoms = clip_geoms[~shapely.is_missing(clip_geoms)]
+    clip_geoms = clip_geoms[~shapely.is_empty(clip_geoms)]
+    shapely.prepare(clip_geoms)
+    return shapely.STRtree(clip_geoms)
+
+
+def _clip(
+    data_gdf: gpd.GeoDataFrame, clip_tree: shapely.STRtree, primitivetype: int
+) -> gpd.GeoDataFrame:
+    """Clip the geometries with the union of the intersecting geometries in the tree.
+
+    Rows that don't intersect any geometry in the tree are removed.
+    """
+    geoms = data_gdf.geometry.array.to_numpy()
+    input_idx, tree_idx = clip_tree.query(geoms, predicate="intersects")
+    if len(input_idx) == 0:
+        return data_gdf.iloc[0:0]
+
+    # Union the clip geometries per input geometry
+    order = np.argsort(input_idx, kind="stable")
+    input_idx, tree_idx = input_idx[order], tree_idx[order]
+    rows, starts = np.unique(input_idx, return_index=True)
+    clip_geoms = clip_tree.geometries
+    clip_unioned = np.empty(len(rows), dtype=object)
+    for index, group in enumerate(np.split(tree_idx, starts[1:])):
+        if len(group) == 1:
+            clip_unioned[index] = clip_geoms[group[0]]
+        else:
+            clip_unioned[index] = shapely.union_all(clip_geoms[group])
+
+    result_gdf = data_gdf.iloc[rows].copy()
+    result_gdf.geometry = pygeoops.collection_extract(
+        shapely.intersection(geoms[rows], clip_unioned), primitivetype=primitivetype
+    )
+    return result_gdf
+
+
 def dissolve(
     input_path: Path,
     output_path: Path,
@@ -1236,7 +1832,7 @@ def dissolve(
         if tiles_path is not None:
             result_tiles_gdf = gfo.read_file(tiles_path)
             if nb_parallel == -1:
-                nb_cpu = multiprocessing.cpu_count()
+                nb_cpu = _processing_util.cpu_count()
                 nb_parallel = nb_cpu  # int(1.25 * nb_cpu)
                 logger.debug(f"Nb cpus found: {nb_cpu}, nb_parallel: {nb_parallel}")
         else:
@@ -1277,14 +1873,40 @@ def dissolve(
         # The dissolve for polygons is done in several passes, and after the first
         # pass, only the 'onborder' features are further dissolved, as the
         # 'notonborder' features are already OK.
-        tempdir = _io_util.create_tempdir(f"geofileops/{operation_name}")
+        tempdir = _io_util.create_tempdir(
+            f"geofileops/{operation_name}",
+            resume_key=_io_util.get_resume_key(input_path, tiles_path, output_path),
+        )
+        keep_tmp_dir = False
         try:
             if output_layer is None:
                 output_layer = gfo.get_default_layer(output_path)
             output_tmp_path = tempdir / "output_tmp.gpkg"
+
+            # If resuming is enabled, keep track of the passes completed
+            manifest = None
+            if ConfigOptions.resume:
+                manifest = _processing_util.ResumeManifest(
+                    tempdir / "resume_manifest.json",
+                    fingerprint={
+                        "inputs": _io_util.get_resume_key(input_path, tiles_path),
+                        "input_layer": input_layer,
+                        "groupby_columns": groupby_columns,
+                        "agg_columns": agg_columns,
+                        "explodecollections": explodecollections,
+                        "nb_squarish_tiles": nb_squarish_tiles,
+                        "gridsize": gridsize,
+                        "on_data_error": on_data_error,
+                    },
+                )
+                # The files of the finalization can be incomplete
+                for path in tempdir.glob("output_tmp*"):
+                    path.unlink()
+
             prev_nb_batches = None
             last_pass = False
             pass_id = 0
+            pass_output_paths: list[Path] = []
             logger.info(f"Start, with input {input_path}")
             input_pass_layer: Optional[str] = input_layer
             while True:
@@ -1293,6 +1915,22 @@ def dissolve(
                 if not input_path.exists():
                     break
 
+                # When resuming, skip the passes that were completed already
+                pass_tiles_path = tempdir / f"output_{pass_id}_tiles.gpkg"
+                if manifest is not None and manifest.is_completed(pass_id):
+                    logger.info(f"resume: pass {pass_id} was completed")
+                    prev_nb_batches = len(gfo.read_file(pass_tiles_path))
+                    pass_output_paths.append(
+                        tempdir / f"output_{pass_id}_notonborder.gpkg"
+                    )
+                    output_tmp_onborder_path = (
+                        tempdir / f"output_{pass_id}_onborder.gpkg"
+                    )
+                    input_path = output_tmp_onborder_path
+                    pass_id += 1
+                    input_pass_layer = None
+                    continue
+
                 # Get info of the current file that needs to be dissolved
                 input_pass_layerinfo = gfo.get_layerinfo(input_path, input_pass_layer)
                 nb_rows_total = input_pass_layerinfo.featurecount
@@ -1300,13 +1938,29 @@ def dissolve(
                 # Calculate the best number of parallel processes and batches for
                 # the available resources for the current pass
                 # Limit the nb of rows per batch, as dissolve slows down with more rows.
+                parallelization_config = ParallelizationConfig(max_rows_per_batch=10000)
+                if ConfigOptions.calibrate != "none" and batchsize <= 0:
+                    parallelization_config = _calibrate_parallelization_config(
+                        input_path=input_path,
+                        input_layer=input_pass_layerinfo.name,
+                        apply_func=lambda gdf: gdf.dissolve(),
+                        parallelization_config=parallelization_config,
+                        cache_key=f"dissolve|{pass_id}",
+                    )
+                    # The sample is small, so the slowdown with more rows is not
+                    # measured: keep the limit.
+                    parallelization_config.max_rows_per_batch = min(
+                        parallelization_config.max_rows_per_batch, 10000
+                    )
+                    parallelization_config.min_rows_per_batch = min(
+                        parallelization_config.min_rows_per_batch,
+                        parallelization_config.max_rows_per_batch,
+                    )
                 nb_parallel, nb_batches = _determine_nb_batches(
                     nb_rows_total=nb_rows_total,
                     nb_parallel=nb_parallel,
                     batchsize=batchsize,
-                    parallelization_config=ParallelizationConfig(
-                        max_rows_per_batch=10000
-                    ),
+                    parallelization_config=parallelization_config,
                 )
 
                 # If the ideal number of batches is close to the nb. result tiles asked,
@@ -1348,21 +2002,35 @@ def dissolve(
                     tiles_gdf.geometry = shapely.set_precision(
                         tiles_gdf.geometry, grid_size=gridsize
                     )
-                gfo.to_file(tiles_gdf, tempdir / f"output_{pass_id}_tiles.gpkg")
+                gfo.to_file(tiles_gdf, pass_tiles_path)
 
                 # If the number of tiles ends up as 1, it is the last pass anyway...
                 if len(tiles_gdf) == 1:
                     last_pass = True
 
+                # The notonborder rows are final immediately. When resuming, they are
+                # saved per pass so the results of completed passes can be reused.
+                output_pass_notonborder_path = output_tmp_path
+                if manifest is not None:
+                    output_pass_notonborder_path = (
+                        tempdir / f"output_{pass_id}_notonborder.gpkg"
+                    )
+                    pass_output_paths.append(output_pass_notonborder_path)
+
                 # If we are not in the last pass, onborder parcels will need extra
                 # processing still in further passes, so are saved in a seperate
-                # gfo. The notonborder rows are final immediately
+                # gfo.
                 if last_pass is not True:
                     output_tmp_onborder_path = (
                         tempdir / f"output_{pass_id}_onborder.gpkg"
                     )
                 else:
-                    output_tmp_onborder_path = output_tmp_path
+                    output_tmp_onborder_path = output_pass_notonborder_path
+
+                if manifest is not None:
+                    # Remove the results of an incomplete run of this pass
+                    gfo.remove(output_pass_notonborder_path, missing_ok=True)
+                    gfo.remove(output_tmp_onborder_path, missing_ok=True)
 
                 # Now go!
                 logger.info(
@@ -1372,7 +2040,7 @@ def dissolve(
                 pass_start = datetime.now()
                 _ = _dissolve_polygons_pass(
                     input_path=input_path,
-                    output_notonborder_path=output_tmp_path,
+                    output_notonborder_path=output_pass_notonborder_path,
                     output_onborder_path=output_tmp_onborder_path,
                     explodecollections=explodecollections,
                     groupby_columns=groupby_columns,
@@ -1384,8 +2052,18 @@ def dissolve(
                     keep_empty_geoms=False,
                     nb_parallel=nb_parallel,
                     on_data_error=on_data_error,
+                    resume=manifest is not None,
                 )
                 logger.info(f"Pass {pass_id} ready, took {datetime.now()-pass_start}")
+                if manifest is not None:
+                    manifest.set_completed(
+                        pass_id,
+                        [
+                            pass_tiles_path,
+                            output_pass_notonborder_path,
+                            output_tmp_onborder_path,
+                        ],
+                    )
 
                 # Prepare the next pass
                 # The input path is the onborder file
@@ -1400,9 +2078,19 @@ def dissolve(
 
             # Calculation ready! Now finalise output!
             logger.info("Finalize result")
+            # When resuming, the results of the passes are saved in separate files
+            for pass_output_path in pass_output_paths:
+                if pass_output_path.exists():
+                    fileops._append_to_nolock(
+                        src=pass_output_path,
+                        dst=output_tmp_path,
+                        dst_layer=output_layer,
+                        create_spatial_index=False,
+                    )
+
             # If there is a result on border, append it to the rest
             if (
-                str(output_tmp_onborder_path) != str(output_tmp_path)
+                output_tmp_onborder_path not in [output_tmp_path, *pass_output_paths]
                 and output_tmp_onborder_path.exists()
             ):
                 gfo.append_to(
@@ -1630,8 +2318,12 @@ def dissolve(
                 # Now we are ready to move the result to the final spot...
                 gfo.move(output_tmp2_final_path, output_path)
 
+        except Exception:
+            # Keep the completed passes so the operation can be resumed
+            keep_tmp_dir = ConfigOptions.resume
+            raise
         finally:
-            if ConfigOptions.remove_temp_files:
+            if ConfigOptions.remove_temp_files and not keep_tmp_dir:
                 shutil.rmtree(tempdir, ignore_errors=True)
     else:
         raise NotImplementedError(
@@ -1653,6 +2345,7 @@ def _dissolve_polygons_pass(
     keep_empty_geoms: bool,
     nb_parallel: int,
     on_data_error: str = "raise",
+    resume: bool = False,
 ):
     start_time = datetime.now()
 
@@ -1662,6 +2355,32 @@ def _dissolve_polygons_pass(
     # Start calculation in parallel
     input_layerinfo = gfo.get_layerinfo(input_path, input_layer)
 
+    partial_suffix = _merge_util.partial_suffix()
+
+    # If resuming, keep track of the tiles completed
+    manifest = None
+    if resume:
+        name = f"{output_notonborder_path.stem}_resume_manifest.json"
+        manifest = _processing_util.ResumeManifest(
+            output_onborder_path.parent / name,
+            fingerprint={
+                "inputs": _io_util.get_resume_key(input_path),
+                "input_layer": input_layer,
+                "tiles": [tile.bounds for tile in tiles_gdf.geometry],
+                "tile_ids": (
+                    tiles_gdf["tile_id"].tolist() if "tile_id" in tiles_gdf else None
+                ),
+                "groupby_columns": groupby_columns,
+                "agg_columns": agg_columns,
+                "explodecollections": explodecollections,
+                "gridsize": gridsize,
+                "keep_empty_geoms": keep_empty_geoms,
+                "on_data_error": on_data_error,
+                "partial_suffix": partial_suffix,
+            },
+        )
+    partials_to_append = []
+
     # Processing in threads is 2x faster for small datasets (on Windows)
     calculate_in_threads = True if input_layerinfo.featurecount <= 100 else False
     with _processing_util.PooledExecutorFactory(
@@ -1675,7 +2394,7 @@ def _dissolve_polygons_pass(
         batches: dict[int, dict] = {}
         nb_batches = len(tiles_gdf)
         nb_batches_done = 0
-        future_to_batch_id = {}
+        to_submit = []
         nb_rows_done = 0
         for batch_id, tile_row in enumerate(tiles_gdf.itertuples()):
             batches[batch_id] = {}
@@ -1684,22 +2403,35 @@ def _dissolve_polygons_pass(
 
             # Output each batch to a seperate temporary file, otherwise there
             # are timeout issues when processing large files
-            suffix = output_notonborder_path.suffix
-            name = f"{output_notonborder_path.stem}_{batch_id}{suffix}"
+            name = f"{output_notonborder_path.stem}_{batch_id}{partial_suffix}"
             output_notonborder_tmp_partial_path = tempdir / name
             batches[batch_id]["output_notonborder_tmp_partial_path"] = (
                 output_notonborder_tmp_partial_path
             )
-            name = f"{output_onborder_path.stem}_{batch_id}{suffix}"
+            name = f"{output_onborder_path.stem}_{batch_id}{partial_suffix}"
             output_onborder_tmp_partial_path = tempdir / name
             batches[batch_id]["output_onborder_tmp_partial_path"] = (
                 output_onborder_tmp_partial_path
             )
 
+            # When resuming, skip the tiles that were completed already
+            partial_paths = [
+                (output_notonborder_tmp_partial_path, output_notonborder_path),
+                (output_onborder_tmp_partial_path, output_onborder_path),
+            ]
+            if manifest is not None:
+                if manifest.is_completed(batch_id):
+                    partials_to_append.extend(partial_paths)
+                    nb_batches_done += 1
+                    continue
+                gfo.remove(output_notonborder_tmp_partial_path, missing_ok=True)
+                gfo.remove(output_onborder_tmp_partial_path, missing_ok=True)
+
             # Get tile_id if present
             tile_id = tile_row.tile_id if "tile_id" in tile_row._fields else None
 
-            future = calculate_pool.submit(
+            submit = functools.partial(
+                calculate_pool.submit,
                 _dissolve_polygons,
                 input_path=input_path,
                 output_notonborder_path=output_notonborder_tmp_partial_path,
@@ -1716,18 +2448,27 @@ def _dissolve_polygons_pass(
                 keep_empty_geoms=keep_empty_geoms,
                 on_data_error=on_data_error,
             )
-            future_to_batch_id[future] = batch_id
+            to_submit.append((batch_id, submit))
 
         # Loop till all parallel processes are ready, but process each one
-        # that is ready already
+        # that is ready already. Tiles are only submitted when there is enough
+        # memory available.
+        batches_completed = _processing_util.AsCompletedSplitStragglers(
+            pool=calculate_pool,
+            future_to_batch_id={},
+            nb_workers=nb_parallel,
+            to_submit=to_submit,
+            memory_monitor=_processing_util.MemoryMonitor(
+                pool=calculate_pool, max_concurrency=nb_parallel
+            ),
+        )
         _general_util.report_progress(
             start_time, nb_batches_done, nb_batches, "dissolve"
         )
-        for future in futures.as_completed(future_to_batch_id):
+        for future, batch_id in batches_completed:
             try:
                 # If the calculate gave results
                 nb_batches_done += 1
-                batch_id = future_to_batch_id[future]
                 result = future.result()
 
                 if result is not None:
@@ -1744,40 +2485,29 @@ def _dissolve_polygons_pass(
                             logger.debug(f"Perfstring: {result['perfstring']}")
 
                     # Start copy of the result to a common file
-                    batch_id = future_to_batch_id[future]
-
-                    # If calculate gave notonborder results, append to output
                     output_notonborder_tmp_partial_path = batches[batch_id][
                         "output_notonborder_tmp_partial_path"
                     ]
-                    if (
-                        output_notonborder_tmp_partial_path.exists()
-                        and output_notonborder_tmp_partial_path.stat().st_size > 0
-                    ):
-                        fileops._append_to_nolock(
-                            src=output_notonborder_tmp_partial_path,
-                            dst=output_notonborder_path,
-                            create_spatial_index=False,
-                        )
-                        gfo.remove(output_notonborder_tmp_partial_path)
-
-                    # If calculate gave onborder results, append to output
                     output_onborder_tmp_partial_path = batches[batch_id][
                         "output_onborder_tmp_partial_path"
                     ]
-                    if (
-                        output_onborder_tmp_partial_path.exists()
-                        and output_onborder_tmp_partial_path.stat().st_size > 0
-                    ):
-                        fileops._append_to_nolock(
-                            src=output_onborder_tmp_partial_path,
-                            dst=output_onborder_path,
-                            create_spatial_index=False,
+                    partial_paths = [
+                        (output_notonborder_tmp_partial_path, output_notonborder_path),
+                        (output_onborder_tmp_partial_path, output_onborder_path),
+                    ]
+                    if manifest is not None:
+                        # When resuming, the partial files are only appended once all
+                        # tiles are ready, otherwise they can't be reused.
+                        manifest.set_completed(
+                            batch_id, [path for path, _ in partial_paths]
                         )
-                        gfo.remove(output_onborder_tmp_partial_path)
+                        partials_to_append.extend(partial_paths)
+                    else:
+                        # If calculate gave (notonborder/onborder) results, append
+                        for partial_path, dst_path in partial_paths:
+                            _append_partial(partial_path, dst_path)
 
             except Exception as ex:
-                batch_id = future_to_batch_id[future]
                 message = f"Error executing {batches[batch_id]}: {ex}"
                 logger.exception(message)
                 calculate_pool.shutdown()
@@ -1788,6 +2518,17 @@ def _dissolve_polygons_pass(
                 start_time, nb_batches_done, nb_batches, "dissolve"
             )
 
+    for partial_path, dst_path in partials_to_append:
+        _append_partial(partial_path, dst_path)
+
+
+def _append_partial(partial_path: Path, dst_path: Path):
+    if partial_path.exists() and partial_path.stat().st_size > 0:
+        fileops._append_to_nolock(
+            src=partial_path, dst=dst_path, create_spatial_index=False
+        )
+        gfo.remove(partial_path)
+
 
 def _dissolve_polygons(
     input_path: Path,
@@ -2024,13 +2765,12 @@ def _dissolve_polygons(
         assert isinstance(diss_gdf, gpd.GeoDataFrame)
         # Use force_multitype, to avoid warnings when some batches contain
         # singletype and some contain multitype geometries
-        gfo.to_file(
+        _merge_util.write_partial(
             diss_gdf,
             output_notonborder_path,
             layer=output_layer,
             force_multitype=True,
             index=False,
-            create_spatial_index=False,
         )
     else:
         # If not, save the polygons on the border seperately
@@ -2043,25 +2783,23 @@ def _dissolve_polygons(
         if len(onborder_gdf) > 0:
             # Use force_multitype, to avoid warnings when some batches contain
             # singletype and some contain multitype geometries
-            gfo.to_file(
+            _merge_util.write_partial(
                 onborder_gdf,
                 output_onborder_path,
                 layer=output_layer,
                 force_multitype=True,
-                create_spatial_index=False,
             )
 
         notonborder_gdf = diss_gdf[~diss_gdf.index.isin(onborder_gdf.index)]
         if len(notonborder_gdf) > 0:
             # Use force_multitype, to avoid warnings when some batches contain
             # singletype and some contain multitype geometries
-            gfo.to_file(
+            _merge_util.write_partial(
                 notonborder_gdf,
                 output_notonborder_path,
                 layer=output_layer,
                 force_multitype=True,
                 index=False,
-                create_spatial_index=False,
             )
     perfinfo["time_to_file"] = (datetime.now() - start_to_file).total_seconds()
 
@@ -1,11 +1,12 @@
 """Module containing the implementation of Geofile operations using a sql statement."""
 
+import functools
 import json
 import logging
 import logging.config
 import math
-import multiprocessing
 import shutil
+import sqlite3
 import string
 import warnings
 from collections.abc import Iterable
@@ -30,7 +31,9 @@ from geofileops.util import (
     _general_util,
     _geofileinfo,
     _geoops_gpd,
+    _geoseries_util,
     _io_util,
+    _merge_util,
     _ogr_sql_util,
     _ogr_util,
     _processing_util,
@@ -40,6 +43,9 @@ from geofileops.util._geofileinfo import GeofileInfo
 
 logger = logging.getLogger(__name__)
 
+# Name the database with the batch assignments is attached with, if applicable
+BATCH_DATABASENAME = "batches"
+
 # -----------------------
 # Operations on one layer
 # -----------------------
@@ -60,6 +66,7 @@ def buffer(
     nb_parallel: int = -1,
     batchsize: int = -1,
     force: bool = False,
+    sort_output: bool = False,
 ):
     # Init + prepare sql template for this operation
     # ----------------------------------------------
@@ -107,6 +114,7 @@ def buffer(
         nb_parallel=nb_parallel,
         batchsize=batchsize,
         force=force,
+        sort_output=sort_output,
     )
 
 
@@ -123,6 +131,7 @@ def convexhull(
     nb_parallel: int = -1,
     batchsize: int = -1,
     force: bool = False,
+    sort_output: bool = False,
 ):
     # Init + prepare sql template for this operation
     # ----------------------------------------------
@@ -156,6 +165,7 @@ def convexhull(
         nb_parallel=nb_parallel,
         batchsize=batchsize,
         force=force,
+        sort_output=sort_output,
     )
 
 
@@ -169,6 +179,7 @@ def delete_duplicate_geometries(
     keep_empty_geoms: bool = False,
     where_post: Optional[str] = None,
     force: bool = False,
+    sort_output: bool = False,
 ):
     # The query as written doesn't give correct results when parallelized,
     # but it isn't useful to do it for this operation.
@@ -203,6 +214,7 @@ def delete_duplicate_geometries(
         nb_parallel=1,
         batchsize=-1,
         force=force,
+        sort_output=sort_output,
     )
 
 
@@ -217,6 +229,7 @@ def isvalid(
     nb_parallel: int = -1,
     batchsize: int = -1,
     force: bool = False,
+    sort_output: bool = False,
 ) -> bool:
     # Prepare sql template for this operation
     sql_template = """
@@ -247,6 +260,7 @@ def isvalid(
         nb_parallel=nb_parallel,
         batchsize=batchsize,
         force=force,
+        sort_output=sort_output,
     )
 
     # Check the number of invalid files
@@ -294,6 +308,7 @@ def makevalid(
     nb_parallel: int = -1,
     batchsize: int = -1,
     force: bool = False,
+    sort_output: bool = False,
 ):
     # If output file exists already, either clean up or return...
     operation_name = "makevalid"
@@ -367,6 +382,7 @@ def makevalid(
         nb_parallel=nb_parallel,
         batchsize=batchsize,
         force=force,
+        sort_output=sort_output,
     )
 
 
@@ -386,6 +402,7 @@ def select(
     batchsize: int = -1,
     force: bool = False,
     operation_prefix: str = "",
+    sort_output: bool = False,
 ):
     # Check if output exists already here, to avoid to much logging to be written
     logger = logging.getLogger(f"geofileops.{operation_prefix}select")
@@ -425,6 +442,7 @@ def select(
         nb_parallel=nb_parallel,
         batchsize=batchsize,
         force=force,
+        sort_output=sort_output,
     )
 
 
@@ -442,6 +460,7 @@ def simplify(
     nb_parallel: int = -1,
     batchsize: int = -1,
     force: bool = False,
+    sort_output: bool = False,
 ):
     # Init + prepare sql template for this operation
     # ----------------------------------------------
@@ -474,6 +493,7 @@ def simplify(
         nb_parallel=nb_parallel,
         batchsize=batchsize,
         force=force,
+        sort_output=sort_output,
     )
 
 
@@ -495,6 +515,7 @@ def _single_layer_vector_operation(
     nb_parallel: int,
     batchsize: int,
     force: bool,
+    sort_output: bool = False,
 ):
     """Execute a sql query template on the input layer.
 
@@ -518,6 +539,8 @@ def _single_layer_vector_operation(
         nb_parallel (int): _description_
         batchsize (int): _description_
         force (bool): _description_
+        sort_output (bool, optional): True to sort the rows of the output spatially.
+            Not applicable if the fids are preserved. Defaults to False.
 
     Raises:
         ValueError: _description_
@@ -837,6 +860,8 @@ def _single_layer_vector_operation(
         # Round up and clean up
         # Now create spatial index and move to output location
         if tmp_output_path.exists():
+            if sort_output and not preserve_fid:
+                tmp_output_path = _merge_util.sort_output(tmp_output_path, output_layer)
             if (
                 GeofileInfo(tmp_output_path).default_spatial_index
                 and gfo.get_layerinfo(
@@ -891,6 +916,7 @@ def clip(
     force: bool = False,
     input_columns_prefix: str = "",
     output_with_spatial_index: Optional[bool] = None,
+    sort_output: bool = False,
 ):
     # Init
     # In the query, important to only extract the geometry types that are expected
@@ -976,6 +1002,7 @@ def clip(
         nb_parallel=nb_parallel,
         batchsize=batchsize,
         force=force,
+        sort_output=sort_output,
     )
 
 
@@ -1000,6 +1027,7 @@ def difference(  # noqa: D417
     operation_prefix: str = "",
     input1_subdivided_path: Union[Path, None] = None,
     input2_subdivided_path: Union[Path, None] = None,
+    sort_output: bool = False,
 ):
     """Calculate the difference between two layers.
 
@@ -1057,7 +1085,10 @@ def difference(  # noqa: D417
         force_output_geometrytype = force_output_geometrytype.to_multitype
 
     # Subdivide the input layers speeds up further processing if they are complex.
-    tempdir = _io_util.create_tempdir(f"geofileops/{operation_name}")
+    tempdir = _io_util.create_tempdir(
+        f"geofileops/{operation_name}",
+        resume_key=_io_util.get_resume_key(input1_path, input2_path, output_path),
+    )
 
     if input1_subdivided_path is None:
         # input1_subdivided_path is None: try to subdivide.
@@ -1256,6 +1287,7 @@ def difference(  # noqa: D417
         force=force,
         output_with_spatial_index=output_with_spatial_index,
         tmp_dir=tempdir,
+        sort_output=sort_output,
     )
 
     # Print time taken
@@ -1398,7 +1430,10 @@ def _subdivide_layer(
         ),
     )
     if keep_fid:
-        sql_create_index = f'CREATE INDEX "IDX_{layer}_fid_1" ON "{layer}"(fid_1)'
+        # Remark: when resuming, the index can exist already
+        sql_create_index = (
+            f'CREATE INDEX IF NOT EXISTS "IDX_{layer}_fid_1" ON "{layer}"(fid_1)'
+        )
         fileops.execute_sql(output_path, sql_stmt=sql_create_index)
 
     return output_path
@@ -1421,6 +1456,7 @@ def export_by_location(
     batchsize: int = -1,
     subdivide_coords: int = 10000,
     force: bool = False,
+    sort_output: bool = False,
 ):
     # Because there might be extra preparation of the 2nd layer before going ahead
     # with the real calculation, do some additional init + checks here...
@@ -1450,7 +1486,12 @@ def export_by_location(
     ) = _prepare_filter_by_location_fields(spatial_relations_query)
 
     # Subdivide the 2nd layer if applicable to speed up further processing.
-    tmp_dir = _io_util.create_tempdir(f"geofileops/{operation_name}")
+    tmp_dir = _io_util.create_tempdir(
+        f"geofileops/{operation_name}",
+        resume_key=_io_util.get_resume_key(
+            input_path, input_to_compare_with_path, output_path
+        ),
+    )
     input_to_compare_with_subdivided_path = _subdivide_layer(
         path=input_to_compare_with_path,
         layer=input_to_compare_with_layer,
@@ -1622,6 +1663,7 @@ def export_by_location(
         batchsize=batchsize,
         force=force,
         tmp_dir=tmp_dir,
+        sort_output=sort_output,
     )
 
     # Print time taken
@@ -1642,6 +1684,7 @@ def export_by_distance(
     nb_parallel: int = -1,
     batchsize: int = -1,
     force: bool = False,
+    sort_output: bool = False,
 ):
     # Prepare sql template for this operation
     input1_layer_rtree = "rtree_{input1_layer}_{input1_geometrycolumn}"
@@ -1691,6 +1734,7 @@ def export_by_distance(
         nb_parallel=nb_parallel,
         batchsize=batchsize,
         force=force,
+        sort_output=sort_output,
     )
 
 
@@ -1717,6 +1761,7 @@ def intersection(  # noqa: D417
     operation_prefix: str = "",
     input1_subdivided_path: Optional[Path] = None,
     input2_subdivided_path: Optional[Path] = None,
+    sort_output: bool = False,
 ):
     """Calculate the intersection between two layers.
 
@@ -1777,7 +1822,10 @@ def intersection(  # noqa: D417
         force_output_geometrytype = primitivetype_to_extract.to_multitype
 
     # Subdivide input1 layer if needed to speed up further processing.
-    tempdir = _io_util.create_tempdir(f"geofileops/{operation_name}")
+    tempdir = _io_util.create_tempdir(
+        f"geofileops/{operation_name}",
+        resume_key=_io_util.get_resume_key(input1_path, input2_path, output_path),
+    )
 
     if input1_subdivided_path is None:
         # input1_subdivided_path is None: try to subdivide.
@@ -1972,6 +2020,7 @@ def intersection(  # noqa: D417
         input1_subdivided_path=input1_subdivided_path,
         input2_subdivided_path=input2_subdivided_path,
         output_with_spatial_index=output_with_spatial_index,
+        sort_output=sort_output,
     )
 
     # Print time taken
@@ -1999,6 +2048,7 @@ def join_by_location(
     nb_parallel: int = -1,
     batchsize: int = -1,
     force: bool = False,
+    sort_output: bool = False,
 ):
     # Prepare sql template for this operation
     # Prepare intersection area columns/filter
@@ -2118,6 +2168,7 @@ def join_by_location(
         nb_parallel=nb_parallel,
         batchsize=batchsize,
         force=force,
+        sort_output=sort_output,
     )
 
 
@@ -2286,6 +2337,7 @@ def join_nearest(
     nb_parallel: int = -1,
     batchsize: int = -1,
     force: bool = False,
+    sort_output: bool = False,
 ):
     # Init some things...
     # Because there is preprocessing done in this function, check output path
@@ -2401,6 +2453,7 @@ def join_nearest(
         batchsize=batchsize,
         force=force,
         use_ogr=True,
+        sort_output=sort_output,
     )
 
 
@@ -2425,6 +2478,7 @@ def select_two_layers(
     force: bool = False,
     operation_prefix: str = "",
     output_with_spatial_index: Optional[bool] = None,
+    sort_output: bool = False,
 ):
     # Go!
     return _two_layer_vector_operation(
@@ -2448,6 +2502,7 @@ def select_two_layers(
         batchsize=batchsize,
         force=force,
         output_with_spatial_index=output_with_spatial_index,
+        sort_output=sort_output,
     )
 
 
@@ -2470,6 +2525,7 @@ def identity(
     batchsize: int = -1,
     subdivide_coords: int = 2000,
     force: bool = False,
+    sort_output: bool = False,
 ):
     # An identity is the combination of the results of an "intersection" of input1 and
     # input2 and an difference of input2 with input1.
@@ -2494,104 +2550,137 @@ def identity(
     if _io_util.output_exists(path=output_path, remove_if_exists=force):
         return
 
-    tempdir = _io_util.create_tempdir("geofileops/identity")
+    tempdir = _io_util.create_tempdir(
+        "geofileops/identity",
+        resume_key=_io_util.get_resume_key(input1_path, input2_path, output_path),
+    )
+    keep_tmp_dir = False
     try:
-        # Prepare the input files
-        logger.info("Step 1 of 4: prepare input files")
-        input1_subdivided_path = _subdivide_layer(
-            path=input1_path,
-            layer=input1_layer,
-            output_path=tempdir / "subdivided/input1_layer.gpkg",
-            subdivide_coords=subdivide_coords,
-            nb_parallel=nb_parallel,
-            batchsize=batchsize,
-            operation_prefix="identity/",
-        )
-        if input1_subdivided_path is None:
-            # Hardcoded optimization: root means that no subdivide was needed
-            input1_subdivided_path = Path("/")
-
-        if overlay_self:
-            # If overlay_self is True, input1 and input2 are the same
-            input2_subdivided_path: Optional[Path] = input1_subdivided_path
-        else:
-            input2_subdivided_path = _subdivide_layer(
-                path=input2_path,
-                layer=input2_layer,
-                output_path=tempdir / "subdivided/input2_layer.gpkg",
+        # All steps share the same worker processes, so the batches of the steps that
+        # can run concurrently are calculated interleaved.
+        with _processing_util.worker_pool(nb_parallel, reuse_active=True):
+            # Prepare the input files
+            logger.info("Step 1 of 3: prepare input files")
+            input1_path, input1_layer, input2_path, input2_layer = (
+                _convert_to_spatialite_based(  # type: ignore[assignment]
+                    input1_path=input1_path,
+                    input1_layer=input1_layer,
+                    tempdir=tempdir,
+                    input2_path=input2_path,
+                    input2_layer=input2_layer,
+                )
+            )
+            input1_subdivided_path = _subdivide_layer(
+                path=input1_path,
+                layer=input1_layer,
+                output_path=tempdir / "subdivided/input1_layer.gpkg",
                 subdivide_coords=subdivide_coords,
                 nb_parallel=nb_parallel,
                 batchsize=batchsize,
                 operation_prefix="identity/",
             )
-            if input2_subdivided_path is None:
+            if input1_subdivided_path is None:
                 # Hardcoded optimization: root means that no subdivide was needed
-                input2_subdivided_path = Path("/")
+                input1_subdivided_path = Path("/")
 
-        # Calculate intersection of input1 with input2 to a temporary output file
-        logger.info("Step 2 of 4: intersection")
-        intersection_output_path = tempdir / "intersection_output.gpkg"
-        intersection(
-            input1_path=input1_path,
-            input2_path=input2_path,
-            output_path=intersection_output_path,
-            overlay_self=overlay_self,
-            input1_layer=input1_layer,
-            input1_columns=input1_columns,
-            input1_columns_prefix=input1_columns_prefix,
-            input2_layer=input2_layer,
-            input2_columns=input2_columns,
-            input2_columns_prefix=input2_columns_prefix,
-            output_layer=output_layer,
-            explodecollections=explodecollections,
-            gridsize=gridsize,
-            where_post=where_post,
-            nb_parallel=nb_parallel,
-            batchsize=batchsize,
-            force=force,
-            output_with_spatial_index=False,
-            operation_prefix="identity/",
-            input1_subdivided_path=input1_subdivided_path,
-            input2_subdivided_path=input2_subdivided_path,
-        )
+            if overlay_self:
+                # If overlay_self is True, input1 and input2 are the same
+                input2_subdivided_path: Optional[Path] = input1_subdivided_path
+            else:
+                input2_subdivided_path = _subdivide_layer(
+                    path=input2_path,
+                    layer=input2_layer,
+                    output_path=tempdir / "subdivided/input2_layer.gpkg",
+                    subdivide_coords=subdivide_coords,
+                    nb_parallel=nb_parallel,
+                    batchsize=batchsize,
+                    operation_prefix="identity/",
+                )
+                if input2_subdivided_path is None:
+                    # Hardcoded optimization: root means that no subdivide was needed
+                    input2_subdivided_path = Path("/")
+
+            # The intersection of input1 with input2 and the difference of input2
+            # from input1 are independent, so they are calculated concurrently.
+            logger.info("Step 2 of 3: intersection and difference")
+            intersection_output_path = tempdir / "intersection_output.gpkg"
+            difference_output_path = tempdir / "difference_output.gpkg"
+
+            def calculate_intersection():
+                intersection(
+                    input1_path=input1_path,
+                    input2_path=input2_path,
+                    output_path=intersection_output_path,
+                    overlay_self=overlay_self,
+                    input1_layer=input1_layer,
+                    input1_columns=input1_columns,
+                    input1_columns_prefix=input1_columns_prefix,
+                    input2_layer=input2_layer,
+                    input2_columns=input2_columns,
+                    input2_columns_prefix=input2_columns_prefix,
+                    output_layer=output_layer,
+                    explodecollections=explodecollections,
+                    gridsize=gridsize,
+                    where_post=where_post,
+                    nb_parallel=nb_parallel,
+                    batchsize=batchsize,
+                    force=force,
+                    output_with_spatial_index=False,
+                    operation_prefix="identity/",
+                    input1_subdivided_path=input1_subdivided_path,
+                    input2_subdivided_path=input2_subdivided_path,
+                )
 
-        # Now difference input1 from input2 to another temporary output gfo...
-        logger.info("Step 3 of 4: difference")
-        difference_output_path = tempdir / "difference_output.gpkg"
-        difference(
-            input1_path=input1_path,
-            input2_path=input2_path,
-            output_path=difference_output_path,
-            overlay_self=overlay_self,
-            input1_layer=input1_layer,
-            input1_columns=input1_columns,
-            input_columns_prefix=input1_columns_prefix,
-            input2_layer=input2_layer,
-            output_layer=output_layer,
-            explodecollections=explodecollections,
-            gridsize=gridsize,
-            where_post=where_post,
-            nb_parallel=nb_parallel,
-            batchsize=batchsize,
-            subdivide_coords=subdivide_coords,
-            force=force,
-            output_with_spatial_index=False,
-            operation_prefix="identity/",
-            input1_subdivided_path=input1_subdivided_path,
-            input2_subdivided_path=input2_subdivided_path,
-        )
+            def calculate_difference():
+                difference(
+                    input1_path=input1_path,
+                    input2_path=input2_path,
+                    output_path=difference_output_path,
+                    overlay_self=overlay_self,
+                    input1_layer=input1_layer,
+                    input1_columns=input1_columns,
+                    input_columns_prefix=input1_columns_prefix,
+                    input2_layer=input2_layer,
+                    output_layer=output_layer,
+                    explodecollections=explodecollections,
+                    gridsize=gridsize,
+                    where_post=where_post,
+                    nb_parallel=nb_parallel,
+                    batchsize=batchsize,
+                    subdivide_coords=subdivide_coords,
+                    force=force,
+                    output_with_spatial_index=False,
+                    operation_prefix="identity/",
+                    input1_subdivided_path=input1_subdivided_path,
+                    input2_subdivided_path=input2_subdivided_path,
+                )
 
-        # Now append
-        logger.info("Step 4 of 4: finalize")
-        # Note: append will never create an index on an already existing layer.
-        _append_to_nolock(
-            src=difference_output_path,
-            dst=intersection_output_path,
-            src_layer=output_layer,
-            dst_layer=output_layer,
-        )
+            def append_difference():
+                # Note: append will never create an index on an already existing layer.
+                _append_to_nolock(
+                    src=difference_output_path,
+                    dst=intersection_output_path,
+                    src_layer=output_layer,
+                    dst_layer=output_layer,
+                )
+
+            _processing_util.run_dag(
+                {
+                    "intersection": (calculate_intersection, []),
+                    "difference": (calculate_difference, []),
+                    "append_difference": (
+                        append_difference,
+                        ["intersection", "difference"],
+                    ),
+                }
+            )
 
         # Convert or add spatial index
+        logger.info("Step 3 of 3: finalize")
+        if sort_output:
+            intersection_output_path = _merge_util.sort_output(
+                intersection_output_path, output_layer
+            )
         tmp_output_path = intersection_output_path
         if intersection_output_path.suffix != output_path.suffix:
             # Output file should be in different format, so convert
@@ -2603,8 +2692,12 @@ def identity(
         # Now we are ready to move the result to the final spot...
         gfo.move(tmp_output_path, output_path)
 
+    except Exception:
+        # Keep the intermediate results so the operation can be resumed
+        keep_tmp_dir = ConfigOptions.resume
+        raise
     finally:
-        if ConfigOptions.remove_temp_files:
+        if ConfigOptions.remove_temp_files and not keep_tmp_dir:
             shutil.rmtree(tempdir, ignore_errors=True)
 
     logger.info(f"Ready, full identity took {datetime.now()-start_time}")
@@ -2629,6 +2722,7 @@ def symmetric_difference(
     batchsize: int = -1,
     subdivide_coords: int = 2000,
     force: bool = False,
+    sort_output: bool = False,
 ):
     # A symmetric difference can be simulated by doing an difference of input1
     # and input2 and then append the result of an difference of input2 with
@@ -2658,113 +2752,144 @@ def symmetric_difference(
     if _io_util.output_exists(path=output_path, remove_if_exists=force):
         return
 
-    tempdir = _io_util.create_tempdir("geofileops/symmdiff")
+    tempdir = _io_util.create_tempdir(
+        "geofileops/symmdiff",
+        resume_key=_io_util.get_resume_key(input1_path, input2_path, output_path),
+    )
+    keep_tmp_dir = False
     try:
-        # Prepare the input files
-        logger.info("Step 1 of 4: prepare input files")
-        input1_subdivided_path = _subdivide_layer(
-            path=input1_path,
-            layer=input1_layer,
-            output_path=tempdir / "subdivided/input1_layer.gpkg",
-            subdivide_coords=subdivide_coords,
-            nb_parallel=nb_parallel,
-            batchsize=batchsize,
-            operation_prefix="symmetric_difference/",
-        )
-        if input1_subdivided_path is None:
-            # Hardcoded optimization: root means that no subdivide was needed
-            input1_subdivided_path = Path("/")
-
-        if overlay_self:
-            # With overlay_self, input2 is the same as input1
-            input2_subdivided_path: Optional[Path] = input1_subdivided_path
-        else:
-            input2_subdivided_path = _subdivide_layer(
-                path=input2_path,
-                layer=input2_layer,
-                output_path=tempdir / "subdivided/input2_layer.gpkg",
+        # All steps share the same worker processes, so the batches of the steps that
+        # can run concurrently are calculated interleaved.
+        with _processing_util.worker_pool(nb_parallel, reuse_active=True):
+            # Prepare the input files
+            logger.info("Step 1 of 3: prepare input files")
+            input1_path, input1_layer, input2_path, input2_layer = (
+                _convert_to_spatialite_based(  # type: ignore[assignment]
+                    input1_path=input1_path,
+                    input1_layer=input1_layer,
+                    tempdir=tempdir,
+                    input2_path=input2_path,
+                    input2_layer=input2_layer,
+                )
+            )
+            input1_subdivided_path = _subdivide_layer(
+                path=input1_path,
+                layer=input1_layer,
+                output_path=tempdir / "subdivided/input1_layer.gpkg",
                 subdivide_coords=subdivide_coords,
                 nb_parallel=nb_parallel,
                 batchsize=batchsize,
                 operation_prefix="symmetric_difference/",
             )
-            if input2_subdivided_path is None:
+            if input1_subdivided_path is None:
                 # Hardcoded optimization: root means that no subdivide was needed
-                input2_subdivided_path = Path("/")
+                input1_subdivided_path = Path("/")
 
-        # Difference input2 from input1 to a temporary output file
-        logger.info("Step 2 of 4: difference 1")
-        diff1_output_path = tempdir / "layer1_diff_layer2_output.gpkg"
-        difference(
-            input1_path=input1_path,
-            input2_path=input2_path,
-            output_path=diff1_output_path,
-            overlay_self=overlay_self,
-            input1_layer=input1_layer,
-            input1_columns=input1_columns,
-            input_columns_prefix=input1_columns_prefix,
-            input2_layer=input2_layer,
-            output_layer=output_layer,
-            explodecollections=explodecollections,
-            gridsize=gridsize,
-            where_post=where_post,
-            nb_parallel=nb_parallel,
-            batchsize=batchsize,
-            subdivide_coords=subdivide_coords,
-            force=force,
-            output_with_spatial_index=False,
-            operation_prefix="symmetric_difference/",
-            input1_subdivided_path=input1_subdivided_path,
-            input2_subdivided_path=input2_subdivided_path,
-        )
+            if overlay_self:
+                # With overlay_self, input2 is the same as input1
+                input2_subdivided_path: Optional[Path] = input1_subdivided_path
+            else:
+                input2_subdivided_path = _subdivide_layer(
+                    path=input2_path,
+                    layer=input2_layer,
+                    output_path=tempdir / "subdivided/input2_layer.gpkg",
+                    subdivide_coords=subdivide_coords,
+                    nb_parallel=nb_parallel,
+                    batchsize=batchsize,
+                    operation_prefix="symmetric_difference/",
+                )
+                if input2_subdivided_path is None:
+                    # Hardcoded optimization: root means that no subdivide was needed
+                    input2_subdivided_path = Path("/")
+
+            # Both differences are independent, so they are calculated concurrently.
+            logger.info("Step 2 of 3: differences")
+            diff1_output_path = tempdir / "layer1_diff_layer2_output.gpkg"
+            diff2_output_path = tempdir / "layer2_diff_layer1_output.gpkg"
+
+            def calculate_diff1():
+                # Difference input2 from input1
+                difference(
+                    input1_path=input1_path,
+                    input2_path=input2_path,
+                    output_path=diff1_output_path,
+                    overlay_self=overlay_self,
+                    input1_layer=input1_layer,
+                    input1_columns=input1_columns,
+                    input_columns_prefix=input1_columns_prefix,
+                    input2_layer=input2_layer,
+                    output_layer=output_layer,
+                    explodecollections=explodecollections,
+                    gridsize=gridsize,
+                    where_post=where_post,
+                    nb_parallel=nb_parallel,
+                    batchsize=batchsize,
+                    subdivide_coords=subdivide_coords,
+                    force=force,
+                    output_with_spatial_index=False,
+                    operation_prefix="symmetric_difference/",
+                    input1_subdivided_path=input1_subdivided_path,
+                    input2_subdivided_path=input2_subdivided_path,
+                )
 
-        if input2_columns is None or len(input2_columns) > 0:
-            input2_info = gfo.get_layerinfo(input2_path)
-            columns_to_add = (
-                input2_columns if input2_columns is not None else input2_info.columns
-            )
-            for column in columns_to_add:
-                gfo.add_column(
-                    diff1_output_path,
-                    name=f"{input2_columns_prefix}{column}",
-                    type=input2_info.columns[column].gdal_type,
+                if input2_columns is None or len(input2_columns) > 0:
+                    input2_info = gfo.get_layerinfo(input2_path, input2_layer)
+                    columns_to_add = (
+                        input2_columns
+                        if input2_columns is not None
+                        else input2_info.columns
+                    )
+                    for column in columns_to_add:
+                        gfo.add_column(
+                            diff1_output_path,
+                            name=f"{input2_columns_prefix}{column}",
+                            type=input2_info.columns[column].gdal_type,
+                        )
+
+            def calculate_diff2():
+                # Difference input1 from input2
+                difference(
+                    input1_path=input2_path,
+                    input2_path=input1_path,
+                    output_path=diff2_output_path,
+                    overlay_self=overlay_self,
+                    input1_layer=input2_layer,
+                    input1_columns=input2_columns,
+                    input_columns_prefix=input2_columns_prefix,
+                    input2_layer=input1_layer,
+                    output_layer=output_layer,
+                    explodecollections=explodecollections,
+                    gridsize=gridsize,
+                    where_post=where_post,
+                    nb_parallel=nb_parallel,
+                    batchsize=batchsize,
+                    subdivide_coords=subdivide_coords,
+                    force=force,
+                    output_with_spatial_index=False,
+                    operation_prefix="symmetric_difference/",
                 )
 
-        # Now difference input1 from input2 to another temporary output file
-        logger.info("Step 3 of 4: difference 2")
-        diff2_output_path = tempdir / "layer2_diff_layer1_output.gpkg"
-        difference(
-            input1_path=input2_path,
-            input2_path=input1_path,
-            output_path=diff2_output_path,
-            overlay_self=overlay_self,
-            input1_layer=input2_layer,
-            input1_columns=input2_columns,
-            input_columns_prefix=input2_columns_prefix,
-            input2_layer=input1_layer,
-            output_layer=output_layer,
-            explodecollections=explodecollections,
-            gridsize=gridsize,
-            where_post=where_post,
-            nb_parallel=nb_parallel,
-            batchsize=batchsize,
-            subdivide_coords=subdivide_coords,
-            force=force,
-            output_with_spatial_index=False,
-            operation_prefix="symmetric_difference/",
-        )
+            def append_diff2():
+                # Note: append will never create an index on an already existing layer.
+                _append_to_nolock(
+                    src=diff2_output_path,
+                    dst=diff1_output_path,
+                    src_layer=output_layer,
+                    dst_layer=output_layer,
+                )
 
-        # Now append
-        logger.info("Step 4 of 4: finalize")
-        # Note: append will never create an index on an already existing layer.
-        _append_to_nolock(
-            src=diff2_output_path,
-            dst=diff1_output_path,
-            src_layer=output_layer,
-            dst_layer=output_layer,
-        )
+            _processing_util.run_dag(
+                {
+                    "diff1": (calculate_diff1, []),
+                    "diff2": (calculate_diff2, []),
+                    "append_diff2": (append_diff2, ["diff1", "diff2"]),
+                }
+            )
 
         # Convert or add spatial index
+        logger.info("Step 3 of 3: finalize")
+        if sort_output:
+            diff1_output_path = _merge_util.sort_output(diff1_output_path, output_layer)
         tmp_output_path = diff1_output_path
         if diff1_output_path.suffix != output_path.suffix:
             # Output file should be in diffent format, so convert
@@ -2776,8 +2901,12 @@ def symmetric_difference(
         # Now we are ready to move the result to the final spot...
         gfo.move(tmp_output_path, output_path)
 
+    except Exception:
+        # Keep the intermediate results so the operation can be resumed
+        keep_tmp_dir = ConfigOptions.resume
+        raise
     finally:
-        if ConfigOptions.remove_temp_files:
+        if ConfigOptions.remove_temp_files and not keep_tmp_dir:
             shutil.rmtree(tempdir, ignore_errors=True)
 
     logger.info(f"Ready, full symmetric_difference took {datetime.now()-start_time}")
@@ -2802,6 +2931,7 @@ def union(
     batchsize: int = -1,
     subdivide_coords: int = 2000,
     force: bool = False,
+    sort_output: bool = False,
 ):
     # A union is the combination of the results of an intersection of input1 and input2,
     # the result of an difference of input2 with input1 and the difference of input1
@@ -2828,138 +2958,172 @@ def union(
         return
 
     start_time = datetime.now()
-    tempdir = _io_util.create_tempdir("geofileops/union")
+    tempdir = _io_util.create_tempdir(
+        "geofileops/union",
+        resume_key=_io_util.get_resume_key(input1_path, input2_path, output_path),
+    )
+    keep_tmp_dir = False
     try:
-        # Prepare the input files
-        logger.info("Step 1 of 5: prepare input files")
-        input1_subdivided_path = _subdivide_layer(
-            path=input1_path,
-            layer=input1_layer,
-            output_path=tempdir / "subdivided/input1_layer.gpkg",
-            subdivide_coords=subdivide_coords,
-            nb_parallel=nb_parallel,
-            batchsize=batchsize,
-            operation_prefix="union/",
-        )
-        if input1_subdivided_path is None:
-            # Hardcoded optimization: root means that no subdivide was needed
-            input1_subdivided_path = Path("/")
-
-        if overlay_self:
-            # With overlay_self, input2 is the same as input1
-            input2_subdivided_path: Optional[Path] = input1_subdivided_path
-        else:
-            input2_subdivided_path = _subdivide_layer(
-                path=input2_path,
-                layer=input2_layer,
-                output_path=tempdir / "subdivided/input2_layer.gpkg",
+        # All steps share the same worker processes, so the batches of the steps that
+        # can run concurrently are calculated interleaved.
+        with _processing_util.worker_pool(nb_parallel, reuse_active=True):
+            # Prepare the input files
+            logger.info("Step 1 of 3: prepare input files")
+            input1_path, input1_layer, input2_path, input2_layer = (
+                _convert_to_spatialite_based(  # type: ignore[assignment]
+                    input1_path=input1_path,
+                    input1_layer=input1_layer,
+                    tempdir=tempdir,
+                    input2_path=input2_path,
+                    input2_layer=input2_layer,
+                )
+            )
+            input1_subdivided_path = _subdivide_layer(
+                path=input1_path,
+                layer=input1_layer,
+                output_path=tempdir / "subdivided/input1_layer.gpkg",
                 subdivide_coords=subdivide_coords,
                 nb_parallel=nb_parallel,
                 batchsize=batchsize,
                 operation_prefix="union/",
             )
-            if input2_subdivided_path is None:
+            if input1_subdivided_path is None:
                 # Hardcoded optimization: root means that no subdivide was needed
-                input2_subdivided_path = Path("/")
+                input1_subdivided_path = Path("/")
 
-        # First apply intersection of input1 with input2 to a temporary output file...
-        logger.info("Step 2 of 5: intersection")
-        intersection_output_path = tempdir / "intersection_output.gpkg"
-        intersection(
-            input1_path=input1_path,
-            input2_path=input2_path,
-            output_path=intersection_output_path,
-            overlay_self=overlay_self,
-            input1_layer=input1_layer,
-            input1_columns=input1_columns,
-            input1_columns_prefix=input1_columns_prefix,
-            input2_layer=input2_layer,
-            input2_columns=input2_columns,
-            input2_columns_prefix=input2_columns_prefix,
-            output_layer=output_layer,
-            explodecollections=explodecollections,
-            gridsize=gridsize,
-            where_post=where_post,
-            nb_parallel=nb_parallel,
-            batchsize=batchsize,
-            force=force,
-            output_with_spatial_index=False,
-            operation_prefix="union/",
-            input1_subdivided_path=input1_subdivided_path,
-            input2_subdivided_path=input2_subdivided_path,
-        )
+            if overlay_self:
+                # With overlay_self, input2 is the same as input1
+                input2_subdivided_path: Optional[Path] = input1_subdivided_path
+            else:
+                input2_subdivided_path = _subdivide_layer(
+                    path=input2_path,
+                    layer=input2_layer,
+                    output_path=tempdir / "subdivided/input2_layer.gpkg",
+                    subdivide_coords=subdivide_coords,
+                    nb_parallel=nb_parallel,
+                    batchsize=batchsize,
+                    operation_prefix="union/",
+                )
+                if input2_subdivided_path is None:
+                    # Hardcoded optimization: root means that no subdivide was needed
+                    input2_subdivided_path = Path("/")
+
+            # The intersection of input1 with input2, the difference of input1 from
+            # input2 and the difference of input2 from input1 are independent, so
+            # they are calculated concurrently. The differences are appended to the
+            # intersection output once both are ready.
+            logger.info("Step 2 of 3: intersection and differences")
+            intersection_output_path = tempdir / "intersection_output.gpkg"
+            diff1_output_path = tempdir / "diff_input1_from_input2_output.gpkg"
+            diff2_output_path = tempdir / "diff_input2_from_input1_output.gpkg"
+
+            def calculate_intersection():
+                intersection(
+                    input1_path=input1_path,
+                    input2_path=input2_path,
+                    output_path=intersection_output_path,
+                    overlay_self=overlay_self,
+                    input1_layer=input1_layer,
+                    input1_columns=input1_columns,
+                    input1_columns_prefix=input1_columns_prefix,
+                    input2_layer=input2_layer,
+                    input2_columns=input2_columns,
+                    input2_columns_prefix=input2_columns_prefix,
+                    output_layer=output_layer,
+                    explodecollections=explodecollections,
+                    gridsize=gridsize,
+                    where_post=where_post,
+                    nb_parallel=nb_parallel,
+                    batchsize=batchsize,
+                    force=force,
+                    output_with_spatial_index=False,
+                    operation_prefix="union/",
+                    input1_subdivided_path=input1_subdivided_path,
+                    input2_subdivided_path=input2_subdivided_path,
+                )
 
-        # Difference input1 from input2 to another temporary output gfo.
-        logger.info("Step 3 of 5: difference of input 1 from input 2")
-        diff1_output_path = tempdir / "diff_input1_from_input2_output.gpkg"
-        difference(
-            input1_path=input2_path,
-            input2_path=input1_path,
-            output_path=diff1_output_path,
-            overlay_self=overlay_self,
-            input1_layer=input2_layer,
-            input1_columns=input2_columns,
-            input_columns_prefix=input2_columns_prefix,
-            input2_layer=input1_layer,
-            output_layer=output_layer,
-            explodecollections=explodecollections,
-            gridsize=gridsize,
-            where_post=where_post,
-            nb_parallel=nb_parallel,
-            batchsize=batchsize,
-            subdivide_coords=subdivide_coords,
-            force=force,
-            output_with_spatial_index=False,
-            operation_prefix="union/",
-            input1_subdivided_path=input2_subdivided_path,
-            input2_subdivided_path=input1_subdivided_path,
-        )
-        # Note: append will never create an index on an already existing layer.
-        _append_to_nolock(
-            src=diff1_output_path,
-            dst=intersection_output_path,
-            src_layer=output_layer,
-            dst_layer=output_layer,
-        )
-        gfo.remove(diff1_output_path)
+            def calculate_diff1():
+                # Difference input1 from input2
+                difference(
+                    input1_path=input2_path,
+                    input2_path=input1_path,
+                    output_path=diff1_output_path,
+                    overlay_self=overlay_self,
+                    input1_layer=input2_layer,
+                    input1_columns=input2_columns,
+                    input_columns_prefix=input2_columns_prefix,
+                    input2_layer=input1_layer,
+                    output_layer=output_layer,
+                    explodecollections=explodecollections,
+                    gridsize=gridsize,
+                    where_post=where_post,
+                    nb_parallel=nb_parallel,
+                    batchsize=batchsize,
+                    subdivide_coords=subdivide_coords,
+                    force=force,
+                    output_with_spatial_index=False,
+                    operation_prefix="union/",
+                    input1_subdivided_path=input2_subdivided_path,
+                    input2_subdivided_path=input1_subdivided_path,
+                )
 
-        # Difference input1 from input2 to and add to temporary output file.
-        logger.info("Step 4 of 5: difference input 2 from input 1")
-        diff2_output_path = tempdir / "diff_input2_from_input1_output.gpkg"
+            def calculate_diff2():
+                # Difference input2 from input1
+                difference(
+                    input1_path=input1_path,
+                    input2_path=input2_path,
+                    output_path=diff2_output_path,
+                    overlay_self=overlay_self,
+                    input1_layer=input1_layer,
+                    input1_columns=input1_columns,
+                    input_columns_prefix=input1_columns_prefix,
+                    input2_layer=input2_layer,
+                    output_layer=output_layer,
+                    explodecollections=explodecollections,
+                    gridsize=gridsize,
+                    where_post=where_post,
+                    nb_parallel=nb_parallel,
+                    batchsize=batchsize,
+                    subdivide_coords=subdivide_coords,
+                    force=force,
+                    output_with_spatial_index=False,
+                    operation_prefix="union/",
+                    input1_subdivided_path=input1_subdivided_path,
+                    input2_subdivided_path=input2_subdivided_path,
+                )
 
-        difference(
-            input1_path=input1_path,
-            input2_path=input2_path,
-            output_path=diff2_output_path,
-            overlay_self=overlay_self,
-            input1_layer=input1_layer,
-            input1_columns=input1_columns,
-            input_columns_prefix=input1_columns_prefix,
-            input2_layer=input2_layer,
-            output_layer=output_layer,
-            explodecollections=explodecollections,
-            gridsize=gridsize,
-            where_post=where_post,
-            nb_parallel=nb_parallel,
-            batchsize=batchsize,
-            subdivide_coords=subdivide_coords,
-            force=force,
-            output_with_spatial_index=False,
-            operation_prefix="union/",
-            input1_subdivided_path=input1_subdivided_path,
-            input2_subdivided_path=input2_subdivided_path,
-        )
-        _append_to_nolock(
-            src=diff2_output_path,
-            dst=intersection_output_path,
-            src_layer=output_layer,
-            dst_layer=output_layer,
-        )
-        gfo.remove(diff2_output_path)
+            def append_to_intersection(src: Path):
+                # Note: append will never create an index on an already existing layer.
+                _append_to_nolock(
+                    src=src,
+                    dst=intersection_output_path,
+                    src_layer=output_layer,
+                    dst_layer=output_layer,
+                )
+                gfo.remove(src)
+
+            _processing_util.run_dag(
+                {
+                    "intersection": (calculate_intersection, []),
+                    "diff1": (calculate_diff1, []),
+                    "diff2": (calculate_diff2, []),
+                    "append_diff1": (
+                        lambda: append_to_intersection(diff1_output_path),
+                        ["intersection", "diff1"],
+                    ),
+                    "append_diff2": (
+                        lambda: append_to_intersection(diff2_output_path),
+                        ["append_diff1", "diff2"],
+                    ),
+                }
+            )
 
         # Convert or add spatial index
-        logger.info("Step 5 of 5: finalize")
-
+        logger.info("Step 3 of 3: finalize")
+        if sort_output:
+            intersection_output_path = _merge_util.sort_output(
+                intersection_output_path, output_layer
+            )
         tmp_output_path = intersection_output_path
         if intersection_output_path.suffix != output_path.suffix:
             # Output file should be in different format, so convert
@@ -2971,8 +3135,12 @@ def union(
         # Now we are ready to move the result to the final spot...
         gfo.move(tmp_output_path, output_path)
 
+    except Exception:
+        # Keep the intermediate results so the operation can be resumed
+        keep_tmp_dir = ConfigOptions.resume
+        raise
     finally:
-        if ConfigOptions.remove_temp_files:
+        if ConfigOptions.remove_temp_files and not keep_tmp_dir:
             shutil.rmtree(tempdir, ignore_errors=True)
 
     logger.info(f"Ready, full union took {datetime.now()-start_time}")
@@ -3003,6 +3171,7 @@ def _two_layer_vector_operation(
     use_ogr: bool = False,
     output_with_spatial_index: Optional[bool] = None,
     tmp_dir: Optional[Path] = None,
+    sort_output: bool = False,
 ):
     """Executes an operation that needs 2 input files.
 
@@ -3053,6 +3222,8 @@ def _two_layer_vector_operation(
         tmp_dir (Path, optional): If None, a new temp dir will be created. if not None,
             the temp dir specified will be used. In both cases the tmp_dir will be
             removed after the operation if ConfigOptions.remove_temp_files is not False!
+        sort_output (bool, optional): True to sort the rows of the output spatially.
+            Defaults to False.
 
     Raises:
         ValueError: [description]
@@ -3097,7 +3268,10 @@ def _two_layer_vector_operation(
     # Init layer info
     start_time = datetime.now()
     if tmp_dir is None:
-        tmp_dir = _io_util.create_tempdir(f"geofileops/{operation_name}")
+        tmp_dir = _io_util.create_tempdir(
+            f"geofileops/{operation_name}",
+            resume_key=_io_util.get_resume_key(input1_path, input2_path, output_path),
+        )
 
     # Check if crs are the same in the input layers + use it (if there is one)
     output_crs = _check_crs(input1_path, input1_layer, input2_path, input2_layer)
@@ -3107,10 +3281,19 @@ def _two_layer_vector_operation(
     tmp_output_path.parent.mkdir(exist_ok=True, parents=True)
     gfo.remove(tmp_output_path, missing_ok=True)
 
+    # The input files can be converted to temp files, so determine the key of the
+    # input files to resume based on the original ones.
+    resume_inputs = {
+        "inputs": _io_util.get_resume_key(input1_path, input2_path),
+        "layers": [input1_layer, input2_layer],
+    }
+
+    keep_tmp_dir = False
     try:
         # Prepare tmp files/batches
         # -------------------------
         logger.debug(f"Prepare input (params), tempdir: {tmp_dir}")
+        orig_input_paths = (input1_path, input2_path)
         input1_path, input1_layer, input2_path, input2_layer = (
             _convert_to_spatialite_based(  # type: ignore[assignment]
                 input1_path=input1_path,
@@ -3142,6 +3325,8 @@ def _two_layer_vector_operation(
             tempdir=tmp_dir,
             nb_parallel=nb_parallel,
             batchsize=batchsize,
+            # use_ogr only supports one input database, so no batch database either
+            batch_order="rowid" if use_ogr else ConfigOptions.batch_order,
         )
         if processing_params is None or processing_params.batches is None:
             return
@@ -3226,6 +3411,27 @@ def _two_layer_vector_operation(
             },
             use_ogr=use_ogr,
         )
+        if processing_params.batch_db_path is not None:
+            # The batch filters refer to the database with the batch assignments
+            input_db_names[BATCH_DATABASENAME] = processing_params.batch_db_path
+
+        # The converted copies of the input files, the subdivided files and the batch
+        # database are created by geofileops and don't change anymore, so they can be
+        # attached immutable. The input files of the user can't.
+        created_paths = [
+            path
+            for path in (
+                input1_path,
+                input2_path,
+                input1_subdivided_path,
+                input2_subdivided_path,
+                processing_params.batch_db_path,
+            )
+            if path is not None and path not in orig_input_paths
+        ]
+        immutable_databases = [
+            dbname for dbname, path in input_db_names.items() if path in created_paths
+        ]
 
         # Fill out sql_template as much as possible already
         # -------------------------------------------------
@@ -3258,7 +3464,9 @@ def _two_layer_vector_operation(
         )
 
         column_datatypes = _sqlite_util.get_columns(
-            sql_stmt=sql_stmt, input_databases=input_db_names
+            sql_stmt=sql_stmt,
+            input_databases=input_db_names,
+            immutable_databases=immutable_databases,
         )
 
         # Apply gridsize if it is specified
@@ -3319,6 +3527,27 @@ def _two_layer_vector_operation(
             # where_post has been applied already so set to None.
             where_post = None
 
+        # If resuming is enabled, keep track of the batches completed
+        manifest = None
+        if ConfigOptions.resume:
+            manifest = _processing_util.ResumeManifest(
+                tmp_dir / "resume_manifest.json",
+                fingerprint={
+                    "sql_template": sql_template,
+                    "batches": {
+                        batch_id: batch["batch_filter"]
+                        for batch_id, batch in processing_params.batches.items()
+                    },
+                    **resume_inputs,
+                    "explodecollections": explodecollections,
+                    "force_output_geometrytype": force_output_geometrytype,
+                    "output_crs": output_crs,
+                    "column_datatypes": column_datatypes,
+                },
+            )
+            # Merged files can be incomplete, so they are merged again
+            shutil.rmtree(tmp_dir / "merged", ignore_errors=True)
+
         # Calculate
         # ---------
         # Processing in threads is 2x faster for small datasets (on Windows)
@@ -3332,10 +3561,32 @@ def _two_layer_vector_operation(
             max_workers=processing_params.nb_parallel,
             initializer=_processing_util.initialize_worker(),
         ) as calculate_pool:
-            # Start looping
+            # calculate_two_layers doesn't support explodecollections in one step:
+            # there is an extra layer copy involved.
+            # Normally explodecollections can be deferred to the appending of the
+            # partial files, but if explodecollections and there is a where_post to
+            # be applied, it needs to be applied now already. Otherwise the
+            # where_post in the append of partial files later on won't give correct
+            # results!
+            explodecollections_now = False
+            output_geometrytype_now = force_output_geometrytype
+            if explodecollections and where_post is not None:
+                explodecollections_now = True
+            if (
+                force_output_geometrytype is not None
+                and explodecollections
+                and not explodecollections_now
+            ):
+                # convert geometrytype to multitype to avoid ogr warnings
+                output_geometrytype_now = force_output_geometrytype.to_multitype
+
+            # The sqlite cache size is based on the memory available per worker
+            sqlite_profile = _sqlite_util.SqliteProfile.from_config(
+                speed=True, nb_parallel=processing_params.nb_parallel
+            )
             batches: dict[int, dict] = {}
-            future_to_batch_id = {}
-            for batch_id in processing_params.batches:
+
+            def submit_batch(batch_id: int, batch_filter: str) -> futures.Future:
                 batches[batch_id] = {}
                 batches[batch_id]["layer"] = output_layer
 
@@ -3343,6 +3594,8 @@ def _two_layer_vector_operation(
                     tmp_dir / f"{output_path.stem}_{batch_id}.gpkg"
                 )
                 batches[batch_id]["tmp_partial_output_path"] = tmp_partial_output_path
+                # Remark: when resuming, an incomplete partial file can exist
+                gfo.remove(tmp_partial_output_path, missing_ok=True)
 
                 # Fill out final things in sql_template
                 sql_stmt = sql_template.format(
@@ -3350,31 +3603,12 @@ def _two_layer_vector_operation(
                     input2_databasename="{input2_databasename}",
                     input3_databasename="{input3_databasename}",
                     input4_databasename="{input4_databasename}",
-                    batch_filter=processing_params.batches[batch_id]["batch_filter"],
+                    batch_filter=batch_filter,
                 )
                 batches[batch_id]["sqlite_stmt"] = sql_stmt
 
-                # calculate_two_layers doesn't support explodecollections in one step:
-                # there is an extra layer copy involved.
-                # Normally explodecollections can be deferred to the appending of the
-                # partial files, but if explodecollections and there is a where_post to
-                # be applied, it needs to be applied now already. Otherwise the
-                # where_post in the append of partial files later on won't give correct
-                # results!
-                explodecollections_now = False
-                output_geometrytype_now = force_output_geometrytype
-                if explodecollections and where_post is not None:
-                    explodecollections_now = True
-                if (
-                    force_output_geometrytype is not None
-                    and explodecollections
-                    and not explodecollections_now
-                ):
-                    # convert geometrytype to multitype to avoid ogr warnings
-                    output_geometrytype_now = force_output_geometrytype.to_multitype
-
                 # Remark: this temp file doesn't need spatial index
-                future = calculate_pool.submit(
+                return calculate_pool.submit(
                     _calculate_two_layers,
                     input_databases=input_db_names,
                     output_path=tmp_partial_output_path,
@@ -3386,67 +3620,135 @@ def _two_layer_vector_operation(
                     use_ogr=use_ogr,
                     create_spatial_index=False,
                     column_datatypes=column_datatypes,
+                    profile=sqlite_profile,
+                    immutable_databases=immutable_databases,
                 )
-                future_to_batch_id[future] = batch_id
+
+            def split_batch(batch_id: int, nb_parts: int) -> dict:
+                # Only batches on a range of ids can be split
+                batch = processing_params.batches.get(batch_id, {})
+                if "start_id" not in batch:
+                    return {}
+
+                end_id = batch["end_id"]
+                if end_id is None:
+                    # The last batch has no end_id, so determine it
+                    if filter_column == "fid_1":
+                        path = input1_subdivided_path
+                        layer = gfo.get_only_layer(input1_subdivided_path)
+                    else:
+                        path = input1_path
+                        layer = input1_layer
+                    sql_stmt = f'SELECT MAX({filter_column}) max_id FROM "{layer}"'
+                    max_df = gfo.read_file(path, sql_stmt=sql_stmt)
+                    end_id = pd.to_numeric(max_df["max_id"][0]).item()
+
+                future_to_sub_id = {}
+                column = f"{input1_layer_alias}.{filter_column}"
+                start_id = batch["start_id"]
+                ranges = _processing_util.split_range(start_id, end_id, nb_parts)
+                for sub_start_id, sub_end_id in ranges:
+                    sub_id = max(batches) + 1
+                    batch_filter = _range_batch_filter(column, sub_start_id, sub_end_id)
+                    future_to_sub_id[submit_batch(sub_id, batch_filter)] = sub_id
+
+                return future_to_sub_id
+
+            def stop_batch(batch_id: int):
+                path = batches[batch_id]["tmp_partial_output_path"]
+                _processing_util.request_stop(path)
+
+            # Start looping
+            to_submit = []
+            partials_to_merge = []
+            for batch_id, batch in processing_params.batches.items():
+                if manifest is not None and manifest.is_completed(batch_id):
+                    path = tmp_dir / f"{output_path.stem}_{batch_id}.gpkg"
+                    if path.exists():
+                        partials_to_merge.append(path)
+                    continue
+                batch_filter = batch["batch_filter"]
+                submit = functools.partial(submit_batch, batch_id, batch_filter)
+                to_submit.append((batch_id, submit))
+            nb_todo = len(to_submit)
+            if nb_todo < nb_batches:
+                logger.info(f"resume: {nb_batches - nb_todo} batches were completed")
 
             # Loop till all parallel processes are ready, but process each one
-            # that is ready already
-            nb_done = 0
+            # that is ready already. Batches are only submitted when there is enough
+            # memory available. Batches that take a lot longer than the others
+            # are split in sub-batches if there are idle workers. When resuming, the
+            # completed batches are kept track of, so batches aren't split then.
+            split_stragglers = ConfigOptions.split_stragglers and manifest is None
+            batches_completed = _processing_util.AsCompletedSplitStragglers(
+                pool=calculate_pool,
+                future_to_batch_id={},
+                split_batch=split_batch if split_stragglers else None,
+                stop_batch=stop_batch,
+                nb_workers=processing_params.nb_parallel,
+                to_submit=to_submit,
+                memory_monitor=_processing_util.MemoryMonitor(
+                    pool=calculate_pool,
+                    max_concurrency=processing_params.nb_parallel,
+                ),
+            )
+            merger = _merge_util.PartialsMerger(tmp_dir=tmp_dir)
             _general_util.report_progress(
                 start_time,
-                nb_done,
-                nb_batches,
+                batches_completed.nb_done,
+                nb_todo,
                 operation_name,
                 processing_params.nb_parallel,
             )
-            for future in futures.as_completed(future_to_batch_id):
+            for future, batch_id in batches_completed:
                 try:
                     # Get the result
                     result = future.result()
                     if result is not None:
                         logger.debug(f"{result}")
                 except Exception as ex:
-                    batch_id = future_to_batch_id[future]
                     error = str(ex).partition("\n")[0]
                     message = f"Error <{error}> executing {batches[batch_id]}"
                     logger.exception(message)
                     raise Exception(message) from ex
 
                 # If the calculate gave results, copy/append to output
-                batch_id = future_to_batch_id[future]
                 tmp_partial_output_path = batches[batch_id]["tmp_partial_output_path"]
-                nb_done += 1
+                if manifest is not None:
+                    manifest.set_completed(batch_id, [tmp_partial_output_path])
 
                 # Normally all partial files should exist, but to be sure...
                 if not tmp_partial_output_path.exists():
                     logger.warning(f"Result file {tmp_partial_output_path} not found")
                     continue
 
-                # If there is only one tmp_partial file and it is already ok as
-                # output file, just rename/move it.
-                if (
-                    nb_batches == 1
-                    and not explodecollections
+                if manifest is not None:
+                    # The partial files are only merged once all batches are ready,
+                    # otherwise they can't be reused when resuming.
+                    partials_to_merge.append(tmp_partial_output_path)
+                elif nb_batches > 1 or batches_completed.nb_split > 0:
+                    # Merge the partial files in parallel while calculating
+                    merger.add(tmp_partial_output_path)
+                elif (
+                    not explodecollections
                     and force_output_geometrytype is None
                     and where_post is None
                     and tmp_partial_output_path.suffix.lower()
                     == tmp_output_path.suffix.lower()
                 ):
+                    # If there is only one tmp_partial file and it is already ok as
+                    # output file, just rename/move it.
                     gfo.move(tmp_partial_output_path, tmp_output_path)
                 else:
                     # If there is only one batch, it is faster to create the spatial
                     # index immediately
-                    create_spatial_index = (
-                        True if nb_batches == 1 and output_with_spatial_index else False
-                    )
-
                     fileops._append_to_nolock(
                         src=tmp_partial_output_path,
                         dst=tmp_output_path,
                         explodecollections=explodecollections,
                         force_output_geometrytype=force_output_geometrytype,
                         where=where_post,
-                        create_spatial_index=create_spatial_index,
+                        create_spatial_index=output_with_spatial_index,
                         preserve_fid=False,
                     )
                     gfo.remove(tmp_partial_output_path)
@@ -3454,15 +3756,30 @@ def _two_layer_vector_operation(
                 # Log the progress and prediction speed
                 _general_util.report_progress(
                     start_time=start_time,
-                    nb_done=nb_done,
-                    nb_todo=nb_batches,
+                    nb_done=batches_completed.nb_done,
+                    nb_todo=nb_todo,
                     operation=operation_name,
                     nb_parallel=processing_params.nb_parallel,
                 )
 
+            # Append the files remaining after the parallel merges to the output
+            for partial_path in partials_to_merge:
+                merger.add(partial_path)
+            merger.finalize(
+                tmp_output_path,
+                explodecollections=explodecollections,
+                force_output_geometrytype=force_output_geometrytype,
+                where=where_post,
+            )
+
+            # The pool isn't needed anymore, so stop discarded stragglers
+            batches_completed.terminate_discarded()
+
         # Round up and clean up
         # Now create spatial index and move to output location
         if tmp_output_path.exists():
+            if sort_output:
+                tmp_output_path = _merge_util.sort_output(tmp_output_path, output_layer)
             if output_with_spatial_index:
                 gfo.create_spatial_index(
                     path=tmp_output_path,
@@ -3481,9 +3798,11 @@ def _two_layer_vector_operation(
     except Exception:
         gfo.remove(output_path, missing_ok=True)
         gfo.remove(tmp_output_path, missing_ok=True)
+        # Keep the completed batches so the operation can be resumed
+        keep_tmp_dir = ConfigOptions.resume
         raise
     finally:
-        if ConfigOptions.remove_temp_files:
+        if ConfigOptions.remove_temp_files and not keep_tmp_dir:
             shutil.rmtree(tmp_dir, ignore_errors=True)
 
 
@@ -3605,7 +3924,12 @@ def _calculate_two_layers(
     create_spatial_index: bool,
     column_datatypes: dict,
     use_ogr: bool,
+    profile: Optional[_sqlite_util.SqliteProfile] = None,
+    immutable_databases: Optional[list[str]] = None,
 ):
+    if profile is None:
+        profile = _sqlite_util.SqliteProfile.SPEED
+
     if not use_ogr:
         # If explodecollections, write first to tmp file, then apply explodecollections
         # to the final output file.
@@ -3614,17 +3938,28 @@ def _calculate_two_layers(
             output_name = f"{output_path.stem}_tmp{output_path.suffix}"
             output_tmp_path = output_path.parent / output_name
 
-        _sqlite_util.create_table_as_sql(
-            input_databases=input_databases,
-            output_path=output_tmp_path,
-            sql_stmt=sql_stmt,
-            output_layer=output_layer,
-            output_geometrytype=force_output_geometrytype,
-            output_crs=output_crs,
-            create_spatial_index=create_spatial_index,
-            profile=_sqlite_util.SqliteProfile.SPEED,
-            column_datatypes=column_datatypes,
-        )
+        # The batch can be asked to stop, e.g. if it is split in sub-batches
+        try:
+            _sqlite_util.create_table_as_sql(
+                input_databases=input_databases,
+                output_path=output_tmp_path,
+                sql_stmt=sql_stmt,
+                output_layer=output_layer,
+                output_geometrytype=force_output_geometrytype,
+                output_crs=output_crs,
+                create_spatial_index=create_spatial_index,
+                profile=profile,
+                column_datatypes=column_datatypes,
+                reuse_connection=True,
+                interrupt=functools.partial(
+                    _processing_util.stop_requested, output_path
+                ),
+                immutable_databases=immutable_databases,
+            )
+        except Exception:
+            _processing_util.raise_if_stopped(output_path)
+            raise
+        _processing_util.raise_if_stopped(output_path)
 
         if explodecollections:
             _ogr_util.vector_translate(
@@ -3651,7 +3986,10 @@ def _calculate_two_layers(
             output_layer=output_layer,
             explodecollections=explodecollections,
             force_output_geometrytype=force_output_geometrytype,
-            options={"LAYER_CREATION.SPATIAL_INDEX": create_spatial_index},
+            options={
+                "LAYER_CREATION.SPATIAL_INDEX": create_spatial_index,
+                **profile.gdal_options(),
+            },
         )
 
 
@@ -3661,10 +3999,12 @@ class ProcessingParams:
         nb_parallel: int,
         batches: dict,
         batchsize: int,
+        batch_db_path: Optional[Path] = None,
     ):
         self.nb_parallel = nb_parallel
         self.batches = batches
         self.batchsize = batchsize
+        self.batch_db_path = batch_db_path
 
     def to_json(self, path: Path):
         prepared = _general_util.prepare_for_serialize(vars(self))
@@ -3682,8 +4022,20 @@ def _convert_to_spatialite_based(
     """Prepare input files for the calculation.
 
     The input files should be spatialite based, and should be of the same type: either
-    both GPKG, or both SQLite.
+    both GPKG, or both SQLite. If resuming is enabled, the conversions that were
+    completed already for the same input files are reused.
     """
+    # If resuming is enabled, keep track of the conversions completed
+    manifest = None
+    if ConfigOptions.resume:
+        manifest = _processing_util.ResumeManifest(
+            tempdir / "convert_manifest.json",
+            fingerprint={
+                "inputs": _io_util.get_resume_key(input1_path, input2_path),
+                "layers": [input1_layer, input2_layer],
+            },
+        )
+
     input1_info = _geofileinfo.get_geofileinfo(input1_path)
     input2_info = (
         None if input2_path is None else _geofileinfo.get_geofileinfo(input2_path)
@@ -3707,13 +4059,18 @@ def _convert_to_spatialite_based(
         if input2_info is not None and input2_info.driver == "SQLite":
             suffix = ".sqlite"
         input1_tmp_path = tempdir / f"{input1_path.stem}{suffix}"
-        gfo.copy_layer(
-            src=input1_path,
-            src_layer=input1_layer,
-            dst=input1_tmp_path,
-            dst_layer=input1_layer,
-            preserve_fid=True,
-        )
+        if manifest is None or not manifest.is_completed("input1"):
+            # Remark: when resuming, an old (partial) copy can exist already
+            gfo.copy_layer(
+                src=input1_path,
+                src_layer=input1_layer,
+                dst=input1_tmp_path,
+                dst_layer=input1_layer,
+                preserve_fid=True,
+                force=True,
+            )
+            if manifest is not None:
+                manifest.set_completed("input1", [input1_tmp_path])
         input1_path = input1_tmp_path
         input1_info = _geofileinfo.get_geofileinfo(input1_path)
         if input1_info.driver == "SQLite":
@@ -3737,15 +4094,20 @@ def _convert_to_spatialite_based(
             input2_tmp_path = tempdir / f"{input2_path.stem}{suffix}"
 
             # Make sure the copy is taken to a separate file.
-            if input2_tmp_path.exists():
+            if input2_tmp_path == input1_path:
                 input2_tmp_path = tempdir / f"{input2_path.stem}2{suffix}"
-            gfo.copy_layer(
-                src=input2_path,
-                src_layer=input2_layer,
-                dst=input2_tmp_path,
-                dst_layer=input2_layer,
-                preserve_fid=True,
-            )
+            if manifest is None or not manifest.is_completed("input2"):
+                # Remark: when resuming, an old (partial) copy can exist already
+                gfo.copy_layer(
+                    src=input2_path,
+                    src_layer=input2_layer,
+                    dst=input2_tmp_path,
+                    dst_layer=input2_layer,
+                    preserve_fid=True,
+                    force=True,
+                )
+                if manifest is not None:
+                    manifest.set_completed("input2", [input2_tmp_path])
             input2_path = input2_tmp_path
             input2_info = _geofileinfo.get_geofileinfo(input2_path)
             if input2_info.driver == "SQLite":
@@ -3766,6 +4128,7 @@ def _prepare_processing_params(
     input1_subdivided_path: Optional[Path] = None,
     input2_path: Optional[Path] = None,
     input2_layer: Optional[str] = None,
+    batch_order: str = "rowid",
 ) -> Optional[ProcessingParams]:
     # Prepare batches to process
     layer1_info = gfo.get_layerinfo(
@@ -3783,6 +4146,7 @@ def _prepare_processing_params(
 
     # Check number of batches + appoint nb rows to batches
     batches: dict[int, dict] = {}
+    batch_db_path = None
     if nb_batches == 1:
         # If only one batch, no filtering is needed
         batches[0] = {}
@@ -3792,6 +4156,35 @@ def _prepare_processing_params(
         batches[0]["input2_layer"] = input2_layer
         batches[0]["batch_filter"] = ""
 
+    elif batch_order == "hilbert" and input1_subdivided_path is None:
+        # Assign the rows to batches along a hilbert curve, so each batch covers a
+        # spatially compact region.
+        batch_db_path = tempdir / "batches.sqlite"
+        nb_batches = _create_batch_db_hilbert(
+            path=input1_path,
+            layer_info=layer1_info,
+            nb_batches=nb_batches,
+            output_path=batch_db_path,
+            weight_geomsize=ConfigOptions.batch_weight == "geomsize",
+        )
+
+        layer_alias_d = ""
+        if input1_layer_alias is not None:
+            layer_alias_d = f"{input1_layer_alias}."
+
+        for batch_id in range(nb_batches):
+            batches[batch_id] = {
+                "input1_path": input1_path,
+                "input1_layer": input1_layer,
+                "input2_path": input2_path,
+                "input2_layer": input2_layer,
+                "batch_filter": (
+                    f"AND {layer_alias_d}{filter_column} IN ( "
+                    f"SELECT id FROM {BATCH_DATABASENAME}.batch_rows "
+                    f"WHERE batch_id = {batch_id}) "
+                ),
+            }
+
     else:
         if input1_subdivided_path is not None:
             # input1 is subdivided, so determine batches based on the fid_1
@@ -3811,6 +4204,16 @@ def _prepare_processing_params(
             batch_info_df.reset_index(names=["batch_id"], inplace=True)
             nb_batches = len(batch_info_df)
 
+        elif ConfigOptions.batch_weight == "geomsize":
+            # Determine the rowid ranges so each batch has about the same total size
+            # of geometries.
+            batch_info_df = _sqlite_util.get_batch_ranges_geomsize(
+                input1_path,
+                layer=layer1_info.name,
+                geometrycolumn=layer1_info.geometrycolumn,
+                nb_batches=nb_batches,
+            )[["batch_id", "start_id"]]
+
         else:
             # Determine the min_rowid and max_rowid
             # Remark: SELECT MIN(rowid), MAX(rowid) ... is a lot slower than UNION ALL!
@@ -3866,20 +4269,21 @@ def _prepare_processing_params(
 
         # Now loop over all batch ranges to build up the necessary filters
         for batch_id, start_id, end_id in batch_info_df.itertuples(index=False):
-            # The batch filter
-            batch_filter = f"{layer_alias_d}{filter_column} >= {int(start_id)}"
-            if not np.isnan(end_id).item():
-                # There is an end_id specified, so add it to the filter
-                batch_filter += f" AND {layer_alias_d}{filter_column} <= {int(end_id)}"
-            batch_filter = f"AND ({batch_filter}) "
+            start_id = int(start_id)
+            end_id = None if np.isnan(end_id).item() else int(end_id)
 
             # Fill out the batch properties
+            # Remark: the range is kept as well so the batch can be split later on
             batches[batch_id] = {
                 "input1_path": input1_path,
                 "input1_layer": input1_layer,
                 "input2_path": input2_path,
                 "input2_layer": input2_layer,
-                "batch_filter": batch_filter,
+                "batch_filter": _range_batch_filter(
+                    f"{layer_alias_d}{filter_column}", start_id, end_id
+                ),
+                "start_id": start_id,
+                "end_id": end_id,
             }
 
     # No use starting more processes than the number of batches...
@@ -3889,11 +4293,124 @@ def _prepare_processing_params(
         nb_parallel=nb_parallel,
         batches=batches,
         batchsize=int(nb_rows_input_layer / len(batches)),
+        batch_db_path=batch_db_path,
     )
     returnvalue.to_json(tempdir / "processing_params.json")
     return returnvalue
 
 
+def _range_batch_filter(column: str, start_id: int, end_id: Optional[int]) -> str:
+    """Create a batch filter for the rows with column between start_id and end_id.
+
+    Args:
+        column (str): the column to filter on, possibly prefixed with a table alias.
+        start_id (int): the minimum value of the column, inclusive.
+        end_id (Optional[int]): the maximum value of the column, inclusive. If None,
+            there is no maximum.
+
+    Returns:
+        str: the batch filter.
+    """
+    batch_filter = f"{column} >= {start_id}"
+    if end_id is not None:
+        # There is an end_id specified, so add it to the filter
+        batch_filter += f" AND {column} <= {end_id}"
+    return f"AND ({batch_filter}) "
+
+
+def _create_batch_db_hilbert(
+    path: Path,
+    layer_info: fileops.LayerInfo,
+    nb_batches: int,
+    output_path: Path,
+    weight_geomsize: bool = False,
+) -> int:
+    """Create a database with a table assigning the rows of a layer to batches.
+
+    The rows are ordered along a hilbert curve based on the center of their bounding
+    box and then split in ``nb_batches`` batches with the same number of rows. The
+    result is written to table "batch_rows" with columns "batch_id" and "id", where
+    "id" is the rowid of the row in the input layer.
+
+    Args:
+        path (Path): the file containing the layer.
+        layer_info (LayerInfo): the info of the layer to assign to batches.
+        nb_batches (int): the number of batches to create.
+        output_path (Path): the path of the sqlite database to create.
+        weight_geomsize (bool, optional): True to split the rows so the batches have
+            about the same total size of geometries instead of the same number of
+            rows. Defaults to False.
+
+    Returns:
+        int: the number of batches created. If ``weight_geomsize`` is True, this can be
+            less than ``nb_batches``.
+    """
+    layer = layer_info.name
+    geom = layer_info.geometrycolumn
+    driver = _geofileinfo.get_geofileinfo(path).driver
+    if driver == "GPKG" and gfo.has_spatial_index(path, layer):
+        # Reading the bounding boxes from the rtree avoids parsing the geometries.
+        # Rows without geometry are not in the rtree, hence the left join.
+        sql_stmt = f"""
+            SELECT layer.rowid AS id
+                  ,(rtree.minx + rtree.maxx) / 2 AS x
+                  ,(rtree.miny + rtree.maxy) / 2 AS y
+                  ,IFNULL(LENGTH(layer."{geom}"), 0) + 100 AS weight
+              FROM "{layer}" layer
+              LEFT JOIN "rtree_{layer}_{geom}" rtree ON rtree.id = layer.rowid
+        """
+    else:
+        sql_stmt = f"""
+            SELECT rowid AS id
+                  ,(ST_MinX("{geom}") + ST_MaxX("{geom}")) / 2 AS x
+                  ,(ST_MinY("{geom}") + ST_MaxY("{geom}")) / 2 AS y
+                  ,IFNULL(LENGTH("{geom}"), 0) + 100 AS weight
+              FROM "{layer}"
+        """
+    bbox_df = gfo.read_file(path, sql_stmt=sql_stmt, sql_dialect="SQLITE")
+    x = pd.to_numeric(bbox_df["x"]).to_numpy(dtype=np.float64, na_value=np.nan)
+    y = pd.to_numeric(bbox_df["y"]).to_numpy(dtype=np.float64, na_value=np.nan)
+
+    # Sort the rows along the hilbert curve and split them in equally sized batches.
+    # The weight of a row is the size of its geometry + 100 bytes overhead per row.
+    distances = _geoseries_util.hilbert_distance(x, y)
+    order = np.argsort(distances, kind="stable")
+    ids = pd.to_numeric(bbox_df["id"]).to_numpy(dtype=np.int64)[order]
+    if weight_geomsize:
+        weights = pd.to_numeric(bbox_df["weight"]).to_numpy(dtype=np.int64)[order]
+    else:
+        weights = np.ones(len(ids), dtype=np.int64)
+    weights_before = np.cumsum(weights) - weights
+    batch_ids = (weights_before * nb_batches) // max(int(weights.sum()), 1)
+    # Batches can be skipped if a single row is heavier than a batch, so renumber
+    _, batch_ids = np.unique(batch_ids, return_inverse=True)
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.unlink(missing_ok=True)
+    conn = sqlite3.connect(output_path)
+    try:
+        conn.execute("PRAGMA journal_mode=OFF;")
+        conn.execute("PRAGMA synchronous=OFF;")
+        conn.execute(
+            """
+            CREATE TABLE batch_rows (
+                batch_id INTEGER NOT NULL,
+                id INTEGER NOT NULL,
+                PRIMARY KEY (batch_id, id)
+            ) WITHOUT ROWID
+            """
+        )
+        conn.executemany(
+            "INSERT INTO batch_rows (batch_id, id) VALUES (?, ?)",
+            zip(batch_ids.tolist(), ids.tolist()),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+    return int(batch_ids.max()) + 1 if len(batch_ids) > 0 else 0
+
+
 def _determine_nb_batches(
     nb_rows_input_layer: int,
     nb_parallel: int,
@@ -3909,8 +4426,9 @@ def _determine_nb_batches(
         batchsize (int): recommended number of rows per batch
         is_twolayer_operation (bool): True if optimization for a two layer operation,
             False if it involves a single layer operation.
-        cpu_count (int, optional): the number of CPU's available. If None, this is
-            determined automatically if needed.
+        cpu_count (int, optional): the number of CPU's available. If None, the number
+            of workers of the shared pool is used if one is active, otherwise the
+            number of CPU's is determined automatically.
 
     Returns:
         Tuple[int, int]: Tuple of (nb_parallel, nb_batches)
@@ -3922,7 +4440,9 @@ def _determine_nb_batches(
         return (1, 1)
 
     if cpu_count is None:
-        cpu_count = multiprocessing.cpu_count()
+        cpu_count = (
+            _processing_util.shared_pool_max_workers() or _processing_util.cpu_count()
+        )
 
     # Determine the optimal number of parallel workers
     if nb_parallel == -1:
@@ -4205,7 +4725,7 @@ def dissolve_singlethread(
     tempdir = _io_util.create_tempdir("geofileops/dissolve_singlethread")
     try:
         suffix = output_path.suffix
-        options = {}
+        options: dict = _sqlite_util.SqliteProfile.from_config().gdal_options()
         if where_post is not None:
             # where_post needs to be applied still, so no spatial index needed
             options["LAYER_CREATION.SPATIAL_INDEX"] = False
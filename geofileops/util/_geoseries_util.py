@@ -2,7 +2,7 @@
 
 import logging
 import warnings
-from typing import Union
+from typing import Optional, Union
 
 import geopandas as gpd
 import geopandas._compat as gpd_compat
@@ -277,3 +277,64 @@ def set_precision(
                     )
 
             return np.array(result)
+
+
+def hilbert_distance(
+    x: NDArray, y: NDArray, total_bounds: Optional[tuple] = None, level: int = 16
+) -> NDArray[np.int64]:
+    """Calculate the distance along a hilbert curve for the coordinates given.
+
+    The coordinates are first scaled to a grid of 2**level by 2**level cells covering
+    the ``total_bounds``. Coordinates that are nan are treated as being in the first
+    cell.
+
+    Args:
+        x (NDArray): the x coordinates, typically the centers of bounding boxes.
+        y (NDArray): the y coordinates, typically the centers of bounding boxes.
+        total_bounds (tuple, optional): the bounds (minx, miny, maxx, maxy) the curve
+            should cover. If None, the bounds of the coordinates are used.
+            Defaults to None.
+        level (int, optional): the level of the hilbert curve, between 1 and 31.
+            Defaults to 16.
+
+    Returns:
+        NDArray[np.int64]: the distances along the hilbert curve.
+    """
+    if level < 1 or level > 31:
+        raise ValueError(f"level should be between 1 and 31, not {level}")
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if len(x) == 0:
+        return np.array([], dtype=np.int64)
+    if total_bounds is None:
+        if np.all(np.isnan(x)):
+            return np.zeros(len(x), dtype=np.int64)
+        total_bounds = (np.nanmin(x), np.nanmin(y), np.nanmax(x), np.nanmax(y))
+
+    # Scale the coordinates to integer cell indices on the grid
+    minx, miny, maxx, maxy = total_bounds
+    side = 2**level
+    width = maxx - minx if maxx > minx else 1.0
+    height = maxy - miny if maxy > miny else 1.0
+    xi = np.nan_to_num((x - minx) / width * (side - 1), nan=0.0)
+    yi = np.nan_to_num((y - miny) / height * (side - 1), nan=0.0)
+    xi = np.clip(xi, 0, side - 1).astype(np.int64)
+    yi = np.clip(yi, 0, side - 1).astype(np.int64)
+
+    # Walk from the largest to the smallest quadrant size, rotating the coordinates
+    # in each step so they are relative to the orientation of the current quadrant.
+    distance = np.zeros(len(xi), dtype=np.int64)
+    quadrant_size = side // 2
+    while quadrant_size > 0:
+        rx = (xi & quadrant_size) > 0
+        ry = (yi & quadrant_size) > 0
+        distance += quadrant_size * quadrant_size * ((3 * rx) ^ ry)
+
+        flip = rx & ~ry
+        xi = np.where(flip, side - 1 - xi, xi)
+        yi = np.where(flip, side - 1 - yi, yi)
+        xi, yi = np.where(~ry, yi, xi), np.where(~ry, xi, yi)
+        quadrant_size //= 2
+
+    return distance
@@ -1,15 +1,35 @@
 """Module containing some utilities regarding io."""
 
+import hashlib
 import logging
 import os
+import socket
 import tempfile
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional
+from typing import Any, Optional, Union
+
+import psutil
 
 import geofileops as gfo
+from geofileops.helpers._configoptions_helper import ConfigOptions
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    # Not available on Windows
+    fcntl = None  # type: ignore[assignment]
 
+logger = logging.getLogger(__name__)
 
-def create_tempdir(base_dirname: str, parent_dir: Optional[Path] = None) -> Path:
+
+def create_tempdir(
+    base_dirname: str,
+    parent_dir: Optional[Path] = None,
+    resume_key: Optional[str] = None,
+) -> Path:
     """Creates a new tempdir in the default temp location.
 
     Remark: the temp dir won't be cleaned up automatically!
@@ -24,6 +44,10 @@ def create_tempdir(base_dirname: str, parent_dir: Optional[Path] = None) -> Path
             of the base_dirname a subdirectory will be created: e.g. "foo/bar".
         parent_dir (Path, optional): The dir to create the tempdir in. If None, the
             system temp dir is used. Defaults to None.
+        resume_key (str, optional): If not None, the name of the tempdir is based on
+            this key instead of a number, so the same tempdir is returned when called
+            again with the same key, e.g. to resume an interrupted operation. If it
+            exists already, it is reused. Defaults to None.
 
     Raises:
         Exception: if it wasn't possible to create the temp dir because there
@@ -35,6 +59,12 @@ def create_tempdir(base_dirname: str, parent_dir: Optional[Path] = None) -> Path
     if parent_dir is None:
         parent_dir = Path(tempfile.gettempdir())
 
+    if resume_key is not None:
+        key_hash = hashlib.sha256(resume_key.encode()).hexdigest()[:16]
+        tempdir = parent_dir / f"{base_dirname}_resume_{key_hash}"
+        tempdir.mkdir(parents=True, exist_ok=True)
+        return tempdir
+
     for i in range(1, 999999):
         try:
             tempdir = parent_dir / f"{base_dirname}_{i:06d}"
@@ -49,6 +79,34 @@ def create_tempdir(base_dirname: str, parent_dir: Optional[Path] = None) -> Path
     )
 
 
+def get_resume_key(*paths: Optional[Path]) -> Optional[str]:
+    """Get the key to use for the tempdir of an operation so it can be resumed.
+
+    The key is based on the paths passed and the size and the modification time of
+    the ones that exist, so if an input file changes, a new tempdir is used.
+
+    Args:
+        paths (Path): the paths of the input and output files of the operation.
+
+    Returns:
+        Optional[str]: the key or None if resuming is not enabled, see
+            ``GFO_RESUME``.
+    """
+    if not ConfigOptions.resume:
+        return None
+
+    key_parts = []
+    for path in paths:
+        if path is None:
+            continue
+        key_parts.append(str(Path(path).resolve()))
+        if path.exists():
+            stat = path.stat()
+            key_parts.append(f"{stat.st_size}_{stat.st_mtime_ns}")
+
+    return "|".join(key_parts)
+
+
 def get_tempfile_locked(
     base_filename: str,
     suffix: str = ".tmp",
@@ -124,6 +182,114 @@ def create_file_atomic(filename) -> bool:
             raise Exception("Error creating lock file {filename}") from ex
 
 
+@contextmanager
+def lock_file(
+    path: Union[str, "os.PathLike[Any]"], timeout_s: Optional[float] = None
+) -> Iterator[None]:
+    """Context manager to get exclusive write access to a file between processes.
+
+    A lock file with the name of the file followed by ".lock" is used. If available,
+    ``fcntl.flock`` is used to lock it, so the lock is released by the operating system
+    if the process holding it is killed. Otherwise the lock file is created atomically
+    and it contains the host and the process id of the holder, so a lock left behind by
+    a process that doesn't exist anymore is removed.
+
+    While waiting for the lock, it is retried with an increasing interval of at most
+    0.1 seconds, so waiting processes continue soon after the lock is released.
+
+    Args:
+        path (PathLike): the file to lock.
+        timeout_s (float, optional): the maximum number of seconds to wait for the lock.
+            If None, wait indefinitely. Defaults to None.
+
+    Raises:
+        TimeoutError: the lock could not be acquired within ``timeout_s``.
+    """
+    lockfile = Path(f"{path!s}.lock")
+    start_time = time.monotonic()
+    sleep_s = 0.001
+    while True:
+        handle = _try_lock(lockfile)
+        if handle is not None:
+            break
+        if timeout_s is not None and time.monotonic() - start_time > timeout_s:
+            raise TimeoutError(f"timeout of {timeout_s} s reached locking {path}")
+        time.sleep(sleep_s)
+        sleep_s = min(sleep_s * 2, 0.1)
+
+    try:
+        yield
+    finally:
+        _unlock(lockfile, handle)
+
+
+def _try_lock(lockfile: Path) -> Optional[int]:
+    if fcntl is None:  # pragma: no cover
+        return _try_lock_excl(lockfile)
+
+    fd = os.open(lockfile, os.O_RDWR | os.O_CREAT, 0o666)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return None
+
+    # If the lock file was removed by the previous holder after it was opened here,
+    # the lock obtained is on a file that isn't used anymore.
+    try:
+        locked = os.fstat(fd).st_ino == os.stat(lockfile).st_ino
+    except FileNotFoundError:
+        locked = False
+    if not locked:
+        os.close(fd)
+        return None
+
+    os.ftruncate(fd, 0)
+    os.write(fd, _lock_owner().encode())
+    return fd
+
+
+def _try_lock_excl(lockfile: Path) -> Optional[int]:  # pragma: no cover
+    try:
+        fd = os.open(lockfile, os.O_RDWR | os.O_CREAT | os.O_EXCL, 0o666)
+    except (FileExistsError, PermissionError):
+        _remove_stale_lock(lockfile)
+        return None
+
+    os.write(fd, _lock_owner().encode())
+    return fd
+
+
+def _unlock(lockfile: Path, fd: int):
+    if fcntl is None:  # pragma: no cover
+        # On Windows, a file that is still open cannot be removed
+        os.close(fd)
+        lockfile.unlink(missing_ok=True)
+    else:
+        # Remove the lock file before releasing the lock: processes that opened it
+        # meanwhile detect this after getting the lock and try again.
+        lockfile.unlink(missing_ok=True)
+        os.close(fd)
+
+
+def _remove_stale_lock(lockfile: Path):  # pragma: no cover
+    try:
+        with open(lockfile) as file:
+            host, pid = file.read().rsplit(" ", 1)
+        if host != socket.gethostname() or psutil.pid_exists(int(pid)):
+            return
+    except (OSError, ValueError):
+        # The lock file was removed, is being written or isn't from this host
+        return
+
+    logger.warning(f"remove stale lock file of process {pid}: {lockfile}")
+    lockfile.unlink(missing_ok=True)
+
+
+def _lock_owner() -> str:
+    return f"{socket.gethostname()} {os.getpid()}"
+
+
 def with_stem(path: Path, new_stem) -> Path:
     # Remark: from python 3.9 this is available on any Path, but to avoid
     # having to require 3.9 for this, this hack...
@@ -0,0 +1,422 @@
+"""Module containing utilities to merge the partial results of batches."""
+
+import json
+import logging
+import time
+from concurrent import futures
+from pathlib import Path
+from typing import Optional, Union
+
+import geopandas as gpd
+import pandas as pd
+from osgeo import gdal
+from packaging import version
+from pygeoops import GeometryType
+
+from geofileops import fileops
+from geofileops.helpers._configoptions_helper import ConfigOptions
+from geofileops.util import _geoseries_util, _sqlite_util
+
+logger = logging.getLogger(__name__)
+
+
+class PartialsMerger:
+    """Merge partial result files in parallel while they are being calculated.
+
+    Appending all partial results of the batches one by one to the output file in the
+    main process can become the bottleneck once the calculations are ready, certainly
+    if there are many batches. Hence, as soon as ``fanin`` partial files are available,
+    they are merged into a single, larger partial file in a background thread. Merged
+    files are merged again the same way, so they form a tree. When all calculations
+    are ready, :meth:`finalize` appends the (at most ``fanin``) files that remain to the
+    output file.
+
+    The merges run in a local thread pool of the merger rather than in the pool the
+    batches are calculated in: they are mostly I/O bound, they don't take the place of
+    batches that are accounted for when determining idle workers and available memory
+    and the partial files are local, while the calculation pool can have remote workers.
+
+    The partial files are merged as they are: conversions like explodecollections or a
+    filter are only applied when the remaining files are appended to the output file.
+
+    Args:
+        tmp_dir (Path): the temp directory to write the merged files in.
+        fanin (int, optional): the number of files to merge in one go. Defaults to 4.
+        preserve_fid (bool, optional): True to preserve the fids of the partial files.
+            Defaults to False.
+        max_workers (int, optional): the maximum number of merges to run at the same
+            time. Defaults to 2.
+    """
+
+    def __init__(
+        self,
+        tmp_dir: Path,
+        fanin: int = 4,
+        preserve_fid: bool = False,
+        max_workers: int = 2,
+    ):
+        if fanin < 2:
+            raise ValueError(f"fanin should be at least 2, not {fanin}")
+
+        self.pool = futures.ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="gfo_merge"
+        )
+        self.tmp_dir = tmp_dir / "merged"
+        self.fanin = fanin
+        self.preserve_fid = preserve_fid
+        self.merge_seconds = 0.0
+        """The time spent merging in the workers of the pool, in seconds."""
+        self.nb_merges = 0
+        """The number of merges that were executed."""
+        self._ready: list[Path] = []
+        self._pending: set[futures.Future] = set()
+        self._nb_submitted = 0
+
+    def add(self, path: Path):
+        """Add a partial file to be merged.
+
+        Args:
+            path (Path): the partial file. It will be removed once merged.
+        """
+        self._ready.append(path)
+        self._collect(wait=False)
+        self._submit_merges(final=False)
+
+    def finalize(
+        self,
+        dst_path: Path,
+        explodecollections: bool = False,
+        force_output_geometrytype: Union[GeometryType, str, None] = None,
+        where: Optional[str] = None,
+    ):
+        """Wait till all merges are ready and append the remaining files to dst_path.
+
+        Args:
+            dst_path (Path): the file to append the merged files to.
+            explodecollections (bool, optional): True to explode the collections when
+                appending. Defaults to False.
+            force_output_geometrytype (Union[GeometryType, str, None], optional): the
+                geometry type to force when appending. Defaults to None.
+            where (Optional[str], optional): filter to apply when appending.
+                Defaults to None.
+        """
+        try:
+            self._submit_merges(final=True)
+            while len(self._pending) > 0:
+                self._collect(wait=True)
+                self._submit_merges(final=True)
+        finally:
+            self.pool.shutdown(wait=True, cancel_futures=True)
+        if self.nb_merges == 0 and len(self._ready) == 0:
+            return
+
+        start = time.perf_counter()
+        for path in self._ready:
+            _append_partial(
+                src=path,
+                dst=dst_path,
+                preserve_fid=self.preserve_fid,
+                explodecollections=explodecollections,
+                force_output_geometrytype=force_output_geometrytype,
+                where=where,
+            )
+        final_seconds = time.perf_counter() - start
+
+        logger.info(
+            f"merging partial files took {self.merge_seconds:.2f}s in "
+            f"{self.nb_merges} parallel merges and {final_seconds:.2f}s to append the "
+            f"{len(self._ready)} remaining files to the output file"
+        )
+        self._ready = []
+
+    def _collect(self, wait: bool):
+        if len(self._pending) == 0:
+            return
+        done, self._pending = futures.wait(
+            self._pending,
+            timeout=None if wait else 0,
+            return_when=futures.FIRST_COMPLETED,
+        )
+        for future in done:
+            merged_path, seconds = future.result()
+            self.merge_seconds += seconds
+            self.nb_merges += 1
+            if merged_path is not None:
+                self._ready.append(merged_path)
+
+    def _submit_merges(self, final: bool):
+        # While calculating, only merge full groups. When finalizing, merge till no
+        # more than fanin files remain.
+        while len(self._ready) >= self.fanin and (
+            not final or len(self._ready) + len(self._pending) > self.fanin
+        ):
+            to_merge = self._ready[: self.fanin]
+            self._ready = self._ready[self.fanin :]
+            self.tmp_dir.mkdir(exist_ok=True)
+            suffix = to_merge[0].suffix
+            merged_path = self.tmp_dir / f"merged_{self._nb_submitted}{suffix}"
+            self._nb_submitted += 1
+            future = self.pool.submit(
+                merge_partials,
+                src_paths=to_merge,
+                dst_path=merged_path,
+                preserve_fid=self.preserve_fid,
+            )
+            self._pending.add(future)
+
+
+def merge_partials(
+    src_paths: list[Path], dst_path: Path, preserve_fid: bool = False
+) -> tuple[Optional[Path], float]:
+    """Merge partial files into a new file.
+
+    The source files are removed once they are merged.
+
+    Args:
+        src_paths (list[Path]): the partial files to merge.
+        dst_path (Path): the file to merge them to.
+        preserve_fid (bool, optional): True to preserve the fids. Defaults to False.
+
+    Returns:
+        tuple[Optional[Path], float]: the path to the merged file or None if none of
+            the source files exist and the time the merge took in seconds.
+    """
+    start = time.perf_counter()
+    if dst_path.suffix.lower() == ".parquet":
+        result_path = _merge_parquet(src_paths, dst_path)
+        return (result_path, time.perf_counter() - start)
+
+    result_path = None
+    for src_path in src_paths:
+        if not src_path.exists():
+            continue
+        _append_partial(src=src_path, dst=dst_path, preserve_fid=preserve_fid)
+        result_path = dst_path
+
+    return (result_path, time.perf_counter() - start)
+
+
+def sort_output(path: Path, layer: Optional[str] = None) -> Path:
+    """Sort the rows of an output file spatially.
+
+    The rows are sorted with :func:`~geofileops.spatial_sort` into a new file next to
+    ``path``, without spatial index. The fids are not preserved, so this should only be
+    used on the final output of operations that don't preserve them.
+
+    Args:
+        path (Path): the output file to sort.
+        layer (str, optional): the layer to sort. Defaults to None.
+
+    Returns:
+        Path: the path to the sorted file or ``path`` if it wasn't sorted.
+    """
+    if not path.exists():
+        return path
+    layerinfo = fileops.get_layerinfo(path, layer, raise_on_nogeom=False)
+    if layerinfo.geometrycolumn is None:
+        return path
+
+    sorted_path = path.with_name(f"{path.stem}_sorted{path.suffix}")
+    fileops.spatial_sort(
+        path,
+        sorted_path,
+        src_layer=layerinfo.name,
+        dst_layer=layerinfo.name,
+        create_spatial_index=False,
+        force=True,
+    )
+    fileops.remove(path)
+    return sorted_path
+
+
+def _append_partial(
+    src: Path,
+    dst: Path,
+    preserve_fid: bool,
+    explodecollections: bool = False,
+    force_output_geometrytype: Union[GeometryType, str, None] = None,
+    where: Optional[str] = None,
+):
+    # If no conversions are needed, try the fast options first
+    if not explodecollections and force_output_geometrytype is None and where is None:
+        if not dst.exists() and src.suffix.lower() == dst.suffix.lower():
+            fileops.move(src, dst)
+            return
+        if _sqlite_util.append_gpkg_layer(src, dst, preserve_fid=preserve_fid):
+            fileops.remove(src)
+            return
+
+    fileops._append_to_nolock(
+        src=src,
+        dst=dst,
+        explodecollections=explodecollections,
+        force_output_geometrytype=force_output_geometrytype,
+        where=where,
+        create_spatial_index=False,
+        preserve_fid=preserve_fid,
+    )
+    fileops.remove(src)
+
+
+def partial_suffix(preserve_fid: bool = False, where: Optional[str] = None) -> str:
+    """Determine the suffix to use for the temp files with partial results.
+
+    The format is determined by the ``GFO_PARTIAL_FORMAT`` configuration option.
+    GeoParquet is not used if the fids need to be preserved or if a ``where`` filter
+    needs to be applied when merging, as GDAL doesn't support this for GeoParquet.
+
+    Args:
+        preserve_fid (bool, optional): True if the fids of the partial files need to be
+            preserved. Defaults to False.
+        where (Optional[str], optional): filter that will be applied when merging the
+            partial files. Defaults to None.
+
+    Raises:
+        RuntimeError: if GeoParquet should be used, but the dependencies are not
+            available.
+
+    Returns:
+        str: the suffix to use for the partial files.
+    """
+    if ConfigOptions.partial_format != "parquet" or preserve_fid or where is not None:
+        return ".gpkg"
+
+    try:
+        import pyarrow
+    except ImportError as ex:
+        raise RuntimeError(
+            "GFO_PARTIAL_FORMAT=PARQUET requires pyarrow to be installed"
+        ) from ex
+    # Remark: pyarrow >= 14 is needed to unify the schemas of the partial files.
+    if version.parse(pyarrow.__version__) < version.parse("14"):
+        raise RuntimeError(
+            "GFO_PARTIAL_FORMAT=PARQUET requires pyarrow >= 14, not "
+            f"{pyarrow.__version__}"
+        )
+    if gdal.GetDriverByName("Parquet") is None:
+        raise RuntimeError(
+            "GFO_PARTIAL_FORMAT=PARQUET requires GDAL with the Parquet driver"
+        )
+
+    return ".parquet"
+
+
+def write_partial(
+    gdf: gpd.GeoDataFrame,
+    path: Path,
+    layer: Optional[str] = None,
+    force_output_geometrytype: Union[GeometryType, str, None] = None,
+    force_multitype: bool = False,
+    index: Optional[bool] = None,
+):
+    """Write a partial result to a temp file.
+
+    GeoParquet files are written with pyarrow, other formats with :func:`to_file`.
+
+    Args:
+        gdf (gpd.GeoDataFrame): the partial result to write.
+        path (Path): the file to write to.
+        layer (Optional[str], optional): the layer to write to. Defaults to None.
+        force_output_geometrytype (Union[GeometryType, str, None], optional): the
+            geometry type to write. Defaults to None.
+        force_multitype (bool, optional): True to convert single type geometries to
+            the corresponding multi type. Defaults to False.
+        index (Optional[bool], optional): True to write the index as a column.
+            Defaults to None.
+    """
+    if path.suffix.lower() != ".parquet":
+        fileops.to_file(
+            gdf,
+            path,
+            layer=layer,
+            force_output_geometrytype=force_output_geometrytype,
+            force_multitype=force_multitype,
+            index=index,
+            create_spatial_index=False,
+        )
+        return
+
+    if force_multitype and len(gdf) > 0:
+        gdf = gdf.copy()
+        gdf.geometry = _geoseries_util.harmonize_geometrytypes(
+            gdf.geometry, force_multitype=True
+        )
+    if index is None:
+        # Same logic as to_file: only write the index if it is named or not an integer
+        index = list(gdf.index.names) != [None] or not pd.api.types.is_integer_dtype(
+            gdf.index.dtype
+        )
+    gdf.to_parquet(path, index=index)
+
+    # For an empty result, GDAL can only determine the geometry type when merging if it
+    # is in the metadata.
+    if len(gdf) == 0 and force_output_geometrytype is not None:
+        import pyarrow.parquet as pq
+
+        if isinstance(force_output_geometrytype, str):
+            force_output_geometrytype = GeometryType[force_output_geometrytype.upper()]
+        table = pq.read_table(path)
+        metadata = dict(table.schema.metadata)
+        geo = json.loads(metadata[b"geo"])
+        geo["columns"][geo["primary_column"]]["geometry_types"] = [
+            force_output_geometrytype.name_camelcase
+        ]
+        metadata[b"geo"] = json.dumps(geo).encode("utf-8")
+        pq.write_table(table.replace_schema_metadata(metadata), path)
+
+
+def _merge_parquet(src_paths: list[Path], dst_path: Path) -> Optional[Path]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    src_paths = [path for path in src_paths if path.exists()]
+    if len(src_paths) == 0:
+        return None
+
+    # The schemas of the partial files can differ slightly, e.g. a column with only
+    # None values in one batch, so unify them.
+    schemas = [pq.read_schema(path) for path in src_paths]
+    schema = pa.unify_schemas(schemas, promote_options="permissive")
+
+    # Combine the geometry types and the bounding boxes in the GeoParquet metadata
+    geo = json.loads(schemas[0].metadata[b"geo"])
+    geometry_types: set[str] = set()
+    bboxes = []
+    for src_schema in schemas:
+        src_geo = json.loads(src_schema.metadata[b"geo"])
+        column_meta = src_geo["columns"][src_geo["primary_column"]]
+        geometry_types.update(column_meta.get("geometry_types", []))
+        if "bbox" in column_meta:
+            bboxes.append(column_meta["bbox"])
+    column_meta = geo["columns"][geo["primary_column"]]
+    column_meta["geometry_types"] = sorted(geometry_types)
+    column_meta.pop("bbox", None)
+    if len(bboxes) > 0:
+        column_meta["bbox"] = [
+            min(bbox[0] for bbox in bboxes),
+            min(bbox[1] for bbox in bboxes),
+            max(bbox[2] for bbox in bboxes),
+            max(bbox[3] for bbox in bboxes),
+        ]
+    metadata = {**schemas[0].metadata, b"geo": json.dumps(geo).encode("utf-8")}
+    schema = schema.with_metadata(metadata)
+
+    # Copy the data per row group, so only one row group is in memory at a time
+    with pq.ParquetWriter(dst_path, schema) as writer:
+        for path in src_paths:
+            parquet_file = pq.ParquetFile(path)
+            for row_group in range(parquet_file.num_row_groups):
+                table = parquet_file.read_row_group(row_group)
+                columns = [
+                    (
+                        table.column(field.name).cast(field.type)
+                        if field.name in table.column_names
+                        else pa.nulls(len(table), field.type)
+                    )
+                    for field in schema
+                ]
+                writer.write_table(pa.Table.from_arrays(columns, schema=schema))
+            parquet_file.close()
+            path.unlink()
+
+    return dst_path
@@ -0,0 +1,95 @@
+"""Module containing a process-wide cache for the metadata of files."""
+
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Hashable
+from pathlib import Path
+from typing import Any, Callable, Optional, Union
+
+_MAXSIZE = 256
+
+_cache: "OrderedDict[tuple, Any]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def get(
+    path: Union[str, "os.PathLike[Any]"], key: Hashable, compute: Callable[[], Any]
+) -> Any:
+    """Get the cached metadata for a file or compute and cache it.
+
+    The cache is least-recently-used and the entries are keyed on the path, the key
+    and the modification time and size of the file. Hence, if the file is changed, the
+    metadata is computed again. Write operations of geofileops also call
+    :func:`invalidate`, as the modification time isn't always precise enough.
+
+    Args:
+        path (PathLike): the file the metadata is about.
+        key (Hashable): the key for the kind of metadata, including the parameters
+            that influence it.
+        compute (Callable[[], Any]): function that computes the metadata if it isn't
+            cached. Exceptions raised are not cached.
+
+    Returns:
+        Any: the metadata.
+    """
+    signature = _get_signature(path)
+    if signature is None:
+        return compute()
+
+    cache_key = (_normalize(path), key, signature)
+    with _lock:
+        if cache_key in _cache:
+            _cache.move_to_end(cache_key)
+            return _cache[cache_key]
+
+    value = compute()
+    with _lock:
+        _cache[cache_key] = value
+        while len(_cache) > _MAXSIZE:
+            _cache.popitem(last=False)
+
+    return value
+
+
+def invalidate(path: Union[str, "os.PathLike[Any]", None] = None):
+    """Remove the cached metadata for a file.
+
+    Args:
+        path (PathLike, optional): the file to remove the metadata for. If None, the
+            entire cache is cleared. Defaults to None.
+    """
+    with _lock:
+        if path is None:
+            _cache.clear()
+            return
+
+        path_normalized = _normalize(path)
+        for cache_key in [key for key in _cache if key[0] == path_normalized]:
+            del _cache[cache_key]
+
+
+def _normalize(path: Union[str, "os.PathLike[Any]"]) -> str:
+    return os.path.normcase(os.path.abspath(path))
+
+
+def _get_signature(path: Union[str, "os.PathLike[Any]"]) -> Optional[tuple]:
+    # Also check the files that can change without the main file changing: the .dbf
+    # of a shapefile and the write-ahead log of sqlite based files.
+    path = Path(path)
+    paths = [path, path.with_suffix(".dbf") if path.suffix.lower() == ".shp" else None]
+    paths.append(Path(f"{path}-wal"))
+    signature = []
+    for index, curr_path in enumerate(paths):
+        if curr_path is None:
+            continue
+        try:
+            stat = curr_path.stat()
+        except OSError:
+            if index == 0:
+                # The file doesn't exist (anymore), so don't cache anything
+                return None
+            continue
+        signature.append((index, stat.st_mtime_ns, stat.st_size))
+
+    return tuple(signature)
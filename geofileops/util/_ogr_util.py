@@ -14,6 +14,7 @@ from pygeoops import GeometryType
 
 import geofileops as gfo
 from geofileops import _compat, fileops
+from geofileops.util import _metadata_cache
 from geofileops.util._general_util import MissingRuntimeDependencyError
 
 # Make sure only one instance per process is running
@@ -574,6 +575,7 @@ def vector_translate(
     finally:
         output_ds = None
         input_ds = None
+        _metadata_cache.invalidate(output_path)
 
         if gdal_cpl_log_path.exists():
             # Truncate the cpl log file already, because sometimes it is locked and
@@ -755,6 +757,9 @@ def _prepare_gdal_options(options: dict, split_by_option_type: bool = False) ->
 class set_config_options:
     """Context manager to set config options.
 
+    The config options are set thread-local, so operations running concurrently in
+    other threads are not affected.
+
     Args:
         config_options (dict): dict with config options to set.
             `Eg. { "OGR_SQLITE_CACHE", 128 }`
@@ -774,11 +779,11 @@ class set_config_options:
                 value = "YES" if value is True else "NO"
             else:
                 value = str(value)
-            gdal.SetConfigOption(str(name), value)
+            gdal.SetThreadLocalConfigOption(str(name), value)
 
     def __exit__(self, type, value, traceback):
         # Remove config options that were set
         # TODO: delete loop + uncomment if SetConfigOptions() is supported
         for name, _ in self.config_options.items():
-            gdal.SetConfigOption(name, None)
+            gdal.SetThreadLocalConfigOption(name, None)
         # gdal.SetConfigOptions(self.config_options_backup)
@@ -1,46 +1,1145 @@
 """Module containing utilities regarding processes."""
 
+import collections
+import hashlib
+import json
+import logging
+import math
+import multiprocessing
 import os
+import statistics
+import tempfile
+import threading
+import time
+import uuid
+from collections.abc import Iterable, Iterator
 from concurrent import futures
-from typing import Optional
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, NamedTuple, Optional
 
+import numpy as np
 import psutil
 
+from geofileops.helpers._configoptions_helper import ConfigOptions
+
+logger = logging.getLogger(__name__)
+
+
+# The pool shared by all operations, if one is active.
+_shared_pool: Optional[futures.Executor] = None
+
+# The number of batch loops of :class:`AsCompletedSplitStragglers` running per pool.
+_nb_iterating: collections.Counter = collections.Counter()
+_nb_iterating_lock = threading.Lock()
+
+# The number of operations using the shared pool via :class:`PooledExecutorFactory`.
+_nb_shared_pool_users: collections.Counter = collections.Counter()
+_nb_shared_pool_users_lock = threading.Lock()
+
+
+@contextmanager
+def worker_pool(
+    nb_parallel: int = -1,
+    reuse_active: bool = False,
+    executor: Optional[futures.Executor] = None,
+) -> Iterator[futures.Executor]:
+    """Context manager to start a pool of worker processes to be shared.
+
+    By default, each operation starts its own worker processes, which implies some
+    startup overhead because e.g. geopandas and gdal need to be imported in each of
+    them. Within the scope of this context manager, all operations reuse the same
+    worker processes that are started and warmed up only once. This is mainly useful
+    when e.g. many operations are run on small files.
+
+    Remarks:
+        - within this scope, the number of worker processes of the shared pool is used
+          for all operations, regardless of the ``nb_parallel`` specified for them.
+        - it is recommended to only use this in the main process of a script, so within
+          a ``if __name__ == "__main__":`` block.
+
+    Args:
+        nb_parallel (int, optional): the number of worker processes to start. If -1,
+            the number of CPU's available is used. Defaults to -1.
+        reuse_active (bool, optional): True to use the shared pool that is active
+            already, if there is one, instead of starting a new one.
+            Defaults to False.
+        executor (futures.Executor, optional): the executor to use as shared pool
+            instead of starting local worker processes, e.g. a
+            :class:`DirectoryQueueExecutor` to distribute the calculations over
+            multiple machines. It is not shut down when leaving the scope, so it can be
+            reused. If specified, ``nb_parallel`` is ignored: the number of workers is
+            taken from the ``max_workers`` attribute of the executor, if it has one.
+            If the workers run on other machines, the temp dir needs to be on a shared
+            filesystem as well, as the partial results are written there.
+            Defaults to None.
+
+    Yields:
+        futures.Executor: the shared pool.
+
+    Examples:
+        .. code-block:: python
+
+            import geofileops as gfo
+
+            if __name__ == "__main__":
+                with gfo.worker_pool(nb_parallel=4):
+                    for path in paths:
+                        gfo.buffer(path, output_dir / path.name, distance=1)
+
+    """
+    global _shared_pool
+
+    if reuse_active and _shared_pool is not None:
+        yield _shared_pool
+        return
+
+    if executor is not None:
+        from geofileops.util import _queue_executor
+
+        if isinstance(executor, _queue_executor.DirectoryQueueExecutor):
+            executor.check_tempdir()
+
+        previous_pool = _shared_pool
+        try:
+            _shared_pool = executor
+            yield executor
+        finally:
+            _shared_pool = previous_pool
+        return
+
+    if nb_parallel < 1:
+        nb_parallel = cpu_count()
+    if os.name == "nt":
+        nb_parallel = min(nb_parallel, 61)
+
+    pool = futures.ProcessPoolExecutor(
+        max_workers=nb_parallel, initializer=initialize_worker
+    )
+    previous_pool = _shared_pool
+    try:
+        # Warm up the workers so the startup overhead isn't payed by the first
+        # operation that uses them.
+        warm_up_futures = [pool.submit(_warm_up_worker) for _ in range(nb_parallel)]
+        futures.wait(warm_up_futures)
+
+        _shared_pool = pool
+        yield pool
+    finally:
+        _shared_pool = previous_pool
+        pool.shutdown(wait=True)
+
+
+def shared_pool_max_workers() -> Optional[int]:
+    """Determine the number of workers of the active shared pool.
+
+    Returns:
+        Optional[int]: the number of workers, or None if no shared pool is active or
+            if the number of workers isn't known.
+    """
+    if _shared_pool is None:
+        return None
+    return pool_max_workers(_shared_pool)
+
+
+def pool_max_workers(pool: futures.Executor) -> Optional[int]:
+    """Determine the number of workers of a pool.
+
+    Args:
+        pool (futures.Executor): the pool.
+
+    Returns:
+        Optional[int]: the number of workers, or None if it isn't known.
+    """
+    if is_local_pool(pool):
+        return pool._max_workers  # type: ignore[attr-defined]
+    return getattr(pool, "max_workers", None)
+
+
+def is_local_pool(pool: futures.Executor) -> bool:
+    """Check if the workers of a pool run on this machine.
+
+    Args:
+        pool (futures.Executor): the pool.
+
+    Returns:
+        bool: True if the workers run on this machine.
+    """
+    return isinstance(pool, (futures.ProcessPoolExecutor, futures.ThreadPoolExecutor))
+
+
+def can_fork() -> bool:
+    """Check if a new process pool can use forked worker processes.
+
+    Forked workers inherit the memory of this process, but this is only applicable if a
+    new process pool is started, so not if a shared pool is active. Forking while other
+    threads are running, e.g. the steps of :func:`run_dag`, can deadlock the forked
+    workers if one of these threads holds a lock, so this is avoided as well.
+
+    Returns:
+        bool: True if workers can be forked.
+    """
+    return (
+        "fork" in multiprocessing.get_all_start_methods()
+        and _shared_pool is None
+        and threading.active_count() == 1
+    )
+
+
+def _warm_up_worker() -> int:
+    # Import the modules with the largest import overhead
+    import geofileops  # noqa: F401
+    from geofileops.util import _geoops_gpd, _geoops_sql  # noqa: F401
+
+    # Make sure all workers get a call by keeping them busy for a moment
+    time.sleep(0.1)
+    return os.getpid()
+
 
 class PooledExecutorFactory:
     """Context manager to create an Executor.
 
+    If a process pool is asked for within the scope of :func:`worker_pool`, the
+    shared pool is returned instead of creating a new one.
+
     Args:
         threadpool (bool, optional): True to get a ThreadPoolExecutor,
             False to get a ProcessPoolExecutor. Defaults to True.
         max_workers (int, optional): Max number of workers.
             Defaults to None to get automatic determination.
         initialisze (function, optional): Function that does initialisations.
+        mp_context (str, optional): the start method to use for the processes of a
+            process pool, e.g. "fork". If None, the default start method is used. Not
+            applicable for the shared pool. Defaults to None.
     """
 
-    def __init__(self, threadpool: bool = True, max_workers=None, initializer=None):
+    def __init__(
+        self,
+        threadpool: bool = True,
+        max_workers=None,
+        initializer=None,
+        mp_context: Optional[str] = None,
+    ):
         self.threadpool = threadpool
         if max_workers is not None and os.name == "nt":
             self.max_workers = min(max_workers, 61)
         else:
             self.max_workers = max_workers
         self.initializer = initializer
+        self.mp_context = mp_context
         self.pool: Optional[futures.Executor] = None
+        self.shared_pool: Optional[futures.Executor] = None
 
     def __enter__(self) -> futures.Executor:
         if self.threadpool:
             self.pool = futures.ThreadPoolExecutor(
                 max_workers=self.max_workers, initializer=self.initializer
             )
+        elif _shared_pool is not None:
+            self.shared_pool = _shared_pool
+            with _nb_shared_pool_users_lock:
+                _nb_shared_pool_users[id(self.shared_pool)] += 1
+            return _shared_pool
         else:
+            # Remark: by default, ProcessPoolExecutor doesn't take container limits
+            # into account, so determine max_workers explicitly.
+            max_workers = self.max_workers
+            if max_workers is None:
+                max_workers = cpu_count()
+                if os.name == "nt":
+                    max_workers = min(max_workers, 61)
+            mp_context = None
+            if self.mp_context is not None:
+                mp_context = multiprocessing.get_context(self.mp_context)
             self.pool = futures.ProcessPoolExecutor(
-                max_workers=self.max_workers, initializer=self.initializer
+                max_workers=max_workers,
+                initializer=self.initializer,
+                mp_context=mp_context,
             )
         return self.pool
 
     def __exit__(self, type, value, traceback):
+        # Remark: a shared pool is not shut down, as it is not in self.pool
         if self.pool is not None:
             self.pool.shutdown(wait=True)
+        if self.shared_pool is not None:
+            # The workers of a shared pool keep running, so let them release what
+            # they keep for the operation. Releasing needs all workers, so it would
+            # stall other operations using the pool: then the last one releases them.
+            with _nb_shared_pool_users_lock:
+                _nb_shared_pool_users[id(self.shared_pool)] -= 1
+                last_user = _nb_shared_pool_users[id(self.shared_pool)] <= 0
+                if last_user:
+                    del _nb_shared_pool_users[id(self.shared_pool)]
+            if last_user:
+                release_workers(self.shared_pool)
+
+
+class BatchStoppedError(Exception):
+    """Raised by a batch that was asked to stop with :func:`request_stop`."""
+
+
+def request_stop(output_path: Path):
+    """Ask the batch writing to ``output_path`` to stop.
+
+    The batch stops cooperatively: it checks regularly if it should stop with
+    :func:`raise_if_stopped`, so it can take some time before it actually stops.
+
+    Args:
+        output_path (Path): the output file of the batch.
+    """
+    _stop_path(output_path).touch()
+
+
+def raise_if_stopped(output_path: Path):
+    """Raise :class:`BatchStoppedError` if the batch of ``output_path`` should stop.
+
+    Args:
+        output_path (Path): the output file of the batch.
+
+    Raises:
+        BatchStoppedError: if the batch should stop.
+    """
+    if stop_requested(output_path):
+        raise BatchStoppedError(f"batch stopped on request: {output_path}")
+
+
+def stop_requested(output_path: Path) -> bool:
+    """Check if the batch writing to ``output_path`` was asked to stop.
+
+    Args:
+        output_path (Path): the output file of the batch.
+
+    Returns:
+        bool: True if the batch should stop.
+    """
+    return _stop_path(output_path).exists()
+
+
+def _stop_path(output_path: Path) -> Path:
+    return output_path.with_name(f"{output_path.name}.stop")
+
+
+class AsCompletedSplitStragglers:
+    """Iterate over futures of batches as they complete, splitting stragglers.
+
+    Batches that run a lot longer than the batches that were completed before are
+    considered stragglers. If there are idle workers, such a straggler is split in
+    sub-batches to be calculated in parallel, using ``split_batch``. The original
+    batch is asked to stop with ``stop_batch``, so the work isn't done twice. If it
+    completes anyway before it notices, it is used and the sub-batches are discarded.
+    Otherwise, the sub-batches are only yielded once all of them are completed. If a
+    sub-batch fails and the original batch stopped already, the failed sub-batch is
+    yielded so the error can be handled as for any batch. Stragglers are only split if
+    no other batch loops are using the pool at the same time, e.g. for steps of an
+    operation that are run concurrently with :func:`run_dag`: the batches of the other
+    loops make it impossible to determine if workers are idle.
+
+    The discarded batches that are still running when the iteration is done are not
+    waited for, but the pool stays usable, e.g. to merge the partial results. Once the
+    pool isn't needed anymore, :meth:`terminate_discarded` can be used to avoid having
+    to wait for them when the pool is shut down.
+
+    Args:
+        pool (futures.Executor): the pool the futures are running in.
+        future_to_batch_id (dict): the futures to wait for with their batch id.
+        split_batch (Callable, optional): function ``split_batch(batch_id, nb_parts)``
+            that submits sub-batches covering the batch with ``batch_id`` to the pool
+            and returns a dict with the futures of the sub-batches and their batch id.
+            If the batch cannot be split, an empty dict should be returned. If None,
+            stragglers are not split. Defaults to None.
+        stop_batch (Callable, optional): function ``stop_batch(batch_id)`` that asks
+            a running batch to stop, after which it should raise
+            :class:`BatchStoppedError`. It is called for stragglers once they are split
+            and for sub-batches that are discarded. If None, they keep running till
+            they are done. Defaults to None.
+        nb_workers (int, optional): the number of workers in the pool. Defaults to 1.
+        straggler_factor (float, optional): a batch is a straggler if it is running
+            more than this factor times the median duration of the batches completed
+            already. Defaults to 3.
+        straggler_min_seconds (float, optional): a batch is never considered a
+            straggler if it is running less than this number of seconds.
+            Defaults to 60.
+        poll_interval (float, optional): the interval in seconds to check for
+            stragglers and for the memory usage. Defaults to 1.
+        to_submit (list, optional): batches that still need to be submitted to the
+            pool, as a list of tuples with the batch id and a function without
+            arguments that submits the batch and returns its future. If a
+            ``memory_monitor`` is specified, they are only submitted when the memory
+            usage allows it, otherwise they are submitted immediately.
+            Defaults to None.
+        memory_monitor (MemoryMonitor, optional): the monitor that determines how many
+            batches can run concurrently. Defaults to None.
+    """
+
+    def __init__(
+        self,
+        pool: futures.Executor,
+        future_to_batch_id: dict[futures.Future, Any],
+        split_batch: Optional[Callable[[Any, int], dict[futures.Future, Any]]] = None,
+        stop_batch: Optional[Callable[[Any], None]] = None,
+        nb_workers: int = 1,
+        straggler_factor: float = 3.0,
+        straggler_min_seconds: float = 60.0,
+        poll_interval: float = 1.0,
+        to_submit: Optional[list[tuple[Any, Callable[[], futures.Future]]]] = None,
+        memory_monitor: Optional["MemoryMonitor"] = None,
+    ):
+        self.pool = pool
+        self.future_to_batch_id = dict(future_to_batch_id)
+        self.to_submit = list(to_submit) if to_submit is not None else []
+        self.memory_monitor = memory_monitor
+        self.split_batch = split_batch
+        self.stop_batch = stop_batch
+        self.nb_workers = nb_workers
+        self.straggler_factor = straggler_factor
+        self.straggler_min_seconds = straggler_min_seconds
+        self.poll_interval = poll_interval
+        self.nb_done = 0
+        """The number of original batches that were yielded entirely."""
+        self.nb_split = 0
+        """The number of batches that were split."""
+        self._discarded: set[futures.Future] = set()
+
+    def __iter__(self) -> Iterator[tuple[futures.Future, Any]]:
+        """Yield the futures to use the results of, with their batch id.
+
+        Yields:
+            Iterator[tuple[futures.Future, Any]]: the future and the batch id.
+        """
+        start_times: dict[futures.Future, float] = {}
+        durations: list[float] = []
+        parent_to_subs: dict[futures.Future, list[futures.Future]] = {}
+        sub_to_parent: dict[futures.Future, futures.Future] = {}
+        not_splittable: set[futures.Future] = set()
+        failed_subs: dict[futures.Future, futures.Future] = {}
+        discarded = self._discarded
+        yielded_subs: set[futures.Future] = set()
+
+        with _nb_iterating_lock:
+            _nb_iterating[id(self.pool)] += 1
+        try:
+            not_done = set(self.future_to_batch_id)
+            self._submit(not_done)
+            while len(not_done) > 0:
+                poll = self.split_batch is not None or len(self.to_submit) > 0
+                done, not_done = futures.wait(
+                    not_done,
+                    timeout=self.poll_interval if poll else None,
+                    return_when=futures.FIRST_COMPLETED,
+                )
+                now = time.perf_counter()
+                for future in not_done:
+                    if future not in start_times and future.running():
+                        start_times[future] = now
+
+                for future in done:
+                    if future in discarded or future in yielded_subs:
+                        continue
+
+                    if future in sub_to_parent:
+                        parent = sub_to_parent[future]
+                        subs = parent_to_subs[parent]
+                        failed = [sub for sub in subs if sub.done() and _failed(sub)]
+                        if len(failed) > 0:
+                            # The split failed, so the original batch is used after
+                            # all, unless it stopped already.
+                            failed_sub = failed[0]
+                            if not failed_sub.cancelled():
+                                logger.debug(
+                                    f"sub-batch failed: {failed_sub.exception()}"
+                                )
+                            others = [sub for sub in subs if sub is not failed_sub]
+                            self._discard_subs(others, discarded, not_done)
+                            del parent_to_subs[parent]
+                            for sub in subs:
+                                del sub_to_parent[sub]
+                            not_splittable.add(parent)
+                            # The failed sub-batch is only yielded once, and only
+                            # if its parent stopped.
+                            yielded_subs.add(failed_sub)
+                            if parent.done() and _is_stopped(parent):
+                                discarded.add(parent)
+                                self.nb_done += 1
+                                yield failed_sub, self.future_to_batch_id[failed_sub]
+                            else:
+                                failed_subs[parent] = failed_sub
+                            continue
+                        if all(sub.done() for sub in subs):
+                            # All sub-batches are ready, so the original isn't needed.
+                            # Remark: other sub-batches of the parent can be in done as
+                            # well, so forget about them to yield them only once.
+                            self._discard([parent], discarded, not_done)
+                            del parent_to_subs[parent]
+                            for sub in subs:
+                                del sub_to_parent[sub]
+                                yielded_subs.add(sub)
+                            for index, sub in enumerate(subs):
+                                if index == len(subs) - 1:
+                                    self.nb_done += 1
+                                yield sub, self.future_to_batch_id[sub]
+                        continue
+
+                    # The future of an original batch
+                    if _is_stopped(future):
+                        if future in parent_to_subs:
+                            # The sub-batches will cover the range of the batch
+                            continue
+                        if future in failed_subs:
+                            # Neither the batch nor its sub-batches succeeded
+                            failed_sub = failed_subs.pop(future)
+                            self.nb_done += 1
+                            yield failed_sub, self.future_to_batch_id[failed_sub]
+                            continue
+                    if future in start_times:
+                        durations.append(now - start_times[future])
+                    if future in parent_to_subs:
+                        # The original batch was faster than its sub-batches
+                        subs = parent_to_subs.pop(future)
+                        self._discard_subs(subs, discarded, not_done)
+                    failed_subs.pop(future, None)
+                    self.nb_done += 1
+                    yield future, self.future_to_batch_id[future]
+
+                self._submit(not_done)
+                if self.split_batch is not None:
+                    self._split_stragglers(
+                        not_done,
+                        start_times,
+                        durations,
+                        parent_to_subs,
+                        sub_to_parent,
+                        not_splittable,
+                        now,
+                    )
+        finally:
+            with _nb_iterating_lock:
+                _nb_iterating[id(self.pool)] -= 1
+                if _nb_iterating[id(self.pool)] <= 0:
+                    del _nb_iterating[id(self.pool)]
+
+    def terminate_discarded(self):
+        """Stop the discarded batches that are still running.
+
+        For a process pool, this terminates the workers of the pool, so it should only
+        be called when the pool isn't used anymore.
+        """
+        if any(not future.done() for future in self._discarded):
+            terminate_pool(self.pool)
+
+    def _split_stragglers(
+        self,
+        not_done: set[futures.Future],
+        start_times: dict[futures.Future, float],
+        durations: list[float],
+        parent_to_subs: dict[futures.Future, list[futures.Future]],
+        sub_to_parent: dict[futures.Future, futures.Future],
+        not_splittable: set[futures.Future],
+        now: float,
+    ):
+        # Only split if there is nothing left to do for idle workers and if no other
+        # batch loops use the pool, as then it is unknown if workers are idle.
+        with _nb_iterating_lock:
+            pool_shared = _nb_iterating[id(self.pool)] > 1
+        if (
+            pool_shared
+            or len(durations) == 0
+            or len(self.to_submit) > 0
+            or any(f not in start_times for f in not_done)
+        ):
+            return
+        nb_idle = self.nb_workers - len(not_done)
+        if self.memory_monitor is not None:
+            # Workers are idle on purpose if memory is short
+            nb_idle = min(nb_idle, self.memory_monitor.concurrency - len(not_done))
+        if nb_idle <= 0:
+            return
+
+        threshold = max(
+            self.straggler_min_seconds,
+            self.straggler_factor * statistics.median(durations),
+        )
+        running = sorted(
+            (f for f in not_done if f in start_times), key=lambda f: start_times[f]
+        )
+        for future in running:
+            if (
+                future in sub_to_parent
+                or future in parent_to_subs
+                or future in not_splittable
+                or now - start_times[future] < threshold
+            ):
+                continue
+
+            assert self.split_batch is not None
+            batch_id = self.future_to_batch_id[future]
+            subs = self.split_batch(batch_id, max(nb_idle, 2))
+            if len(subs) == 0:
+                not_splittable.add(future)
+                continue
+
+            logger.info(
+                f"batch {batch_id} running for {now - start_times[future]:.0f}s, so "
+                f"split it in {len(subs)} sub-batches"
+            )
+            self.nb_split += 1
+            if self.stop_batch is not None:
+                # The sub-batches take over, so the work isn't done twice
+                self.stop_batch(batch_id)
+            self.future_to_batch_id.update(subs)
+            parent_to_subs[future] = list(subs)
+            for sub in subs:
+                sub_to_parent[sub] = future
+            not_done.update(subs)
+            nb_idle -= len(subs)
+            if nb_idle <= 0:
+                break
+
+    def _submit(self, not_done: set[futures.Future]):
+        if len(self.to_submit) == 0:
+            return
+        if self.memory_monitor is None:
+            nb_to_submit = len(self.to_submit)
+        else:
+            nb_to_submit = self.memory_monitor.nb_to_admit(nb_running=len(not_done))
+
+        for batch_id, submit in self.to_submit[:nb_to_submit]:
+            future = submit()
+            self.future_to_batch_id[future] = batch_id
+            not_done.add(future)
+        self.to_submit = self.to_submit[nb_to_submit:]
+
+    def _discard_subs(
+        self,
+        subs: list[futures.Future],
+        discarded: set[futures.Future],
+        not_done: set[futures.Future],
+    ):
+        self._discard(subs, discarded, not_done)
+        if self.stop_batch is not None:
+            for sub in subs:
+                if not sub.done():
+                    self.stop_batch(self.future_to_batch_id[sub])
+
+    @staticmethod
+    def _discard(
+        to_discard: list[futures.Future],
+        discarded: set[futures.Future],
+        not_done: set[futures.Future],
+    ):
+        for future in to_discard:
+            future.cancel()
+            discarded.add(future)
+            not_done.discard(future)
+
+
+def _failed(future: futures.Future) -> bool:
+    """Check if a future that is done was cancelled or raised an exception."""
+    return future.cancelled() or future.exception() is not None
+
+
+def _is_stopped(future: futures.Future) -> bool:
+    """Check if a future that is done stopped with :class:`BatchStoppedError`."""
+    return not future.cancelled() and isinstance(future.exception(), BatchStoppedError)
+
+
+class MemoryMonitor:
+    """Determine how many batches can run concurrently based on the memory usage.
+
+    The memory used on the system and the resident memory (RSS) of the worker
+    processes are checked with psutil. The largest RSS of a worker is used as an
+    estimate of the memory another batch will need. If starting another batch would
+    make the memory used on the system exceed the ceiling, the concurrency is lowered
+    and no new batches are admitted till memory is available again. Once memory is
+    available again, the concurrency is raised again.
+
+    Args:
+        pool (futures.Executor): the pool the batches are running in.
+        max_concurrency (int): the maximum number of batches to run concurrently.
+        ceiling (float, optional): the percentage of the total memory of the system
+            that may be used. Defaults to None, then
+            :attr:`ConfigOptions.memory_ceiling` is used.
+    """
+
+    def __init__(
+        self,
+        pool: futures.Executor,
+        max_concurrency: int,
+        ceiling: Optional[float] = None,
+    ):
+        if ceiling is None:
+            ceiling = ConfigOptions.memory_ceiling
+        self.pool = pool
+        self.max_concurrency = max(max_concurrency, 1)
+        self.ceiling = ceiling
+        self.ceiling_bytes = memory_info().total * ceiling / 100
+        self.concurrency = self.max_concurrency
+        """The number of batches that can run concurrently at the moment."""
+        self.nb_throttled = 0
+        """The number of times the concurrency was lowered."""
+
+    def nb_to_admit(self, nb_running: int) -> int:
+        """Determine the number of batches that can be started now.
+
+        Args:
+            nb_running (int): the number of batches that are running.
+
+        Returns:
+            int: the number of batches that can be started.
+        """
+        # Only the memory of local pools can be monitored
+        if not is_local_pool(self.pool):
+            return max(self.max_concurrency - nb_running, 0)
+
+        memory = memory_info()
+        headroom = self.ceiling_bytes - (memory.total - memory.available)
+        workers_rss = _get_workers_rss(self.pool)
+        bytes_per_batch = max(workers_rss) if len(workers_rss) > 0 else 0
+
+        if bytes_per_batch > 0:
+            concurrency = nb_running + math.floor(headroom / bytes_per_batch)
+        elif headroom > 0:
+            concurrency = self.max_concurrency
+        else:
+            concurrency = nb_running - 1
+        # Remark: the concurrency is at least 1, so a batch is always admitted when
+        # none are running.
+        concurrency = min(max(concurrency, 1), self.max_concurrency)
+
+        if concurrency != self.concurrency:
+            used_percent = 100 - memory.available / memory.total * 100
+            if concurrency < self.concurrency:
+                self.nb_throttled += 1
+                change = "lowered"
+            else:
+                change = "raised"
+            logger.info(
+                f"memory used: {used_percent:.0f}% (ceiling: {self.ceiling:.0f}%), "
+                f"max worker RSS: {bytes_per_batch / 1024 / 1024:.0f} MB, so the "
+                f"concurrency is {change} from {self.concurrency} to {concurrency}"
+            )
+            self.concurrency = concurrency
+
+        return max(self.concurrency - nb_running, 0)
+
+
+def _get_workers_rss(pool: futures.Executor) -> list[int]:
+    # Only the workers of a process pool can be monitored seperately
+    if not isinstance(pool, futures.ProcessPoolExecutor):
+        return []
+
+    workers_rss = []
+    processes = getattr(pool, "_processes", None) or {}
+    for pid in list(processes):
+        try:
+            workers_rss.append(psutil.Process(pid).memory_info().rss)
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+    return workers_rss
+
+
+class ResumeManifest:
+    """Keeps track of the batches of an operation that were completed.
+
+    This way, when an operation is interrupted, the batches that were completed don't
+    need to be calculated again when it is resumed. The manifest is saved as a json
+    file in the tempdir of the operation after each change.
+
+    The manifest is only reused if its fingerprint is the same, so it should contain
+    all info that determines the result of the batches, e.g. the batch filters, the
+    input files and the parameters of the operation.
+
+    Args:
+        path (Path): the path to save the manifest to.
+        fingerprint (dict): the info that determines the result of the batches. Values
+            that can't be serialized to json are converted to a string.
+    """
+
+    def __init__(self, path: Path, fingerprint: dict):
+        self.path = path
+        try:
+            fingerprint_json = json.dumps(
+                fingerprint, sort_keys=True, default=_fingerprint_default
+            )
+            self.fingerprint = hashlib.sha256(fingerprint_json.encode()).hexdigest()
+        except (ValueError, RecursionError) as ex:
+            # If no fingerprint can be determined, the manifest is never reused
+            logger.info(f"fingerprint could not be determined: {ex}")
+            self.fingerprint = uuid.uuid4().hex
+        self._completed: dict[str, list[str]] = {}
+
+        if path.exists():
+            with open(path) as file:
+                manifest = json.load(file)
+            if manifest.get("fingerprint") == self.fingerprint:
+                self._completed = manifest["completed"]
+            else:
+                logger.info(f"{path} is for other input or parameters, so it is reset")
+
+    def is_completed(self, batch_id: Any) -> bool:
+        """Check if the batch was completed and all of its output files still exist.
+
+        Args:
+            batch_id (Any): the batch id.
+
+        Returns:
+            bool: True if the batch was completed.
+        """
+        paths = self._completed.get(str(batch_id))
+        if paths is None:
+            return False
+        return all(Path(path).exists() for path in paths)
+
+    def set_completed(self, batch_id: Any, output_paths: Iterable[Path]):
+        """Mark the batch as completed.
+
+        Args:
+            batch_id (Any): the batch id.
+            output_paths (Iterable[Path]): the output files of the batch. Those that
+                don't exist are ignored, as the batch didn't have output for them.
+        """
+        self._completed[str(batch_id)] = [
+            str(path) for path in output_paths if path.exists()
+        ]
+        manifest = {"fingerprint": self.fingerprint, "completed": self._completed}
+
+        # Write to a temp file first, so the manifest is never written partially
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w") as file:
+            json.dump(manifest, file, indent=4)
+        os.replace(tmp_path, self.path)
+
+
+def _fingerprint_default(obj: Any) -> Any:
+    # Functions are identified by their code and the variables they refer to
+    if callable(obj) and hasattr(obj, "__code__"):
+        closure = [cell.cell_contents for cell in obj.__closure__ or []]
+        return [
+            obj.__qualname__,
+            obj.__code__.co_code.hex(),
+            repr(obj.__code__.co_consts),
+            closure,
+        ]
+    return str(obj)
+
+
+def run_dag(
+    steps: dict[str, tuple[Callable[[], Any], list[str]]],
+    max_workers: Optional[int] = None,
+) -> dict[str, Any]:
+    """Run steps concurrently, each as soon as the steps it depends on are done.
+
+    The steps are run in threads of the current process. They typically submit their
+    calculations to the pool shared via :func:`worker_pool`, so the batches of steps
+    that don't depend on each other are calculated interleaved and keep all workers
+    busy.
+
+    If a step fails, no new steps are started and the exception is raised once the
+    steps that are running already are done.
+
+    Args:
+        steps (dict[str, tuple[Callable[[], Any], list[str]]]): the steps to run by
+            name, as tuples of a function without arguments and the names of the
+            steps it depends on.
+        max_workers (int, optional): the maximum number of steps to run concurrently.
+            Defaults to None, then all steps that can be run are run concurrently.
+
+    Raises:
+        ValueError: if a step depends on an unknown step or on itself via other
+            steps.
+
+    Returns:
+        dict[str, Any]: the results of the steps by name.
+    """
+    for name, (_, depends_on) in steps.items():
+        unknown = [dependency for dependency in depends_on if dependency not in steps]
+        if len(unknown) > 0:
+            raise ValueError(f"step {name} depends on unknown steps: {unknown}")
+
+    results: dict[str, Any] = {}
+    to_run = dict(steps)
+    running: dict[futures.Future, str] = {}
+    with futures.ThreadPoolExecutor(max_workers=max_workers or len(steps) or 1) as pool:
+        while len(to_run) > 0 or len(running) > 0:
+            for name, (func, depends_on) in list(to_run.items()):
+                if all(dependency in results for dependency in depends_on):
+                    running[pool.submit(func)] = name
+                    del to_run[name]
+            if len(running) == 0:
+                raise ValueError(f"steps with circular dependencies: {list(to_run)}")
+
+            done, _ = futures.wait(running, return_when=futures.FIRST_COMPLETED)
+            for future in done:
+                results[running.pop(future)] = future.result()
+
+    return results
+
+
+def split_range(start: int, end: int, nb_parts: int) -> list[tuple[int, int]]:
+    """Split the range of integers from start to end (inclusive) in parts.
+
+    Args:
+        start (int): the start of the range.
+        end (int): the end of the range, inclusive.
+        nb_parts (int): the number of parts to split the range in.
+
+    Returns:
+        list[tuple[int, int]]: the (start, end) of the parts, end inclusive. If the
+            range is smaller than ``nb_parts``, less parts are returned.
+    """
+    bounds = np.unique(np.linspace(start, end + 1, nb_parts + 1).astype(np.int64))
+    return [
+        (int(part_start), int(part_end) - 1)
+        for part_start, part_end in zip(bounds[:-1], bounds[1:])
+    ]
+
+
+def release_worker():
+    """Release the resources the current worker keeps between the tasks.
+
+    Workers e.g. keep a connection to the input files of an operation open between
+    its batches. In a pool that is used for multiple operations, they need to be
+    released at the end of an operation, otherwise the files stay open.
+    """
+    from geofileops.util import _sqlite_util
+
+    _sqlite_util.close_worker_connection()
+
+
+def release_workers(pool: futures.Executor, timeout_s: float = 5.0):
+    """Run :func:`release_worker` in all workers of a process pool.
+
+    For other pools, nothing is done: the workers of a thread pool stop when the pool
+    is shut down and the workers of a :class:`DirectoryQueueExecutor` release the
+    resources themselves when they become idle.
+
+    All workers need to get a task, so while they are busy with calculations of other
+    operations, the release waits for them. Hence, it should only be used if no other
+    operations are using the pool.
+
+    Args:
+        pool (futures.Executor): the pool to release the workers of.
+        timeout_s (float, optional): the maximum time in seconds to wait for all
+            workers to be available, e.g. if they are busy with other operations.
+            Defaults to 5.
+    """
+    if not isinstance(pool, futures.ProcessPoolExecutor):
+        return
+
+    # Remark: each task waits till a task was started in all workers, so every
+    # worker gets one.
+    nb_workers = pool_max_workers(pool) or 1
+    with tempfile.TemporaryDirectory(prefix="geofileops_release_") as tmp_dir:
+        try:
+            tasks = [
+                pool.submit(_release_worker_task, Path(tmp_dir), nb_workers, timeout_s)
+                for _ in range(nb_workers)
+            ]
+        except RuntimeError as ex:
+            # The pool was shut down or is broken, so the workers are stopped already
+            logger.debug(f"release_workers not possible: {ex}")
+            return
+        futures.wait(tasks)
+
+
+def _release_worker_task(rendezvous_dir: Path, nb_workers: int, timeout_s: float):
+    release_worker()
+    (rendezvous_dir / str(os.getpid())).touch()
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        if sum(1 for _ in rendezvous_dir.iterdir()) >= nb_workers:
+            break
+        time.sleep(0.01)
+
+
+def terminate_pool(pool: futures.Executor):
+    """Shut down a pool without waiting for the running calculations.
+
+    For a process pool, the worker processes are terminated. For a thread pool this is
+    not possible, so the running calculations will still be waited for when the pool
+    is shut down. The shared pool of :func:`worker_pool` is left untouched.
+
+    Args:
+        pool (futures.Executor): the pool to terminate.
+    """
+    if pool is _shared_pool:
+        # The shared pool needs to stay usable, so the calculations can't be stopped
+        return
+
+    pool.shutdown(wait=False, cancel_futures=True)
+    if isinstance(pool, futures.ProcessPoolExecutor):
+        # There is no public API to stop running calculations in a process pool
+        processes = getattr(pool, "_processes", None) or {}
+        for process in list(processes.values()):
+            if process.is_alive():
+                process.terminate()
+
+
+class MemoryInfo(NamedTuple):
+    """The memory available to this process, in bytes."""
+
+    total: int
+    available: int
+
+
+def cpu_count() -> int:
+    """Determine the number of CPU's this process can use.
+
+    Next to the number of CPU's of the system, this takes into account:
+        - the CPU's this process is restricted to (CPU affinity), e.g. via taskset.
+        - the CPU quota of the cgroup (v1 or v2) the process runs in, e.g. the CPU
+          limit of a docker container or a kubernetes pod.
+
+    Returns:
+        int: the number of CPU's available, at least 1.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        nb_cpus = len(os.sched_getaffinity(0))
+    else:
+        nb_cpus = multiprocessing.cpu_count()
+
+    cpu_quota = _get_cgroup_cpu_quota()
+    if cpu_quota is not None:
+        nb_cpus = min(nb_cpus, math.ceil(cpu_quota))
+
+    return max(nb_cpus, 1)
+
+
+def memory_info() -> MemoryInfo:
+    """Determine the memory this process can use.
+
+    Next to the memory of the system, this takes into account the memory limit of the
+    cgroup (v1 or v2) the process runs in, e.g. the memory limit of a docker
+    container or a kubernetes pod.
+
+    Returns:
+        MemoryInfo: the total and available memory in bytes.
+    """
+    memory = psutil.virtual_memory()
+    total = memory.total
+    available = memory.available
+
+    cgroup_memory = _get_cgroup_memory()
+    if cgroup_memory is not None:
+        limit, usage = cgroup_memory
+        total = min(total, limit)
+        available = min(available, max(limit - usage, 0))
+
+    return MemoryInfo(total=total, available=available)
+
+
+# Values of cgroup v1 limits above this are considered as unlimited
+_CGROUP_V1_UNLIMITED = 2**62
+
+
+def _get_cgroup_cpu_quota(
+    cgroup_root: Path = Path("/sys/fs/cgroup"),
+    proc_cgroup_path: Path = Path("/proc/self/cgroup"),
+) -> Optional[float]:
+    # Returns the (lowest) CPU quota of the cgroup hierarchy, in CPU's, or None
+    quotas = []
+    if (cgroup_root / "cgroup.controllers").exists():
+        # cgroup v2: cpu.max contains "<quota> <period>" or "max <period>"
+        for cgroup_dir in _get_cgroup_dirs(cgroup_root, "", proc_cgroup_path):
+            value = _read_cgroup_file(cgroup_dir / "cpu.max")
+            if value is None:
+                continue
+            quota, _, period = value.partition(" ")
+            if quota != "max" and period != "":
+                quotas.append(int(quota) / int(period))
+    else:
+        # cgroup v1: quota is -1 if unlimited
+        for controller in ["cpu,cpuacct", "cpu"]:
+            for cgroup_dir in _get_cgroup_dirs(
+                cgroup_root / controller, "cpu", proc_cgroup_path
+            ):
+                quota = _read_cgroup_file(cgroup_dir / "cpu.cfs_quota_us")
+                period = _read_cgroup_file(cgroup_dir / "cpu.cfs_period_us")
+                if quota is None or period is None or int(quota) <= 0:
+                    continue
+                quotas.append(int(quota) / int(period))
+
+    return min(quotas) if len(quotas) > 0 else None
+
+
+def _get_cgroup_memory(
+    cgroup_root: Path = Path("/sys/fs/cgroup"),
+    proc_cgroup_path: Path = Path("/proc/self/cgroup"),
+) -> Optional[tuple[int, int]]:
+    # Returns the (lowest) memory limit of the cgroup hierarchy with the memory used in
+    # that cgroup, in bytes, or None. Inactive file cache is not considered as used,
+    # as it can be reclaimed.
+    if (cgroup_root / "cgroup.controllers").exists():
+        controller_root = cgroup_root
+        controller = ""
+        limit_file, usage_file, inactive_key = (
+            "memory.max",
+            "memory.current",
+            "inactive_file",
+        )
+    else:
+        controller_root = cgroup_root / "memory"
+        controller = "memory"
+        limit_file, usage_file, inactive_key = (
+            "memory.limit_in_bytes",
+            "memory.usage_in_bytes",
+            "total_inactive_file",
+        )
+
+    result = None
+    for cgroup_dir in _get_cgroup_dirs(controller_root, controller, proc_cgroup_path):
+        limit = _read_cgroup_file(cgroup_dir / limit_file)
+        if limit is None or limit == "max" or int(limit) >= _CGROUP_V1_UNLIMITED:
+            continue
+        if result is not None and int(limit) >= result[0]:
+            continue
+
+        usage = int(_read_cgroup_file(cgroup_dir / usage_file) or 0)
+        stat = _read_cgroup_file(cgroup_dir / "memory.stat") or ""
+        for line in stat.splitlines():
+            key, _, value = line.partition(" ")
+            if key == inactive_key:
+                usage = max(usage - int(value), 0)
+                break
+        result = (int(limit), usage)
+
+    return result
+
+
+def _get_cgroup_dirs(
+    controller_root: Path, controller: str, proc_cgroup_path: Path
+) -> list[Path]:
+    # Determine the cgroup directories of this process for the controller, from the
+    # cgroup of the process up to the root, as limits of all of them apply.
+    # Remark: in a container, the cgroup path is often not visible as the cgroup of
+    # the container is mounted as root, so the root is always included.
+    relative_path = None
+    content = _read_cgroup_file(proc_cgroup_path) or ""
+    for line in content.splitlines():
+        # Lines are formatted as "<id>:<controllers>:<path>", with "0::<path>" for v2
+        _, controllers, path = line.split(":", maxsplit=2)
+        if controller in controllers.split(",") or controllers == controller:
+            relative_path = path.lstrip("/")
+            break
+
+    cgroup_dirs = []
+    if relative_path:
+        cgroup_dir = controller_root / relative_path
+        while cgroup_dir != controller_root:
+            if cgroup_dir.exists():
+                cgroup_dirs.append(cgroup_dir)
+            cgroup_dir = cgroup_dir.parent
+    if controller_root.exists():
+        cgroup_dirs.append(controller_root)
+
+    return cgroup_dirs
+
+
+def _read_cgroup_file(path: Path) -> Optional[str]:
+    try:
+        return path.read_text().strip()
+    except (OSError, ValueError):
+        return None
 
 
 def initialize_worker():
@@ -0,0 +1,419 @@
+"""Module containing an executor that distributes tasks via a directory."""
+
+import logging
+import os
+import pickle
+import socket
+import tempfile
+import threading
+import time
+import uuid
+import warnings
+from concurrent import futures
+from pathlib import Path
+from typing import Any, Callable, Optional, Union
+
+import cloudpickle
+
+from geofileops.util import _processing_util
+
+logger = logging.getLogger(__name__)
+
+_PENDING_DIR = "pending"
+_RUNNING_DIR = "running"
+_DONE_DIR = "done"
+
+
+class DirectoryQueueExecutor(futures.Executor):
+    """Executor that distributes tasks via a job queue in a directory.
+
+    The tasks submitted are saved as files in ``queue_dir``. They are executed by worker
+    processes that poll this directory. Workers can be started on any machine that can
+    access the directory, e.g. on a shared network filesystem, with:
+
+    .. code-block:: console
+
+        python -m geofileops.worker <queue_dir>
+
+    To run operations on the workers, use the executor as shared pool in
+    :func:`worker_pool`.
+
+    Remarks:
+        - the functions submitted, their arguments and their results are serialized
+          with cloudpickle, so the workers need compatible versions of python and of
+          the packages used.
+        - the paths used in the operations need to be accessible for the workers with
+          the same path as for the main process.
+        - **the partial results of the operations are written to the temp dir of the
+          main process**, so it needs to be on the shared filesystem as well and
+          accessible with the same path for the workers. Set the ``TMPDIR``
+          environment variable of the main process to a directory on the shared
+          filesystem to accomplish this. :func:`worker_pool` gives a warning if the
+          temp dir isn't on the same filesystem as ``queue_dir``.
+        - the workers touch the file of the task they are executing regularly. If
+          this stops for more than ``stale_timeout`` seconds, e.g. because the worker
+          was killed, the task fails so the operation doesn't wait forever. The task
+          is not retried.
+
+    Args:
+        queue_dir (Union[str, os.PathLike]): the directory to use as job queue. It is
+            created if it doesn't exist yet.
+        poll_interval (float, optional): the interval in seconds to check for tasks
+            that were completed by the workers. Defaults to 0.5.
+        max_workers (int, optional): the total number of workers that process the
+            queue. It is used to determine the number of batches of an operation and
+            how many of them are submitted at the same time. Defaults to None, then
+            the number of CPU's of this machine is used.
+        stale_timeout (float, optional): the number of seconds after which a task is
+            considered failed if its worker stopped sending heartbeats. Should be a lot
+            larger than the ``heartbeat_interval`` of the workers. Defaults to 60.
+
+    Examples:
+        .. code-block:: python
+
+            import geofileops as gfo
+
+            if __name__ == "__main__":
+                executor = gfo.DirectoryQueueExecutor(
+                    "/mnt/shared/gfo_queue", max_workers=64
+                )
+                with gfo.worker_pool(executor=executor):
+                    gfo.buffer(input_path, output_path, distance=1)
+
+    """
+
+    def __init__(
+        self,
+        queue_dir: Union[str, "os.PathLike[Any]"],
+        poll_interval: float = 0.5,
+        max_workers: Optional[int] = None,
+        stale_timeout: float = 60.0,
+    ):
+        """Constructor of DirectoryQueueExecutor.
+
+        Args:
+            queue_dir (Union[str, os.PathLike]): the directory to use as job queue.
+            poll_interval (float, optional): the interval in seconds to check for
+                tasks that were completed. Defaults to 0.5.
+            max_workers (int, optional): the total number of workers that process
+                the queue. Defaults to None, then the number of CPU's of this machine
+                is used.
+            stale_timeout (float, optional): the number of seconds after which a task
+                is considered failed if its worker stopped sending heartbeats.
+                Defaults to 60.
+        """
+        if max_workers is not None and max_workers < 1:
+            raise ValueError(f"max_workers should be at least 1, not {max_workers}")
+
+        self.queue_dir = Path(queue_dir)
+        self.poll_interval = poll_interval
+        self.stale_timeout = stale_timeout
+        self.max_workers = (
+            max_workers if max_workers is not None else _processing_util.cpu_count()
+        )
+        for subdir in (_PENDING_DIR, _RUNNING_DIR, _DONE_DIR):
+            (self.queue_dir / subdir).mkdir(parents=True, exist_ok=True)
+
+        # The prefix makes the task ids unique if the queue is shared by executors
+        self._prefix = uuid.uuid4().hex
+        self._nb_submitted = 0
+        self._futures: dict[str, futures.Future] = {}
+        # The last modification time seen of the running tasks + when it was seen
+        self._heartbeats: dict[str, tuple[int, float]] = {}
+        self._lock = threading.Lock()
+        self._shutdown = False
+        self._poller: Optional[threading.Thread] = None
+
+    def check_tempdir(self):
+        """Check if the temp dir is probably accessible for the workers.
+
+        The partial results of the operations are written to the temp dir, so it
+        should be on the shared filesystem as well. As it is hard to check this
+        reliably, a warning is given if it is on another filesystem than the queue dir.
+        """
+        tempdir = Path(tempfile.gettempdir())
+        if not _same_filesystem(tempdir, self.queue_dir):
+            warnings.warn(
+                f"the temp dir {tempdir} is on another filesystem than the queue dir "
+                f"{self.queue_dir}. The partial results of operations are written to "
+                "the temp dir, so it must be accessible for all workers with the same "
+                "path. If needed, set the TMPDIR environment variable to a directory "
+                "on the shared filesystem.",
+                stacklevel=2,
+            )
+
+    def submit(self, fn: Callable, /, *args, **kwargs) -> futures.Future:
+        """Submit a task to the queue.
+
+        Args:
+            fn (Callable): the function to execute.
+            *args: the positional arguments for the function.
+            **kwargs: the keyword arguments for the function.
+
+        Returns:
+            futures.Future: the future representing the task.
+        """
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new futures after shutdown")
+
+            task_id = f"{self._prefix}_{self._nb_submitted:08d}"
+            self._nb_submitted += 1
+            _write_atomic(
+                self.queue_dir / _PENDING_DIR / f"{task_id}.pkl",
+                cloudpickle.dumps((fn, args, kwargs)),
+            )
+            future: futures.Future = futures.Future()
+            self._futures[task_id] = future
+
+            if self._poller is None:
+                self._poller = threading.Thread(target=self._poll, daemon=True)
+                self._poller.start()
+
+        return future
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False):
+        """Stop accepting tasks and clean up the resources of the executor.
+
+        The workers are not stopped, as they can be shared by multiple executors.
+
+        Args:
+            wait (bool, optional): True to wait till all tasks are done.
+                Defaults to True.
+            cancel_futures (bool, optional): True to cancel the tasks that are not
+                running yet. Defaults to False.
+        """
+        with self._lock:
+            self._shutdown = True
+            if cancel_futures:
+                for future in self._futures.values():
+                    future.cancel()
+            poller = self._poller
+
+        if wait and poller is not None:
+            poller.join()
+
+    def _poll(self):
+        while True:
+            with self._lock:
+                if len(self._futures) == 0 and self._shutdown:
+                    return
+                try:
+                    self._update_futures()
+                except Exception as ex:
+                    # If polling fails, e.g. because the queue dir isn't accessible
+                    # anymore, the futures would never complete, so fail them all.
+                    logger.exception(f"error polling queue dir {self.queue_dir}")
+                    for future in self._futures.values():
+                        _set_exception(future, ex)
+                    self._futures.clear()
+                    self._heartbeats.clear()
+            time.sleep(self.poll_interval)
+
+    def _update_futures(self):
+        for task_id in _list_tasks(self.queue_dir / _DONE_DIR, self._prefix):
+            future = self._futures.pop(task_id, None)
+            self._heartbeats.pop(task_id, None)
+            done_path = self.queue_dir / _DONE_DIR / f"{task_id}.pkl"
+            try:
+                if future is None:
+                    # E.g. the result of a task that was considered stale
+                    continue
+                with open(done_path, "rb") as file:
+                    succeeded, value = pickle.load(file)
+            except Exception as ex:
+                succeeded, value = False, ex
+            finally:
+                done_path.unlink(missing_ok=True)
+            if succeeded:
+                _set_result(future, value)
+            else:
+                _set_exception(future, value)
+
+        # Mark the tasks claimed by a worker as running + check if they are still alive
+        now = time.monotonic()
+        running_dir = self.queue_dir / _RUNNING_DIR
+        for task_id in _list_tasks(running_dir, self._prefix):
+            future = self._futures.get(task_id)
+            if future is None:
+                continue
+            if not future.done() and not future.running():
+                future.set_running_or_notify_cancel()
+
+            # Use the local clock to determine the age of the heartbeat, as the clocks
+            # of the workers and of the file server can differ from it.
+            try:
+                mtime_ns = os.stat(running_dir / f"{task_id}.pkl").st_mtime_ns
+            except FileNotFoundError:
+                # The task was completed in the meantime
+                continue
+            last_mtime_ns, seen = self._heartbeats.get(task_id, (None, now))
+            if mtime_ns != last_mtime_ns:
+                self._heartbeats[task_id] = (mtime_ns, now)
+            elif now - seen > self.stale_timeout:
+                logger.error(f"no heartbeat for task {task_id} since {now - seen:.0f}s")
+                del self._futures[task_id]
+                del self._heartbeats[task_id]
+                (running_dir / f"{task_id}.pkl").unlink(missing_ok=True)
+                _set_exception(
+                    future,
+                    RuntimeError(
+                        f"the worker executing task {task_id} stopped sending "
+                        "heartbeats, e.g. because it was killed"
+                    ),
+                )
+
+        # Remove the tasks that were cancelled before a worker claimed them
+        for task_id, future in list(self._futures.items()):
+            if future.cancelled():
+                pending_path = self.queue_dir / _PENDING_DIR / f"{task_id}.pkl"
+                try:
+                    os.remove(pending_path)
+                    del self._futures[task_id]
+                except FileNotFoundError:
+                    # Claimed by a worker, so the result will still be written
+                    pass
+
+
+def _same_filesystem(path1: Path, path2: Path) -> bool:
+    return os.stat(path1).st_dev == os.stat(path2).st_dev
+
+
+def _set_result(future: futures.Future, value: Any):
+    if future.cancelled() or not (
+        future.running() or future.set_running_or_notify_cancel()
+    ):
+        return
+    future.set_result(value)
+
+
+def _set_exception(future: futures.Future, ex: BaseException):
+    if future.cancelled() or not (
+        future.running() or future.set_running_or_notify_cancel()
+    ):
+        return
+    future.set_exception(ex)
+
+
+def run_worker(
+    queue_dir: Union[str, "os.PathLike[Any]"],
+    poll_interval: float = 0.5,
+    idle_timeout: Optional[float] = None,
+    heartbeat_interval: float = 10.0,
+) -> int:
+    """Execute the tasks in a job queue directory.
+
+    Multiple workers can process the same queue: each task is claimed by one worker by
+    moving it from the pending to the running directory, which is atomic.
+
+    Args:
+        queue_dir (Union[str, os.PathLike]): the directory used as job queue.
+        poll_interval (float, optional): the interval in seconds to check for new
+            tasks. Defaults to 0.5.
+        idle_timeout (Optional[float], optional): stop if no tasks were found during
+            this number of seconds. If None, the worker keeps running till it is
+            stopped. Defaults to None.
+        heartbeat_interval (float, optional): the interval in seconds to touch the
+            file of the task being executed, so the executor knows the worker is still
+            alive. Defaults to 10.
+
+    Returns:
+        int: the number of tasks executed.
+    """
+    queue_dir = Path(queue_dir)
+    for subdir in (_PENDING_DIR, _RUNNING_DIR, _DONE_DIR):
+        (queue_dir / subdir).mkdir(parents=True, exist_ok=True)
+    worker_name = f"{socket.gethostname()}-{os.getpid()}"
+    logger.info(f"worker {worker_name} started on {queue_dir}")
+
+    nb_executed = 0
+    idle_since = time.monotonic()
+    released = True
+    while True:
+        task_id = _claim_task(queue_dir)
+        if task_id is None:
+            if not released:
+                # The operation is probably done, so don't keep e.g. its files open
+                _processing_util.release_worker()
+                released = True
+            if (
+                idle_timeout is not None
+                and time.monotonic() - idle_since > idle_timeout
+            ):
+                break
+            time.sleep(poll_interval)
+            continue
+
+        _execute_task(queue_dir, task_id, heartbeat_interval)
+        nb_executed += 1
+        idle_since = time.monotonic()
+        released = False
+
+    logger.info(f"worker {worker_name} stopped after {nb_executed} tasks")
+    return nb_executed
+
+
+def _claim_task(queue_dir: Path) -> Optional[str]:
+    for task_id in _list_tasks(queue_dir / _PENDING_DIR):
+        try:
+            os.rename(
+                queue_dir / _PENDING_DIR / f"{task_id}.pkl",
+                queue_dir / _RUNNING_DIR / f"{task_id}.pkl",
+            )
+            return task_id
+        except FileNotFoundError:
+            # Claimed by another worker or cancelled in the meantime
+            continue
+    return None
+
+
+def _execute_task(queue_dir: Path, task_id: str, heartbeat_interval: float = 10.0):
+    running_path = queue_dir / _RUNNING_DIR / f"{task_id}.pkl"
+    stop_heartbeat = threading.Event()
+
+    def heartbeat():
+        while not stop_heartbeat.wait(heartbeat_interval):
+            try:
+                os.utime(running_path)
+            except OSError:
+                return
+
+    heartbeat_thread = threading.Thread(target=heartbeat, daemon=True)
+    heartbeat_thread.start()
+    try:
+        with open(running_path, "rb") as file:
+            fn, args, kwargs = pickle.load(file)
+        result: tuple[bool, Any] = (True, fn(*args, **kwargs))
+    except Exception as ex:
+        result = (False, ex)
+    finally:
+        stop_heartbeat.set()
+        heartbeat_thread.join()
+
+    try:
+        data = cloudpickle.dumps(result)
+    except Exception as ex:
+        # The result or exception can't be serialized, so report that instead
+        data = cloudpickle.dumps(
+            (False, RuntimeError(f"result of task could not be serialized: {ex}"))
+        )
+    _write_atomic(queue_dir / _DONE_DIR / f"{task_id}.pkl", data)
+    # Remark: if the task was considered stale, the executor removed the file already
+    running_path.unlink(missing_ok=True)
+
+
+def _list_tasks(task_dir: Path, prefix: str = "") -> list[str]:
+    # Remark: files still being written have another suffix, so they are ignored
+    return sorted(
+        path.stem
+        for path in task_dir.iterdir()
+        if path.suffix == ".pkl" and path.name.startswith(prefix)
+    )
+
+
+def _write_atomic(path: Path, data: bytes):
+    # Write to a temp file first, so a task is never read while partially written
+    tmp_path = path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+    with open(tmp_path, "wb") as file:
+        file.write(data)
+    os.replace(tmp_path, path)
@@ -1,27 +1,37 @@
 """Module containing utilities regarding sqlite/spatialite files."""
 
+import dataclasses
 import datetime
-import enum
+import functools
 import logging
 import pprint
 import shutil
 import sqlite3
 import tempfile
+import threading
 import time
 import warnings
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional, Union
+from typing import Callable, ClassVar, Optional, Union
 
+import numpy as np
+import pandas as pd
+import psutil
 from pygeoops import GeometryType
 
 import geofileops as gfo
 from geofileops.helpers._configoptions_helper import ConfigOptions
+from geofileops.util import _geoseries_util, _metadata_cache
 from geofileops.util import _sqlite_userdefined as sqlite_userdefined
 from geofileops.util._general_util import MissingRuntimeDependencyError
 
 # Get a logger...
 logger = logging.getLogger(__name__)
 
+# The cached connection of the worker (thread), see get_worker_connection
+_worker = threading.local()
+
 
 class EmptyResultError(Exception):
     """Exception raised when the SQL statement disn't return any rows.
@@ -46,8 +56,14 @@ def spatialite_version_info() -> dict[str, str]:
     Returns:
         Dict[str, str]: a dict with the version of the runtime dependencies.
     """
-    test_path = Path(__file__).resolve().parent / "test.gpkg"
-    conn = sqlite3.connect(test_path)
+    return dict(_spatialite_version_info())
+
+
+@functools.lru_cache(maxsize=1)
+def _spatialite_version_info() -> dict[str, str]:
+    # The versions can't change while running, so they are only determined once
+    conn = sqlite3.connect(":memory:")
+    sql = None
     try:
         load_spatialite(conn)
         sql = "SELECT spatialite_version(), geos_version()"
@@ -85,16 +101,147 @@ def spatialite_version_info() -> dict[str, str]:
     return versions
 
 
-class SqliteProfile(enum.Enum):
-    DEFAULT = 0
-    SPEED = 1
+@dataclass(frozen=True)
+class SqliteProfile:
+    """The settings (PRAGMA's) to use for the sqlite databases of an operation.
+
+    SqliteProfile.DEFAULT and SqliteProfile.SPEED are available as presets. Use
+    :meth:`from_config` to get a profile with the settings of the
+    ``GFO_SQLITE_PROFILE`` configoption applied.
+
+    Attributes:
+        speed (bool): True to use settings optimized for speed for the output
+            database, but those will be less safe regarding transaction safety,...
+        page_size (Optional[int]): the page size in bytes for new output databases. If
+            None, the sqlite default is used.
+        cache_size_mb (Optional[int]): the page cache per database in MB. If None, it
+            is determined based on the available memory.
+        mmap_size_mb (int): the maximum size of the databases in MB to memory map.
+        threads (int): the number of auxiliary threads sqlite may use for sorting.
+        temp_store (str): where to store temporary tables and indexes: "default",
+            "file" or "memory".
+        soft_heap_limit_mb (int): the soft limit of the heap memory used in MB.
+    """
+
+    speed: bool = False
+    page_size: Optional[int] = None
+    cache_size_mb: Optional[int] = None
+    mmap_size_mb: int = 30000
+    threads: int = 0
+    temp_store: str = "memory"
+    soft_heap_limit_mb: int = 1024
+
+    DEFAULT: ClassVar["SqliteProfile"]
+    SPEED: ClassVar["SqliteProfile"]
+
+    @classmethod
+    def from_config(cls, speed: bool = False, nb_parallel: int = 1) -> "SqliteProfile":
+        """Get the profile with the settings of the configoptions applied.
+
+        Args:
+            speed (bool, optional): True to use settings optimized for speed for the
+                output database. Defaults to False.
+            nb_parallel (int, optional): the number of parallel workers the memory
+                available is divided over to determine the cache size if it isn't
+                configured. Defaults to 1.
+
+        Returns:
+            SqliteProfile: the profile.
+        """
+        profile = cls(speed=speed, **ConfigOptions.sqlite_profile)
+        if profile.cache_size_mb is None:
+            profile = dataclasses.replace(
+                profile, cache_size_mb=_default_cache_size_mb(nb_parallel)
+            )
+
+        return profile
+
+    def pragmas(self, dbnames: list[str]) -> list[str]:
+        """Get the PRAGMA statements to apply the profile.
+
+        Args:
+            dbnames (list[str]): the databases to apply the per database settings to.
+                If the profile is a speed profile, the speed settings are applied to
+                the first database, which should be the output database.
+
+        Returns:
+            list[str]: the PRAGMA statements.
+        """
+        cache_size_mb = self._get_cache_size_mb()
+        temp_store = ["default", "file", "memory"].index(self.temp_store)
+        pragmas = [
+            f"PRAGMA temp_store={temp_store};",
+            f"PRAGMA threads={self.threads};",
+            f"PRAGMA soft_heap_limit={self.soft_heap_limit_mb * 1024 * 1024};",
+        ]
+        for dbname in dbnames:
+            # A negative cache_size is in kibibytes
+            pragmas.append(f"PRAGMA {dbname}.cache_size=-{cache_size_mb * 1024};")
+            pragmas.append(
+                f"PRAGMA {dbname}.mmap_size={self.mmap_size_mb * 1024 * 1024};"
+            )
+
+        if self.speed and len(dbnames) > 0:
+            # These options don't really make a difference on windows, but it doesn't
+            # hurt and maybe on other platforms...
+            pragmas.append(f"PRAGMA {dbnames[0]}.journal_mode=OFF;")
+            # These pragma's increase speed
+            pragmas.append(f"PRAGMA {dbnames[0]}.locking_mode=EXCLUSIVE;")
+            pragmas.append(f"PRAGMA {dbnames[0]}.synchronous=OFF;")
+
+        return pragmas
+
+    def gdal_options(self) -> dict[str, str]:
+        """Get the gdal config options to apply the profile in gdal.
+
+        The speed settings are not applied, as gdal opens the input files with the
+        same settings as the output file.
+
+        Returns:
+            dict[str, str]: the config options to pass to e.g. vector_translate.
+        """
+        profile = dataclasses.replace(self, speed=False)
+        pragmas = [
+            pragma.removeprefix("PRAGMA main.").removeprefix("PRAGMA ").rstrip(";")
+            for pragma in profile.pragmas(["main"])
+        ]
+        if self.page_size is not None:
+            pragmas.insert(0, f"page_size={self.page_size}")
+
+        return {
+            "CONFIG.OGR_SQLITE_CACHE": str(self._get_cache_size_mb()),
+            "CONFIG.OGR_SQLITE_PRAGMA": ",".join(pragmas),
+        }
+
+    def _get_cache_size_mb(self) -> int:
+        if self.cache_size_mb is not None:
+            return self.cache_size_mb
+        return _default_cache_size_mb(nb_parallel=1)
+
+
+SqliteProfile.DEFAULT = SqliteProfile()
+SqliteProfile.SPEED = SqliteProfile(speed=True)
+
 
+def _default_cache_size_mb(nb_parallel: int) -> int:
+    # Use 1/8 of the available memory, divided over the parallel workers
+    available_mb = psutil.virtual_memory().available / 1024 / 1024
+    cache_size_mb = int(available_mb / 8 / max(nb_parallel, 1))
+    return min(max(cache_size_mb, 16), 1024)
 
-def create_new_spatialdb(path: Path, crs_epsg: Optional[int] = None):
+
+def create_new_spatialdb(
+    path: Path, crs_epsg: Optional[int] = None, page_size: Optional[int] = None
+):
     # Connect to sqlite
     conn = sqlite3.connect(path)
     sql = None
     try:
+        # The page size can only be changed before anything is written to the file
+        if page_size is not None:
+            sql = f"PRAGMA page_size={page_size};"
+            conn.execute(sql)
+
         with conn:
             load_spatialite(conn)
 
@@ -104,27 +251,12 @@ def create_new_spatialdb(path: Path, crs_epsg: Optional[int] = None):
                 sql = "SELECT EnableGpkgMode();"
                 # sql = 'SELECT EnableGpkgAmphibiousMode();'
                 conn.execute(sql)
-                # Remark: this only works on the main database!
                 sql = "SELECT gpkgCreateBaseTables();"
-                conn.execute(sql)
+                _create_gpkg_base_tables(conn)
                 if crs_epsg is not None and crs_epsg not in [0, -1, 4326]:
                     sql = f"SELECT gpkgInsertEpsgSRID({crs_epsg})"
                     conn.execute(sql)
 
-                # If they are present, remove triggers that were removed from the gpkg
-                # spec because of issues but apparently weren't removed in spatialite.
-                # https://github.com/opengeospatial/geopackage/pull/240
-                sql = "DROP TRIGGER gpkg_metadata_reference_row_id_value_insert;"
-                try:
-                    conn.execute(sql)
-                except Exception:  # pragma: no cover
-                    pass
-                sql = "DROP TRIGGER gpkg_metadata_reference_row_id_value_update;"
-                try:
-                    conn.execute(sql)
-                except Exception:  # pragma: no cover
-                    pass
-
             elif output_suffix_lower == ".sqlite":
                 sql = "SELECT InitSpatialMetaData(1);"
                 conn.execute(sql)
@@ -138,6 +270,169 @@ def create_new_spatialdb(path: Path, crs_epsg: Optional[int] = None):
         raise Exception(f"Error creating spatial db {path}") from ex
     finally:
         conn.close()
+        _metadata_cache.invalidate(path)
+
+
+def _create_gpkg_base_tables(conn: sqlite3.Connection):
+    # Remark: this only works on the main database!
+    conn.execute("SELECT gpkgCreateBaseTables();")
+
+    # If they are present, remove triggers that were removed from the gpkg spec
+    # because of issues but apparently weren't removed in spatialite.
+    # https://github.com/opengeospatial/geopackage/pull/240
+    sql = "DROP TRIGGER gpkg_metadata_reference_row_id_value_insert;"
+    try:
+        conn.execute(sql)
+    except Exception:  # pragma: no cover
+        pass
+    sql = "DROP TRIGGER gpkg_metadata_reference_row_id_value_update;"
+    try:
+        conn.execute(sql)
+    except Exception:  # pragma: no cover
+        pass
+
+
+def get_worker_connection(
+    input_databases: dict[str, Path],
+    profile: SqliteProfile,
+    immutable_databases: Optional[list[str]] = None,
+) -> sqlite3.Connection:
+    """Get the connection of the current worker to the input databases.
+
+    The connection has spatialite loaded, the input databases attached read-only and
+    the profile applied. It is cached per thread, so the following calls with the same
+    input databases in the same worker can reuse it: for small batches setting up the
+    connection can take as long as running the query. The cached connection is
+    replaced if other input databases are asked for or if an input file has changed.
+
+    The main database of the connection is an empty in-memory GeoPackage, so only
+    GeoPackage input databases are supported.
+
+    Args:
+        input_databases (dict): dict with the database name(s) and path(s) to the input
+            database(s).
+        profile (SqliteProfile): the profile to apply. The speed settings are not
+            applied, as they only apply to output databases.
+        immutable_databases (list[str], optional): the names of the input databases
+            that were created by geofileops itself and won't change anymore, so they
+            can be attached as immutable. Defaults to None.
+
+    Returns:
+        sqlite3.Connection: the connection. Don't close it, use
+            :func:`close_worker_connection` instead.
+    """
+    profile = dataclasses.replace(profile, speed=False)
+    if immutable_databases is None:
+        immutable_databases = []
+    key = (
+        profile,
+        tuple(
+            (dbname, dbname in immutable_databases, *_get_file_signature(path))
+            for dbname, path in input_databases.items()
+        ),
+    )
+    if getattr(_worker, "key", None) == key:
+        return _worker.connection
+
+    close_worker_connection()
+    conn = sqlite3.connect(":memory:", detect_types=sqlite3.PARSE_DECLTYPES, uri=True)
+    sql = None
+    try:
+        # The page size of the main database is used for the output databases
+        # created from it, see _attach_new_output.
+        if profile.page_size is not None:
+            sql = f"PRAGMA page_size={profile.page_size};"
+            conn.execute(sql)
+        load_spatialite(conn)
+        sql = "SELECT gpkgCreateBaseTables();"
+        _create_gpkg_base_tables(conn)
+        sql = "SELECT EnableGpkgMode();"
+        conn.execute(sql)
+
+        for dbname, path in input_databases.items():
+            sql = f"ATTACH DATABASE ? AS {dbname}"
+            _attach_readonly(conn, path, dbname, dbname in immutable_databases)
+        for sql in profile.pragmas(["main", *input_databases]):
+            conn.execute(sql)
+        conn.commit()
+
+    except Exception as ex:
+        conn.close()
+        raise RuntimeError(f"Error {ex} executing {sql}") from ex
+
+    _worker.connection = conn
+    _worker.key = key
+    return conn
+
+
+def close_worker_connection():
+    """Close the cached connection of the current worker if there is one."""
+    conn = getattr(_worker, "connection", None)
+    _worker.connection = None
+    _worker.key = None
+    if conn is not None:
+        conn.close()
+
+
+def _get_file_signature(path: Path) -> tuple:
+    path = Path(path).resolve()
+    stat = path.stat()
+    wal_path = Path(f"{path}-wal")
+    wal_size = wal_path.stat().st_size if wal_path.exists() else 0
+    return (str(path), stat.st_mtime_ns, stat.st_size, wal_size)
+
+
+def _attach_new_output(
+    conn: sqlite3.Connection,
+    output_path: Path,
+    output_databasename: str,
+    output_crs: Optional[int],
+    profile: SqliteProfile,
+):
+    """Create a new GeoPackage and attach it to a worker connection.
+
+    The new file is created as a copy of the empty main database of the connection, so
+    spatialite doesn't have to be loaded again to create it.
+    """
+    # Make sure only the crs of the output is registered next to the default ones
+    srs_ids = [-1, 0, 4326]
+    if output_crs is not None and output_crs not in srs_ids:
+        srs_ids.append(output_crs)
+    sql = "SELECT srs_id FROM main.gpkg_spatial_ref_sys"
+    if sorted(row[0] for row in conn.execute(sql)) != sorted(srs_ids):
+        conn.execute(
+            "DELETE FROM main.gpkg_spatial_ref_sys WHERE srs_id NOT IN (-1, 0, 4326)"
+        )
+        if len(srs_ids) > 3:
+            conn.execute(f"SELECT gpkgInsertEpsgSRID({output_crs})")
+        conn.commit()
+
+    conn.execute("VACUUM main INTO ?", (str(output_path),))
+    conn.execute(f"ATTACH DATABASE ? AS {output_databasename}", (str(output_path),))
+    for sql in profile.pragmas([output_databasename]):
+        conn.execute(sql)
+
+
+def _close_output(conn: sqlite3.Connection, output_databasename: str):
+    """Close the connection to the output database.
+
+    If the output database is the main database, the connection is closed. Otherwise
+    it was attached to the worker connection, so it is only detached.
+    """
+    if output_databasename == "main":
+        conn.close()
+        return
+
+    if conn is not getattr(_worker, "connection", None):
+        # The worker connection was closed already
+        return
+    try:
+        if conn.in_transaction:
+            conn.rollback()
+        conn.execute(f"DETACH DATABASE {output_databasename}")
+    except Exception:
+        # Don't reuse a connection that is in an unknown state
+        close_worker_connection()
 
 
 def get_columns(
@@ -146,13 +441,29 @@ def get_columns(
     empty_output_ok: bool = True,
     use_spatialite: bool = True,
     output_geometrytype: Optional[GeometryType] = None,
+    profile: Optional[SqliteProfile] = None,
+    reuse_connection: bool = False,
+    immutable_databases: Optional[list[str]] = None,
 ) -> dict[str, str]:
     # Init
     start = time.perf_counter()
     tmp_dir = None
+    if profile is None:
+        profile = SqliteProfile.from_config()
+    if immutable_databases is None:
+        immutable_databases = []
+    reuse_connection = (
+        reuse_connection
+        and use_spatialite
+        and "main" not in input_databases
+        and all(path.suffix.lower() == ".gpkg" for path in input_databases.values())
+    )
 
     # Connect to/create sqlite main database
-    if "main" in input_databases:
+    if reuse_connection:
+        # The worker connection has a main database that is writable
+        main_db_path = None
+    elif "main" in input_databases:
         # If an input database is main, use it as the main database
         main_db_path = input_databases["main"]
     else:
@@ -163,10 +474,16 @@ def get_columns(
         create_new_spatialdb(path=main_db_path)
 
     sql = None
-    conn = sqlite3.connect(main_db_path, detect_types=sqlite3.PARSE_DECLTYPES)
+    if main_db_path is None:
+        conn = get_worker_connection(input_databases, profile, immutable_databases)
+    else:
+        conn = sqlite3.connect(
+            main_db_path, detect_types=sqlite3.PARSE_DECLTYPES, uri=True
+        )
     try:
-        # Load spatialite if asked for
-        if use_spatialite:
+        # Load spatialite if asked for. The worker connection has spatialite loaded and
+        # the input databases attached already.
+        if use_spatialite and main_db_path is not None:
             load_spatialite(conn)
             if main_db_path.suffix.lower() == ".gpkg":
                 sql = "SELECT EnableGpkgMode();"
@@ -179,8 +496,15 @@ def get_columns(
                     continue
 
                 sql = f"ATTACH DATABASE ? AS {dbname}"
-                dbSpec = (str(path),)
-                conn.execute(sql, dbSpec)
+                _attach_readonly(conn, path, dbname, dbname in immutable_databases)
+
+        # Apply the sqlite profile. The main database is only used for a temp table.
+        if main_db_path is not None:
+            dbnames = [dbname for dbname in input_databases if dbname != "main"]
+            for sql in dataclasses.replace(profile, speed=False).pragmas(
+                ["main", *dbnames]
+            ):
+                conn.execute(sql)
 
         # Prepare sql statement for execute
         sql_stmt_prepared = sql_stmt.format(batch_filter="")
@@ -279,7 +603,14 @@ def get_columns(
         conn.rollback()
         raise RuntimeError(f"Error {ex} executing {sql}") from ex
     finally:
-        conn.close()
+        if main_db_path is None:
+            # Keep the worker connection open, but clean up the temp table
+            try:
+                conn.execute("DROP TABLE IF EXISTS temp.tmp;")
+            except Exception:
+                close_worker_connection()
+        else:
+            conn.close()
         if ConfigOptions.remove_temp_files:
             if tmp_dir is not None:
                 shutil.rmtree(tmp_dir, ignore_errors=True)
@@ -303,7 +634,10 @@ def create_table_as_sql(
     create_spatial_index: bool = True,
     empty_output_ok: bool = True,
     column_datatypes: Optional[dict] = None,
-    profile: SqliteProfile = SqliteProfile.DEFAULT,
+    profile: Optional[SqliteProfile] = None,
+    reuse_connection: bool = False,
+    interrupt: Optional[Callable[[], bool]] = None,
+    immutable_databases: Optional[list[str]] = None,
 ):
     """Execute sql statement and save the result in the output file.
 
@@ -327,10 +661,20 @@ def create_table_as_sql(
             (some) columns is not specified, it it automatically determined as good as
             possible. Defaults to None.
         profile (SqliteProfile, optional): the set of PRAGMA's to use when creating the
-            table. SqliteProfile.DEFAULT will use default setting. SqliteProfile.SPEED
-            uses settings optimized for speed, but will be less save regarding
-            transaction safety,...
-            Defaults to SqliteProfile.DEFAULT.
+            table. SqliteProfile.SPEED uses settings optimized for speed, but will be
+            less save regarding transaction safety,... If None,
+            ``SqliteProfile.from_config()`` is used. Defaults to None.
+        reuse_connection (bool, optional): True to use the cached connection of the
+            worker to the input databases, see :func:`get_worker_connection`. Then the
+            output file is attached to it, so the geometry triggers are not added to
+            the output layer. Only used for new GeoPackage output files without
+            spatial index. Defaults to False.
+        interrupt (Callable, optional): function that is called regularly while the
+            sql_stmt is executed. If it returns True, the execution is interrupted and
+            an error is raised. Defaults to None.
+        immutable_databases (list[str], optional): the names of the input databases
+            that were created by geofileops itself and won't change anymore, so they
+            can be attached as immutable. Defaults to None.
 
     Raises:
         ValueError: invalid (combinations of) parameters passed.
@@ -348,13 +692,35 @@ def create_table_as_sql(
                 "output_path and all input paths must have the same suffix!"
             )
 
+    if profile is None:
+        profile = SqliteProfile.from_config()
+    if immutable_databases is None:
+        immutable_databases = []
+    reuse_connection = (
+        reuse_connection
+        and output_suffix_lower == ".gpkg"
+        and not create_spatial_index
+        and not output_path.exists()
+        and "main" not in input_databases
+        and all(path.suffix.lower() == ".gpkg" for path in input_databases.values())
+    )
+
     # If output file doesn't exist yet, create and init it
-    if not output_path.exists():
-        create_new_spatialdb(path=output_path, crs_epsg=output_crs)
+    if not reuse_connection and not output_path.exists():
+        create_new_spatialdb(
+            path=output_path, crs_epsg=output_crs, page_size=profile.page_size
+        )
 
     sql = None
-    conn = sqlite3.connect(output_path, detect_types=sqlite3.PARSE_DECLTYPES, uri=True)
+    output_databasename = "main"
+    conn = None
     try:
+        if reuse_connection:
+            conn = get_worker_connection(input_databases, profile, immutable_databases)
+        else:
+            conn = sqlite3.connect(
+                output_path, detect_types=sqlite3.PARSE_DECLTYPES, uri=True
+            )
         with conn:
 
             def to_string_for_sql(input) -> str:
@@ -363,47 +729,38 @@ def create_table_as_sql(
                 else:
                     return str(input)
 
-            # Connect to output database file so it is main, otherwise the
-            # gpkg... functions don't work
-            # Remark: sql statements using knn only work if they are main, so they
-            # are executed with ogr, as the output needs to be main as well :-(.
-            output_databasename = "main"
-            load_spatialite(conn)
-
-            if output_suffix_lower == ".gpkg":
-                sql = "SELECT EnableGpkgMode();"
-                conn.execute(sql)
-
-            # Set cache size to 128 MB (in kibibytes)
-            sql = "PRAGMA cache_size=-128000;"
-            conn.execute(sql)
-            # Set temp storage to MEMORY
-            sql = "PRAGMA temp_store=2;"
-            conn.execute(sql)
-            # Set soft heap limit to 1 GB (in bytes)
-            sql = f"PRAGMA soft_heap_limit={1024*1024*1024};"
-            conn.execute(sql)
-
-            # Attach to all input databases
-            for dbname, path in input_databases.items():
-                sql = f"ATTACH DATABASE ? AS {dbname}"
-                dbSpec = (str(path),)
-                conn.execute(sql, dbSpec)
-
-            # Use the sqlite profile specified
-            if profile is SqliteProfile.SPEED:
-                # Use memory mapped IO: much faster for calculations
-                # (max 30GB)
-                conn.execute("PRAGMA mmap_size=30000000000;")
+            if reuse_connection:
+                # Spatialite is loaded and the input databases are attached already,
+                # so only the new output database needs to be attached.
+                output_databasename = "gfo_output"
+                sql = f"ATTACH DATABASE ? AS {output_databasename}"
+                _attach_new_output(
+                    conn, output_path, output_databasename, output_crs, profile
+                )
+            else:
+                # Connect to output database file so it is main, otherwise the
+                # gpkg... functions don't work
+                # Remark: sql statements using knn only work if they are main, so they
+                # are executed with ogr, as the output needs to be main as well :-(.
+                load_spatialite(conn)
 
-                # These options don't really make a difference on windows, but
-                # it doesn't hurt and maybe on other platforms...
-                for databasename in [output_databasename, *input_databases.keys()]:
-                    conn.execute(f"PRAGMA {databasename}.journal_mode=OFF;")
+                if output_suffix_lower == ".gpkg":
+                    sql = "SELECT EnableGpkgMode();"
+                    conn.execute(sql)
 
-                    # These pragma's increase speed
-                    conn.execute(f"PRAGMA {databasename}.locking_mode=EXCLUSIVE;")
-                    conn.execute(f"PRAGMA {databasename}.synchronous=OFF;")
+                # Attach to all input databases. They are only read, so they are
+                # attached read-only. Files created by geofileops are also attached
+                # immutable: then they don't need any locking, which avoids contention
+                # between the workers reading the same input files.
+                for dbname, path in input_databases.items():
+                    sql = f"ATTACH DATABASE ? AS {dbname}"
+                    immutable = dbname in immutable_databases
+                    _attach_readonly(conn, path, dbname, immutable)
+
+                # Apply the sqlite profile: memory mapped IO, cache,... for all
+                # databases and, if asked, the speed settings for the output database.
+                for sql in profile.pragmas([output_databasename, *input_databases]):
+                    conn.execute(sql)
 
             # Determine columns/datatypes to create the table if not specified
             column_types = column_datatypes
@@ -414,6 +771,9 @@ def create_table_as_sql(
                     empty_output_ok=empty_output_ok,
                     use_spatialite=True,
                     output_geometrytype=output_geometrytype,
+                    profile=profile,
+                    reuse_connection=reuse_connection,
+                    immutable_databases=immutable_databases,
                 )
 
             # If geometry type was not specified, look for it in column_types
@@ -485,8 +845,11 @@ def create_table_as_sql(
 
                     # Now add geom triggers
                     # Remark: this only works on the main database!
-                    sql = f"SELECT gpkgAddGeometryTriggers('{output_layer}', 'geom');"
-                    conn.execute(sql)
+                    if output_databasename == "main":
+                        sql = (
+                            f"SELECT gpkgAddGeometryTriggers('{output_layer}', 'geom');"
+                        )
+                        conn.execute(sql)
             elif output_suffix_lower == ".sqlite":
                 # Create geom metadata if there is one
                 if "geom" in column_types:
@@ -505,6 +868,8 @@ def create_table_as_sql(
                     f'INSERT INTO {output_databasename}."{output_layer}" '
                     f'({", ".join(columns_for_insert)})\n{sql_stmt}'
                 )
+                if interrupt is not None:
+                    conn.set_progress_handler(lambda: int(interrupt()), 1_000_000)
                 conn.execute(sql)
 
             except Exception as ex:
@@ -517,6 +882,10 @@ def create_table_as_sql(
                         '("select * will select fid!)',
                     )
                 raise
+            finally:
+                if interrupt is not None:
+                    # The worker connection can be reused, so reset the handler
+                    conn.set_progress_handler(None, 0)
 
             # Create spatial index if needed
             if "geom" in column_types and create_spatial_index is True:
@@ -527,18 +896,7 @@ def create_table_as_sql(
                     sql = f"SELECT gpkgAddSpatialIndex('{output_layer}', 'geom');"
                     conn.execute(sql)
                     # Now fill the index
-                    sql = f"""
-                        INSERT INTO "rtree_{output_layer}_geom"
-                          SELECT fid
-                                ,ST_MinX(geom)
-                                ,ST_MaxX(geom)
-                                ,ST_MinY(geom)
-                                ,ST_MaxY(geom)
-                            FROM "{output_layer}"
-                           WHERE geom IS NOT NULL
-                             AND ST_IsEmpty(geom) = 0
-                    """
-                    conn.execute(sql)
+                    fill_gpkg_rtree(conn, output_layer, "geom")
                 elif output_suffix_lower == ".sqlite":
                     sql = f"SELECT CreateSpatialIndex('{output_layer}', 'geom');"
                     conn.execute(sql)
@@ -546,19 +904,323 @@ def create_table_as_sql(
 
     except EmptyResultError:
         logger.info(f"Query didn't return any rows: {sql_stmt}")
-        conn.close()
+        if conn is not None:
+            _close_output(conn, output_databasename)
+            conn = None
         if output_path.exists():
             output_path.unlink()
     except Exception as ex:
         raise RuntimeError(f"Error {ex} executing {sql}") from ex
     finally:
         if conn is not None:
-            conn.close()
+            _close_output(conn, output_databasename)
+        _metadata_cache.invalidate(output_path)
+
+
+def get_batch_ranges_geomsize(
+    path: Path, layer: str, geometrycolumn: str, nb_batches: int
+) -> pd.DataFrame:
+    """Determine the rowid ranges of batches with about the same total geometry size.
+
+    The size of the geometry blob is a cheap proxy for the number of coordinates. 100
+    bytes is added for the overhead per row. The SQLITE dialect of GDAL is used, so
+    this works for all file types.
+
+    Args:
+        path (Path): the file containing the layer.
+        layer (str): the layer to determine the batches for.
+        geometrycolumn (str): the geometry column of the layer.
+        nb_batches (int): the number of batches to create.
+
+    Returns:
+        pd.DataFrame: the batches, with columns "batch_id", "nb_rows", "start_id" and
+            "end_id". A batch can get more than its share if it contains a very large
+            geometry, so there can be less than ``nb_batches`` batches.
+    """
+    sql_stmt = f"""
+        SELECT batch_id
+              ,COUNT(*) AS nb_rows
+              ,MIN(rowid) AS start_id
+              ,MAX(rowid) AS end_id
+          FROM
+            ( SELECT rowid
+                    ,(SUM(weight) OVER (ORDER BY rowid) - weight) * {nb_batches}
+                      / (SELECT SUM(IFNULL(LENGTH("{geometrycolumn}"), 0) + 100)
+                           FROM "{layer}"
+                        ) AS batch_id
+                FROM
+                  ( SELECT rowid
+                          ,IFNULL(LENGTH("{geometrycolumn}"), 0) + 100 AS weight
+                      FROM "{layer}"
+                  )
+            )
+         GROUP BY batch_id
+         ORDER BY batch_id;
+    """
+    batch_info_df = gfo.read_file(path=path, sql_stmt=sql_stmt, sql_dialect="SQLITE")
+
+    # Batch_id's can be skipped, so renumber them
+    batch_info_df["batch_id"] = range(len(batch_info_df))
+    return pd.DataFrame(batch_info_df[["batch_id", "nb_rows", "start_id", "end_id"]])
+
+
+def fill_gpkg_rtree(
+    conn: sqlite3.Connection, layer: str, geometrycolumn: str, chunksize: int = 100_000
+):
+    """Fill the empty rtree spatial index of a layer in a GeoPackage.
+
+    Inserting the rows in an arbitrary order in an rtree is slow for large layers and
+    results in a poorly packed tree. Hence, the bounding boxes of the geometries are
+    first sorted along a hilbert curve and then inserted in that order. This way
+    neighbouring boxes end up in the same nodes, so building the index is faster and
+    spatial queries on it need to read fewer pages.
+
+    Args:
+        conn (sqlite3.Connection): connection to the GeoPackage, with spatialite
+            loaded.
+        layer (str): the layer to fill the spatial index for.
+        geometrycolumn (str): the geometry column of the layer.
+        chunksize (int, optional): the number of rows to read and insert at a time.
+            Defaults to 100000.
+    """
+    sql = f"""
+        SELECT fid
+              ,ST_MinX("{geometrycolumn}")
+              ,ST_MaxX("{geometrycolumn}")
+              ,ST_MinY("{geometrycolumn}")
+              ,ST_MaxY("{geometrycolumn}")
+          FROM "{layer}"
+         WHERE "{geometrycolumn}" IS NOT NULL
+           AND ST_IsEmpty("{geometrycolumn}") = 0
+    """
+    # Read the bounds in chunks in preallocated arrays to limit the memory needed. The
+    # number of rows in the layer is an upper limit for the number of bounds.
+    nb_rows_max = conn.execute(f'SELECT COUNT(*) FROM "{layer}"').fetchone()[0]
+    fids = np.empty(nb_rows_max, dtype=np.int64)
+    bounds = np.empty((nb_rows_max, 4), dtype=np.float64)
+    nb_rows = 0
+    cursor = conn.execute(sql)
+    while True:
+        rows = cursor.fetchmany(chunksize)
+        if len(rows) == 0:
+            break
+        fids[nb_rows : nb_rows + len(rows)] = [row[0] for row in rows]
+        bounds[nb_rows : nb_rows + len(rows)] = [row[1:] for row in rows]
+        nb_rows += len(rows)
+    if nb_rows == 0:
+        return
+    fids = fids[:nb_rows]
+    bounds = bounds[:nb_rows]
+
+    distances = _geoseries_util.hilbert_distance(
+        (bounds[:, 0] + bounds[:, 1]) / 2, (bounds[:, 2] + bounds[:, 3]) / 2
+    )
+    order = np.argsort(distances, kind="stable")
+    del distances
+
+    sql = f'INSERT INTO "rtree_{layer}_{geometrycolumn}" VALUES (?, ?, ?, ?, ?)'
+    for start in range(0, nb_rows, chunksize):
+        chunk_order = order[start : start + chunksize]
+        conn.executemany(
+            sql, zip(fids[chunk_order].tolist(), *bounds[chunk_order].T.tolist())
+        )
+
+
+def append_gpkg_layer(
+    src: Path,
+    dst: Path,
+    src_layer: Optional[str] = None,
+    dst_layer: Optional[str] = None,
+    preserve_fid: bool = False,
+) -> bool:
+    """Append a layer of a GPKG file to a layer with the same schema in another GPKG.
+
+    The source file is attached to the destination file and the rows are copied with a
+    single ``INSERT INTO ... SELECT`` in one transaction, so the geometries don't need
+    to be decoded and encoded again. The extent in ``gpkg_contents`` is updated. If the
+    destination layer has a spatial index, its triggers and rtree are dropped before
+    the append and the rtree is filled again afterwards with :func:`fill_gpkg_rtree`,
+    as this is a lot faster than updating it for each row.
+
+    If the append is not possible like this, e.g. because the schemas are not the
+    same, nothing is done and False is returned.
+
+    Args:
+        src (Path): the GPKG file to append.
+        dst (Path): the GPKG file to append to.
+        src_layer (Optional[str], optional): the source layer. If None, the only layer
+            in the file. Defaults to None.
+        dst_layer (Optional[str], optional): the destination layer. If None, the only
+            layer in the file. Defaults to None.
+        preserve_fid (bool, optional): True to copy the fids as well. Defaults to False.
+
+    Returns:
+        bool: True if the layer was appended, False if this was not possible.
+    """
+    if src.suffix.lower() != ".gpkg" or dst.suffix.lower() != ".gpkg":
+        return False
+    if not src.exists() or not dst.exists():
+        return False
+
+    conn = sqlite3.connect(dst, uri=True)
+    sql = None
+    try:
+        sql = "ATTACH DATABASE ? AS src"
+        _attach_readonly(conn, src, "src")
+
+        # Determine the layers
+        layers = {}
+        for dbname, layer in [("src", src_layer), ("main", dst_layer)]:
+            sql = f"SELECT table_name FROM {dbname}.gpkg_contents"
+            tables = [row[0] for row in conn.execute(sql).fetchall()]
+            if layer is None and len(tables) == 1:
+                layer = tables[0]
+            if layer not in tables:
+                return False
+            layers[dbname] = layer
+
+        # The columns and the geometry column definition must be the same
+        columns = {}
+        geometry_columns = {}
+        for dbname, layer in layers.items():
+            sql = f'PRAGMA {dbname}.table_info("{layer}")'
+            table_info = conn.execute(sql).fetchall()
+            columns[dbname] = {
+                (row[1].lower(), row[2].upper(), row[5]) for row in table_info
+            }
+            sql = f"""
+                SELECT column_name, geometry_type_name, srs_id, z, m
+                  FROM {dbname}.gpkg_geometry_columns
+                 WHERE table_name = ?
+            """
+            geometry_columns[dbname] = conn.execute(sql, (layer,)).fetchall()
+        if columns["src"] != columns["main"]:
+            return False
+        if geometry_columns["src"] != geometry_columns["main"]:
+            return False
+
+        # Triggers on the destination layer can need spatialite functions, so don't
+        # append if there are any apart from the ones of gdal to maintain the feature
+        # count and the ones to maintain the spatial index, as it is rebuilt anyway.
+        sql = """
+            SELECT name, sql FROM main.sqlite_master
+             WHERE type = 'trigger' AND tbl_name = ?
+               AND name NOT LIKE 'trigger_%_feature_count_%'
+        """
+        triggers = conn.execute(sql, (layers["main"],)).fetchall()
+        rtree_sql = None
+        if len(triggers) > 0:
+            if len(geometry_columns["main"]) == 0:
+                return False
+            rtree = f"rtree_{layers['main']}_{geometry_columns['main'][0][0]}"
+            if any(not name.startswith(f"{rtree}_") for name, _ in triggers):
+                return False
+            sql = "SELECT sql FROM main.sqlite_master WHERE type = 'table' AND name = ?"
+            row = conn.execute(sql, (rtree,)).fetchone()
+            if row is None:
+                return False
+            rtree_sql = row[0]
+            # Spatialite is needed to fill the rtree again
+            load_spatialite(conn)
+            sql = "SELECT EnableGpkgMode();"
+            conn.execute(sql)
+
+        # Determine the extent after the append. If the extent of a non-empty layer
+        # is not known, the resulting extent isn't known either.
+        extents = {}
+        for dbname, layer in layers.items():
+            sql = f"""
+                SELECT min_x, min_y, max_x, max_y
+                  FROM {dbname}.gpkg_contents
+                 WHERE table_name = ?
+                   AND EXISTS (SELECT 1 FROM {dbname}."{layer}")
+            """
+            extents[dbname] = conn.execute(sql, (layer,)).fetchone()
+        if extents["src"] is None:
+            extent = extents["main"]
+        elif extents["main"] is None:
+            extent = extents["src"]
+        elif None in extents["src"] or None in extents["main"]:
+            extent = (None, None, None, None)
+        else:
+            extent = (
+                min(extents["src"][0], extents["main"][0]),
+                min(extents["src"][1], extents["main"][1]),
+                max(extents["src"][2], extents["main"][2]),
+                max(extents["src"][3], extents["main"][3]),
+            )
+
+        # Now append the rows
+        columns_to_copy = [
+            f'"{name}"' for name, _, pk in columns["main"] if preserve_fid or pk == 0
+        ]
+        columns_str = ", ".join(columns_to_copy)
+        with conn:
+            # Start the transaction explicitly, so dropping the spatial index is part
+            # of it as well.
+            sql = "BEGIN"
+            conn.execute(sql)
+            if rtree_sql is not None:
+                for name, _ in triggers:
+                    sql = f'DROP TRIGGER main."{name}"'
+                    conn.execute(sql)
+                sql = f'DROP TABLE main."{rtree}"'
+                conn.execute(sql)
+
+            sql = f"""
+                INSERT INTO main."{layers["main"]}" ({columns_str})
+                  SELECT {columns_str} FROM src."{layers["src"]}"
+            """
+            conn.execute(sql)
+
+            if rtree_sql is not None:
+                sql = rtree_sql
+                conn.execute(sql)
+                sql = f'fill_gpkg_rtree of "{rtree}"'
+                fill_gpkg_rtree(conn, layers["main"], geometry_columns["main"][0][0])
+                for _, sql in triggers:
+                    conn.execute(sql)
+
+            if extent is not None:
+                sql = """
+                    UPDATE main.gpkg_contents
+                       SET min_x = ?, min_y = ?, max_x = ?, max_y = ?,
+                           last_change = STRFTIME('%Y-%m-%dT%H:%M:%fZ', 'now')
+                     WHERE table_name = ?
+                """
+                conn.execute(sql, (*extent, layers["main"]))
+
+            # Update the feature count if gdal keeps track of it
+            sql = """
+                SELECT 1 FROM main.sqlite_master
+                 WHERE type = 'table' AND name = 'gpkg_ogr_contents'
+            """
+            if len(conn.execute(sql).fetchall()) > 0:
+                sql = f"""
+                    UPDATE main.gpkg_ogr_contents
+                       SET feature_count = (SELECT COUNT(*) FROM "{layers["main"]}")
+                     WHERE table_name = ?
+                """
+                conn.execute(sql, (layers["main"],))
+
+        return True
+
+    except Exception as ex:
+        raise RuntimeError(f"Error {ex} executing {sql}") from ex
+    finally:
+        conn.close()
+        _metadata_cache.invalidate(dst)
 
 
 def execute_sql(
-    path: Path, sql_stmt: Union[str, list[str]], use_spatialite: bool = True
+    path: Path,
+    sql_stmt: Union[str, list[str]],
+    use_spatialite: bool = True,
+    profile: Optional[SqliteProfile] = None,
 ):
+    if profile is None:
+        profile = SqliteProfile.from_config()
+
     # Connect to database file
     conn = sqlite3.connect(path)
     sql = None
@@ -570,14 +1232,9 @@ def execute_sql(
                 sql = "SELECT EnableGpkgMode();"
                 conn.execute(sql)
 
-        """
-        # Set nb KB of cache
-        sql = "PRAGMA cache_size=-50000;"
-        conn.execute(sql)
-        sql = "PRAGMA temp_store=MEMORY;"
-        conn.execute(sql)
-        conn.execute("PRAGMA journal_mode = WAL")
-        """
+        for sql in profile.pragmas(["main"]):
+            conn.execute(sql)
+
         if isinstance(sql_stmt, str):
             sql = sql_stmt
             conn.execute(sql)
@@ -591,6 +1248,47 @@ def execute_sql(
         raise Exception(f"Error executing {sql}") from ex
     finally:
         conn.close()
+        _metadata_cache.invalidate(path)
+
+
+def _attach_readonly(
+    conn: sqlite3.Connection, path: Path, dbname: str, immutable: bool = False
+):
+    """Attach a database file read-only to the connection.
+
+    If ``immutable`` is True, the file is attached as immutable as well. Then sqlite
+    doesn't take any locks to read it, so many processes can read the file at the same
+    time without contention. As sqlite then also ignores changes made by others, this
+    should only be used for files created by geofileops itself that won't be changed
+    anymore, like converted copies of input files. Files with a non-empty rollback
+    journal or write-ahead log or with a shared memory file are never attached as
+    immutable, as they are being written or weren't closed properly.
+
+    The connection should have been opened with ``uri=True``.
+
+    Args:
+        conn (sqlite3.Connection): the connection to attach the database to.
+        path (Path): the database file to attach.
+        dbname (str): the name to attach the database as.
+        immutable (bool, optional): True to attach the file as immutable if possible.
+            Defaults to False.
+    """
+    uri = f"{Path(path).resolve().as_uri()}?mode=ro"
+    if immutable and not _is_being_written(path):
+        uri = f"{uri}&immutable=1"
+    conn.execute(f"ATTACH DATABASE ? AS {dbname}", (uri,))
+
+
+def _is_being_written(path: Path) -> bool:
+    # A shared memory file exists while the file is open in WAL mode. A non-empty
+    # rollback journal or write-ahead log contains changes that aren't in the file yet.
+    if Path(f"{path}-shm").exists():
+        return True
+    for suffix in ("-journal", "-wal"):
+        sidecar_path = Path(f"{path}{suffix}")
+        if sidecar_path.exists() and sidecar_path.stat().st_size > 0:
+            return True
+    return False
 
 
 def test_data_integrity(path: Path, use_spatialite: bool = True):
@@ -0,0 +1,66 @@
+"""Worker process to execute the tasks of a :class:`DirectoryQueueExecutor`.
+
+Usage:
+
+.. code-block:: console
+
+    python -m geofileops.worker <queue_dir> [--poll-interval 0.5] [--idle-timeout 600]
+        [--heartbeat-interval 10]
+
+"""
+
+import argparse
+import logging
+from typing import Optional
+
+from geofileops.util import _processing_util, _queue_executor
+
+
+def main(args: Optional[list[str]] = None) -> int:
+    """Run a worker on the job queue directory specified in the arguments.
+
+    Args:
+        args (Optional[list[str]], optional): the command line arguments. If None,
+            ``sys.argv`` is used. Defaults to None.
+
+    Returns:
+        int: the exit code.
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m geofileops.worker",
+        description="Execute the tasks of a geofileops DirectoryQueueExecutor.",
+    )
+    parser.add_argument("queue_dir", help="the directory used as job queue")
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=0.5,
+        help="the interval in seconds to check for new tasks",
+    )
+    parser.add_argument(
+        "--idle-timeout",
+        type=float,
+        default=None,
+        help="stop if no tasks were found during this number of seconds",
+    )
+    parser.add_argument(
+        "--heartbeat-interval",
+        type=float,
+        default=10.0,
+        help="the interval in seconds to signal that the task being executed is alive",
+    )
+    parsed_args = parser.parse_args(args)
+
+    logging.basicConfig(level=logging.INFO)
+    _processing_util.initialize_worker()
+    _queue_executor.run_worker(
+        queue_dir=parsed_args.queue_dir,
+        poll_interval=parsed_args.poll_interval,
+        idle_timeout=parsed_args.idle_timeout,
+        heartbeat_interval=parsed_args.heartbeat_interval,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -65,3 +65,94 @@ def test_remove_temp_files(value, expected):
         del os.environ[test_key]
 
     assert result is expected
+
+
+@pytest.mark.parametrize(
+    "key, value, expected",
+    [
+        ("GFO_BATCH_ORDER", "HILBERT", "hilbert"),
+        ("GFO_BATCH_ORDER", " rowid ", "rowid"),
+        ("GFO_BATCH_ORDER", None, "rowid"),
+        ("GFO_BATCH_WEIGHT", "GEOMSIZE", "geomsize"),
+        ("GFO_BATCH_WEIGHT", None, "rows"),
+        ("GFO_BROADCAST_MAX_ROWS", "100", 100),
+        ("GFO_BROADCAST_MAX_ROWS", " 0 ", 0),
+        ("GFO_BROADCAST_MAX_ROWS", None, 0),
+        ("GFO_CALIBRATE", "SAMPLE", "sample"),
+        ("GFO_CALIBRATE", " persist ", "persist"),
+        ("GFO_CALIBRATE", None, "none"),
+        ("GFO_IO_USE_ARROW", "TRUE", True),
+        ("GFO_IO_USE_ARROW", None, False),
+        ("GFO_MEMORY_CEILING", "75", 75.0),
+        ("GFO_MEMORY_CEILING", " 80% ", 80.0),
+        ("GFO_MEMORY_CEILING", "", 90.0),
+        ("GFO_MEMORY_CEILING", None, 90.0),
+        ("GFO_ON_DATA_ERROR", "WARN", "warn"),
+        ("GFO_ON_DATA_ERROR", None, "raise"),
+        ("GFO_OUTPUT_SORTED", "TRUE", True),
+        ("GFO_OUTPUT_SORTED", None, False),
+        ("GFO_PARTIAL_FORMAT", "PARQUET", "parquet"),
+        ("GFO_PARTIAL_FORMAT", "", "gpkg"),
+        ("GFO_PARTIAL_FORMAT", None, "gpkg"),
+        ("GFO_RESUME", "TRUE", True),
+        ("GFO_RESUME", None, False),
+        ("GFO_SPLIT_STRAGGLERS", "FALSE", False),
+        ("GFO_SPLIT_STRAGGLERS", None, True),
+        (
+            "GFO_SQLITE_PROFILE",
+            "cache_size_mb=512, THREADS=4",
+            {"cache_size_mb": 512, "threads": 4},
+        ),
+        (
+            "GFO_SQLITE_PROFILE",
+            "page_size=8192,temp_store=File",
+            {"page_size": 8192, "temp_store": "file"},
+        ),
+        ("GFO_SQLITE_PROFILE", "", {}),
+        ("GFO_SQLITE_PROFILE", None, {}),
+    ],
+)
+def test_configoption(key, value, expected):
+    # The name of the property is the key without the GFO_ prefix in lower case
+    option = key.removeprefix("GFO_").lower()
+    if value is None:
+        if key in os.environ:
+            del os.environ[key]
+        result = getattr(ConfigOptions, option)
+    else:
+        with gfo.TempEnv({key: value}):
+            result = getattr(ConfigOptions, option)
+
+    assert result == expected
+    assert type(result) is type(expected)
+
+
+@pytest.mark.parametrize(
+    "key, value",
+    [
+        ("GFO_BATCH_ORDER", "INVALID"),
+        ("GFO_BATCH_WEIGHT", "INVALID"),
+        ("GFO_BROADCAST_MAX_ROWS", "INVALID"),
+        ("GFO_BROADCAST_MAX_ROWS", "-1"),
+        ("GFO_BROADCAST_MAX_ROWS", "1.5"),
+        ("GFO_CALIBRATE", "INVALID"),
+        ("GFO_IO_USE_ARROW", "INVALID"),
+        ("GFO_MEMORY_CEILING", "INVALID"),
+        ("GFO_MEMORY_CEILING", "0"),
+        ("GFO_MEMORY_CEILING", "101"),
+        ("GFO_ON_DATA_ERROR", "INVALID"),
+        ("GFO_PARTIAL_FORMAT", "INVALID"),
+        ("GFO_SQLITE_PROFILE", "INVALID"),
+        ("GFO_SQLITE_PROFILE", "invalid=1"),
+        ("GFO_SQLITE_PROFILE", "threads=-1"),
+        ("GFO_SQLITE_PROFILE", "page_size=1000"),
+        ("GFO_SQLITE_PROFILE", "temp_store=x"),
+    ],
+)
+def test_configoption_invalidvalue(key, value):
+    option = key.removeprefix("GFO_").lower()
+    with gfo.TempEnv({key: value}):
+        with pytest.raises(
+            ValueError, match=f"invalid value for .*configoption <{key}>"
+        ):
+            _ = getattr(ConfigOptions, option)
@@ -2,8 +2,10 @@
 Tests for functionalities in geofileops.general.
 """
 
+import math
 import os
 import shutil
+import threading
 from itertools import product
 
 import geopandas as gpd
@@ -1000,6 +1002,64 @@ def test_read_file_fid_as_index(suffix, engine_setter):
         assert read_gdf.index[0] == 6
 
 
+@pytest.mark.parametrize("suffix", SUFFIXES_FILEOPS)
+@pytest.mark.parametrize("rows", [None, slice(5, 10)])
+def test_read_file_arrow(suffix, rows):
+    pytest.importorskip("pyarrow")
+    src = test_helper.get_testfile("polygon-parcel", suffix=suffix)
+    encoding = "utf-8" if suffix == ".csv" else None
+
+    # Read the file with and without Arrow: the result should be the same
+    with gfo.TempEnv({"GFO_IO_USE_ARROW": "FALSE"}):
+        exp_gdf = gfo.read_file(src, rows=rows, encoding=encoding)
+    with gfo.TempEnv({"GFO_IO_USE_ARROW": "TRUE"}):
+        read_gdf = gfo.read_file(src, rows=rows, encoding=encoding)
+
+    if rows is not None:
+        assert len(read_gdf) == 5
+    if suffix != ".csv":
+        # Date columns should be converted to datetime64 in Arrow
+        assert pd.api.types.is_datetime64_any_dtype(read_gdf["DATUM"])
+        assert_geodataframe_equal(read_gdf, exp_gdf, check_dtype=False)
+    else:
+        assert_frame_equal(read_gdf, exp_gdf, check_dtype=False)
+
+
+@pytest.mark.parametrize("suffix", SUFFIXES_FILEOPS)
+@pytest.mark.parametrize("columns", [None, ["OIDN", "fid"]])
+def test_read_file_chunks(suffix, columns, engine_setter):
+    src = test_helper.get_testfile("polygon-parcel", suffix=suffix)
+    exp_gdf = gfo.read_file(src, columns=columns)
+
+    chunks = list(gfo.read_file_chunks(src, chunksize=20, columns=columns))
+
+    assert len(chunks) == math.ceil(len(exp_gdf) / 20)
+    assert all(len(chunk) <= 20 for chunk in chunks)
+    read_gdf = pd.concat(chunks)
+    if suffix == ".csv":
+        assert_frame_equal(read_gdf, exp_gdf, check_dtype=False)
+    else:
+        assert_geodataframe_equal(read_gdf, exp_gdf, check_dtype=False)
+
+
+def test_read_file_chunks_where(engine_setter):
+    src = test_helper.get_testfile("polygon-parcel")
+    where = "OIDN > 100"
+    exp_gdf = gfo.read_file(src, where=where, fid_as_index=True)
+
+    chunks = gfo.read_file_chunks(src, chunksize=7, where=where, fid_as_index=True)
+    read_gdf = pd.concat(list(chunks))
+
+    assert len(read_gdf) > 0
+    assert_geodataframe_equal(read_gdf, exp_gdf, check_dtype=False)
+
+
+def test_read_file_chunks_invalid_chunksize():
+    src = test_helper.get_testfile("polygon-parcel")
+    with pytest.raises(ValueError, match="chunksize should be > 0"):
+        next(gfo.read_file_chunks(src, chunksize=0))
+
+
 @pytest.mark.parametrize("suffix", SUFFIXES_FILEOPS)
 def test_read_file_sql(suffix, engine_setter):
     # Prepare test data
@@ -1397,6 +1457,107 @@ def test_to_file_append_different_columns(tmp_path, engine_setter):
         gfo.to_file(test_gdf, path=test_path, append=True)
 
 
+@pytest.mark.parametrize("max_rows_in_memory", [1_000_000, 10])
+def test_spatial_sort(tmp_path, max_rows_in_memory):
+    src = test_helper.get_testfile("polygon-parcel")
+    dst = tmp_path / "sorted.gpkg"
+
+    gfo.spatial_sort(
+        src, dst, dst_layer="sorted", max_rows_in_memory=max_rows_in_memory
+    )
+
+    # All rows should be there, sorted along the hilbert curve
+    src_gdf = gfo.read_file(src)
+    result_gdf = gfo.read_file(dst)
+    assert gfo.listlayers(dst) == ["sorted"]
+    assert_geodataframe_equal(
+        result_gdf, src_gdf, check_dtype=False, normalize=True, sort_values=True
+    )
+    bounds = result_gdf.geometry.bounds
+    distances = _geoseries_util.hilbert_distance(
+        (bounds.minx + bounds.maxx) / 2, (bounds.miny + bounds.maxy) / 2
+    )
+    assert all(distances[:-1] <= distances[1:])
+
+
+def test_spatial_sort_invalid_params(tmp_path):
+    src = test_helper.get_testfile("polygon-parcel")
+    with pytest.raises(ValueError, match="unsupported method"):
+        gfo.spatial_sort(src, tmp_path / "dst.gpkg", method="str")
+    with pytest.raises(ValueError, match="max_rows_in_memory should be > 0"):
+        gfo.spatial_sort(src, tmp_path / "dst.gpkg", max_rows_in_memory=0)
+
+
+def test_to_file_append_concurrent(tmp_path, engine_setter):
+    src = test_helper.get_testfile("polygon-parcel")
+    test_gdf = gfo.read_file(src).head(5)
+    dst = tmp_path / "dst.gpkg"
+
+    # Append from multiple threads: the lock file should serialize the appends
+    def append():
+        for _ in range(5):
+            gfo.to_file(test_gdf, dst, append=True)
+
+    threads = [threading.Thread(target=append) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert gfo.get_layerinfo(dst).featurecount == 4 * 5 * len(test_gdf)
+    assert not (tmp_path / "dst.gpkg.lock").exists()
+
+
+def test_batch_writer(tmp_path):
+    src = test_helper.get_testfile("polygon-parcel")
+    test_gdf = gfo.read_file(src)
+    dst = tmp_path / "dst.gpkg"
+
+    with gfo.BatchWriter(dst, batch_size=20) as writer:
+        for start in range(0, len(test_gdf), 7):
+            writer.write(test_gdf.iloc[start : start + 7])
+            # Rows are only written when batch_size rows are buffered
+            if start < 14:
+                assert not dst.exists()
+
+    result_gdf = gfo.read_file(dst)
+    assert_geodataframe_equal(
+        result_gdf, test_gdf, check_dtype=False, normalize=True, sort_values=True
+    )
+
+
+def test_batch_writer_invalid_batch_size(tmp_path):
+    with pytest.raises(ValueError, match="batch_size should be > 0"):
+        gfo.BatchWriter(tmp_path / "dst.gpkg", batch_size=0)
+
+
+@pytest.mark.parametrize("suffix", SUFFIXES_FILEOPS)
+def test_to_file_arrow(tmp_path, suffix):
+    pytest.importorskip("pyarrow")
+    src = test_helper.get_testfile("polygon-parcel", suffix=suffix)
+    encoding = "utf-8" if suffix == ".csv" else None
+    read_gdf = gfo.read_file(src, encoding=encoding)
+
+    # Write the file with and without Arrow: the result should be the same
+    exp_path = tmp_path / f"{src.stem}-exp{suffix}"
+    output_path = tmp_path / f"{src.stem}-arrow{suffix}"
+    with gfo.TempEnv({"GFO_IO_USE_ARROW": "FALSE"}):
+        gfo.to_file(read_gdf, exp_path)
+    with gfo.TempEnv({"GFO_IO_USE_ARROW": "TRUE"}):
+        gfo.to_file(read_gdf, output_path)
+        # Appending should also work
+        gfo.to_file(read_gdf, output_path, append=True)
+
+    exp_gdf = gfo.read_file(exp_path)
+    written_gdf = gfo.read_file(output_path)
+    assert len(written_gdf) == 2 * len(exp_gdf)
+    written_gdf = written_gdf.iloc[: len(exp_gdf)]
+    if suffix == ".csv":
+        assert_frame_equal(written_gdf, exp_gdf)
+    else:
+        assert_geodataframe_equal(written_gdf, exp_gdf)
+
+
 def test_to_file_attribute_table_gpkg(tmp_path, engine_setter):
     # Prepare test data
     test_path = test_helper.get_testfile("polygon-parcel", dst_dir=tmp_path)
@@ -8,10 +8,11 @@ import geopandas as gpd
 import pygeoops
 import pytest
 import shapely.geometry as sh_geom
+from osgeo import gdal
 
 import geofileops as gfo
 from geofileops import GeometryType
-from geofileops.util import _geometry_util
+from geofileops.util import _geometry_util, _geoseries_util
 from geofileops.util import _geoops_gpd as geoops_gpd
 from geofileops.util._geofileinfo import GeofileInfo
 from tests import test_helper
@@ -333,6 +334,170 @@ def test_buffer_styles(tmp_path, suffix, epsg):
     assert area_square_buffer > area_default_buffer
 
 
+@pytest.mark.parametrize("suffix", SUFFIXES_GEOOPS)
+@pytest.mark.parametrize("explodecollections", [False, True])
+def test_buffer_partial_format_parquet(tmp_path, suffix, explodecollections):
+    pytest.importorskip("pyarrow")
+    if gdal.GetDriverByName("Parquet") is None:
+        pytest.skip("GDAL Parquet driver not available")
+
+    # Prepare test data
+    input_path = test_helper.get_testfile("polygon-parcel", suffix=suffix)
+    input_layerinfo = gfo.get_layerinfo(input_path)
+    batchsize = math.ceil(input_layerinfo.featurecount / 4)
+
+    # Run the buffer with GeoPackage and with GeoParquet partial files
+    output_paths = {}
+    for partial_format in ["gpkg", "parquet"]:
+        output_path = tmp_path / f"{input_path.stem}-{partial_format}{suffix}"
+        with gfo.TempEnv({"GFO_PARTIAL_FORMAT": partial_format}):
+            geoops_gpd.buffer(
+                input_path=input_path,
+                output_path=output_path,
+                distance=1,
+                explodecollections=explodecollections,
+                batchsize=batchsize,
+            )
+        output_paths[partial_format] = output_path
+
+    # The results should be the same
+    exp_layerinfo = gfo.get_layerinfo(output_paths["gpkg"])
+    output_layerinfo = gfo.get_layerinfo(output_paths["parquet"])
+    assert output_layerinfo.featurecount == exp_layerinfo.featurecount
+    assert output_layerinfo.geometrytype == exp_layerinfo.geometrytype
+    assert list(output_layerinfo.columns) == list(exp_layerinfo.columns)
+    exp_gdf = gfo.read_file(output_paths["gpkg"])
+    output_gdf = gfo.read_file(output_paths["parquet"])
+    assert sum(output_gdf.area) == pytest.approx(sum(exp_gdf.area))
+
+
+@pytest.mark.parametrize("suffix", SUFFIXES_GEOOPS)
+@pytest.mark.parametrize("explodecollections", [False, True])
+def test_buffer_output_sorted(tmp_path, suffix, explodecollections):
+    # Prepare test data
+    input_path = test_helper.get_testfile("polygon-parcel", suffix=suffix)
+    output_path = tmp_path / f"{input_path.stem}-output{suffix}"
+    input_layerinfo = gfo.get_layerinfo(input_path)
+    batchsize = math.ceil(input_layerinfo.featurecount / 4)
+
+    # Run test: the square endcap style is only supported by the gpd implementation
+    with gfo.TempEnv({"GFO_OUTPUT_SORTED": "TRUE"}):
+        gfo.buffer(
+            input_path=input_path,
+            output_path=output_path,
+            distance=1,
+            endcap_style=_geometry_util.BufferEndCapStyle.SQUARE,
+            explodecollections=explodecollections,
+            batchsize=batchsize,
+        )
+
+    # Check the result
+    output_layerinfo = gfo.get_layerinfo(output_path)
+    assert output_layerinfo.name == output_path.stem
+    if GeofileInfo(output_path).default_spatial_index:
+        assert gfo.has_spatial_index(output_path)
+    output_gdf = gfo.read_file(output_path, fid_as_index=True)
+    if suffix == ".gpkg" and not explodecollections:
+        # The fids are preserved, so the output is not sorted
+        input_gdf = gfo.read_file(input_path, fid_as_index=True)
+        input_gdf = input_gdf[~input_gdf.geometry.is_empty & input_gdf.geometry.notna()]
+        assert list(output_gdf.index) == list(input_gdf.index)
+        return
+
+    # The rows should be sorted along the hilbert curve
+    centers = output_gdf.geometry.envelope.centroid
+    distances = _geoseries_util.hilbert_distance(centers.x, centers.y)
+    assert all(distances[:-1] <= distances[1:])
+
+
+@pytest.mark.parametrize("suffix", SUFFIXES_GEOOPS)
+@pytest.mark.parametrize("explodecollections", [False, True])
+def test_pipeline(tmp_path, suffix, explodecollections):
+    # Prepare test data
+    input_path = test_helper.get_testfile("polygon-parcel", suffix=suffix)
+    output_path = tmp_path / f"{input_path.stem}-output{suffix}"
+    input_layerinfo = gfo.get_layerinfo(input_path)
+    batchsize = math.ceil(input_layerinfo.featurecount / 2)
+
+    # Run test
+    pipeline = gfo.pipeline(input_path).buffer(distance=1).makevalid()
+    pipeline_simplify = pipeline.simplify(tolerance=1)
+    assert len(pipeline.steps) == 2
+    assert len(pipeline_simplify.steps) == 3
+    pipeline_simplify.to(
+        output_path, explodecollections=explodecollections, batchsize=batchsize
+    )
+
+    # Now check if the output file is correctly created
+    assert output_path.exists()
+    output_layerinfo = gfo.get_layerinfo(output_path)
+    assert len(output_layerinfo.columns) == len(input_layerinfo.columns)
+    if explodecollections:
+        assert output_layerinfo.geometrytype == GeometryType.POLYGON
+    else:
+        assert output_layerinfo.geometrytype == GeometryType.MULTIPOLYGON
+        assert input_layerinfo.featurecount == output_layerinfo.featurecount + 1
+
+    # The result should be the same as applying the operations one by one
+    input_gdf = gfo.read_file(input_path)
+    input_gdf = input_gdf[~input_gdf.geometry.isna()]
+    expected_geoms = pygeoops.simplify(
+        pygeoops.make_valid(input_gdf.geometry.buffer(1)), tolerance=1
+    )
+    if explodecollections:
+        expected_geoms = expected_geoms.explode(ignore_index=True)
+    output_gdf = gfo.read_file(output_path)
+    assert len(output_gdf) == len(expected_geoms)
+    assert sum(output_gdf.area) == pytest.approx(sum(expected_geoms.area))
+
+
+@pytest.mark.parametrize(
+    "force_output_geometrytype",
+    [None, GeometryType.MULTIPOLYGON, GeometryType.GEOMETRYCOLLECTION],
+)
+def test_pipeline_makevalid(tmp_path, force_output_geometrytype):
+    # Prepare test data: one of the polygons has a part that collapses to a line
+    test_gdf = gpd.GeoDataFrame(
+        {"descr": ["poly + line", "sliver"]},
+        geometry=[
+            sh_geom.MultiPolygon(
+                [
+                    sh_geom.Polygon([(0, 5), (5, 5), (5, 10), (0, 10), (0, 5)]),
+                    sh_geom.Polygon([(0, 0), (5, 0), (10, 0), (15, 0)]),
+                ]
+            ),
+            sh_geom.Polygon([(0, 0), (5, 0), (10, 0), (15, 0)]),
+        ],
+        crs=31370,
+    )
+    input_path = tmp_path / "input.gpkg"
+    gfo.to_file(test_gdf, input_path)
+
+    # Run test
+    output_path = tmp_path / "output.gpkg"
+    gfo.pipeline(input_path).makevalid().simplify(tolerance=1).to(
+        output_path, force_output_geometrytype=force_output_geometrytype
+    )
+
+    # The result should be the same as the one of the operations one by one
+    makevalid_path = tmp_path / "makevalid.gpkg"
+    geoops_gpd.makevalid(
+        input_path, makevalid_path, force_output_geometrytype=force_output_geometrytype
+    )
+    expected_path = tmp_path / "expected.gpkg"
+    geoops_gpd.simplify(makevalid_path, expected_path, tolerance=1)
+    output_gdf = gfo.read_file(output_path)
+    expected_gdf = gfo.read_file(expected_path)
+    assert len(output_gdf) == len(expected_gdf)
+    assert output_gdf.geometry.normalize().equals(expected_gdf.geometry.normalize())
+
+
+def test_pipeline_nosteps(tmp_path):
+    input_path = test_helper.get_testfile("polygon-parcel")
+    with pytest.raises(ValueError, match="at least one step should be specified"):
+        gfo.pipeline(input_path).to(tmp_path / "output.gpkg")
+
+
 @pytest.mark.parametrize(
     "suffix, epsg, testfile, gridsize",
     [
@@ -27,19 +27,21 @@ from tests.test_helper import SUFFIXES_GEOOPS, TESTFILES, assert_geodataframe_eq
 
 @pytest.mark.parametrize("testfile", TESTFILES)
 @pytest.mark.parametrize("suffix", SUFFIXES_GEOOPS)
-def test_clip(tmp_path, testfile, suffix):
+@pytest.mark.parametrize("broadcast_max_rows", ["0", "1000"])
+def test_clip(tmp_path, testfile, suffix, broadcast_max_rows):
     input_path = test_helper.get_testfile(testfile, suffix=suffix)
     clip_path = test_helper.get_testfile("polygon-zone", suffix=suffix)
     output_path = tmp_path / f"{input_path.stem}-output{suffix}"
     input_layerinfo = gfo.get_layerinfo(input_path)
     batchsize = math.ceil(input_layerinfo.featurecount / 2)
-    gfo.clip(
-        input_path=str(input_path),
-        clip_path=str(clip_path),
-        output_path=str(output_path),
-        where_post=None,
-        batchsize=batchsize,
-    )
+    with gfo.TempEnv({"GFO_BROADCAST_MAX_ROWS": broadcast_max_rows}):
+        gfo.clip(
+            input_path=str(input_path),
+            clip_path=str(clip_path),
+            output_path=str(output_path),
+            where_post=None,
+            batchsize=batchsize,
+        )
 
     # Compare result with geopandas
     assert output_path.exists()
@@ -896,6 +898,36 @@ def test_intersection(
     )
 
 
+def test_intersection_batch_order_hilbert(tmp_path):
+    """Intersection with batches ordered on a hilbert curve gives the same result."""
+    input1_path = test_helper.get_testfile("polygon-parcel")
+    input2_path = test_helper.get_testfile("polygon-zone")
+    batchsize = math.ceil(gfo.get_layerinfo(input1_path).featurecount / 4)
+
+    output_path = tmp_path / "output.gpkg"
+    with gfo.TempEnv({"GFO_BATCH_ORDER": "hilbert"}):
+        gfo.intersection(
+            input1_path=input1_path,
+            input2_path=input2_path,
+            output_path=output_path,
+            nb_parallel=2,
+            batchsize=batchsize,
+        )
+
+    # Check the contents of the result file by comparing with geopandas
+    output_gdf = gfo.read_file(output_path)
+    input1_gdf = gfo.read_file(input1_path)
+    input2_gdf = gfo.read_file(input2_path)
+    expected_gdf = input1_gdf.overlay(
+        input2_gdf, how="intersection", keep_geom_type=True
+    )
+    renames = dict(zip(expected_gdf.columns, output_gdf.columns))
+    expected_gdf = expected_gdf.rename(columns=renames)
+    assert_geodataframe_equal(
+        output_gdf, expected_gdf, check_dtype=False, sort_values=True
+    )
+
+
 def test_intersection_input_no_index(tmp_path):
     """
     Test if intersection works if the input gpkg files don't have a spatial index.
@@ -2,7 +2,9 @@ import logging
 
 import pytest
 
+import geofileops as gfo
 from geofileops.util import _geoops_gpd
+from tests import test_helper
 
 
 @pytest.mark.parametrize(
@@ -59,3 +61,63 @@ def test_determine_nb_batches(
 
     assert exp_nb_parallel == res_nb_parallel
     assert exp_nb_batches == res_nb_batches
+
+
+@pytest.mark.parametrize("calibrate", ["sample", "persist"])
+def test_calibrate_parallelization_config(calibrate):
+    input_path = test_helper.get_testfile("polygon-parcel")
+    input_layer = gfo.get_only_layer(input_path)
+
+    def buffer(gdf):
+        gdf.geometry = gdf.geometry.buffer(1)
+        return gdf
+
+    with gfo.TempEnv({"GFO_CALIBRATE": calibrate}):
+        config = _geoops_gpd._calibrate_parallelization_config(
+            input_path=input_path,
+            input_layer=input_layer,
+            apply_func=buffer,
+            parallelization_config=_geoops_gpd.ParallelizationConfig(cpu_count=2),
+            cache_key="buffer",
+        )
+        # The second time, the persisted calibration should be reused
+        config2 = _geoops_gpd._calibrate_parallelization_config(
+            input_path=input_path,
+            input_layer=input_layer,
+            apply_func=buffer,
+            cache_key="buffer",
+        )
+
+    assert config.cpu_count == 2
+    assert config.bytes_per_row > 0
+    assert 0 < config.min_rows_per_batch <= config.max_rows_per_batch
+    if calibrate == "persist":
+        assert config2.bytes_per_row == config.bytes_per_row
+        assert config2.min_rows_per_batch == config.min_rows_per_batch
+        assert config2.max_rows_per_batch == config.max_rows_per_batch
+
+
+@pytest.mark.parametrize("suffix", [".gpkg", ".shp"])
+@pytest.mark.parametrize("batch_weight", ["rows", "geomsize"])
+def test_prepare_processing_params_batch_weight(tmp_path, suffix, batch_weight):
+    input_path = test_helper.get_testfile("polygon-parcel", suffix=suffix)
+    input_layer = gfo.get_only_layer(input_path)
+    nb_rows = gfo.get_layerinfo(input_path).featurecount
+
+    with gfo.TempEnv({"GFO_BATCH_WEIGHT": batch_weight}):
+        processing_params = _geoops_gpd._prepare_processing_params(
+            input_path=input_path,
+            input_layer=input_layer,
+            nb_parallel=2,
+            batchsize=10,
+            tmp_dir=tmp_path,
+        )
+
+    assert len(processing_params.batches) > 1
+
+    # All rows should be in exactly one batch
+    nb_rows_batches = 0
+    for batch_filter in processing_params.batches:
+        batch_gdf = gfo.read_file(input_path, where=batch_filter)
+        nb_rows_batches += len(batch_gdf)
+    assert nb_rows_batches == nb_rows
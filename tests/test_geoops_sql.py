@@ -1,3 +1,5 @@
+import sqlite3
+
 import pytest
 
 import geofileops as gfo
@@ -51,6 +53,22 @@ def test_determine_nb_batches(
     assert exp_nb_batches == res_nb_batches
 
 
+def test_determine_nb_batches_executor(tmp_path):
+    # With an executor as shared pool, its workers are used instead of the local CPU's
+    executor = gfo.DirectoryQueueExecutor(tmp_path / "queue", max_workers=32)
+    with gfo.worker_pool(executor=executor):
+        res_nb_parallel, res_nb_batches = _geoops_sql._determine_nb_batches(
+            nb_rows_input_layer=1_000_000,
+            nb_parallel=-1,
+            batchsize=-1,
+            is_twolayer_operation=False,
+        )
+    executor.shutdown()
+
+    assert res_nb_parallel == 32
+    assert res_nb_batches == 32
+
+
 @pytest.mark.parametrize(
     "input1_suffix, input2_suffix, output1_suffix, output2_suffix",
     [
@@ -110,6 +128,107 @@ def test_convert_to_spatialite_based(
         assert input2_out_path is None
 
 
+def test_convert_to_spatialite_based_resume(tmp_path):
+    input1_path = test_helper.get_testfile("polygon-parcel", suffix=".shp")
+    input1_layer = gfo.get_only_layer(input1_path)
+    input2_path = test_helper.get_testfile("polygon-zone", suffix=".shp")
+    input2_layer = gfo.get_only_layer(input2_path)
+    kwargs = {
+        "input1_path": input1_path,
+        "input1_layer": input1_layer,
+        "tempdir": tmp_path,
+        "input2_path": input2_path,
+        "input2_layer": input2_layer,
+    }
+
+    with gfo.TempEnv({"GFO_RESUME": "True"}):
+        result = _geoops_sql._convert_to_spatialite_based(**kwargs)
+        stats = [result[0].stat().st_mtime_ns, result[2].stat().st_mtime_ns]
+
+        # When resuming, the completed conversions are reused
+        assert _geoops_sql._convert_to_spatialite_based(**kwargs) == result
+        assert [result[0].stat().st_mtime_ns, result[2].stat().st_mtime_ns] == stats
+
+        # Unless the input changed
+        kwargs["input2_path"] = test_helper.get_testfile(
+            "polygon-zone", suffix=".shp", dst_dir=tmp_path / "changed"
+        )
+        _geoops_sql._convert_to_spatialite_based(**kwargs)
+        assert result[2].stat().st_mtime_ns != stats[1]
+
+
+@pytest.mark.parametrize("batch_weight", ["rows", "geomsize"])
+def test_prepare_processing_params_batch_weight(tmp_path, batch_weight):
+    # Copy the test file so the rowids are not consecutive anymore
+    input1_path = test_helper.get_testfile("polygon-parcel", dst_dir=tmp_path)
+    input1_layer = gfo.get_only_layer(input1_path)
+    gfo.execute_sql(input1_path, f'DELETE FROM "{input1_layer}" WHERE fid % 3 = 0')
+    nb_rows = gfo.get_layerinfo(input1_path).featurecount
+
+    with gfo.TempEnv({"GFO_BATCH_WEIGHT": batch_weight}):
+        processing_params = _geoops_sql._prepare_processing_params(
+            input1_path=input1_path,
+            input1_layer=input1_layer,
+            tempdir=tmp_path,
+            nb_parallel=2,
+            batchsize=10,
+        )
+
+    assert processing_params is not None
+    assert len(processing_params.batches) > 1
+    assert list(processing_params.batches) == list(
+        range(len(processing_params.batches))
+    )
+
+    # All rows should be in exactly one batch
+    nb_rows_batches = 0
+    for batch in processing_params.batches.values():
+        sql_stmt = f"""
+            SELECT COUNT(*) AS nb_rows FROM "{input1_layer}"
+             WHERE 1=1 {batch["batch_filter"]}
+        """
+        batch_df = gfo.read_file(input1_path, sql_stmt=sql_stmt)
+        nb_rows_batches += batch_df["nb_rows"].item()
+    assert nb_rows_batches == nb_rows
+
+
+@pytest.mark.parametrize("suffix", [".gpkg", ".sqlite"])
+def test_prepare_processing_params_hilbert(tmp_path, suffix):
+    input1_path = test_helper.get_testfile("polygon-parcel", suffix=suffix)
+    input1_layer = gfo.get_only_layer(input1_path)
+    input2_path = test_helper.get_testfile("polygon-zone", suffix=suffix)
+    nb_rows = gfo.get_layerinfo(input1_path).featurecount
+
+    processing_params = _geoops_sql._prepare_processing_params(
+        input1_path=input1_path,
+        input1_layer=input1_layer,
+        input1_layer_alias="layer1",
+        input2_path=input2_path,
+        input2_layer=gfo.get_only_layer(input2_path),
+        tempdir=tmp_path,
+        nb_parallel=2,
+        batchsize=10,
+        batch_order="hilbert",
+    )
+
+    assert processing_params is not None
+    assert processing_params.batch_db_path is not None
+    assert len(processing_params.batches) > 1
+    for batch_id, batch in processing_params.batches.items():
+        assert "layer1.rowid IN (" in batch["batch_filter"]
+        assert f"batch_id = {batch_id})" in batch["batch_filter"]
+
+    # All rows should be assigned to exactly one batch
+    conn = sqlite3.connect(processing_params.batch_db_path)
+    try:
+        rows = conn.execute("SELECT batch_id, id FROM batch_rows").fetchall()
+    finally:
+        conn.close()
+    assert len(rows) == nb_rows
+    assert len({id for _, id in rows}) == nb_rows
+    assert {batch_id for batch_id, _ in rows} == set(processing_params.batches)
+
+
 @pytest.mark.parametrize(
     "desc, testfile, subdivide_coords, expected_subdivided",
     [
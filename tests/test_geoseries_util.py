@@ -3,6 +3,7 @@ Tests for functionalities in geoseries_util.
 """
 
 import geopandas as gpd
+import numpy as np
 import pytest
 import shapely
 import shapely.geometry as sh_geom
@@ -193,6 +194,34 @@ def test_harmonize_geometrytypes():
             assert geom is not None
 
 
+@pytest.mark.parametrize("level", [1, 2, 4])
+def test_hilbert_distance(level):
+    # Create all cells of a grid with the size of the level
+    side = 2**level
+    x, y = np.meshgrid(np.arange(side, dtype=float), np.arange(side, dtype=float))
+    x = x.ravel()
+    y = y.ravel()
+
+    result = _geoseries_util.hilbert_distance(
+        x, y, total_bounds=(0, 0, side - 1, side - 1), level=level
+    )
+
+    # Each cell should get a unique distance + cells following each other on the
+    # curve should be neighbours.
+    assert sorted(result.tolist()) == list(range(side * side))
+    order = np.argsort(result)
+    steps = np.abs(np.diff(x[order])) + np.abs(np.diff(y[order]))
+    assert (steps == 1).all()
+
+
+def test_hilbert_distance_nan():
+    result = _geoseries_util.hilbert_distance(
+        np.array([np.nan, 0.0, 10.0]), np.array([np.nan, 0.0, 10.0])
+    )
+    assert result.tolist()[:2] == [0, 0]
+    assert result[2] > 0
+
+
 def test_is_valid_reason(tmp_path):
     # Test with valid data + Empty geometry
     # -------------------------------------
@@ -2,6 +2,12 @@
 Tests for functionalities in _io_util.
 """
 
+import threading
+import time
+
+import pytest
+
+import geofileops as gfo
 from geofileops.util import _io_util
 
 
@@ -17,6 +23,32 @@ def test_create_tempdir():
     tempdir2.rmdir()
 
 
+def test_create_tempdir_resume_key(tmp_path):
+    # Test
+    tempdir1 = _io_util.create_tempdir("testje", tmp_path, resume_key="key1")
+    assert tempdir1.exists()
+    tempdir2 = _io_util.create_tempdir("testje", tmp_path, resume_key="key1")
+    assert tempdir2 == tempdir1
+    tempdir3 = _io_util.create_tempdir("testje", tmp_path, resume_key="key2")
+    assert tempdir3 != tempdir1
+
+
+def test_get_resume_key(tmp_path):
+    path = tmp_path / "testje.txt"
+    path.write_text("test")
+    with gfo.TempEnv({"GFO_RESUME": "False"}):
+        assert _io_util.get_resume_key(path) is None
+
+    with gfo.TempEnv({"GFO_RESUME": "True"}):
+        resume_key = _io_util.get_resume_key(path)
+        assert resume_key is not None
+        assert _io_util.get_resume_key(path) == resume_key
+
+        # If the file changes, the key should be different
+        path.write_text("test changed")
+        assert _io_util.get_resume_key(path) != resume_key
+
+
 def test_create_file_atomic(tmp_path):
     path = tmp_path / "testje_atomic.txt"
     file_created = _io_util.create_file_atomic(path)
@@ -50,3 +82,40 @@ def test_get_tempfile_locked():
             tempfile2lock_path.unlink()
         if tempfile3lock_path is not None:
             tempfile3lock_path.unlink()
+
+
+def test_lock_file(tmp_path):
+    path = tmp_path / "test.gpkg"
+    lockfile = tmp_path / "test.gpkg.lock"
+    with _io_util.lock_file(path, timeout_s=1):
+        assert lockfile.exists()
+        # The lock is exclusive, also within the same process
+        with pytest.raises(TimeoutError, match="reached locking"):
+            with _io_util.lock_file(path, timeout_s=0.1):
+                pass
+
+    assert not lockfile.exists()
+    with _io_util.lock_file(path, timeout_s=0.1):
+        pass
+
+
+def test_lock_file_threads(tmp_path):
+    # Increment a counter in a file from multiple threads: without lock, increments
+    # would get lost.
+    path = tmp_path / "counter.txt"
+    path.write_text("0")
+
+    def increment():
+        for _ in range(20):
+            with _io_util.lock_file(path, timeout_s=60):
+                value = int(path.read_text())
+                time.sleep(0.001)
+                path.write_text(str(value + 1))
+
+    threads = [threading.Thread(target=increment) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert path.read_text() == "160"
@@ -0,0 +1,100 @@
+"""
+Tests for functionalities in _merge_util.
+"""
+
+import geopandas as gpd
+import pytest
+from osgeo import gdal
+
+import geofileops as gfo
+from geofileops.util import _merge_util
+from tests import test_helper
+
+
+@pytest.mark.parametrize("nb_partials", [1, 3, 4, 11])
+@pytest.mark.parametrize("fanin", [2, 4])
+@pytest.mark.parametrize("suffix", [".gpkg", ".parquet"])
+def test_partials_merger(tmp_path, nb_partials, fanin, suffix):
+    if suffix == ".parquet":
+        pytest.importorskip("pyarrow")
+        if gdal.GetDriverByName("Parquet") is None:
+            pytest.skip("GDAL Parquet driver not available")
+
+    # Prepare test data: split the test file in partial files
+    src = test_helper.get_testfile("polygon-parcel", dst_dir=tmp_path)
+    src_gdf = gfo.read_file(src)
+    partial_dir = tmp_path / "partials"
+    partial_dir.mkdir()
+    partial_paths = []
+    for index in range(nb_partials):
+        partial_path = partial_dir / f"partial_{index}{suffix}"
+        _merge_util.write_partial(
+            src_gdf.iloc[index::nb_partials], partial_path, index=False
+        )
+        partial_paths.append(partial_path)
+
+    # Test
+    output_path = tmp_path / "output.gpkg"
+    merger = _merge_util.PartialsMerger(tmp_dir=tmp_path, fanin=fanin)
+    for partial_path in partial_paths:
+        merger.add(partial_path)
+    merger.finalize(output_path)
+
+    # Check result
+    assert output_path.exists()
+    assert gfo.get_layerinfo(output_path).featurecount == len(src_gdf)
+    assert not any(path.exists() for path in partial_paths)
+    if nb_partials >= fanin:
+        assert merger.nb_merges > 0
+    else:
+        assert merger.nb_merges == 0
+
+
+def test_partials_merger_invalid_fanin(tmp_path):
+    with pytest.raises(ValueError, match="fanin should be at least 2"):
+        _merge_util.PartialsMerger(tmp_dir=tmp_path, fanin=1)
+
+
+def test_merge_partials_parquet(tmp_path):
+    pytest.importorskip("pyarrow")
+    src = test_helper.get_testfile("polygon-parcel", dst_dir=tmp_path)
+    src_gdf = gfo.read_file(src)
+    partial_paths = []
+    for index in range(3):
+        partial_path = tmp_path / f"partial_{index}.parquet"
+        _merge_util.write_partial(
+            src_gdf.iloc[index::3], partial_path, force_multitype=True, index=False
+        )
+        partial_paths.append(partial_path)
+    # An empty partial should not influence the result
+    empty_path = tmp_path / "partial_empty.parquet"
+    _merge_util.write_partial(
+        src_gdf.iloc[0:0],
+        empty_path,
+        force_output_geometrytype="MULTIPOLYGON",
+        index=False,
+    )
+    partial_paths.append(empty_path)
+
+    # Test
+    output_path = tmp_path / "merged.parquet"
+    result_path, _ = _merge_util.merge_partials(partial_paths, output_path)
+
+    # Check result
+    assert result_path == output_path
+    assert not any(path.exists() for path in partial_paths)
+    result_gdf = gpd.read_parquet(output_path)
+    assert len(result_gdf) == len(src_gdf)
+    assert list(result_gdf.columns) == list(src_gdf.columns)
+    assert set(result_gdf.geometry.dropna().geom_type) == {"MultiPolygon"}
+
+
+def test_partial_suffix_old_pyarrow(monkeypatch):
+    pyarrow = pytest.importorskip("pyarrow")
+    monkeypatch.setattr(pyarrow, "__version__", "13.0.0")
+    with gfo.TempEnv({"GFO_PARTIAL_FORMAT": "parquet"}):
+        with pytest.raises(RuntimeError, match="requires pyarrow >= 14"):
+            _merge_util.partial_suffix()
+
+        # If GeoPackage is used anyway, the version doesn't matter
+        assert _merge_util.partial_suffix(preserve_fid=True) == ".gpkg"
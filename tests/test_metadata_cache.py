@@ -0,0 +1,86 @@
+"""
+Tests for functionalities in _metadata_cache.
+"""
+
+import shutil
+import sqlite3
+
+import geofileops as gfo
+from geofileops.util import _metadata_cache
+from tests import test_helper
+
+
+def test_get(tmp_path):
+    path = tmp_path / "test.txt"
+    path.write_text("test")
+    nb_computed = 0
+
+    def compute():
+        nonlocal nb_computed
+        nb_computed += 1
+        return nb_computed
+
+    assert _metadata_cache.get(path, key="test", compute=compute) == 1
+    assert _metadata_cache.get(path, key="test", compute=compute) == 1
+    assert _metadata_cache.get(path, key="other", compute=compute) == 2
+
+    # If the file changes, the metadata is computed again
+    path.write_text("test changed")
+    assert _metadata_cache.get(path, key="test", compute=compute) == 3
+
+    # After invalidation, the metadata is computed again
+    _metadata_cache.invalidate(path)
+    assert _metadata_cache.get(path, key="test", compute=compute) == 4
+
+
+def test_get_missing_file(tmp_path):
+    # For a file that doesn't exist, nothing is cached
+    path = tmp_path / "not_existing.txt"
+    assert _metadata_cache.get(path, key="test", compute=lambda: 1) == 1
+    assert _metadata_cache.get(path, key="test", compute=lambda: 2) == 2
+
+
+def test_get_layerinfo_cached(tmp_path):
+    src = test_helper.get_testfile("polygon-parcel", dst_dir=tmp_path)
+    layerinfo = gfo.get_layerinfo(src)
+    assert "NEW_COLUMN" not in layerinfo.columns
+
+    # Changes to the layerinfo returned should not end up in the cache
+    layerinfo.columns.clear()
+    layerinfo.name = "changed"
+    layerinfo_cached = gfo.get_layerinfo(src)
+    assert layerinfo_cached.name == "parcels"
+    assert len(layerinfo_cached.columns) > 0
+
+    # A write operation of geofileops invalidates the cache
+    gfo.add_column(src, name="NEW_COLUMN", type=gfo.DataType.INTEGER)
+    assert "NEW_COLUMN" in gfo.get_layerinfo(src).columns
+
+
+def test_get_layerinfo_changed_externally(tmp_path):
+    src = test_helper.get_testfile("polygon-parcel", dst_dir=tmp_path)
+    layerinfo = gfo.get_layerinfo(src)
+    other_path = tmp_path / "other.gpkg"
+    gfo.to_file(gfo.read_file(src).head(2), other_path, layer=layerinfo.name)
+
+    # Change the file without geofileops: the cached metadata isn't used anymore
+    # because the modification time and size of the file changed.
+    shutil.copy(other_path, src)
+    assert gfo.get_layerinfo(src).featurecount == 2
+    assert layerinfo.featurecount > 2
+
+
+def test_listlayers_cached(tmp_path):
+    src = test_helper.get_testfile("polygon-parcel", dst_dir=tmp_path)
+    assert gfo.listlayers(src, only_spatial_layers=False) == ["parcels"]
+
+    # Add a layer without geofileops
+    with sqlite3.connect(src) as conn:
+        conn.execute("CREATE TABLE extra (id INTEGER PRIMARY KEY)")
+        conn.execute(
+            "INSERT INTO gpkg_contents (table_name, data_type, identifier) "
+            "VALUES ('extra', 'attributes', 'extra')"
+        )
+    conn.close()
+
+    assert gfo.listlayers(src, only_spatial_layers=False) == ["parcels", "extra"]
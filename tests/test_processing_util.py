@@ -2,11 +2,83 @@
 Tests for functionalities in _processing_util.
 """
 
+import functools
+import multiprocessing
 import os
+import threading
+import time
+from concurrent import futures
 
+import pytest
+
+import geofileops as gfo
 from geofileops.util import _processing_util
 
 
+@pytest.mark.parametrize("version", [1, 2])
+def test_cgroup_limits(tmp_path, version):
+    # Prepare a fake cgroup hierarchy with a container with 2.5 CPU's and 1 GB memory
+    # within a parent cgroup with 4 CPU's and 2 GB memory.
+    cgroup_root = tmp_path / "cgroup"
+    proc_cgroup_path = tmp_path / "proc_cgroup"
+    if version == 2:
+        proc_cgroup_path.write_text("0::/parent/container\n")
+        cgroup_root.mkdir()
+        (cgroup_root / "cgroup.controllers").write_text("cpu memory")
+        parent_dir = cgroup_root / "parent"
+        container_dir = parent_dir / "container"
+        container_dir.mkdir(parents=True)
+        (cgroup_root / "cpu.max").write_text("max 100000")
+        (parent_dir / "cpu.max").write_text("400000 100000")
+        (container_dir / "cpu.max").write_text("250000 100000")
+        (parent_dir / "memory.max").write_text(str(2 * 1024**3))
+        (container_dir / "memory.max").write_text(str(1024**3))
+        (container_dir / "memory.current").write_text(str(300 * 1024**2))
+        (container_dir / "memory.stat").write_text(
+            f"anon 123\ninactive_file {100 * 1024**2}\n"
+        )
+    else:
+        proc_cgroup_path.write_text(
+            "4:memory:/parent/container\n2:cpu,cpuacct:/parent/container\n"
+        )
+        cpu_container_dir = cgroup_root / "cpu,cpuacct" / "parent" / "container"
+        cpu_container_dir.mkdir(parents=True)
+        (cgroup_root / "cpu,cpuacct" / "cpu.cfs_quota_us").write_text("-1")
+        (cgroup_root / "cpu,cpuacct" / "cpu.cfs_period_us").write_text("100000")
+        (cpu_container_dir / "cpu.cfs_quota_us").write_text("250000")
+        (cpu_container_dir / "cpu.cfs_period_us").write_text("100000")
+        memory_root = cgroup_root / "memory"
+        container_dir = memory_root / "parent" / "container"
+        container_dir.mkdir(parents=True)
+        (memory_root / "memory.limit_in_bytes").write_text("9223372036854771712")
+        (container_dir / "memory.limit_in_bytes").write_text(str(1024**3))
+        (container_dir / "memory.usage_in_bytes").write_text(str(300 * 1024**2))
+        (container_dir / "memory.stat").write_text(
+            f"cache 123\ntotal_inactive_file {100 * 1024**2}\n"
+        )
+
+    # Test
+    cpu_quota = _processing_util._get_cgroup_cpu_quota(cgroup_root, proc_cgroup_path)
+    memory = _processing_util._get_cgroup_memory(cgroup_root, proc_cgroup_path)
+
+    assert cpu_quota == 2.5
+    assert memory == (1024**3, 200 * 1024**2)
+
+
+def test_cgroup_limits_none(tmp_path):
+    # If there are no cgroups, there are no limits
+    cgroup_root = tmp_path / "cgroup"
+    proc_cgroup_path = tmp_path / "proc_cgroup"
+    assert _processing_util._get_cgroup_cpu_quota(cgroup_root, proc_cgroup_path) is None
+    assert _processing_util._get_cgroup_memory(cgroup_root, proc_cgroup_path) is None
+
+
+def test_cpu_count_memory_info():
+    assert _processing_util.cpu_count() >= 1
+    memory = _processing_util.memory_info()
+    assert 0 < memory.available <= memory.total
+
+
 def test_processnice():
     # Test setting and getting some values for nice
     # Remark: the nice values tests are spcifically written to accomodate for
@@ -42,3 +114,370 @@ def test_processnice():
 
     # Reset niceness to original value before test
     _processing_util.setprocessnice(nice_orig)
+
+
+def _sleep_range(start: int, end: int, sleep_s: float) -> tuple[int, int]:
+    time.sleep(sleep_s)
+    return (start, end)
+
+
+@pytest.mark.parametrize("split", [True, False])
+def test_as_completed_split_stragglers(split):
+    # Batch 0 is a straggler, the other batches are fast
+    ranges = {batch_id: (batch_id * 100, batch_id * 100 + 99) for batch_id in range(4)}
+    with futures.ThreadPoolExecutor(max_workers=4) as pool:
+
+        def split_batch(batch_id, nb_parts):
+            future_to_sub_id = {}
+            sub_ranges = _processing_util.split_range(*ranges[batch_id], nb_parts)
+            for sub_start, sub_end in sub_ranges:
+                sub_id = max(ranges) + 1
+                ranges[sub_id] = (sub_start, sub_end)
+                # The sub-batches are completed immediately, so they are always
+                # completed together, which should still yield each of them once.
+                future: futures.Future = futures.Future()
+                future.set_running_or_notify_cancel()
+                future.set_result((sub_start, sub_end))
+                future_to_sub_id[future] = sub_id
+            return future_to_sub_id
+
+        # Remark: the fast batches need to run long enough to be seen running, as
+        # only the duration of those is known to determine the stragglers.
+        future_to_batch_id = {}
+        for batch_id, (start, end) in ranges.items():
+            sleep_s = 1.5 if batch_id == 0 else 0.2
+            future = pool.submit(_sleep_range, start, end, sleep_s)
+            future_to_batch_id[future] = batch_id
+        batches_completed = _processing_util.AsCompletedSplitStragglers(
+            pool=pool,
+            future_to_batch_id=future_to_batch_id,
+            split_batch=split_batch if split else None,
+            nb_workers=4,
+            straggler_min_seconds=0.2,
+            poll_interval=0.05,
+        )
+        results = [future.result() for future, _ in batches_completed]
+
+        # The pool should still be usable, e.g. to merge the results
+        assert pool.submit(_sleep_range, 0, 1, 0).result() == (0, 1)
+        batches_completed.terminate_discarded()
+
+    # All rows should be covered exactly once
+    rows = [row for start, end in results for row in range(start, end + 1)]
+    assert sorted(rows) == list(range(400))
+    assert batches_completed.nb_done == 4
+    if split:
+        assert batches_completed.nb_split == 1
+        assert len(results) == len(ranges) - 1
+        assert len(results) > 4
+    else:
+        assert batches_completed.nb_split == 0
+        assert len(results) == 4
+
+
+def _stoppable_range(start: int, end: int, sleep_s: float, path) -> tuple[int, int]:
+    stop_time = time.perf_counter() + sleep_s
+    while time.perf_counter() < stop_time:
+        _processing_util.raise_if_stopped(path)
+        time.sleep(0.01)
+    if start < 0:
+        raise ValueError("invalid range")
+    return (start, end)
+
+
+@pytest.mark.parametrize("sub_fails", [False, True])
+def test_as_completed_split_stragglers_stop(tmp_path, sub_fails):
+    # Batch 0 is a straggler that would take very long: once it is split, it should
+    # be stopped and the sub-batches should cover its range.
+    ranges = {batch_id: (batch_id * 100, batch_id * 100 + 99) for batch_id in range(4)}
+    paths = {}
+    with futures.ThreadPoolExecutor(max_workers=4) as pool:
+
+        def submit_batch(batch_id, start, end, sleep_s):
+            ranges[batch_id] = (start, end)
+            paths[batch_id] = tmp_path / f"batch_{batch_id}.gpkg"
+            return pool.submit(_stoppable_range, start, end, sleep_s, paths[batch_id])
+
+        def split_batch(batch_id, nb_parts):
+            future_to_sub_id = {}
+            sub_ranges = _processing_util.split_range(*ranges[batch_id], nb_parts)
+            for index, (sub_start, sub_end) in enumerate(sub_ranges):
+                sub_id = max(ranges) + 1
+                if sub_fails and index == 0:
+                    sub_start = -1
+                future = submit_batch(sub_id, sub_start, sub_end, 0)
+                future_to_sub_id[future] = sub_id
+            return future_to_sub_id
+
+        def stop_batch(batch_id):
+            _processing_util.request_stop(paths[batch_id])
+
+        future_to_batch_id = {}
+        for batch_id, (start, end) in list(ranges.items()):
+            sleep_s = 60 if batch_id == 0 else 0.2
+            future_to_batch_id[submit_batch(batch_id, start, end, sleep_s)] = batch_id
+        batches_completed = _processing_util.AsCompletedSplitStragglers(
+            pool=pool,
+            future_to_batch_id=future_to_batch_id,
+            split_batch=split_batch,
+            stop_batch=stop_batch,
+            nb_workers=4,
+            straggler_min_seconds=0.2,
+            poll_interval=0.05,
+        )
+        start = time.perf_counter()
+        results = []
+        errors = []
+        for future, _ in batches_completed:
+            try:
+                results.append(future.result())
+            except ValueError as ex:
+                errors.append(ex)
+
+    # The straggler was stopped rather than running till the end
+    assert time.perf_counter() - start < 30
+    assert batches_completed.nb_split == 1
+    assert batches_completed.nb_done == 4
+    rows = [row for start, end in results for row in range(start, end + 1)]
+    if sub_fails:
+        # The error of the sub-batch is yielded, as the straggler was stopped
+        assert len(errors) == 1
+        assert sorted(rows) == list(range(100, 400))
+    else:
+        assert len(errors) == 0
+        assert sorted(rows) == list(range(400))
+
+
+def test_as_completed_split_stragglers_shared_pool():
+    # If batch loops of multiple steps use the same pool at the same time, it is not
+    # known if workers are idle, so stragglers should not be split.
+    def split_batch(batch_id, nb_parts):
+        raise AssertionError("stragglers should not be split")
+
+    def step(pool):
+        future_to_batch_id = {
+            pool.submit(_sleep_range, 0, 99, 1.5 if batch_id == 0 else 0.2): batch_id
+            for batch_id in range(4)
+        }
+        batches_completed = _processing_util.AsCompletedSplitStragglers(
+            pool=pool,
+            future_to_batch_id=future_to_batch_id,
+            split_batch=split_batch,
+            nb_workers=8,
+            straggler_min_seconds=0.2,
+            poll_interval=0.05,
+        )
+        results = [future.result() for future, _ in batches_completed]
+        return len(results), batches_completed.nb_split
+
+    with futures.ThreadPoolExecutor(max_workers=8) as pool:
+        results = _processing_util.run_dag(
+            {"step1": (lambda: step(pool), []), "step2": (lambda: step(pool), [])}
+        )
+
+    assert results == {"step1": (4, 0), "step2": (4, 0)}
+    assert id(pool) not in _processing_util._nb_iterating
+
+
+@pytest.mark.parametrize("ceiling, exp_max_running", [(100, 4), (0.001, 1)])
+def test_as_completed_memory_monitor(ceiling, exp_max_running):
+    running = []
+    max_running = 0
+
+    def submit(pool, batch_id):
+        nonlocal max_running
+        running.append(batch_id)
+        max_running = max(max_running, len(running))
+        future = pool.submit(_sleep_range, batch_id, batch_id, 0.05)
+        future.add_done_callback(lambda _: running.remove(batch_id))
+        return future
+
+    with futures.ThreadPoolExecutor(max_workers=4) as pool:
+        to_submit = [
+            (batch_id, functools.partial(submit, pool, batch_id))
+            for batch_id in range(8)
+        ]
+        memory_monitor = _processing_util.MemoryMonitor(
+            pool=pool, max_concurrency=4, ceiling=ceiling
+        )
+        batches_completed = _processing_util.AsCompletedSplitStragglers(
+            pool=pool,
+            future_to_batch_id={},
+            nb_workers=4,
+            poll_interval=0.01,
+            to_submit=to_submit,
+            memory_monitor=memory_monitor,
+        )
+        batch_ids = [batch_id for _, batch_id in batches_completed]
+
+    # All batches should have been run once, but not more in parallel than allowed
+    assert sorted(batch_ids) == list(range(8))
+    assert batches_completed.nb_done == 8
+    assert max_running <= exp_max_running
+    if exp_max_running == 1:
+        assert memory_monitor.concurrency == 1
+        assert memory_monitor.nb_throttled > 0
+
+
+def test_run_dag():
+    order = []
+
+    def step(name: str, sleep_s: float = 0.0) -> str:
+        time.sleep(sleep_s)
+        order.append(name)
+        return name
+
+    results = _processing_util.run_dag(
+        {
+            "slow": (lambda: step("slow", 0.2), []),
+            "fast": (lambda: step("fast"), []),
+            "after_fast": (lambda: step("after_fast"), ["fast"]),
+            "final": (lambda: step("final"), ["slow", "after_fast"]),
+        }
+    )
+
+    assert results == {name: name for name in ["slow", "fast", "after_fast", "final"]}
+    # The steps that only depend on fast steps shouldn't wait for the slow step
+    assert order == ["fast", "after_fast", "slow", "final"]
+
+
+@pytest.mark.parametrize(
+    "steps, expected_error",
+    [
+        ({"a": (lambda: None, ["unknown"])}, "depends on unknown steps"),
+        (
+            {"a": (lambda: None, ["b"]), "b": (lambda: None, ["a"])},
+            "circular dependencies",
+        ),
+    ],
+)
+def test_run_dag_invalid(steps, expected_error):
+    with pytest.raises(ValueError, match=expected_error):
+        _processing_util.run_dag(steps)
+
+
+def test_run_dag_error():
+    def fail():
+        raise RuntimeError("step failed")
+
+    started = []
+    with pytest.raises(RuntimeError, match="step failed"):
+        _processing_util.run_dag(
+            {
+                "fail": (fail, []),
+                "after_fail": (lambda: started.append("after_fail"), ["fail"]),
+            }
+        )
+    assert started == []
+
+
+@pytest.mark.parametrize(
+    "start, end, nb_parts, expected",
+    [
+        (0, 9, 2, [(0, 4), (5, 9)]),
+        (0, 9, 3, [(0, 2), (3, 5), (6, 9)]),
+        (5, 6, 4, [(5, 5), (6, 6)]),
+        (3, 3, 2, [(3, 3)]),
+    ],
+)
+def test_split_range(start, end, nb_parts, expected):
+    assert _processing_util.split_range(start, end, nb_parts) == expected
+
+
+def test_resume_manifest(tmp_path):
+    manifest_path = tmp_path / "manifest.json"
+    output_path = tmp_path / "output_0.gpkg"
+    output_path.touch()
+    fingerprint = {"sql": "SELECT 1", "batches": ["filter_0", "filter_1"]}
+    manifest = _processing_util.ResumeManifest(manifest_path, fingerprint)
+    assert not manifest.is_completed(0)
+    manifest.set_completed(0, [output_path, tmp_path / "not_existing.gpkg"])
+    assert manifest.is_completed(0)
+    assert not manifest.is_completed(1)
+
+    # A new manifest with the same fingerprint reuses the completed batches
+    manifest = _processing_util.ResumeManifest(manifest_path, fingerprint)
+    assert manifest.is_completed(0)
+
+    # If the output of a batch was removed, it is not completed anymore
+    output_path.unlink()
+    assert not manifest.is_completed(0)
+    output_path.touch()
+
+    # A manifest with another fingerprint starts from scratch
+    fingerprint_other = {**fingerprint, "sql": "SELECT 2"}
+    manifest = _processing_util.ResumeManifest(manifest_path, fingerprint_other)
+    assert not manifest.is_completed(0)
+
+
+def test_release_workers():
+    # All workers of a process pool should get a task to release their resources
+    with futures.ProcessPoolExecutor(max_workers=2) as pool:
+        _processing_util.release_workers(pool)
+        assert pool.submit(os.getpid).result() != os.getpid()
+
+    # For a pool that is shut down already, nothing happens
+    _processing_util.release_workers(pool)
+
+
+def test_release_workers_shared_pool(monkeypatch):
+    released = []
+    monkeypatch.setattr(_processing_util, "release_workers", released.append)
+
+    with futures.ThreadPoolExecutor(max_workers=2) as executor:
+        with gfo.worker_pool(executor=executor):
+            # Simulate two operations using the shared pool at the same time
+            factory1 = _processing_util.PooledExecutorFactory(threadpool=False)
+            factory2 = _processing_util.PooledExecutorFactory(threadpool=False)
+            with factory1 as pool1:
+                with factory2 as pool2:
+                    assert pool1 is executor and pool2 is executor
+
+                # The pool is still used by the first operation, so no release yet
+                assert released == []
+
+            # The last operation using the pool releases the workers
+            assert released == [executor]
+
+
+@pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(), reason="fork not available"
+)
+def test_can_fork(monkeypatch):
+    # Other tests can leave e.g. daemon threads behind, so fake the number of threads
+    monkeypatch.setattr(threading, "active_count", lambda: 1)
+    assert _processing_util.can_fork()
+
+    # Not for the workers of a shared pool
+    with futures.ThreadPoolExecutor(max_workers=1) as executor:
+        with gfo.worker_pool(executor=executor):
+            assert not _processing_util.can_fork()
+
+    # Not if other threads are running
+    monkeypatch.setattr(threading, "active_count", lambda: 2)
+    assert not _processing_util.can_fork()
+
+
+def test_worker_pool():
+    with gfo.worker_pool(nb_parallel=2) as shared_pool:
+        # Within the scope, the shared pool should be used for process pools
+        with _processing_util.PooledExecutorFactory(
+            threadpool=False, max_workers=4
+        ) as pool:
+            assert pool is shared_pool
+            assert pool.submit(os.getpid).result() != os.getpid()
+
+        # Thread pools are not shared
+        with _processing_util.PooledExecutorFactory(threadpool=True) as pool:
+            assert pool is not shared_pool
+
+        # The shared pool should still be usable after an operation used it
+        assert shared_pool.submit(os.getpid).result() != os.getpid()
+
+        # With reuse_active, the active shared pool is used instead of a new one
+        with gfo.worker_pool(nb_parallel=2, reuse_active=True) as reused_pool:
+            assert reused_pool is shared_pool
+
+    # Outside the scope, a new pool is created again
+    with _processing_util.PooledExecutorFactory(threadpool=False) as pool:
+        assert pool is not shared_pool
@@ -0,0 +1,173 @@
+"""
+Tests for functionalities in _queue_executor.
+"""
+
+import math
+import operator
+import shutil
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+import geofileops as gfo
+from geofileops.util import _queue_executor
+from tests import test_helper
+
+
+def test_directory_queue_executor(tmp_path):
+    queue_dir = tmp_path / "queue"
+    executor = _queue_executor.DirectoryQueueExecutor(queue_dir, poll_interval=0.01)
+    workers = [
+        threading.Thread(
+            target=_queue_executor.run_worker,
+            kwargs={"queue_dir": queue_dir, "poll_interval": 0.01, "idle_timeout": 1},
+        )
+        for _ in range(2)
+    ]
+    for worker in workers:
+        worker.start()
+
+    with executor:
+        results = [executor.submit(operator.add, index, 1) for index in range(10)]
+        error = executor.submit(math.sqrt, -1)
+        assert [future.result() for future in results] == list(range(1, 11))
+        with pytest.raises(ValueError, match="math domain error"):
+            error.result()
+
+    for worker in workers:
+        worker.join()
+
+    # All tasks should be processed and cleaned up
+    assert not any((queue_dir / "pending").iterdir())
+    assert not any((queue_dir / "running").iterdir())
+    assert not any((queue_dir / "done").iterdir())
+    with pytest.raises(RuntimeError, match="cannot schedule new futures"):
+        executor.submit(operator.add, 1, 1)
+
+
+def test_directory_queue_executor_max_workers(tmp_path):
+    executor = _queue_executor.DirectoryQueueExecutor(tmp_path, max_workers=16)
+    assert executor.max_workers == 16
+    executor.shutdown()
+
+    with pytest.raises(ValueError, match="max_workers should be at least 1"):
+        _queue_executor.DirectoryQueueExecutor(tmp_path, max_workers=0)
+
+
+def test_directory_queue_executor_cancel(tmp_path):
+    # Without workers, tasks stay pending so they can be cancelled
+    queue_dir = tmp_path / "queue"
+    executor = _queue_executor.DirectoryQueueExecutor(queue_dir, poll_interval=0.01)
+    future = executor.submit(time.sleep, 10)
+    assert future.cancel()
+    executor.shutdown(wait=True)
+
+    assert future.cancelled()
+    assert not any((queue_dir / "pending").iterdir())
+
+
+def test_directory_queue_executor_stale_task(tmp_path):
+    # Simulate a worker that was killed after claiming the task
+    queue_dir = tmp_path / "queue"
+    executor = _queue_executor.DirectoryQueueExecutor(
+        queue_dir, poll_interval=0.01, stale_timeout=0.2
+    )
+    future = executor.submit(operator.add, 1, 1)
+    task_id = _queue_executor._claim_task(queue_dir)
+    assert task_id is not None
+
+    with pytest.raises(RuntimeError, match="stopped sending heartbeats"):
+        future.result(timeout=10)
+    executor.shutdown()
+    assert not any((queue_dir / "running").iterdir())
+
+
+def test_directory_queue_executor_heartbeat(tmp_path):
+    # A task taking longer than the stale_timeout shouldn't fail thanks to heartbeats
+    queue_dir = tmp_path / "queue"
+    executor = _queue_executor.DirectoryQueueExecutor(
+        queue_dir, poll_interval=0.01, stale_timeout=0.5
+    )
+    worker = threading.Thread(
+        target=_queue_executor.run_worker,
+        kwargs={
+            "queue_dir": queue_dir,
+            "poll_interval": 0.01,
+            "idle_timeout": 0.5,
+            "heartbeat_interval": 0.05,
+        },
+    )
+    worker.start()
+    with executor:
+        future = executor.submit(time.sleep, 1.5)
+        assert future.result(timeout=10) is None
+    worker.join()
+
+
+def test_directory_queue_executor_poll_error(tmp_path):
+    # If the queue dir becomes inaccessible, the futures should fail instead of hang
+    queue_dir = tmp_path / "queue"
+    executor = _queue_executor.DirectoryQueueExecutor(queue_dir, poll_interval=0.01)
+    future = executor.submit(operator.add, 1, 1)
+    shutil.rmtree(queue_dir)
+
+    with pytest.raises(FileNotFoundError):
+        future.result(timeout=10)
+    executor.shutdown()
+
+
+def test_worker_pool_executor_tempdir_warning(tmp_path, monkeypatch):
+    executor = _queue_executor.DirectoryQueueExecutor(tmp_path / "queue")
+    # Pretend the temp dir is on another filesystem than the queue dir
+    monkeypatch.setattr(_queue_executor, "_same_filesystem", lambda path1, path2: False)
+    with pytest.warns(UserWarning, match="is on another filesystem than the queue"):
+        with gfo.worker_pool(executor=executor):
+            pass
+    executor.shutdown()
+
+
+def test_worker_pool_executor(tmp_path):
+    # Start some worker processes on the queue directory like they would be started on
+    # other machines.
+    queue_dir = tmp_path / "queue"
+    workers = [
+        subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "geofileops.worker",
+                str(queue_dir),
+                "--poll-interval",
+                "0.1",
+                "--idle-timeout",
+                "10",
+            ]
+        )
+        for _ in range(2)
+    ]
+
+    input_path = test_helper.get_testfile("polygon-parcel", dst_dir=tmp_path)
+    output_path = tmp_path / "output.gpkg"
+    input_layerinfo = gfo.get_layerinfo(input_path)
+    executor = gfo.DirectoryQueueExecutor(queue_dir, poll_interval=0.1)
+    try:
+        with gfo.worker_pool(executor=executor) as pool:
+            assert pool is executor
+            gfo.buffer(
+                input_path,
+                output_path,
+                distance=1,
+                batchsize=math.ceil(input_layerinfo.featurecount / 4),
+            )
+    finally:
+        executor.shutdown()
+        for worker in workers:
+            worker.wait(timeout=60)
+
+    assert all(worker.returncode == 0 for worker in workers)
+    assert output_path.exists()
+    output_layerinfo = gfo.get_layerinfo(output_path)
+    assert output_layerinfo.featurecount == input_layerinfo.featurecount - 1
@@ -3,18 +3,177 @@ Tests for functionalities in ogr_util.
 """
 
 import logging
+import sqlite3
 from pathlib import Path
 
 import pytest
 
 import geofileops as gfo
 from geofileops import fileops
+from geofileops.util import _processing_util
 from geofileops.util import _sqlite_util as sqlite_util
 from geofileops.util._geofileinfo import GeofileInfo
 from tests import test_helper
 from tests.test_helper import assert_geodataframe_equal
 
 
+@pytest.mark.parametrize("immutable", [False, True])
+def test_attach_readonly(tmp_path, immutable):
+    src = test_helper.get_testfile("polygon-parcel", dst_dir=tmp_path)
+    conn = sqlite3.connect(tmp_path / "main.sqlite", uri=True)
+    try:
+        sqlite_util._attach_readonly(conn, src, "input1", immutable=immutable)
+        sql = 'SELECT COUNT(*) FROM input1."parcels"'
+        assert conn.execute(sql).fetchone()[0] == gfo.get_layerinfo(src).featurecount
+        with pytest.raises(sqlite3.OperationalError, match="readonly database"):
+            conn.execute("CREATE TABLE input1.test (id INTEGER)")
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize(
+    "suffix, size, expected",
+    [
+        (None, 0, False),
+        ("-journal", 0, False),
+        ("-journal", 512, True),
+        ("-wal", 0, False),
+        ("-wal", 512, True),
+        ("-shm", 0, True),
+    ],
+)
+def test_is_being_written(tmp_path, suffix, size, expected):
+    path = tmp_path / "test.gpkg"
+    path.touch()
+    if suffix is not None:
+        Path(f"{path}{suffix}").write_bytes(b"\0" * size)
+
+    assert sqlite_util._is_being_written(path) is expected
+
+
+def test_create_table_as_sql_profile(tmp_path):
+    input_path = test_helper.get_testfile("polygon-parcel", dst_dir=tmp_path)
+    output_path = tmp_path / "output.gpkg"
+    sql_stmt = 'SELECT layer.geom, layer.HFDTLT FROM input."parcels" layer'
+    with gfo.TempEnv({"GFO_SQLITE_PROFILE": "page_size=8192,threads=2"}):
+        sqlite_util.create_table_as_sql(
+            input_databases={"input": input_path},
+            output_path=output_path,
+            output_layer="parcels",
+            output_geometrytype=None,
+            output_crs=31370,
+            sql_stmt=sql_stmt,
+        )
+
+    # The page size configured is used for the new output file
+    conn = sqlite3.connect(output_path)
+    try:
+        assert conn.execute("PRAGMA page_size").fetchone()[0] == 8192
+    finally:
+        conn.close()
+    input_info = gfo.get_layerinfo(input_path)
+    assert gfo.get_layerinfo(output_path).featurecount == input_info.featurecount
+
+
+def test_create_table_as_sql_reuse_connection(tmp_path):
+    input_path = test_helper.get_testfile("polygon-parcel", dst_dir=tmp_path)
+    input_info = gfo.get_layerinfo(input_path)
+    sql_stmt = """
+        SELECT layer.geom, layer.HFDTLT
+          FROM input."parcels" layer
+         WHERE layer.rowid % 2 = {batch_id}
+    """
+    try:
+        connections = []
+        for batch_id in range(2):
+            output_path = tmp_path / f"output_{batch_id}.gpkg"
+            sqlite_util.create_table_as_sql(
+                input_databases={"input": input_path},
+                output_path=output_path,
+                output_layer="parcels",
+                output_geometrytype=None,
+                output_crs=31370,
+                sql_stmt=sql_stmt.format(batch_id=batch_id),
+                create_spatial_index=False,
+                profile=sqlite_util.SqliteProfile.SPEED,
+                reuse_connection=True,
+            )
+            connections.append(sqlite_util._worker.connection)
+            output_info = gfo.get_layerinfo(output_path)
+            assert output_info.crs.to_epsg() == 31370
+            assert output_info.featurecount > 0
+
+        # The same connection was used for both batches
+        assert connections[0] is not None
+        assert connections[0] is connections[1]
+        nb_rows = sum(
+            gfo.get_layerinfo(tmp_path / f"output_{batch_id}.gpkg").featurecount
+            for batch_id in range(2)
+        )
+        assert nb_rows == input_info.featurecount
+
+        # If the input file changes, a new connection is used
+        gfo.add_column(input_path, name="NEW_COLUMN", type=gfo.DataType.INTEGER)
+        sqlite_util.create_table_as_sql(
+            input_databases={"input": input_path},
+            output_path=tmp_path / "output_changed.gpkg",
+            output_layer="parcels",
+            output_geometrytype=None,
+            output_crs=31370,
+            sql_stmt=sql_stmt.format(batch_id=0),
+            create_spatial_index=False,
+            reuse_connection=True,
+        )
+        assert sqlite_util._worker.connection is not connections[0]
+
+        # Releasing the worker at the end of an operation closes the connection, so
+        # the input files can be removed.
+        _processing_util.release_worker()
+        assert sqlite_util._worker.connection is None
+        input_path.unlink()
+    finally:
+        sqlite_util.close_worker_connection()
+
+
+def test_spatialite_version_info():
+    versions = sqlite_util.spatialite_version_info()
+    assert versions["spatialite_version"] != ""
+
+    # The versions are cached, but changing the result doesn't change the cache
+    versions["spatialite_version"] = "changed"
+    assert sqlite_util.spatialite_version_info()["spatialite_version"] != "changed"
+
+
+def test_sqlite_profile_from_config():
+    with gfo.TempEnv({"GFO_SQLITE_PROFILE": "cache_size_mb=256,temp_store=file"}):
+        profile = sqlite_util.SqliteProfile.from_config(speed=True)
+    assert profile.speed
+    assert profile.cache_size_mb == 256
+    assert profile.temp_store == "file"
+
+    # The cache size is scaled to the memory available per worker
+    with gfo.TempEnv({"GFO_SQLITE_PROFILE": ""}):
+        profile_1 = sqlite_util.SqliteProfile.from_config(nb_parallel=1)
+        profile_64 = sqlite_util.SqliteProfile.from_config(nb_parallel=64)
+    assert profile_1.cache_size_mb is not None
+    assert profile_64.cache_size_mb is not None
+    assert 16 <= profile_64.cache_size_mb <= profile_1.cache_size_mb <= 1024
+
+    conn = sqlite3.connect(":memory:")
+    try:
+        for sql in profile.pragmas(["main"]):
+            conn.execute(sql)
+        assert conn.execute("PRAGMA main.cache_size").fetchone()[0] == -256 * 1024
+        assert conn.execute("PRAGMA temp_store").fetchone()[0] == 1
+    finally:
+        conn.close()
+
+    gdal_options = profile.gdal_options()
+    assert gdal_options["CONFIG.OGR_SQLITE_CACHE"] == "256"
+    assert "cache_size=-262144" in gdal_options["CONFIG.OGR_SQLITE_PRAGMA"]
+    assert "journal_mode" not in gdal_options["CONFIG.OGR_SQLITE_PRAGMA"]
+
+
 @pytest.mark.parametrize("create_spatial_index", [(True), (False)])
 def test_create_table_as_sql(tmp_path, create_spatial_index):
     output_path = tmp_path / "output.gpkg"
@@ -69,6 +228,52 @@ def test_create_table_as_sql(tmp_path, create_spatial_index):
     gfo.rename_layer(output_path, layer=output_path.stem, new_layer="test_layername")
 
 
+def test_get_batch_ranges_geomsize():
+    path = test_helper.get_testfile("polygon-parcel")
+    info = gfo.get_layerinfo(path)
+
+    batches_df = sqlite_util.get_batch_ranges_geomsize(
+        path, layer=info.name, geometrycolumn=info.geometrycolumn, nb_batches=4
+    )
+
+    # The batches should cover all rows with consecutive batch_id's
+    assert 1 < len(batches_df) <= 4
+    assert list(batches_df["batch_id"]) == list(range(len(batches_df)))
+    assert batches_df["nb_rows"].sum() == info.featurecount
+    assert (
+        batches_df["start_id"].iloc[1:].values > batches_df["end_id"].iloc[:-1].values
+    ).all()
+
+
+@pytest.mark.parametrize("chunksize", [7, 100_000])
+def test_fill_gpkg_rtree(tmp_path, chunksize):
+    src = test_helper.get_testfile("polygon-parcel", dst_dir=tmp_path)
+    gfo.remove_spatial_index(src)
+    input_gdf = gfo.read_file(src, fid_as_index=True)
+
+    conn = sqlite3.connect(src)
+    try:
+        sqlite_util.load_spatialite(conn)
+        conn.execute("SELECT EnableGpkgMode();")
+        conn.execute("SELECT gpkgAddSpatialIndex('parcels', 'geom');")
+        sqlite_util.fill_gpkg_rtree(conn, "parcels", "geom", chunksize=chunksize)
+        conn.commit()
+        rtree_rows = conn.execute(
+            'SELECT id, minx, maxx, miny, maxy FROM "rtree_parcels_geom"'
+        ).fetchall()
+    finally:
+        conn.close()
+
+    # All non-empty geometries should be in the index with their bounds
+    input_gdf = input_gdf[~input_gdf.geometry.is_empty & input_gdf.geometry.notna()]
+    assert len(rtree_rows) == len(input_gdf)
+    for fid, minx, maxx, miny, maxy in rtree_rows:
+        bounds = input_gdf.geometry[fid].bounds
+        assert minx <= bounds[0] and miny <= bounds[1]
+        assert maxx >= bounds[2] and maxy >= bounds[3]
+    assert gfo.has_spatial_index(src)
+
+
 @pytest.mark.parametrize(
     "kwargs, expected_error",
     [
@@ -120,6 +325,62 @@ def test_create_table_as_sql_invalidparams(kwargs, expected_error):
         sqlite_util.create_table_as_sql(**kwargs)
 
 
+def test_append_gpkg_layer(tmp_path):
+    input_path = test_helper.get_testfile("polygon-parcel")
+    input_gdf = fileops.read_file(input_path)
+    src = tmp_path / "src.gpkg"
+    dst = tmp_path / "dst.gpkg"
+    fileops.to_file(input_gdf.iloc[:20], src, create_spatial_index=False)
+    fileops.to_file(input_gdf.iloc[20:], dst, create_spatial_index=False)
+
+    # Test
+    assert sqlite_util.append_gpkg_layer(src, dst)
+
+    # Check result
+    output_gdf = fileops.read_file(dst)
+    assert len(output_gdf) == len(input_gdf)
+    assert gfo.get_layerinfo(dst).featurecount == len(input_gdf)
+    assert_geodataframe_equal(
+        output_gdf, input_gdf, check_less_precise=True, sort_values=True
+    )
+    output_bounds = gfo.get_layerinfo(dst).total_bounds
+    assert output_bounds == pytest.approx(input_gdf.total_bounds.tolist())
+
+
+def test_append_gpkg_layer_not_possible(tmp_path):
+    input_path = test_helper.get_testfile("polygon-parcel")
+    input_gdf = fileops.read_file(input_path)
+    src = tmp_path / "src.gpkg"
+    dst = tmp_path / "dst.gpkg"
+    fileops.to_file(input_gdf.iloc[:20][["HFDTLT", "geometry"]], src)
+    fileops.to_file(input_gdf.iloc[20:], dst, create_spatial_index=False)
+
+    # Different columns, so not possible
+    assert not sqlite_util.append_gpkg_layer(src, dst)
+    assert gfo.get_layerinfo(dst).featurecount == len(input_gdf) - 20
+
+
+def test_append_gpkg_layer_spatial_index(tmp_path):
+    input_path = test_helper.get_testfile("polygon-parcel")
+    input_gdf = fileops.read_file(input_path)
+    src = tmp_path / "src.gpkg"
+    dst = tmp_path / "dst.gpkg"
+    fileops.to_file(input_gdf.iloc[:20], src, create_spatial_index=False)
+    fileops.to_file(input_gdf.iloc[20:], dst, create_spatial_index=True)
+
+    # Test
+    assert sqlite_util.append_gpkg_layer(src, dst)
+
+    # Check result: the spatial index should be complete and still be maintained
+    assert fileops.has_spatial_index(dst)
+    layer = gfo.get_only_layer(dst)
+    sql = f'SELECT COUNT(*) AS nb_rows FROM "rtree_{layer}_geom"'
+    exp_nb_rows = (~(input_gdf.geometry.isna() | input_gdf.geometry.is_empty)).sum()
+    assert fileops.read_file(dst, sql_stmt=sql)["nb_rows"][0] == exp_nb_rows
+    fileops.append_to(input_path, dst)
+    assert fileops.read_file(dst, sql_stmt=sql)["nb_rows"][0] == 2 * exp_nb_rows
+
+
 def test_execute_sql(tmp_path):
     test_path = test_helper.get_testfile(testfile="polygon-parcel", dst_dir=tmp_path)
     exp_spatial_index = GeofileInfo(test_path).default_spatial_index